@@ -1,3 +1,14 @@
-from app.agent import root_agent
+from typing import Any
 
 __all__ = ["root_agent"]
+
+
+def __getattr__(name: str) -> Any:
+    # Built on first use, so that importing a leaf module such as
+    # `app.utils.image_encoding` (in an image worker process) does not load
+    # the config and build the whole agent tree.
+    if name == "root_agent":
+        from app.agent import root_agent
+
+        return root_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -12,13 +12,23 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from datetime import datetime, timezone
+from dataclasses import replace
 
 import google.genai.types as genai_types
 from google.adk.agents import LlmAgent
 from google.adk.planners import BuiltInPlanner
 
 from app.config import config
+from app.fallbacks import degraded_mode
+from app.utils import cassettes
+from app.utils.compaction import CompactionPolicy, HistoryCompactor
+from app.utils.hedging import Deadlines, hedged_model
+from app.utils.incremental import IncrementalStages
+from app.utils.instructions import PrefixedInstruction
+from app.utils.item_bank import ItemBankGaps
+from app.utils.material_cache import PreparedMaterials
+from app.utils.speculation import Route, SpeculativeExecutor
+from app.utils.teacher_profiles import TeacherProfileInjector
 
 from . import prompt
 from .sub_agents.differentiated_materials import differentiated_materials_agent
@@ -27,19 +37,96 @@ from .sub_agents.knowledge_base_agent import knowledge_base_agent
 from .sub_agents.visual_aid_agent import visual_aid_agent
 from .sub_agents.fun_activity import fun_activity_agent
 from .sub_agents.planning import lesson_planning_agent
+from .sub_agents.differentiated_materials.sub_agents.worksheet_generator import (
+    worksheet_generator_agent,
+)
+from .sub_agents.fun_activity.sub_agents.fitb_generator.schema import FITB_ITEMS
+from .sub_agents.fun_activity.sub_agents.quiz_generator import quiz_generator_agent
+from .sub_agents.fun_activity.sub_agents.quiz_generator.schema import QUIZ_ITEMS
+from .sub_agents.planning.subagents.subtopic_decomposer import (
+    subtopic_decomposer_agent,
+)
+
+
+# Requests that almost always end up in the same leaf agent. The leaf is
+# started while the root agent is still deciding where to transfer.
+speculative_executor = SpeculativeExecutor(
+    routes=[
+        Route(
+            category="worksheet",
+            pattern=r"\bworksheets?\b",
+            target=differentiated_materials_agent.name,
+            leaf=worksheet_generator_agent,
+        ),
+        Route(
+            category="quiz",
+            pattern=r"\bquiz(zes)?\b",
+            target=fun_activity_agent.name,
+            leaf=quiz_generator_agent,
+        ),
+        Route(
+            category="lesson_plan",
+            pattern=r"\blesson plans?\b",
+            target=lesson_planning_agent.name,
+            leaf=subtopic_decomposer_agent,
+        ),
+        Route(
+            category="explanation",
+            pattern=r"^\s*(why|how does|how do|explain)\b",
+            target=knowledge_base_agent.name,
+            leaf=knowledge_base_agent,
+        ),
+    ],
+    min_confidence=config.speculation_min_confidence,
+)
+
+default_history = CompactionPolicy(
+    recent_turns=config.history_recent_turns,
+    max_turns=config.history_max_turns,
+)
+# Generators read what they build on from state ({baseline_worksheet}, ...),
+# so earlier turns matter little to them.
+generator_history = replace(default_history, recent_turns=1, max_turns=5)
+history_compactor = HistoryCompactor(
+    default=default_history,
+    policies=dict.fromkeys(
+        (
+            "worksheet_creator_agent",
+            "answerkey_creator_agent",
+            "quiz_generator_agent",
+            "scenario_generator_agent",
+            "fitb_generator_agent",
+            "word_game_generator_agent",
+            "mindmap_generator_agent",
+            "diagram_creator_agent",
+            "visual_guide_generator_agent",
+            "subtopic_decomposer_agent",
+        ),
+        generator_history,
+    ),
+)
 
 
 # --- ROOT AGENT DEFINITION ---
 root_agent = LlmAgent(
     name=config.internal_agent_name,
-    model=config.model,
+    model=hedged_model(config.model),
     description="An intelligent agent that takes goals and breaks them down into actionable tasks and subtasks with built-in planning capabilities.",
     planner=BuiltInPlanner(
         thinking_config=genai_types.ThinkingConfig(include_thoughts=True)
     ),
-    instruction=prompt.SAHAYAK_PROMPT.format(
-        cur_date=datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    instruction=PrefixedInstruction(
+        static_prefix=prompt.SAHAYAK_PROMPT,
+        dynamic_template=prompt.SAHAYAK_CONTEXT_TEMPLATE,
+        defaults={
+            "teacher_locale": "Not specified (default to English)",
+            "teacher_grade": "Not specified (ask if needed)",
+            "teacher_subjects": "Not specified",
+            "teacher_class_minutes": "Not specified (assume 40)",
+        },
     ),
+    before_model_callback=speculative_executor.before_model_callback,
+    after_model_callback=speculative_executor.after_model_callback,
     sub_agents=[
         differentiated_materials_agent,
         hyper_local_content_agent,
@@ -50,3 +137,30 @@ root_agent = LlmAgent(
     ],
     output_key="sahayata",
 )
+
+history_compactor.install(root_agent)
+# Every model call gets a share of the request SLO as its deadline.
+Deadlines(slo_seconds=config.request_slo_seconds).install(root_agent)
+# Teacher profiles are injected into state before any agent runs; see
+# app.utils.teacher_profiles.
+TeacherProfileInjector().install(root_agent)
+# A request for a material prepared ahead of time (`make prewarm`) is answered
+# from the material cache, without a model call; see app.utils.material_cache.
+PreparedMaterials().install(root_agent)
+# Quiz, fill-in-the-blank and worksheet questions come from the item bank
+# where it has them, and only the rest from the model; see app.utils.item_bank.
+ItemBankGaps(
+    {"quiz_generator_agent": QUIZ_ITEMS, "fitb_generator_agent": FITB_ITEMS},
+    text_agents=["worksheet_creator_agent"],
+    enabled=config.item_bank != "off",
+).install(root_agent)
+# Past the load-shedding thresholds, agents answer from local fallbacks
+# instead of the model. Installed last so it runs before every other model
+# callback; see app.utils.degraded.
+degraded_mode.install(root_agent)
+# Generator stages whose inputs did not change reuse their output from state,
+# ahead of every other callback; see app.utils.incremental.
+incremental_stages = IncrementalStages(enabled=config.incremental_stages != "off")
+incremental_stages.install(root_agent)
+# Recording or replaying model calls, when MODEL_CASSETTE_MODE asks for it.
+cassettes.configure(root_agent)
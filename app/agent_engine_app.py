@@ -12,7 +12,6 @@ from pathlib import Path
 from typing import Any
 
 import vertexai
-from google.adk.artifacts import GcsArtifactService
 from google.cloud import logging as google_cloud_logging
 from opentelemetry import trace
 from opentelemetry.sdk.trace import TracerProvider, export
@@ -21,6 +20,11 @@ from vertexai.preview.reasoning_engines import AdkApp
 
 from app.agent import root_agent
 from app.config import config, get_deployment_config
+from app.utils import metrics
+from app.utils.artifacts import (
+    CachedArtifactService,
+    DeduplicatingGcsArtifactService,
+)
 from app.utils.gcs import create_bucket_if_not_exists
 from app.utils.tracing import CloudTraceLoggingSpanExporter
 from app.utils.typing import Feedback
@@ -54,10 +58,14 @@ class AgentEngineApp(AdkApp):
         feedback_obj = Feedback.model_validate(feedback)
         self.logger.log_struct(feedback_obj.model_dump(), severity="INFO")
 
+    def get_metrics(self) -> dict[str, dict[str, float]]:
+        """Return the performance counters (coalescing, caching, ...) of this worker."""
+        return metrics.snapshot()
+
     def register_operations(self) -> dict[str, list[str]]:
         """Register available operations for the agent."""
         operations = super().register_operations()
-        operations[""] = operations[""] + ["register_feedback"]
+        operations[""] = operations[""] + ["register_feedback", "get_metrics"]
         return operations
 
     def clone(self) -> "AgentEngineApp":
@@ -138,8 +146,8 @@ def deploy_agent_engine_app() -> agent_engines.AgentEngine:
     # Step 6: Create the agent engine app
     agent_engine = AgentEngineApp(
         agent=root_agent,
-        artifact_service_builder=lambda: GcsArtifactService(
-            bucket_name=artifacts_bucket_name
+        artifact_service_builder=lambda: CachedArtifactService(
+            DeduplicatingGcsArtifactService(artifacts_bucket_name)
         ),
     )
 
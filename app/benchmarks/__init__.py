@@ -0,0 +1 @@
+"""Offline benchmarks, runnable with `python -m app.benchmarks.<name>`."""
@@ -0,0 +1,189 @@
+"""
+Artifact Dedup Benchmark - Storage and upload time saved by content hashing
+
+Replays sessions that save worksheets, diagrams, images and a few large
+exports drawn from a shared pool (popular materials repeat across sessions,
+as they do in classrooms), against the streaming GCS artifact service and the
+deduplicating one. Both run on the local GCS stand-in with simulated latency
+and bandwidth, so no bucket or credentials are needed.
+
+    uv run python -m app.benchmarks.artifact_dedup --sessions 200
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from typing import Any
+
+from google.adk.artifacts import BaseArtifactService
+from google.genai import types
+
+from app.utils.artifacts import (
+    DeduplicatingGcsArtifactService,
+    StreamingGcsArtifactService,
+)
+from app.utils.local_gcs import LocalGcsClient
+from app.utils.metrics import counters
+
+# (kind, distinct contents, size range in bytes, mime type, saves per session)
+MATERIALS = [
+    ("worksheet.md", 40, (3_000, 12_000), "text/markdown", 2),
+    ("diagram.svg", 25, (10_000, 60_000), "image/svg+xml", 1),
+    ("visual_aid_image.webp", 25, (80_000, 600_000), "image/webp", 1),
+]
+LARGE_EXPORT = ("term_export.pdf", 2, (40_000_000, 40_000_000), "application/pdf")
+LARGE_EXPORT_EVERY = 40
+"""One session in this many also saves a large export."""
+
+LATENCY = 0.002
+BANDWIDTH = 25e6
+
+
+def build_workload(sessions: int, seed: int) -> list[list[tuple[str, types.Part]]]:
+    """Artifacts saved by each session; popular contents are picked more often."""
+    rng = random.Random(seed)
+    pools: dict[str, list[types.Part]] = {}
+    for kind, distinct, (low, high), mime_type, _ in [*MATERIALS, (*LARGE_EXPORT, 0)]:
+        pools[kind] = [
+            types.Part.from_bytes(
+                data=rng.randbytes(rng.randint(low, high)), mime_type=mime_type
+            )
+            for _ in range(distinct)
+        ]
+
+    workload = []
+    for session in range(sessions):
+        saves = []
+        for kind, distinct, _, _, per_session in MATERIALS:
+            # Zipf-like popularity: a few materials account for most saves.
+            weights = [1 / (rank + 1) for rank in range(distinct)]
+            for part in rng.choices(pools[kind], weights=weights, k=per_session):
+                saves.append((kind, part))
+        if session % LARGE_EXPORT_EVERY == 0:
+            saves.append((LARGE_EXPORT[0], rng.choice(pools[LARGE_EXPORT[0]])))
+        workload.append(saves)
+    return workload
+
+
+async def replay(
+    service: BaseArtifactService, workload: list[list[tuple[str, types.Part]]]
+) -> dict[str, float]:
+    upload_seconds = 0.0
+    saved: list[tuple[str, str, int]] = []
+    for index, saves in enumerate(workload):
+        session_id = f"session-{index}"
+        for filename, part in saves:
+            start = time.perf_counter()
+            version = await service.save_artifact(
+                app_name="app",
+                user_id=f"teacher-{index % 25}",
+                session_id=session_id,
+                filename=filename,
+                artifact=part,
+            )
+            upload_seconds += time.perf_counter() - start
+            saved.append((session_id, filename, version))
+
+    # Teachers reopen their materials: read every artifact back once.
+    start = time.perf_counter()
+    for session_id, filename, version in saved:
+        index = int(session_id.rsplit("-", 1)[1])
+        await service.load_artifact(
+            app_name="app",
+            user_id=f"teacher-{index % 25}",
+            session_id=session_id,
+            filename=filename,
+            version=version,
+        )
+    return {
+        "saves": len(saved),
+        "upload_seconds": upload_seconds,
+        "read_seconds": time.perf_counter() - start,
+    }
+
+
+def run(sessions: int, seed: int) -> dict[str, Any]:
+    workload = build_workload(sessions, seed)
+    logical_bytes = sum(
+        len(part.inline_data.data or b"") if part.inline_data else 0
+        for saves in workload
+        for _, part in saves
+    )
+    results: dict[str, Any] = {"sessions": sessions, "logical_bytes": logical_bytes}
+    for name, service_class in (
+        ("streaming", StreamingGcsArtifactService),
+        ("deduplicating", DeduplicatingGcsArtifactService),
+    ):
+        client = LocalGcsClient(latency=LATENCY, bandwidth=BANDWIDTH)
+        service = service_class("artifacts", client=client)
+        dedup_counters = counters("artifacts")
+        dedup_counters.reset()
+        timings = asyncio.run(replay(service, workload))
+        bucket = client.bucket("artifacts")
+        snapshot = dedup_counters.snapshot()
+        results[name] = {
+            **timings,
+            "stored_bytes": bucket.stored_bytes,
+            "objects": bucket.object_count,
+            "bytes_uploaded": client.stats.bytes_uploaded,
+            "requests": client.stats.requests,
+            "composite_uploads": snapshot.get("composite_uploads", 0),
+            "read_cache_hits": snapshot.get("read_cache_hits", 0),
+            "read_cache_misses": snapshot.get("read_cache_misses", 0),
+        }
+    return results
+
+
+def report(results: dict[str, Any]) -> str:
+    plain, dedup = results["streaming"], results["deduplicating"]
+    mb = 1024 * 1024
+
+    def saving(before: float, after: float) -> str:
+        return f"{1 - after / before:.0%} saved" if before else "-"
+
+    reads = dedup["read_cache_hits"] + dedup["read_cache_misses"]
+    hit_rate = dedup["read_cache_hits"] / reads if reads else 0
+    rows = [
+        ("stored", plain["stored_bytes"] / mb, dedup["stored_bytes"] / mb, "MB"),
+        ("uploaded", plain["bytes_uploaded"] / mb, dedup["bytes_uploaded"] / mb, "MB"),
+        ("upload time", plain["upload_seconds"], dedup["upload_seconds"], "s"),
+        ("read time", plain["read_seconds"], dedup["read_seconds"], "s"),
+    ]
+    lines = [
+        f"{results['sessions']} sessions, {plain['saves']} saves, "
+        f"{results['logical_bytes'] / mb:.1f} MB of artifacts",
+        "",
+        f"{'':>12} {'streaming':>12} {'dedup':>12}",
+    ]
+    for label, before, after, unit in rows:
+        lines.append(
+            f"{label:>12} {before:>10.2f}{unit:<2} {after:>10.2f}{unit:<2} "
+            f"{saving(before, after)}"
+        )
+    lines += [
+        "",
+        f"Objects in bucket: {plain['objects']} -> {dedup['objects']} "
+        "(references are empty objects)",
+        f"Composite uploads: {dedup['composite_uploads']:.0f}",
+        f"Read cache hit rate: {hit_rate:.0%}",
+    ]
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=120)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="Print raw results")
+    args = parser.parse_args(argv)
+
+    results = run(args.sessions, args.seed)
+    print(json.dumps(results, indent=2) if args.json else report(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
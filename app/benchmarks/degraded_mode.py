@@ -0,0 +1,263 @@
+"""
+Degraded Mode Benchmark - Responsiveness through model outages and overload
+
+Drives a steady stream of teacher requests (worksheets, word games and
+mindmaps) against a fake model backend with limited capacity, through four
+phases: normal service, a quota outage (most calls fail with 429), a slowdown
+(calls take several times longer, so requests queue) and recovery. Runs it
+twice: without load shedding, and with the `LoadShedder` answering from the
+local fallbacks past its thresholds. Reports, per phase, the share of
+requests answered within the client timeout, the share answered by a
+fallback, and answer latency. Fallbacks are timed separately, against an
+empty material cache, and their measured time is charged to every degraded
+answer. Latencies are in model seconds, run `--time-scale` times faster.
+
+    uv run python -m app.benchmarks.degraded_mode --rate 3 --phase-seconds 60
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from google.genai import errors
+
+from app import fallbacks
+from app.sub_agents.differentiated_materials.sub_agents.worksheet_generator.question_bank import (
+    VOCABULARY,
+)
+from app.utils import material_cache
+from app.utils.degraded import FallbackRequest, LoadShedder, parse_request
+
+PHASES = ["normal", "outage", "slowdown", "recovery"]
+MODES = ["plain", "shedding"]
+REQUESTS = [
+    ("worksheet_creator_agent", "Make a worksheet on {topic} for class {grade}"),
+    ("word_game_generator_agent", "Make a crossword about {topic} for class {grade}"),
+    ("mindmap_generator_agent", "Draw a mindmap of {topic} for class {grade}"),
+]
+TOPICS = [*VOCABULARY, "fractions", "multiplication"]
+
+
+class FakeBackend:
+    """A model service with limited capacity whose health changes by phase."""
+
+    def __init__(self, args: argparse.Namespace, seed: int) -> None:
+        self.args = args
+        self.rng = random.Random(seed)
+        self.capacity = asyncio.Semaphore(args.capacity)
+        self.phase = "normal"
+
+    async def call(self) -> None:
+        scale = self.args.time_scale
+        async with self.capacity:
+            seconds = self.args.latency * self.rng.lognormvariate(0, 0.3)
+            if self.phase == "slowdown":
+                seconds *= self.args.slowdown
+            if self.phase == "outage" and self.rng.random() < self.args.outage_errors:
+                # Quota errors come back quickly.
+                await asyncio.sleep(self.rng.uniform(0.2, 1.0) * scale)
+                raise errors.ClientError(429, {"error": {"message": "quota"}})
+            await asyncio.sleep(seconds * scale)
+
+
+def time_fallbacks(repeat: int, seed: int) -> dict[str, list[float]]:
+    """Seconds each agent's fallback takes, over `repeat` requests each."""
+    rng = random.Random(seed)
+    timings: dict[str, list[float]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # An empty cache: every fallback is built locally, the slow path.
+        material_cache._default_cache = material_cache.MaterialCache(
+            Path(tmp) / "materials.sqlite3"
+        )
+        try:
+            for _ in range(repeat):
+                for agent, template in REQUESTS:
+                    text = template.format(
+                        topic=rng.choice(TOPICS), grade=rng.randint(1, 8)
+                    )
+                    request = parse_request(agent, text, {})
+                    start = time.perf_counter()
+                    if fallbacks.degraded_mode.answer(request) is None:
+                        raise RuntimeError(f"No fallback answers {text!r}")
+                    timings.setdefault(agent, []).append(time.perf_counter() - start)
+        finally:
+            material_cache._default_cache = None
+    return timings
+
+
+async def _request(
+    request: FallbackRequest,
+    backend: FakeBackend,
+    shedder: LoadShedder | None,
+    fallback_seconds: dict[str, list[float]],
+    rng: random.Random,
+) -> tuple[str, float]:
+    """("model" | "degraded" | "failed", latency in model seconds)."""
+    scale = backend.args.time_scale
+    if shedder is not None and shedder.degraded():
+        return "degraded", rng.choice(fallback_seconds[request.agent])
+    start = time.monotonic()
+    try:
+        if shedder is None:
+            await asyncio.wait_for(backend.call(), backend.args.timeout * scale)
+        else:
+            with shedder.track():
+                await asyncio.wait_for(backend.call(), backend.args.timeout * scale)
+    except (errors.APIError, asyncio.TimeoutError):
+        return "failed", (time.monotonic() - start) / scale
+    return "model", (time.monotonic() - start) / scale
+
+
+async def _load(
+    mode: str, args: argparse.Namespace, fallback_seconds: dict[str, list[float]]
+) -> dict[str, Any]:
+    rng = random.Random(args.seed)
+    backend = FakeBackend(args, args.seed)
+    scale = args.time_scale
+    shedder = None
+    if mode == "shedding":
+        shedder = LoadShedder(
+            max_in_flight=args.max_in_flight,
+            max_latency=args.max_latency,
+            cooldown=args.cooldown,
+            # Thresholds are in model seconds.
+            clock=lambda: time.monotonic() / scale,
+        )
+        shedder.counters.reset()
+
+    outcomes: dict[str, list[tuple[str, float]]] = {phase: [] for phase in PHASES}
+    tasks = []
+
+    async def run(phase: str, request: FallbackRequest) -> None:
+        outcomes[phase].append(
+            await _request(request, backend, shedder, fallback_seconds, rng)
+        )
+
+    for phase in PHASES:
+        backend.phase = phase
+        end = time.monotonic() + args.phase_seconds * scale
+        while time.monotonic() < end:
+            agent, template = rng.choice(REQUESTS)
+            text = template.format(topic=rng.choice(TOPICS), grade=rng.randint(1, 8))
+            tasks.append(
+                asyncio.create_task(run(phase, parse_request(agent, text, {})))
+            )
+            await asyncio.sleep(rng.expovariate(args.rate) * scale)
+    await asyncio.gather(*tasks)
+
+    results: dict[str, Any] = {}
+    for phase, rows in outcomes.items():
+        answered = sorted(latency for kind, latency in rows if kind != "failed")
+
+        def percentile(q: float, values: list[float] = answered) -> float:
+            return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+        results[phase] = {
+            "requests": len(rows),
+            "answered": len(answered) / len(rows),
+            "degraded": sum(kind == "degraded" for kind, _ in rows) / len(rows),
+            "p50": statistics.median(answered) if answered else 0.0,
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+        }
+    if shedder is not None:
+        results["counters"] = shedder.counters.snapshot()
+    return results
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    fallback_seconds = time_fallbacks(args.fallback_repeat, args.seed)
+    results: dict[str, Any] = {
+        "timeout_seconds": args.timeout,
+        "fallback_ms": {
+            agent: {
+                "median": statistics.median(values) * 1000,
+                "max": max(values) * 1000,
+            }
+            for agent, values in fallback_seconds.items()
+        },
+    }
+    for mode in MODES:
+        results[mode] = asyncio.run(_load(mode, args, fallback_seconds))
+    return results
+
+
+def report(results: dict[str, Any]) -> str:
+    lines = [
+        f"{'phase':<10} {'mode':<9} {'requests':>8} {'answered':>9} "
+        f"{'degraded':>9} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7}",
+    ]
+    for phase in PHASES:
+        for mode in MODES:
+            row = results[mode][phase]
+            lines.append(
+                f"{phase:<10} {mode:<9} {row['requests']:>8} {row['answered']:>9.1%} "
+                f"{row['degraded']:>9.1%} {row['p50']:>7.1f} {row['p95']:>7.1f} "
+                f"{row['p99']:>7.1f}"
+            )
+    lines += ["", f"{'fallback':<28} {'median ms':>10} {'max ms':>8}"]
+    for agent, timing in results["fallback_ms"].items():
+        lines.append(f"{agent:<28} {timing['median']:>10.2f} {timing['max']:>8.2f}")
+    worst = {
+        mode: min(results[mode][phase]["answered"] for phase in PHASES)
+        for mode in MODES
+    }
+    lines += [
+        "",
+        f"Worst phase: {worst['plain']:.0%} of requests answered within "
+        f"{results['timeout_seconds']:.0f} s without load shedding, "
+        f"{worst['shedding']:.0%} with it",
+    ]
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rate", type=float, default=3, help="Requests per second")
+    parser.add_argument("--phase-seconds", type=float, default=60)
+    parser.add_argument(
+        "--capacity", type=int, default=40, help="Model calls the backend runs at once"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=8, help="Median model call seconds"
+    )
+    parser.add_argument(
+        "--slowdown", type=float, default=6, help="Latency factor while slow"
+    )
+    parser.add_argument(
+        "--outage-errors",
+        type=float,
+        default=0.9,
+        help="Share of calls failing during the outage",
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=60, help="Seconds a teacher waits at most"
+    )
+    parser.add_argument("--max-in-flight", type=int, default=48)
+    parser.add_argument("--max-latency", type=float, default=30)
+    parser.add_argument("--cooldown", type=float, default=15)
+    parser.add_argument("--fallback-repeat", type=int, default=50)
+    parser.add_argument(
+        "--time-scale",
+        type=float,
+        default=0.01,
+        help="Real seconds per model second",
+    )
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="Print raw results")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    print(json.dumps(results, indent=2) if args.json else report(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""
+Hedging Benchmark - Tail latency and extra cost of hedged model calls
+
+Load-tests the request chain (root → manager → leaf → manager synthesis)
+against a fake model backend with injected stragglers and transient errors,
+three ways: plain calls; calls with per-agent deadlines and jittered retries;
+and calls that are also hedged at their agent's p95 latency. Reports request
+latency percentiles, failed requests and the extra backend calls each way
+costs. Latencies are in model seconds, run `--time-scale` times faster.
+
+    uv run python -m app.benchmarks.hedging --requests 2000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from collections.abc import AsyncIterator
+from typing import Any
+
+from app.utils.hedging import DeadlineExceeded, Deadlines, Hedger
+
+# (agent, median seconds, has sub-agents) for each call of a request, in order.
+CHAIN = [
+    ("sahayak", 1.5, True),
+    ("differentiated_materials_agent", 1.0, True),
+    ("worksheet_creator_agent", 6.0, False),
+    ("differentiated_materials_agent", 2.0, True),
+]
+MODES = ["plain", "retries", "hedged"]
+
+
+class FakeBackend:
+    """Model calls with log-normal latency, stragglers and transient errors."""
+
+    def __init__(
+        self,
+        time_scale: float,
+        straggler_rate: float,
+        straggler_factor: tuple[float, float],
+        error_rate: float,
+        seed: int,
+    ) -> None:
+        self.time_scale = time_scale
+        self.straggler_rate = straggler_rate
+        self.straggler_factor = straggler_factor
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.cancelled = 0
+        self.steps = 0
+        """Chain steps run, each needing one call without retries or hedges."""
+
+    async def call(self, median: float) -> AsyncIterator[str]:
+        self.calls += 1
+        seconds = median * self.rng.lognormvariate(0, 0.25)
+        if self.rng.random() < self.straggler_rate:
+            seconds *= self.rng.uniform(*self.straggler_factor)
+        failing = self.rng.random() < self.error_rate
+        try:
+            # Errors (overload, dropped connections) surface early.
+            await asyncio.sleep(seconds * self.time_scale * (0.2 if failing else 1))
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if failing:
+            raise ConnectionError("backend unavailable")
+        yield "response"
+
+
+async def _request(
+    mode: str,
+    backend: FakeBackend,
+    hedger: Hedger,
+    deadlines: Deadlines,
+) -> float | None:
+    """Seconds the request took, in model time; None if it failed."""
+    start = time.monotonic()
+    slo_end = start + deadlines.slo_seconds * backend.time_scale
+    try:
+        for name, median, coordinator in CHAIN:
+            backend.steps += 1
+            if mode == "plain":
+                async for _ in backend.call(median):
+                    pass
+                continue
+            budget = deadlines.budget(name, coordinator)
+            deadline = min(time.monotonic() + budget * backend.time_scale, slo_end)
+            async for _ in hedger.stream(
+                name, lambda _attempt, m=median: backend.call(m), deadline
+            ):
+                pass
+    except (ConnectionError, DeadlineExceeded):
+        return None
+    return (time.monotonic() - start) / backend.time_scale
+
+
+async def _load(
+    mode: str, requests: int, concurrency: int, args: argparse.Namespace
+) -> dict[str, Any]:
+    backend = FakeBackend(
+        args.time_scale,
+        args.straggler_rate,
+        (args.straggler_min, args.straggler_max),
+        args.error_rate,
+        args.seed,
+    )
+    hedger = Hedger(
+        f"benchmark.{mode}",
+        max_hedge_ratio=args.hedge_ratio if mode == "hedged" else 0,
+        # Delays in model seconds, scaled like the backend.
+        min_delay=0.05 * args.time_scale,
+        backoff_base=0.5 * args.time_scale,
+        backoff_cap=8 * args.time_scale,
+    )
+    hedger.counters.reset()
+    deadlines = Deadlines(slo_seconds=args.slo)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited() -> float | None:
+        async with semaphore:
+            return await _request(mode, backend, hedger, deadlines)
+
+    results = await asyncio.gather(*(limited() for _ in range(requests)))
+    latencies = sorted(r for r in results if r is not None)
+
+    def percentile(q: float) -> float:
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    return {
+        "p50": statistics.median(latencies),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+        "max": latencies[-1],
+        "failed": requests - len(latencies),
+        "backend_calls": backend.calls,
+        "extra_calls": backend.calls / backend.steps - 1,
+        "cancelled_calls": backend.cancelled,
+        "counters": hedger.counters.snapshot(),
+    }
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    return {
+        "requests": args.requests,
+        "slo_seconds": args.slo,
+        **{
+            mode: asyncio.run(_load(mode, args.requests, args.concurrency, args))
+            for mode in MODES
+        },
+    }
+
+
+def report(results: dict[str, Any]) -> str:
+    lines = [
+        f"{'mode':<8} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'max s':>7} "
+        f"{'failed':>7} {'extra calls':>12} {'hedges':>7} {'won':>5}",
+    ]
+    for mode in MODES:
+        row = results[mode]
+        counters = row["counters"]
+        lines.append(
+            f"{mode:<8} {row['p50']:>7.1f} {row['p95']:>7.1f} {row['p99']:>7.1f} "
+            f"{row['max']:>7.1f} {row['failed']:>7} {row['extra_calls']:>12.1%} "
+            f"{counters.get('hedges', 0):>7.0f} {counters.get('hedge_wins', 0):>5.0f}"
+        )
+    plain, hedged = results["plain"], results["hedged"]
+    lines += [
+        "",
+        f"p99: {plain['p99']:.1f} s -> {hedged['p99']:.1f} s "
+        f"({1 - hedged['p99'] / plain['p99']:.0%} lower) for "
+        f"{hedged['extra_calls']:.1%} extra backend calls; failed requests "
+        f"{plain['failed']} -> {hedged['failed']} of {results['requests']} "
+        f"(SLO {results['slo_seconds']:.0f} s)",
+    ]
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--slo", type=float, default=40, help="Request SLO, seconds")
+    parser.add_argument(
+        "--straggler-rate", type=float, default=0.03, help="Share of slow calls"
+    )
+    parser.add_argument("--straggler-min", type=float, default=4)
+    parser.add_argument(
+        "--straggler-max",
+        type=float,
+        default=12,
+        help="A straggler takes this many times its usual latency, at most",
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.01, help="Share of calls that fail"
+    )
+    parser.add_argument(
+        "--hedge-ratio", type=float, default=0.1, help="Most hedges per call"
+    )
+    parser.add_argument(
+        "--time-scale",
+        type=float,
+        default=0.005,
+        help="Real seconds per model second",
+    )
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="Print raw results")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    print(json.dumps(results, indent=2) if args.json else report(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
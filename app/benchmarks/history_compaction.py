@@ -0,0 +1,215 @@
+"""
+History Compaction Benchmark - Prompt tokens and latency of long sessions
+
+Builds a synthetic teacher session of 50 turns (the teacher's request, the
+root agent's thoughts and transfer, and a sub-agent's thoughts and long
+output stored under its output_key), and measures, turn by turn, the history
+the root agent and a generator agent would send with and without compaction:
+estimated prompt tokens, the time to build the contents, and the prefill time
+those tokens cost at a given model throughput.
+
+    uv run python -m app.benchmarks.history_compaction --turns 50
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from typing import Any
+
+from google.adk.events import Event, EventActions
+from google.adk.flows.llm_flows.contents import _get_contents
+from google.genai import types
+
+from app.utils.compaction import CompactionPolicy, compact_events
+from app.utils.tokens import estimate_tokens
+
+ROOT = "sahayak"
+# (agent, output_key, output words)
+SUB_AGENTS = [
+    ("worksheet_creator_agent", "baseline_worksheet", 900),
+    ("knowledge_base_agent", "explanation", 400),
+    ("fun_activity_agent", "fun_activities", 700),
+    ("lesson_planning_agent", "weekly_lesson_plan", 1500),
+    ("visual_aid_agent", "visual_aid_output", 300),
+]
+THOUGHT_WORDS = (150, 250)
+WORDS = (
+    "the students learn fractions with pizza slices and equal parts then "
+    "practise adding halves quarters and thirds in groups of four"
+).split()
+
+# The agents measured, and the policy each gets in app.agent.
+MEASURED = {
+    ROOT: CompactionPolicy(),
+    "worksheet_creator_agent": CompactionPolicy(recent_turns=1, max_turns=5),
+}
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def build_session(turns: int, seed: int) -> list[Event]:
+    rng = random.Random(seed)
+    events = []
+    for turn in range(turns):
+        invocation = f"turn-{turn}"
+        agent, output_key, words = rng.choice(SUB_AGENTS)
+        events.append(
+            Event(
+                author="user",
+                invocation_id=invocation,
+                content=types.Content(
+                    role="user", parts=[types.Part(text=_text(rng, 30))]
+                ),
+            )
+        )
+        transfer = types.FunctionCall(
+            id=f"call-{turn}", name="transfer_to_agent", args={"agent_name": agent}
+        )
+        events.append(
+            Event(
+                author=ROOT,
+                invocation_id=invocation,
+                content=types.Content(
+                    role="model",
+                    parts=[
+                        types.Part(
+                            text=_text(rng, rng.randint(*THOUGHT_WORDS)), thought=True
+                        ),
+                        types.Part(function_call=transfer),
+                    ],
+                ),
+            )
+        )
+        events.append(
+            Event(
+                author=ROOT,
+                invocation_id=invocation,
+                content=types.Content(
+                    role="user",
+                    parts=[
+                        types.Part(
+                            function_response=types.FunctionResponse(
+                                id=transfer.id, name=transfer.name, response={}
+                            )
+                        )
+                    ],
+                ),
+                actions=EventActions(transfer_to_agent=agent),
+            )
+        )
+        thought = _text(rng, rng.randint(*THOUGHT_WORDS))
+        output = _text(rng, words)
+        events.append(
+            Event(
+                author=agent,
+                invocation_id=invocation,
+                content=types.Content(
+                    role="model",
+                    parts=[
+                        types.Part(text=thought, thought=True),
+                        types.Part(text=output),
+                    ],
+                ),
+                actions=EventActions(state_delta={output_key: thought + output}),
+            )
+        )
+    return events
+
+
+def _tokens(contents: list[types.Content]) -> int:
+    total = 0
+    for content in contents:
+        for part in content.parts or []:
+            if part.text:
+                total += estimate_tokens(part.text)
+            elif part.function_call or part.function_response:
+                total += estimate_tokens(part.model_dump_json(exclude_none=True))
+    return total
+
+
+def run(turns: int, seed: int, prefill_rate: float) -> dict[str, Any]:
+    events = build_session(turns, seed)
+    starts = [i for i, event in enumerate(events) if event.author == "user"]
+    results: dict[str, Any] = {
+        "turns": turns,
+        "prefill_tokens_per_second": prefill_rate,
+    }
+    for agent, policy in MEASURED.items():
+        rows = []
+        for turn, start in enumerate(starts, start=1):
+            # The history as of this agent's first call in the turn.
+            history = events[: start + 1]
+            begin = time.perf_counter()
+            full = _get_contents(None, history, agent)
+            full_ms = (time.perf_counter() - begin) * 1000
+            begin = time.perf_counter()
+            compacted = _get_contents(None, compact_events(history, policy), agent)
+            compacted_ms = (time.perf_counter() - begin) * 1000
+            rows.append(
+                {
+                    "turn": turn,
+                    "tokens": _tokens(full),
+                    "compacted_tokens": _tokens(compacted),
+                    "build_ms": full_ms,
+                    "compacted_build_ms": compacted_ms,
+                }
+            )
+        results[agent] = rows
+    return results
+
+
+def report(results: dict[str, Any]) -> str:
+    rate = results["prefill_tokens_per_second"]
+    lines = []
+    for agent in MEASURED:
+        rows = results[agent]
+        total = sum(row["tokens"] for row in rows)
+        compacted = sum(row["compacted_tokens"] for row in rows)
+        lines += [
+            f"{agent}: prompt history per turn",
+            f"{'turn':>6} {'tokens':>9} {'compacted':>10} {'build ms':>9} "
+            f"{'compacted':>10} {'prefill s':>10} {'compacted':>10}",
+        ]
+        for row in rows:
+            if row["turn"] in (1, 5, 10, 25) or row["turn"] == len(rows):
+                lines.append(
+                    f"{row['turn']:>6} {row['tokens']:>9} "
+                    f"{row['compacted_tokens']:>10} {row['build_ms']:>9.2f} "
+                    f"{row['compacted_build_ms']:>10.2f} "
+                    f"{row['tokens'] / rate:>10.2f} "
+                    f"{row['compacted_tokens'] / rate:>10.2f}"
+                )
+        lines += [
+            f"Session total: {total} -> {compacted} prompt tokens "
+            f"({1 - compacted / total:.0%} saved), "
+            f"{total / rate:.1f} s -> {compacted / rate:.1f} s of prefill",
+            "",
+        ]
+    lines.append(f"Prefill time assumes {rate:.0f} prompt tokens per second.")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument(
+        "--prefill-rate",
+        type=float,
+        default=8000,
+        help="Prompt tokens per second processed by the model",
+    )
+    parser.add_argument("--json", action="store_true", help="Print raw results")
+    args = parser.parse_args(argv)
+
+    results = run(args.turns, args.seed, args.prefill_rate)
+    print(json.dumps(results, indent=2) if args.json else report(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""
+Incremental Stages Benchmark - Model calls saved by reusing unchanged stages
+
+Runs the worksheet pipeline (worksheet_creator_agent, then
+answerkey_creator_agent reading `{baseline_worksheet}`) through a teacher
+session against a fake model, with and without `IncrementalStages`:
+a first request, the same request sent again after the connection dropped,
+a teacher's edit to one question of the worksheet followed by the request
+again, and the request for another grade. Reports, per turn, which stages
+were recomputed and which were reused from state, the model calls made and
+the time taken. Model latency is in seconds, run `--time-scale` times faster.
+
+    uv run python -m app.benchmarks.incremental_stages --latency 20
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections.abc import AsyncGenerator, Callable
+from typing import Any
+
+from google.adk.events import Event, EventActions
+from google.adk.models import Gemini, LlmRequest, LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from app.agent import incremental_stages
+from app.sub_agents.differentiated_materials.sub_agents.worksheet_generator import (
+    worksheet_generator_agent,
+)
+from app.utils import degraded
+from app.utils.degraded import LoadShedder
+
+MODES = ["plain", "incremental"]
+REQUEST = "Make a worksheet on fractions for class 5"
+# (turn, teacher's message, edit to baseline_worksheet before it)
+TURNS = [
+    ("first request", REQUEST, None),
+    ("sent again", REQUEST, None),
+    ("worksheet edited", REQUEST, ("Q3.", "Q3. (edited) ")),
+    ("another grade", "Make a worksheet on fractions for class 4", None),
+]
+
+
+def _fake_model(
+    latency: float, calls: list[str]
+) -> Callable[..., AsyncGenerator[LlmResponse, None]]:
+    async def generate(
+        self: Gemini, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        labels = llm_request.config.labels if llm_request.config else None
+        agent = (labels or {}).get("adk_agent_name", "")
+        calls.append(agent)
+        await asyncio.sleep(latency)
+        if agent == "worksheet_creator_agent":
+            text = "\n".join(f"Q{n}. Add 1/{n} and 1/{n + 1}." for n in range(1, 11))
+        else:
+            text = f"Answer key #{len(calls)} for the worksheet."
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=text)])
+        )
+
+    return generate
+
+
+async def _session(args: argparse.Namespace) -> list[dict[str, Any]]:
+    session_service = InMemorySessionService()
+    runner = Runner(
+        app_name="incremental",
+        agent=worksheet_generator_agent,
+        session_service=session_service,
+    )
+    session = await session_service.create_session(
+        app_name="incremental", user_id="teacher"
+    )
+    calls: list[str] = []
+    original = Gemini.generate_content_async
+    Gemini.generate_content_async = _fake_model(  # type: ignore[method-assign]
+        args.latency * args.time_scale, calls
+    )
+    rows = []
+    try:
+        for turn, message, edit in TURNS:
+            if edit is not None:
+                current = await session_service.get_session(
+                    app_name="incremental", user_id="teacher", session_id=session.id
+                )
+                assert current is not None
+                worksheet = current.state["baseline_worksheet"].replace(*edit, 1)
+                await session_service.append_event(
+                    current,
+                    Event(
+                        author="user",
+                        actions=EventActions(
+                            state_delta={"baseline_worksheet": worksheet}
+                        ),
+                    ),
+                )
+            before = len(calls)
+            reused = []
+            start = time.perf_counter()
+            async for event in runner.run_async(
+                user_id="teacher",
+                session_id=session.id,
+                new_message=types.Content(
+                    role="user", parts=[types.Part(text=message)]
+                ),
+            ):
+                if event.custom_metadata and event.custom_metadata.get("reused"):
+                    reused.append(event.author)
+            rows.append(
+                {
+                    "turn": turn,
+                    "recomputed": calls[before:],
+                    "reused": reused,
+                    "model_calls": len(calls) - before,
+                    "seconds": (time.perf_counter() - start) / args.time_scale,
+                }
+            )
+    finally:
+        Gemini.generate_content_async = original  # type: ignore[method-assign]
+    return rows
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    # The fake model's latencies must not trip load shedding.
+    degraded._default_shedder = LoadShedder(forced=False)
+    results = {}
+    enabled = incremental_stages.enabled
+    try:
+        for mode in MODES:
+            incremental_stages.enabled = mode == "incremental"
+            results[mode] = asyncio.run(_session(args))
+    finally:
+        incremental_stages.enabled = enabled
+        degraded._default_shedder = None
+    return results
+
+
+def report(results: dict[str, Any]) -> str:
+    lines = [
+        f"{'turn':<18} {'mode':<12} {'calls':>5} {'seconds':>8}  reused stages",
+    ]
+    for index, (turn, _, _) in enumerate(TURNS):
+        for mode in MODES:
+            row = results[mode][index]
+            lines.append(
+                f"{turn:<18} {mode:<12} {row['model_calls']:>5} "
+                f"{row['seconds']:>8.1f}  {', '.join(row['reused']) or '-'}"
+            )
+    totals = {mode: sum(row["model_calls"] for row in results[mode]) for mode in MODES}
+    stale = incremental_stages.graph.downstream("baseline_worksheet")
+    lines += [
+        "",
+        "Stages made stale by an edit to baseline_worksheet: "
+        + ", ".join(stage.agent for stage in stale),
+        f"Model calls over the session: {totals['plain']} without reuse, "
+        f"{totals['incremental']} with it",
+    ]
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--latency", type=float, default=20, help="Seconds per model call"
+    )
+    parser.add_argument(
+        "--time-scale",
+        type=float,
+        default=0.01,
+        help="Real seconds per model second",
+    )
+    parser.add_argument("--json", action="store_true", help="Print raw results")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    print(json.dumps(results, indent=2) if args.json else report(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""
+Item Bank Benchmark - Sampling latency of the question item bank at scale
+
+Fills a fresh item bank (see `app.utils.item_bank`) with synthetic questions
+over many topics, grades and question types, then times the sample a quiz
+request makes: `--count` questions on one topic for one grade, of mixed
+difficulty or of one band, with and without leaving out the questions a
+class was given before (after `--served` earlier quizzes for that class).
+The same samples by `ORDER BY random()`, which reads every matching row,
+are timed for comparison. Reports insert throughput, database size and
+latency percentiles in milliseconds.
+
+    uv run python -m app.benchmarks.item_bank --items 1000000
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from app.utils.item_bank import BANDS, Item, ItemBank
+
+KINDS = ["multiple_choice", "true_false", "matching", "short_answer", "fill_in_blank"]
+GRADES = [str(grade) for grade in range(1, 13)]
+TOPIC = "fractions"
+GRADE = "5"
+CLASS = "benchmark/5"
+_BATCH = 20_000
+
+
+def _topics(items: int) -> list[str]:
+    """Enough topics for about 500 questions per topic, grade and type."""
+    per_topic = len(GRADES) * len(KINDS) * 500
+    return [TOPIC] + [f"topic {n}" for n in range(1, max(1, items // per_topic))]
+
+
+def fill(bank: ItemBank, items: int, rng: random.Random) -> dict[str, float]:
+    topics = _topics(items)
+    start = time.perf_counter()
+    added = 0
+    while added < items:
+        batch = []
+        for n in range(added, min(items, added + _BATCH)):
+            kind = rng.choice(KINDS)
+            batch.append(
+                Item(
+                    topic=rng.choice(topics),
+                    grade=rng.choice(GRADES),
+                    kind=kind,
+                    question=f"Question {n} of the benchmark?",
+                    answer=f"Answer {n}",
+                    difficulty=round(rng.random(), 3),
+                    payload={"question": f"Question {n}?", "type": kind},
+                )
+            )
+        added += bank.add(batch)
+    seconds = time.perf_counter() - start
+    return {
+        "items": added,
+        "topics": len(topics),
+        "insert_seconds": seconds,
+        "inserts_per_second": added / seconds,
+        "database_mb": bank.path.stat().st_size / 2**20,
+    }
+
+
+def _naive(
+    bank: ItemBank, count: int, difficulty: str | None, class_id: str | None
+) -> list[tuple]:
+    """The same sample by shuffling every matching row."""
+    where = "topic = ? AND grade = ?"
+    params: list[Any] = [TOPIC, GRADE]
+    if difficulty is not None:
+        where += " AND band = ?"
+        params.append(BANDS.index(difficulty))
+    if class_id is not None:
+        where += (
+            " AND NOT EXISTS (SELECT 1 FROM served WHERE class_id = ? "
+            "AND item_id = items.id)"
+        )
+        params.append(class_id)
+    return bank._conn.execute(
+        f"SELECT id, question FROM items WHERE {where} ORDER BY random() LIMIT ?",
+        (*params, count),
+    ).fetchall()
+
+
+def _time(sample: Callable[[], Any], repeat: int) -> dict[str, float]:
+    latencies = []
+    returned = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        returned = len(sample())
+        latencies.append((time.perf_counter() - start) * 1000)
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "p50_ms": quantiles[49],
+        "p95_ms": quantiles[94],
+        "p99_ms": quantiles[98],
+        "returned": returned,
+    }
+
+
+def run(args: argparse.Namespace, directory: Path) -> dict[str, Any]:
+    rng = random.Random(args.seed)
+    bank = ItemBank(directory / "item_bank.sqlite3", rng=rng)
+    filled = fill(bank, args.items, rng)
+    for _ in range(args.served):
+        bank.mark_served(CLASS, bank.sample(TOPIC, GRADE, args.count))
+    cases = [
+        ("mixed difficulty", None, None),
+        ("hard only", "hard", None),
+        ("mixed, no repeats for class", None, CLASS),
+    ]
+    results = []
+    for name, difficulty, class_id in cases:
+        for method, sample in (
+            (
+                "index seek",
+                lambda d=difficulty, c=class_id: bank.sample(
+                    TOPIC, GRADE, args.count, difficulty=d, class_id=c
+                ),
+            ),
+            (
+                "order by random()",
+                lambda d=difficulty, c=class_id: _naive(bank, args.count, d, c),
+            ),
+        ):
+            results.append(
+                {"case": name, "method": method, **_time(sample, args.repeat)}
+            )
+    return {
+        **filled,
+        "matching_items": bank.count(TOPIC, GRADE),
+        "served_to_class": args.served * args.count,
+        "count": args.count,
+        "samples": results,
+    }
+
+
+def report(results: dict[str, Any]) -> str:
+    lines = [
+        f"{results['items']:,} items over {results['topics']} topics, "
+        f"{len(GRADES)} grades and {len(KINDS)} types: inserted at "
+        f"{results['inserts_per_second']:,.0f}/s, "
+        f"{results['database_mb']:.0f} MB on disk",
+        f"{results['matching_items']:,} grade-{GRADE} {TOPIC} items, "
+        f"{results['served_to_class']:,} of them served to the class before",
+        "",
+        f"{results['count']} questions per sample",
+        f"{'case':<30} {'method':<18} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'p99 ms':>8} {'got':>4}",
+    ]
+    for row in results["samples"]:
+        lines.append(
+            f"{row['case']:<30} {row['method']:<18} {row['p50_ms']:>8.3f} "
+            f"{row['p95_ms']:>8.3f} {row['p99_ms']:>8.3f} {row['returned']:>4}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--count", type=int, default=10, help="Questions per sample")
+    parser.add_argument(
+        "--served", type=int, default=50, help="Earlier quizzes given to the class"
+    )
+    parser.add_argument("--repeat", type=int, default=200, help="Samples per case")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print raw results")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = run(args, Path(tmp))
+    print(json.dumps(results, indent=2) if args.json else report(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+Mermaid Lint Benchmark - Repair round trips avoided by the local linter
+
+Lints a corpus of model-written diagrams (the built-in one, or your own with
+--corpus), counts how many would have failed to render as written, how many the
+linter repairs locally and how many still need the model, and estimates the
+tokens of the repair turns avoided. Every repaired diagram is linted again to
+check that the repair is stable.
+
+    uv run python -m app.benchmarks.mermaid_lint --corpus diagrams.jsonl
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+from app.sub_agents.visual_aid_agent.mermaid_lint import lint_mermaid
+from app.sub_agents.visual_aid_agent.prompt import DIAGRAM_CREATOR_PROMPT
+from app.utils.tokens import estimate_tokens
+
+# Diagrams as models write them, including their usual mistakes.
+CORPUS = [
+    "graph TD;\n    A[Start] --> B{Is it raining?};\n    B -->|Yes| C[Take umbrella];\n"
+    "    B -->|No| D[Go outside];",
+    "flowchart LR\n    Sun --> Plant\n    Water --> Plant\n    Plant --> Oxygen",
+    "```mermaid\ngraph TD\n    Sunlight --> Leaf\n    Leaf --> Glucose\n```",
+    "graph\n    Evaporation --> Condensation\n    Condensation --> Precipitation\n"
+    "    Precipitation --> Collection\n    Collection --> Evaporation",
+    "graph TD\n    Water Cycle --> Evaporation\n    Evaporation --> Cloud Formation\n"
+    "    Cloud Formation --> Rain",
+    "flowchart TD\n    A[Carbon dioxide (CO2)] --> B[Leaf]\n    C[Water (H2O)] --> B\n"
+    "    B --> D[Glucose (C6H12O6)]",
+    "graph LR\n    A -> B\n    B -> C\n    C -> D",
+    "flowchart TD\n    Start --> Mix[Mix ingredients]\n    Mix --> Bake\n    Bake --> end",
+    "mindmap\nroot((Photosynthesis))\n- Inputs\n  - Sunlight\n  - Water\n"
+    "  - Carbon dioxide\n- Outputs\n  - Glucose\n  - Oxygen",
+    "mindmap\n  root((Fractions))\n    Parts of a whole\n    Numerator (top)\n"
+    "    Denominator (bottom)\n    Equivalent fractions",
+    "mindmap\n  root((Solar System))\n    Planets\n      Inner\n      Outer\n    Moons\n"
+    "    Sun",
+    "flowchart TD\n    subgraph Phase 1 (Light reactions)\n        A[Light] --> B[ATP]\n"
+    "    end\n    subgraph Calvin\n        C[CO2] --> D[Sugar]\n    end\n    B --> D",
+    "graph TD\n    subgraph Digestion\n        Mouth --> Stomach\n"
+    "        Stomach --> Small-Intestine\n",
+    "graph TD\n    Seed --> Sprout -- needs water (daily) --> Plant\n"
+    "    Plant --> Flower",
+    'flowchart LR\n    A["Input"] --> B["Process"]\n    B --> C["Output"]',
+    "graph TD\n    Noun --> Person & Place & Thing\n    Verb --> Action-Word",
+    "Graph td\n    A[Rock] --> B[Sediment]\n    B --> C[Sedimentary rock]",
+    "graph TB\n    Producer --> Primary-Consumer\n    Primary-Consumer --> "
+    "Secondary-Consumer\n    Secondary-Consumer --> Decomposer",
+    "flowchart TD\n    A[Read the problem] --> B{Do you know the formula?}\n"
+    "    B -->|Yes (write it down)| C[Solve]\n    B -->|No| D[Ask teacher]",
+    "graph TD\n    A[Start --> B[Measure]\n    B --> C[Record]",
+    "graph TD\n    --> B[Observe]\n    B --> C[Conclude]",
+    "A --> B\nB --> C[Result (final)]",
+    "flowchart TD\n    A[1857 Revolt] --> B[Crown rule]\n    B --> C[Freedom movement]\n"
+    "    C --> D[Independence 1947]",
+    "graph TOP-DOWN\n    Heart --> Lungs\n    Lungs --> Heart",
+]
+
+
+def load_corpus(path: Path) -> list[str]:
+    """Diagrams from a JSONL file (a "code" or "mermaid_code" field) or .mmd files."""
+    if path.is_dir():
+        return [file.read_text() for file in sorted(path.glob("*.mmd"))]
+    diagrams = []
+    for line in path.read_text().splitlines():
+        if line.strip():
+            record = json.loads(line)
+            diagrams.append(record.get("code") or record.get("mermaid_code") or "")
+    return diagrams
+
+
+def run(diagrams: list[str], repeat: int) -> dict[str, Any]:
+    turn_tokens = estimate_tokens(DIAGRAM_CREATOR_PROMPT)
+    failing = repaired = still_failing = unstable = 0
+    tokens_saved = 0
+    kinds: Counter[str] = Counter()
+    timings = []
+    for code in diagrams:
+        as_written = lint_mermaid(code, repair=False)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = lint_mermaid(code)
+        timings.append((time.perf_counter() - start) * 1000 / repeat)
+
+        kinds.update(issue.code for issue in result.issues)
+        if result.ok and lint_mermaid(result.source).issues:
+            unstable += 1
+        if as_written.ok:
+            continue
+        failing += 1
+        if result.ok:
+            repaired += 1
+            # A repair turn re-reads the prompt and the broken diagram, then
+            # writes the diagram again.
+            tokens_saved += turn_tokens + 2 * estimate_tokens(code)
+        else:
+            still_failing += 1
+    return {
+        "diagrams": len(diagrams),
+        "failing_as_written": failing,
+        "repaired_locally": repaired,
+        "still_need_model": still_failing,
+        "round_trips_avoided": repaired,
+        "estimated_tokens_saved": tokens_saved,
+        "unstable_repairs": unstable,
+        "lint_ms_median": statistics.median(timings) if timings else 0.0,
+        "lint_ms_max": max(timings, default=0.0),
+        "issues": dict(kinds.most_common()),
+    }
+
+
+def report(results: dict[str, Any]) -> str:
+    failing = results["failing_as_written"]
+    share = results["repaired_locally"] / failing if failing else 0
+    lines = [
+        f"Diagrams:                  {results['diagrams']}",
+        f"Would fail as written:     {failing}",
+        f"Repaired locally:          {results['repaired_locally']} ({share:.0%})",
+        f"Still need the model:      {results['still_need_model']}",
+        f"Repair round trips saved:  {results['round_trips_avoided']}",
+        f"Estimated tokens saved:    {results['estimated_tokens_saved']}",
+        f"Lint time (median / max):  {results['lint_ms_median']:.3f}ms / "
+        f"{results['lint_ms_max']:.3f}ms",
+        f"Unstable repairs:          {results['unstable_repairs']}",
+        "",
+        "Issues found:",
+    ]
+    lines += [f"  {count:>4}  {code}" for code, count in results["issues"].items()]
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--corpus",
+        type=Path,
+        help="JSONL file or directory of .mmd files (default: built-in corpus)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=20, help="Lints per diagram for timing"
+    )
+    parser.add_argument("--json", action="store_true", help="Print raw results")
+    args = parser.parse_args(argv)
+
+    diagrams = load_corpus(args.corpus) if args.corpus else CORPUS
+    results = run(diagrams, args.repeat)
+    print(json.dumps(results, indent=2) if args.json else report(results))
+    return 0 if results["unstable_repairs"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""
+Mindmap Benchmark - Output tokens and latency of one tree against four formats
+
+For a corpus of mindmaps at several grades, compares what the mindmap agent
+used to write (an outline, ASCII art, a drawing description and Mermaid code,
+all by the model) with what it writes now (one compact JSON tree, rendered
+locally into every format). Reports output tokens, local rendering time and
+the end-to-end latency those tokens cost at a given decode speed.
+
+    uv run python -m app.benchmarks.mindmap_render --decode-rate 120
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from typing import Any
+
+from app.sub_agents.visual_aid_agent.sub_agents.mindmap_generator.render import (
+    build_tree,
+    render_ascii,
+    render_drawing_steps,
+    render_formats,
+    render_mermaid_mindmap,
+    render_outline,
+)
+from app.sub_agents.visual_aid_agent.sub_agents.mindmap_generator.schema import (
+    Mindmap,
+)
+from app.utils.tokens import estimate_tokens
+
+# Indented outlines (two spaces per level) of the corpus topics.
+TOPICS = {
+    "Photosynthesis": """
+Inputs
+  Sunlight
+    Captured by chlorophyll
+  Water
+    Absorbed by roots
+    Carried by xylem
+  Carbon dioxide
+    Enters through stomata
+Process
+  Happens in chloroplasts
+  Light reactions
+    Split water
+    Release oxygen
+  Sugar making
+    Uses carbon dioxide
+Outputs
+  Glucose
+    Food for the plant
+    Stored as starch
+  Oxygen
+    Released into the air
+Importance
+  Food chains
+  Oxygen for animals
+""",
+    "Water cycle": """
+Evaporation
+  Sun heats water
+  Rivers, lakes and seas
+Condensation
+  Vapour cools
+  Clouds form
+    Tiny droplets
+Precipitation
+  Rain
+  Snow
+  Hail
+Collection
+  Rivers and lakes
+  Groundwater
+    Wells and springs
+Why it matters
+  Fresh water
+  Weather
+""",
+    "Fractions": """
+Parts of a fraction
+  Numerator
+    Parts we take
+  Denominator
+    Equal parts of the whole
+Kinds
+  Proper
+  Improper
+    Mixed numbers
+  Unit fractions
+Equivalent fractions
+  Multiply top and bottom
+  Simplest form
+    Common factors
+Operations
+  Adding
+    Same denominator
+    Different denominators
+  Comparing
+    Number line
+In daily life
+  Sharing food
+  Measuring
+""",
+    "Indian freedom struggle": """
+Early resistance
+  Revolt of 1857
+    Causes
+      Annexation policies
+      Cartridge issue
+    Leaders
+      Rani Lakshmibai
+      Tatya Tope
+Indian National Congress
+  Founded in 1885
+  Moderates and extremists
+    Gokhale
+    Tilak
+Gandhian era
+  Non-cooperation
+    Boycott of foreign goods
+  Civil disobedience
+    Salt march
+      Dandi, 1930
+  Quit India
+    1942
+Revolutionaries
+  Bhagat Singh
+  Chandrashekhar Azad
+Independence
+  15 August 1947
+  Partition
+""",
+}
+GRADES = ["2", "5", "8", "11"]
+
+
+def parse_outline(topic: str, outline: str, grade: str) -> Mindmap:
+    nodes = []
+    for line in outline.strip("\n").splitlines():
+        label = line.strip()
+        nodes.append(f"{(len(line) - len(line.lstrip())) // 2 + 1} {label}")
+    return Mindmap.model_validate({"topic": topic, "grade": grade, "nodes": nodes})
+
+
+def before_output(mindmap: Mindmap) -> str:
+    """What the model used to write: the same tree, in four formats."""
+    root = build_tree(mindmap)
+    return "\n\n".join(
+        [
+            f"## Mindmap: {mindmap.topic}",
+            "### Outline",
+            render_outline(root),
+            "### ASCII art",
+            render_ascii(root),
+            "### How to draw it",
+            render_drawing_steps(root),
+            "### Mermaid",
+            render_mermaid_mindmap(root),
+        ]
+    )
+
+
+def run(repeat: int, decode_rate: float, first_token_seconds: float) -> dict[str, Any]:
+    cases = []
+    for topic, outline in TOPICS.items():
+        for grade in GRADES:
+            mindmap = parse_outline(topic, outline, grade)
+            tree_json = mindmap.model_dump_json(exclude_none=True)
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                render_formats(Mindmap.model_validate_json(tree_json))
+                timings.append((time.perf_counter() - start) * 1000)
+            before_tokens = estimate_tokens(before_output(mindmap))
+            after_tokens = estimate_tokens(tree_json)
+            render_ms = statistics.median(timings)
+            cases.append(
+                {
+                    "topic": topic,
+                    "grade": grade,
+                    "nodes": len(mindmap.nodes),
+                    "before_tokens": before_tokens,
+                    "after_tokens": after_tokens,
+                    "render_ms": render_ms,
+                    "before_seconds": first_token_seconds + before_tokens / decode_rate,
+                    "after_seconds": first_token_seconds
+                    + after_tokens / decode_rate
+                    + render_ms / 1000,
+                }
+            )
+    return {
+        "decode_tokens_per_second": decode_rate,
+        "first_token_seconds": first_token_seconds,
+        "cases": cases,
+    }
+
+
+def report(results: dict[str, Any]) -> str:
+    cases = results["cases"]
+    lines = [
+        f"{'topic':<24} {'grade':>5} {'nodes':>5} {'tokens':>7} {'now':>5} "
+        f"{'render ms':>9} {'latency s':>9} {'now':>5}",
+    ]
+    for case in cases:
+        lines.append(
+            f"{case['topic']:<24} {case['grade']:>5} {case['nodes']:>5} "
+            f"{case['before_tokens']:>7} {case['after_tokens']:>5} "
+            f"{case['render_ms']:>9.2f} {case['before_seconds']:>9.1f} "
+            f"{case['after_seconds']:>5.1f}"
+        )
+    before = sum(case["before_tokens"] for case in cases)
+    after = sum(case["after_tokens"] for case in cases)
+    before_s = statistics.mean(case["before_seconds"] for case in cases)
+    after_s = statistics.mean(case["after_seconds"] for case in cases)
+    lines += [
+        "",
+        f"Output tokens: {before} -> {after} ({1 - after / before:.0%} fewer)",
+        f"Mean latency: {before_s:.1f} s -> {after_s:.1f} s",
+        f"Latency assumes {results['first_token_seconds']} s to the first token "
+        f"and {results['decode_tokens_per_second']:.0f} output tokens per second.",
+    ]
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument(
+        "--decode-rate",
+        type=float,
+        default=120,
+        help="Output tokens per second generated by the model",
+    )
+    parser.add_argument(
+        "--first-token", type=float, default=0.6, help="Seconds to the first token"
+    )
+    parser.add_argument("--json", action="store_true", help="Print raw results")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat, args.decode_rate, args.first_token)
+    print(json.dumps(results, indent=2) if args.json else report(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
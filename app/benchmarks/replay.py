@@ -0,0 +1,206 @@
+"""
+Replay Benchmark - Wall-clock and CPU time of recorded sessions, offline
+
+Runs the teacher sessions recorded in a model-call cassette (see
+`app.utils.cassettes`) through `root_agent` again, answering every model
+call from the cassette. Reports wall-clock and CPU time per session and in
+total, and how the model calls were matched: identical requests, requests
+that changed and were answered by the agent's next recording, and misses.
+Run it on two revisions to compare new caching or routing code exactly.
+Latencies are preserved by default; `--latency zero` leaves only local work.
+
+Record a cassette by running the dev server (or this script with `--record`
+and a JSON list of sessions, each a list of messages) with
+MODEL_CASSETTE_MODE=record.
+
+    uv run python -m app.benchmarks.replay .cache/model-calls.jsonl.gz --repeat 3
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from app.agent import root_agent
+from app.config import config
+from app.utils import degraded
+from app.utils.cassettes import Cassette, CassetteTransport
+from app.utils.degraded import LoadShedder
+from app.utils.metrics import counters
+
+LATENCY = {"preserve": 1.0, "zero": 0.0}
+
+
+def _isolate(directory: Path) -> None:
+    """Keep caches, profiles and renders of the run out of the real ones."""
+    config.material_cache_path = str(directory / "materials.sqlite3")
+    config.teacher_profile_path = str(directory / "profiles.sqlite3")
+    config.visual_output_dir = str(directory / "visuals")
+    # Replayed latencies must not trip load shedding.
+    degraded._default_shedder = LoadShedder(forced=False)
+
+
+async def _run_sessions(sessions: list[list[str]], user_id: str) -> list[dict]:
+    session_service = InMemorySessionService()
+    runner = Runner(
+        app_name="replay",
+        agent=root_agent,
+        session_service=session_service,
+        artifact_service=InMemoryArtifactService(),
+    )
+    timings = []
+    for messages in sessions:
+        session = await session_service.create_session(
+            app_name="replay", user_id=user_id
+        )
+        wall, cpu = time.perf_counter(), time.process_time()
+        events = 0
+        for text in messages:
+            message = types.Content(role="user", parts=[types.Part(text=text)])
+            async for _ in runner.run_async(
+                user_id=user_id, session_id=session.id, new_message=message
+            ):
+                events += 1
+        timings.append(
+            {
+                "turns": len(messages),
+                "events": events,
+                "wall_seconds": time.perf_counter() - wall,
+                "cpu_seconds": time.process_time() - cpu,
+            }
+        )
+    return timings
+
+
+def record(cassette_path: Path, sessions: list[list[str]]) -> dict[str, Any]:
+    """Run `sessions` against the real model, recording every call."""
+    transport = CassetteTransport(Cassette(cassette_path), "record")
+    transport.install(root_agent)
+    try:
+        timings = asyncio.run(_run_sessions(sessions, "record"))
+    finally:
+        transport.uninstall()
+    return {
+        "recorded": len(Cassette.load(cassette_path).recordings),
+        "sessions": timings,
+    }
+
+
+def replay(
+    cassette_path: Path, latency_scale: float, repeat: int, strict: bool
+) -> dict[str, Any]:
+    matches = counters("cassette")
+    runs = []
+    for number in range(repeat):
+        cassette = Cassette.load(cassette_path)
+        transport = CassetteTransport(cassette, "replay", latency_scale, strict)
+        matches.reset()
+        transport.install()
+        try:
+            wall, cpu = time.perf_counter(), time.process_time()
+            # A user per run, so teacher profiles start empty every time.
+            sessions = asyncio.run(
+                _run_sessions(cassette.sessions(), f"replay-{number}")
+            )
+            runs.append(
+                {
+                    "wall_seconds": time.perf_counter() - wall,
+                    "cpu_seconds": time.process_time() - cpu,
+                    "sessions": sessions,
+                    "calls": matches.snapshot(),
+                }
+            )
+        finally:
+            transport.uninstall()
+    recordings = Cassette.load(cassette_path).recordings
+    return {
+        "cassette": str(cassette_path),
+        "recorded_calls": len(recordings),
+        "recorded_model_seconds": sum(r.duration for r in recordings),
+        "latency_scale": latency_scale,
+        "runs": runs,
+    }
+
+
+def report(results: dict[str, Any]) -> str:
+    runs = results["runs"]
+    lines = [
+        f"Cassette: {results['cassette']} ({results['recorded_calls']} calls, "
+        f"{results['recorded_model_seconds']:.1f} s of model time, "
+        f"latency x{results['latency_scale']:g})",
+        "",
+        f"{'session':>7} {'turns':>6} {'events':>7} {'wall s':>9} {'cpu s':>9}",
+    ]
+    for number, sessions in enumerate(
+        zip(*(run["sessions"] for run in runs), strict=True)
+    ):
+        lines.append(
+            f"{number:>7} {sessions[0]['turns']:>6} {sessions[0]['events']:>7} "
+            f"{statistics.median(s['wall_seconds'] for s in sessions):>9.3f} "
+            f"{statistics.median(s['cpu_seconds'] for s in sessions):>9.3f}"
+        )
+    calls = runs[-1]["calls"]
+    lines += [
+        "",
+        f"Total, median of {len(runs)} runs: "
+        f"{statistics.median(r['wall_seconds'] for r in runs):.3f} s wall, "
+        f"{statistics.median(r['cpu_seconds'] for r in runs):.3f} s CPU",
+        f"Model calls: {calls.get('replayed_exact', 0):.0f} identical, "
+        f"{calls.get('replayed_by_order', 0):.0f} changed, "
+        f"{calls.get('misses', 0):.0f} missing from the cassette",
+    ]
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("cassette", type=Path)
+    parser.add_argument(
+        "--latency",
+        default="preserve",
+        help='"preserve", "zero" or a factor for the recorded latencies',
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="Fail calls missing from the cassette instead of calling the model",
+    )
+    parser.add_argument(
+        "--record",
+        type=Path,
+        metavar="SESSIONS_JSON",
+        help="Record the cassette instead, running these sessions against the model",
+    )
+    parser.add_argument("--json", action="store_true", help="Print raw results")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _isolate(Path(tmp))
+        if args.record:
+            sessions = json.loads(args.record.read_text())
+            print(json.dumps(record(args.cassette, sessions), indent=2))
+            return 0
+        latency = LATENCY.get(args.latency)
+        results = replay(
+            args.cassette,
+            float(args.latency) if latency is None else latency,
+            args.repeat,
+            args.strict,
+        )
+    print(json.dumps(results, indent=2) if args.json else report(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""
+Session Store Benchmark - Per-turn latency as sessions grow
+
+Replays a long teacher session turn by turn (read the session, append the
+teacher's message, a routing event and a sub-agent output that rewrites a
+large `output_key`), against ADK's in-memory and database session services
+and the SQLite session service with and without its hot-session cache. Prints
+the mean turn latency as the session grows to hundreds of events, and the
+database size.
+
+    uv run python -m app.benchmarks.session_store --turns 200
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from google.adk.events import Event, EventActions
+from google.adk.sessions import (
+    BaseSessionService,
+    DatabaseSessionService,
+    InMemorySessionService,
+)
+from google.genai import types
+
+from app.utils.sessions import SqliteSessionService
+
+# Large state values rewritten by sub-agents, and their typical size in words.
+OUTPUT_KEYS = {
+    "baseline_worksheet": 900,
+    "content_variations": 1500,
+    "weekly_lesson_plan": 1200,
+    "story_content": 600,
+}
+WORDS = "fractions numerator denominator equal parts whole pizza share".split()
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _turn_events(rng: random.Random, turn: int) -> list[Event]:
+    invocation = f"turn-{turn}"
+    output_key = rng.choice(list(OUTPUT_KEYS))
+    output = _text(rng, OUTPUT_KEYS[output_key])
+    return [
+        Event(
+            author="user",
+            invocation_id=invocation,
+            content=types.Content(role="user", parts=[types.Part(text=_text(rng, 25))]),
+        ),
+        Event(
+            author="sahayak",
+            invocation_id=invocation,
+            content=types.Content(
+                role="model", parts=[types.Part(text=f"Routing to {output_key}")]
+            ),
+            actions=EventActions(state_delta={"last_agent": output_key}),
+        ),
+        Event(
+            author=output_key,
+            invocation_id=invocation,
+            content=types.Content(role="model", parts=[types.Part(text=output)]),
+            actions=EventActions(state_delta={output_key: output}),
+        ),
+    ]
+
+
+async def replay(
+    service: BaseSessionService, turns: int, checkpoint: int, seed: int
+) -> list[float]:
+    """Mean turn latency in ms over each `checkpoint` turns."""
+    rng = random.Random(seed)
+    session = await service.create_session(app_name="app", user_id="teacher")
+    means, window = [], 0.0
+    for turn in range(1, turns + 1):
+        events = _turn_events(rng, turn)
+        start = time.perf_counter()
+        current = await service.get_session(
+            app_name="app", user_id="teacher", session_id=session.id
+        )
+        assert current is not None
+        for event in events:
+            await service.append_event(current, event)
+        window += time.perf_counter() - start
+        if turn % checkpoint == 0:
+            means.append(window / checkpoint * 1000)
+            window = 0.0
+    return means
+
+
+def _database_size(path: Path) -> int:
+    return sum(file.stat().st_size for file in path.parent.glob(path.name + "*"))
+
+
+def run(turns: int, checkpoint: int, seed: int) -> dict[str, Any]:
+    directory = Path(tempfile.mkdtemp(prefix="session_store_"))
+    services: dict[str, tuple[Callable[[], BaseSessionService], Path | None]] = {
+        "in_memory": (InMemorySessionService, None),
+        "adk_database": (
+            lambda: DatabaseSessionService(f"sqlite:///{directory / 'adk.db'}"),
+            directory / "adk.db",
+        ),
+        "sqlite_cold": (
+            lambda: SqliteSessionService(directory / "cold.db", cache_size=0),
+            directory / "cold.db",
+        ),
+        "sqlite_hot": (
+            lambda: SqliteSessionService(directory / "hot.db"),
+            directory / "hot.db",
+        ),
+    }
+    results: dict[str, Any] = {
+        "turns": turns,
+        "events": [turn * 3 for turn in range(checkpoint, turns + 1, checkpoint)],
+    }
+    for name, (factory, path) in services.items():
+        service = factory()
+        means = asyncio.run(replay(service, turns, checkpoint, seed))
+        if isinstance(service, SqliteSessionService):
+            service.close()  # checkpoints the WAL into the database file
+        results[name] = {
+            "turn_ms": means,
+            "db_bytes": _database_size(path) if path else None,
+        }
+    return results
+
+
+def report(results: dict[str, Any]) -> str:
+    names = [name for name in results if name not in ("turns", "events")]
+    lines = [
+        f"Mean latency per turn (ms), {results['turns']} turns of 3 events",
+        "",
+        f"{'events':>8}" + "".join(f"{name:>14}" for name in names),
+    ]
+    for row, events in enumerate(results["events"]):
+        lines.append(
+            f"{events:>8}"
+            + "".join(f"{results[name]['turn_ms'][row]:>14.2f}" for name in names)
+        )
+    lines += ["", "Database size:"]
+    for name in names:
+        if results[name]["db_bytes"] is not None:
+            lines.append(f"  {name:<14} {results[name]['db_bytes'] / 1024:>10.0f} KB")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--turns", type=int, default=150)
+    parser.add_argument(
+        "--checkpoint", type=int, default=25, help="Turns per latency sample"
+    )
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="Print raw results")
+    args = parser.parse_args(argv)
+
+    results = run(args.turns, args.checkpoint, args.seed)
+    print(json.dumps(results, indent=2) if args.json else report(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""
+Teacher Profile Benchmark - Clarification turns saved per task
+
+Simulates teachers giving a stream of tasks to the agents. Each task needs
+some of grade, language and class length; a request that leaves one out costs
+a clarification turn (a model turn plus the teacher's reply) unless the
+teacher's profile, learned from earlier messages, already has it. Reports
+clarification turns per task with and without profiles, the time they cost,
+and the latency of profile lookups and of write-behind against synchronous
+updates.
+
+    uv run python -m app.benchmarks.teacher_profiles --teachers 200 --tasks 20
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from app.utils.teacher_profiles import LANGUAGES, TeacherProfile, TeacherProfileStore
+
+# The agent a task goes to, what it needs to know, and how it is asked for.
+TASKS = [
+    ("visual_aid_agent", ("grade",), "Draw a mindmap of {topic}"),
+    ("differentiated_materials_agent", ("grade",), "Make a worksheet on {topic}"),
+    ("hyper_local_content_agent", ("grade", "language"), "Write a story about {topic}"),
+    ("lesson_planning_agent", ("grade", "minutes"), "Plan next week on {topic}"),
+    ("fun_activity_agent", ("grade", "minutes"), "Suggest a game for {topic}"),
+]
+TOPICS = ["fractions", "the water cycle", "photosynthesis", "our village", "trees"]
+SUBJECTS = ["maths", "science", "EVS", "social studies"]
+# Profile field, as named in TASKS, to the state key the agents read.
+STATE_KEYS = {
+    "grade": "teacher_grade",
+    "language": "teacher_locale",
+    "minutes": "teacher_class_minutes",
+}
+
+
+def _mention(field: str, teacher: dict[str, Any]) -> str:
+    if field == "grade":
+        return f"for class {teacher['grade']}"
+    if field == "language":
+        return f"in {teacher['language']}"
+    return f"for a {teacher['minutes']} minute period"
+
+
+def _known(profile: TeacherProfile) -> set[str]:
+    state = profile.state()
+    return {field for field, key in STATE_KEYS.items() if key in state}
+
+
+def simulate(
+    teachers: int, tasks: int, mention_rate: float, intro_rate: float, seed: int
+) -> dict[str, Any]:
+    """Count clarification turns with and without a profile store."""
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TeacherProfileStore(Path(tmp) / "profiles.sqlite3")
+        without = with_profiles = 0
+        for number in range(teachers):
+            user_id = f"teacher-{number}"
+            teacher = {
+                "grade": rng.randint(1, 10),
+                "language": rng.choice(LANGUAGES[1:]),
+                "minutes": rng.choice([30, 35, 40, 45]),
+                "subject": rng.choice(SUBJECTS),
+            }
+            # Some teachers introduce themselves in their first message.
+            if rng.random() < intro_rate:
+                store.update(
+                    user_id,
+                    f"I teach {teacher['subject']} to class {teacher['grade']} "
+                    f"in {teacher['language']}, and my periods are "
+                    f"{teacher['minutes']} minutes long.",
+                )
+            for _ in range(tasks):
+                _agent, needs, template = rng.choice(TASKS)
+                request = template.format(topic=rng.choice(TOPICS))
+                for field in needs:
+                    if rng.random() < mention_rate:
+                        request += " " + _mention(field, teacher)
+                in_request = TeacherProfile()
+                in_request.learn(request)
+                missing = set(needs) - _known(in_request)
+                known_before = _known(store.get(user_id))
+                store.update(user_id, request)
+                if missing:
+                    without += 1
+                if missing - known_before:
+                    with_profiles += 1
+                    # The teacher answers the clarifying question.
+                    answer = " ".join(_mention(f, teacher) for f in sorted(missing))
+                    store.update(user_id, answer)
+        store.close()
+    total = teachers * tasks
+    return {
+        "tasks": total,
+        "clarifications_without": without,
+        "clarifications_with": with_profiles,
+        "turns_saved_per_task": (without - with_profiles) / total,
+    }
+
+
+def time_store(teachers: int, repeat: int) -> dict[str, float]:
+    """Median microseconds of lookups and updates, by store configuration."""
+    timings: dict[str, list[float]] = {}
+
+    def timed(name: str, call: Any, *args: Any) -> None:
+        start = time.perf_counter()
+        call(*args)
+        timings.setdefault(name, []).append((time.perf_counter() - start) * 1e6)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "profiles.sqlite3"
+        for flush_interval, name in ((2.0, "write_behind"), (0, "synchronous")):
+            store = TeacherProfileStore(path, flush_interval=flush_interval)
+            for round_ in range(repeat):
+                for number in range(teachers):
+                    # A different class length every round, so every update
+                    # changes the profile and has to be written.
+                    text = f"class {number % 10 + 1}, {30 + round_ % 30} minute periods"
+                    timed(f"update_{name}", store.update, str(number), text)
+            store.close()
+        # A new store reads every profile from SQLite once, then from memory.
+        store = TeacherProfileStore(path)
+        for number in range(teachers):
+            timed("lookup_cold", store.get, str(number))
+        for _ in range(repeat):
+            for number in range(teachers):
+                timed("lookup_hot", store.get, str(number))
+        store.close()
+    return {name: statistics.median(values) for name, values in timings.items()}
+
+
+def run(
+    teachers: int,
+    tasks: int,
+    mention_rate: float,
+    intro_rate: float,
+    seed: int,
+    clarification_seconds: float,
+) -> dict[str, Any]:
+    results = simulate(teachers, tasks, mention_rate, intro_rate, seed)
+    results["clarification_seconds"] = clarification_seconds
+    results["median_us"] = time_store(teachers, repeat=5)
+    return results
+
+
+def report(results: dict[str, Any]) -> str:
+    tasks = results["tasks"]
+    without = results["clarifications_without"]
+    with_profiles = results["clarifications_with"]
+    seconds = results["clarification_seconds"]
+    saved = results["turns_saved_per_task"]
+    lines = [
+        f"{'':<22} {'clarifications':>14} {'per task':>9} {'wait s/task':>12}",
+        f"{'without profiles':<22} {without:>14} {without / tasks:>9.2f} "
+        f"{without / tasks * seconds:>12.1f}",
+        f"{'with profiles':<22} {with_profiles:>14} {with_profiles / tasks:>9.2f} "
+        f"{with_profiles / tasks * seconds:>12.1f}",
+        "",
+        f"Turns saved per task: {saved:.2f} ({1 - with_profiles / without:.0%} "
+        f"of clarifications), {saved * seconds:.1f} s per task "
+        f"at {seconds:.0f} s per clarification round trip",
+        "",
+        f"{'profile store':<22} {'median us':>10}",
+    ]
+    for name, value in results["median_us"].items():
+        lines.append(f"{name:<22} {value:>10.1f}")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--teachers", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=20, help="Tasks per teacher")
+    parser.add_argument(
+        "--mention-rate",
+        type=float,
+        default=0.4,
+        help="Chance that a request states each field the task needs",
+    )
+    parser.add_argument(
+        "--intro-rate",
+        type=float,
+        default=0.3,
+        help="Share of teachers who describe their class in their first message",
+    )
+    parser.add_argument(
+        "--clarification-seconds",
+        type=float,
+        default=30,
+        help="Seconds a clarification costs: a model turn and the teacher's reply",
+    )
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="Print raw results")
+    args = parser.parse_args(argv)
+
+    results = run(
+        args.teachers,
+        args.tasks,
+        args.mention_rate,
+        args.intro_rate,
+        args.seed,
+        args.clarification_seconds,
+    )
+    print(json.dumps(results, indent=2) if args.json else report(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+"""
+Token Footprint - Static input tokens of every agent and request path
+
+Builds, for every LLM agent under `root_agent`, the request ADK would send
+to the model on an empty session, by running the agent's own request
+processors and tools offline, and estimates its fixed input tokens: the
+agent's instruction, the routing text (identity, and the name and
+description of every agent it can transfer to), tool declarations and the
+output schema. History, the teacher's message and state placeholders come
+on top of these. Then walks the hop paths of typical requests, from the root
+agent down to the agents doing the work, and reports the fixed tokens each
+path pays, and how many of them go to the routing hops before the work.
+
+    uv run python -m app.benchmarks.token_footprint
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import sys
+from typing import Any
+
+from google.adk.agents import BaseAgent, LlmAgent, RunConfig
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.models import LlmRequest
+from google.adk.sessions import InMemorySessionService, Session
+from google.adk.tools.tool_context import ToolContext
+from google.genai import types
+from pydantic import BaseModel
+
+from app.agent import root_agent
+from app.utils.tokens import estimate_tokens
+
+PARTS = ["instruction", "routing", "tools", "schema"]
+# Request processors whose system instruction counts as the agent's own; all
+# other system instruction text (identity, transfer targets) is routing.
+_INSTRUCTION_PROCESSORS = {"instructions"}
+_PLACEHOLDER = re.compile(r"{([A-Za-z_]\w*)}")
+
+# (request, example message, agent doing the work, model calls per agent)
+# Agents not listed make one call; the root agent and its path to the target
+# transfer once each. Agents with tools make one more call per tool round.
+REQUESTS: list[tuple[str, str, str, dict[str, int]]] = [
+    (
+        "worksheet",
+        "Make a worksheet on fractions for class 5",
+        "worksheet_generator_agent",
+        {},
+    ),
+    (
+        "worksheet variations",
+        "Make three variations of this worksheet",
+        "variation_generator_agent",
+        {"variation_chunk_agent": 3},
+    ),
+    (
+        "simplify for a grade",
+        "Simplify this passage for class 3",
+        "grade_adapter_agent",
+        {},
+    ),
+    (
+        "local story, 3 languages",
+        "Write a story about the monsoon in Hindi, Marathi and English",
+        "hyper_local_content_agent",
+        {
+            "hyper_local_writer_agent": 0,
+            "hyper_local_canonical_agent": 1,
+            "hyper_local_translator_agent": 2,
+        },
+    ),
+    ("explanation", "Why is the sky blue?", "knowledge_base_agent", {}),
+    (
+        "mindmap",
+        "Draw a mindmap of the water cycle for class 6",
+        "mindmap_generator_agent",
+        {},
+    ),
+    (
+        "diagram",
+        "Draw a diagram of the parts of a plant",
+        "diagram_creator_agent",
+        {"diagram_creator_agent": 2},
+    ),
+    (
+        "quiz",
+        "Make a quiz on photosynthesis for class 7",
+        "quiz_generator_agent",
+        {},
+    ),
+    (
+        "word games",
+        "Make a crossword about animals for class 4",
+        "word_game_generator_agent",
+        {"word_game_generator_agent": 2},
+    ),
+    (
+        "weekly lesson plan, 5 days",
+        "Make a lesson plan for a week on electricity for class 8",
+        "lesson_planning_agent",
+        {
+            "day_objective_mapper_agent": 5,
+            "content_planner_day_agent": 5,
+        },
+    ),
+]
+
+
+def _walk(agent: BaseAgent) -> list[BaseAgent]:
+    agents = [agent]
+    for sub_agent in agent.sub_agents:
+        agents.extend(_walk(sub_agent))
+    return agents
+
+
+def _depth(agent: BaseAgent) -> int:
+    return 0 if agent.parent_agent is None else 1 + _depth(agent.parent_agent)
+
+
+def _placeholders(agent: LlmAgent) -> list[str]:
+    """State keys the agent's instructions read, like {baseline_worksheet}."""
+    texts = [agent.instruction, getattr(agent.root_agent, "global_instruction", "")]
+    return sorted(
+        {
+            key
+            for text in texts
+            if isinstance(text, str)
+            for key in _PLACEHOLDER.findall(text)
+        }
+    )
+
+
+def _schema_tokens(llm_request: LlmRequest) -> int:
+    schema = llm_request.config.response_schema if llm_request.config else None
+    if schema is None:
+        return 0
+    if isinstance(schema, type) and issubclass(schema, BaseModel):
+        dumped: Any = schema.model_json_schema()
+    elif isinstance(schema, BaseModel):
+        dumped = schema.model_dump(mode="json", exclude_none=True)
+    else:
+        dumped = schema
+    return estimate_tokens(json.dumps(dumped))
+
+
+def _tool_tokens(llm_request: LlmRequest) -> int:
+    tools = (llm_request.config.tools if llm_request.config else None) or []
+    return sum(
+        estimate_tokens(json.dumps(tool.model_dump(mode="json", exclude_none=True)))
+        for tool in tools
+        if isinstance(tool, types.Tool)
+    )
+
+
+def _system_tokens(llm_request: LlmRequest) -> int:
+    instruction = llm_request.config.system_instruction if llm_request.config else None
+    return estimate_tokens(instruction) if isinstance(instruction, str) else 0
+
+
+async def footprint(agent: LlmAgent) -> dict[str, Any]:
+    """Fixed input tokens of one model call of `agent`, by part."""
+    state = dict.fromkeys(_placeholders(agent), "")
+    session_service = InMemorySessionService()
+    ctx = InvocationContext(
+        session_service=session_service,
+        invocation_id="e-token-footprint",
+        agent=agent,
+        run_config=RunConfig(),
+        session=Session(
+            id="token-footprint", app_name="footprint", user_id="footprint", state=state
+        ),
+    )
+    llm_request = LlmRequest(model=getattr(agent.canonical_model, "model", None))
+    parts = dict.fromkeys(PARTS, 0)
+    # The flow's request processors, then the tools', as in
+    # BaseLlmFlow._preprocess_async, measuring what each adds.
+    flow = agent._llm_flow
+    for processor in flow.request_processors:
+        before = _system_tokens(llm_request)
+        async for _ in processor.run_async(ctx, llm_request):
+            pass
+        stage = type(processor).__module__.rsplit(".", 1)[-1]
+        part = "instruction" if stage in _INSTRUCTION_PROCESSORS else "routing"
+        parts[part] += _system_tokens(llm_request) - before
+    for tool in await agent.canonical_tools(ReadonlyContext(ctx)):
+        await tool.process_llm_request(
+            tool_context=ToolContext(ctx), llm_request=llm_request
+        )
+    parts["tools"] = _tool_tokens(llm_request)
+    parts["schema"] = _schema_tokens(llm_request)
+    return {
+        "agent": agent.name,
+        "depth": _depth(agent),
+        **parts,
+        "total": sum(parts.values()),
+        "state_placeholders": list(state),
+    }
+
+
+def _path(
+    target: BaseAgent, calls: dict[str, int]
+) -> tuple[list[tuple[str, int]], list[tuple[str, int]]]:
+    """
+    (agent, model calls) along a request for `target`, root first: the
+    routing hops down to it, and the agents doing the work.
+    """
+    hops: list[tuple[str, int]] = []
+    ancestor = target.parent_agent
+    while ancestor is not None:
+        if isinstance(ancestor, LlmAgent):
+            hops.insert(0, (ancestor.name, calls.get(ancestor.name, 1)))
+        ancestor = ancestor.parent_agent
+    work = [
+        (agent.name, calls.get(agent.name, 1))
+        for agent in _walk(target)
+        if isinstance(agent, LlmAgent)
+    ]
+    return hops, [hop for hop in work if hop[1]]
+
+
+def run() -> dict[str, Any]:
+    agents = {agent.name: agent for agent in _walk(root_agent)}
+    llm_agents = [agent for agent in agents.values() if isinstance(agent, LlmAgent)]
+    per_agent = {agent.name: asyncio.run(footprint(agent)) for agent in llm_agents}
+    paths = []
+    for request, message, target, calls in REQUESTS:
+        if target not in agents:
+            raise KeyError(f"{request!r}: no agent named {target!r} under root_agent")
+        routing, work = _path(agents[target], calls)
+        hops = routing + work
+        totals = {
+            part: sum(per_agent[name][part] * n for name, n in hops)
+            for part in [*PARTS, "total"]
+        }
+        paths.append(
+            {
+                "request": request,
+                "message": message,
+                "hops": hops,
+                "calls": sum(n for _, n in hops),
+                **totals,
+                "routing_hop_tokens": sum(
+                    per_agent[name]["total"] * n for name, n in routing
+                ),
+            }
+        )
+    return {"agents": list(per_agent.values()), "paths": paths}
+
+
+def report(results: dict[str, Any]) -> str:
+    header = f"{'instr':>7} {'routing':>8} {'tools':>6} {'schema':>7} {'total':>7}"
+    lines = [f"{'agent':<36} {header}"]
+    for row in results["agents"]:
+        name = "  " * row["depth"] + row["agent"]
+        lines.append(
+            f"{name:<36} {row['instruction']:>7} {row['routing']:>8} "
+            f"{row['tools']:>6} {row['schema']:>7} {row['total']:>7}"
+        )
+    lines += ["", f"{'request':<28} {'calls':>5} {header} {'hops':>7}"]
+    for row in results["paths"]:
+        lines.append(
+            f"{row['request']:<28} {row['calls']:>5} {row['instruction']:>7} "
+            f"{row['routing']:>8} {row['tools']:>6} {row['schema']:>7} "
+            f"{row['total']:>7} {row['routing_hop_tokens']:>7}"
+        )
+    lines.append("")
+    for row in results["paths"]:
+        path = " -> ".join(
+            name if n == 1 else f"{name} x{n}" for name, n in row["hops"]
+        )
+        lines.append(f"{row['request']}: {path}")
+    lines += [
+        "",
+        "Tokens are estimated fixed input tokens per call (app.utils.tokens), "
+        "summed over a path's calls; 'hops' is the part spent on routing "
+        "agents before the work. History, the message and state come on top.",
+    ]
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--json", action="store_true", help="Print raw results")
+    args = parser.parse_args(argv)
+
+    results = run()
+    print(json.dumps(results, indent=2) if args.json else report(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
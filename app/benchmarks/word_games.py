@@ -0,0 +1,211 @@
+"""
+Word Game Benchmark - Local puzzle engine speed, validity and tokens saved
+
+Builds crosswords, word searches and scrambles for grids up to 25x25 with 50+
+words, checks every grid, and compares the output tokens a model would spend
+writing the puzzles and answer keys itself with the tokens of the tool call
+that replaces them (the vocabulary and clues only).
+
+    uv run python -m app.benchmarks.word_games --repeat 5
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from typing import Any
+
+from app.sub_agents.fun_activity.sub_agents.word_game_generator.puzzles import (
+    ACROSS,
+    Crossword,
+    WordSearch,
+    build_crossword,
+    build_scrambles,
+    build_word_search,
+    render_crossword,
+    render_scrambles,
+    render_word_search,
+)
+from app.utils.tokens import estimate_tokens
+
+VOCABULARY = [
+    ("photosynthesis", "How plants make food from light"),
+    ("chlorophyll", "Green pigment that captures sunlight"),
+    ("sunlight", "Energy source for plants"),
+    ("oxygen", "Gas released by plants"),
+    ("carbon", "Element found in all living things"),
+    ("glucose", "Sugar made during photosynthesis"),
+    ("stomata", "Tiny pores on a leaf"),
+    ("xylem", "Tubes carrying water up a plant"),
+    ("phloem", "Tubes carrying food around a plant"),
+    ("root", "Part of a plant that absorbs water"),
+    ("stem", "Supports the leaves and flowers"),
+    ("leaf", "Main site of photosynthesis"),
+    ("flower", "Reproductive part of a plant"),
+    ("pollen", "Powder carried by bees"),
+    ("seed", "Grows into a new plant"),
+    ("germination", "When a seed starts to grow"),
+    ("nutrient", "Substance needed for growth"),
+    ("habitat", "Natural home of an organism"),
+    ("ecosystem", "Living things and their surroundings"),
+    ("predator", "Animal that hunts others"),
+    ("prey", "Animal that is hunted"),
+    ("herbivore", "Eats only plants"),
+    ("carnivore", "Eats only meat"),
+    ("omnivore", "Eats plants and animals"),
+    ("producer", "Makes its own food"),
+    ("consumer", "Eats other organisms"),
+    ("decomposer", "Breaks down dead matter"),
+    ("fungi", "Mushrooms belong to this group"),
+    ("bacteria", "Single-celled microorganisms"),
+    ("cell", "Basic unit of life"),
+    ("nucleus", "Control centre of a cell"),
+    ("membrane", "Thin layer around a cell"),
+    ("tissue", "Group of similar cells"),
+    ("organ", "Tissues working together"),
+    ("skeleton", "Framework of bones"),
+    ("muscle", "Tissue that contracts to move"),
+    ("heart", "Pumps blood around the body"),
+    ("lungs", "Organs for breathing"),
+    ("blood", "Carries oxygen in the body"),
+    ("digestion", "Breaking food into nutrients"),
+    ("stomach", "Organ that churns food"),
+    ("intestine", "Long tube absorbing nutrients"),
+    ("kidney", "Filters waste from blood"),
+    ("brain", "Control centre of the body"),
+    ("nerve", "Carries signals in the body"),
+    ("evaporation", "Water turning into vapour"),
+    ("condensation", "Vapour turning into droplets"),
+    ("precipitation", "Rain, snow or hail"),
+    ("cloud", "Visible mass of droplets in the sky"),
+    ("river", "Large natural stream of water"),
+    ("ocean", "Vast body of salt water"),
+    ("climate", "Long-term weather pattern"),
+    ("erosion", "Wearing away of rock or soil"),
+    ("fossil", "Remains of ancient life in rock"),
+    ("mineral", "Naturally occurring solid substance"),
+    ("magnet", "Attracts iron"),
+    ("friction", "Force that slows sliding objects"),
+    ("gravity", "Force pulling objects down"),
+    ("energy", "Ability to do work"),
+    ("circuit", "Closed path for electricity"),
+    ("battery", "Stores electrical energy"),
+    ("insulator", "Material that blocks heat or electricity"),
+]
+
+# (grid size, number of words)
+SCENARIOS = [(10, 15), (15, 30), (20, 50), (25, 62)]
+
+
+def check_crossword(crossword: Crossword) -> bool:
+    """Every cell agrees between crossing words and every word is in bounds."""
+    cells: dict[tuple[int, int], str] = {}
+    for placement in crossword.placements:
+        for (r, c), letter in zip(placement.cells(), placement.word, strict=True):
+            if not (0 <= r < crossword.rows and 0 <= c < crossword.cols):
+                return False
+            if cells.setdefault((r, c), letter) != letter:
+                return False
+    return len({(p.row, p.col, p.direction) for p in crossword.placements}) == len(
+        crossword.placements
+    )
+
+
+def check_word_search(search: WordSearch) -> bool:
+    """Every listed word reads correctly from its recorded position."""
+    return all(
+        "".join(search.grid[r][c] for r, c in placement.cells()) == placement.word
+        for placement in search.placements
+    )
+
+
+def _time_ms(fn: Callable[[], Any], repeat: int) -> tuple[Any, float]:
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(timings)
+
+
+def run_scenario(size: int, count: int, repeat: int) -> dict[str, Any]:
+    entries = VOCABULARY[:count]
+    words = [word for word, _ in entries]
+
+    crossword, crossword_ms = _time_ms(lambda: build_crossword(entries, size), repeat)
+    search, search_ms = _time_ms(lambda: build_word_search(words, size), repeat)
+    scrambles, scramble_ms = _time_ms(lambda: build_scrambles(entries), repeat)
+
+    rendered = [
+        render_crossword(crossword),
+        render_word_search(search),
+        render_scrambles(scrambles),
+    ]
+    # What the model used to write: every grid, clue list and answer key.
+    model_written = "\n\n".join(part for pair in rendered for part in pair)
+    # What it writes now: the tool call arguments.
+    tool_call = json.dumps(
+        {
+            "words": words,
+            "clues": [clue for _, clue in entries],
+            "games": ["crossword", "word_search", "scramble"],
+            "grid_size": size,
+        }
+    )
+    before, after = estimate_tokens(model_written), estimate_tokens(tool_call)
+    return {
+        "grid": f"{size}x{size}",
+        "words": count,
+        "crossword_ms": crossword_ms,
+        "crossword_placed": len(crossword.placements),
+        "crossword_valid": check_crossword(crossword),
+        "across": sum(p.direction == ACROSS for p in crossword.placements),
+        "word_search_ms": search_ms,
+        "word_search_placed": len(search.placements),
+        "word_search_valid": check_word_search(search),
+        "scramble_ms": scramble_ms,
+        "tokens_before": before,
+        "tokens_after": after,
+        "tokens_saved": before - after,
+    }
+
+
+def report(results: list[dict[str, Any]]) -> str:
+    header = (
+        f"{'grid':>7} {'words':>5} | {'crossword':>17} | {'word search':>17} | "
+        f"{'scramble':>8} | {'output tokens (model -> tool)':>30}"
+    )
+    lines = [header, "-" * len(header)]
+    for r in results:
+        saved = r["tokens_saved"] / r["tokens_before"] if r["tokens_before"] else 0
+        lines.append(
+            f"{r['grid']:>7} {r['words']:>5} | "
+            f"{r['crossword_placed']:>3} placed {r['crossword_ms']:>6.1f}ms | "
+            f"{r['word_search_placed']:>3} placed {r['word_search_ms']:>6.1f}ms | "
+            f"{r['scramble_ms']:>6.2f}ms | "
+            f"{r['tokens_before']:>6} -> {r['tokens_after']:>5} ({saved:.0%} saved)"
+        )
+    valid = all(r["crossword_valid"] and r["word_search_valid"] for r in results)
+    lines += ["", f"All grids valid: {'yes' if valid else 'NO'}"]
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Builds per scenario (median is shown)"
+    )
+    parser.add_argument("--json", action="store_true", help="Print raw results")
+    args = parser.parse_args(argv)
+
+    results = [run_scenario(size, count, args.repeat) for size, count in SCENARIOS]
+    print(json.dumps(results, indent=2) if args.json else report(results))
+    valid = all(r["crossword_valid"] and r["word_search_valid"] for r in results)
+    return 0 if valid else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -46,6 +46,110 @@ class AgentConfiguration:
     # Deployment name (can have hyphens, used for display in Agent Engine)
     deployment_name: str = os.environ.get("AGENT_NAME", "sahayak")
 
+    # SQLite file holding pre-generated materials (filled by `make prewarm`);
+    # local to the process, so on Agent Engine each instance has its own
+    material_cache_path: str = os.environ.get(
+        "MATERIAL_CACHE_PATH", ".cache/materials.sqlite3"
+    )
+
+    # SQLite file caching translations made by hyper_local_content_agent
+    translation_cache_path: str = os.environ.get(
+        "TRANSLATION_CACHE_PATH", ".cache/translations.sqlite3"
+    )
+
+    # Image generation model used by the visual aid agents
+    image_model: str = os.environ.get(
+        "IMAGE_MODEL", "gemini-2.0-flash-preview-image-generation"
+    )
+
+    # Format of the compressed main image of generated images ("webp" or "avif")
+    image_format: str = os.environ.get("IMAGE_FORMAT", "webp")
+
+    # Processes encoding generated images
+    image_workers: int = int(os.environ.get("IMAGE_WORKERS", "2"))
+
+    # Where generated images and rendered diagrams are stored, by content hash
+    visual_output_dir: str = os.environ.get("VISUAL_OUTPUT_DIR", ".cache/visuals")
+
+    # Threads for blocking diagram rendering work
+    render_workers: int = int(os.environ.get("RENDER_WORKERS", "4"))
+
+    # GCS bucket for artifacts (generated images, diagrams, ...); when unset
+    # they are stored on the local filesystem under `artifact_dir`
+    artifact_bucket: str | None = os.environ.get("ARTIFACT_BUCKET")
+    artifact_dir: str = os.environ.get("ARTIFACT_DIR", ".cache/artifacts")
+
+    # SQLite file holding dev server sessions, and how many recently used
+    # sessions are kept in memory
+    session_db_path: str = os.environ.get("SESSION_DB_PATH", ".cache/sessions.sqlite3")
+    session_cache_size: int = int(os.environ.get("SESSION_CACHE_SIZE", "64"))
+
+    # SQLite file holding teacher profiles (grades, languages, subjects, class
+    # length), and seconds between background writes of changed profiles
+    teacher_profile_path: str = os.environ.get(
+        "TEACHER_PROFILE_PATH", ".cache/teacher_profiles.sqlite3"
+    )
+    teacher_profile_flush_seconds: float = float(
+        os.environ.get("TEACHER_PROFILE_FLUSH_SECONDS", "2")
+    )
+
+    # Turns of history each agent sees verbatim, and at all; older outputs
+    # are summarized (see app.utils.compaction)
+    history_recent_turns: int = int(os.environ.get("HISTORY_RECENT_TURNS", "3"))
+    history_max_turns: int = int(os.environ.get("HISTORY_MAX_TURNS", "20"))
+
+    # Time a teacher's request may take end to end; every model call gets a
+    # share of it as its deadline (see app.utils.hedging)
+    request_slo_seconds: float = float(os.environ.get("REQUEST_SLO_SECONDS", "180"))
+
+    # Most hedged (duplicate) model calls per call, and retries of model calls
+    # that fail with a transient error
+    hedge_max_ratio: float = float(os.environ.get("HEDGE_MAX_RATIO", "0.1"))
+    model_max_retries: int = int(os.environ.get("MODEL_MAX_RETRIES", "2"))
+
+    # Degraded mode (see app.utils.degraded): "auto" sheds load past the
+    # thresholds below, "on" always answers from local fallbacks, "off" never
+    degraded_mode: str = os.environ.get("DEGRADED_MODE", "auto")
+    # Model calls in flight, p95 (or longest in-flight) seconds to a call's
+    # first response chunk, and share of recent calls failing with overload
+    # errors beyond which load is shed
+    degraded_max_in_flight: int = int(os.environ.get("DEGRADED_MAX_IN_FLIGHT", "32"))
+    degraded_max_latency_seconds: float = float(
+        os.environ.get("DEGRADED_MAX_LATENCY_SECONDS", "45")
+    )
+    degraded_max_error_rate: float = float(
+        os.environ.get("DEGRADED_MAX_ERROR_RATE", "0.5")
+    )
+    # Seconds degraded mode lasts before calls are let through again
+    degraded_cooldown_seconds: float = float(
+        os.environ.get("DEGRADED_COOLDOWN_SECONDS", "30")
+    )
+
+    # Reuse a generator stage's output from state while its inputs are
+    # unchanged (see app.utils.incremental); "off" always recomputes
+    incremental_stages: str = os.environ.get("INCREMENTAL_STAGES", "on")
+
+    # Questions generated for quizzes and worksheets, sampled again for later
+    # requests so the model only writes the missing ones (see
+    # app.utils.item_bank); "off" generates every question
+    item_bank_path: str = os.environ.get("ITEM_BANK_PATH", ".cache/item_bank.sqlite3")
+    item_bank: str = os.environ.get("ITEM_BANK", "on")
+
+    # Record model calls to, or replay them from, a cassette file (see
+    # app.utils.cassettes): mode "record", "replay" or empty for neither;
+    # replayed latencies "preserve"d, "zero"ed or scaled by a factor
+    model_cassette_path: str = os.environ.get(
+        "MODEL_CASSETTE", ".cache/model-calls.jsonl.gz"
+    )
+    model_cassette_mode: str = os.environ.get("MODEL_CASSETTE_MODE", "")
+    model_cassette_latency: str = os.environ.get("MODEL_CASSETTE_LATENCY", "preserve")
+
+    # Routing confidence needed before the likely leaf agent is started
+    # speculatively while the root agent plans (above 1 disables speculation)
+    speculation_min_confidence: float = float(
+        os.environ.get("SPECULATION_MIN_CONFIDENCE", "0.85")
+    )
+
     # Google Cloud settings
     project_id = None
     location = "us-central1"
@@ -0,0 +1,275 @@
+"""
+Development API server with persistent sessions and artifacts.
+
+`adk api_server` keeps sessions and artifacts in memory, so conversations,
+generated images and diagrams disappear on every reload, and its
+`get_fast_api_app` only builds the services it can name by URI. This serves
+the endpoints the frontend uses (sessions, artifacts, `/run` and `/run_sse`,
+as `adk api_server` defines them) from ADK's parts, with:
+
+- sessions in SQLite under SESSION_DB_PATH, with hot sessions cached in
+  memory (see `app.utils.sessions.SqliteSessionService`),
+- the configured artifact service (see
+  `app.utils.artifacts.get_artifact_service`): the local filesystem under
+  ARTIFACT_DIR, or GCS when ARTIFACT_BUCKET is set,
+- runs of `/run_sse` cancelled as soon as the client disconnects, down to
+  their model calls, renders and speculative runs (see
+  `app.utils.cancellation`).
+
+The dev UI, eval and trace endpoints are left to `adk web`.
+
+    uv run python -m app.dev_server app --allow_origins="*"
+"""
+
+import argparse
+import logging
+import os
+from collections.abc import AsyncGenerator, AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.cli.fast_api import AgentRunRequest
+from google.adk.cli.utils import envs
+from google.adk.cli.utils.agent_loader import AgentLoader
+from google.adk.cli.utils.cleanup import close_runners
+from google.adk.events import Event
+from google.adk.memory import InMemoryMemoryService
+from google.adk.runners import Runner
+from google.adk.sessions import Session
+from google.genai import types
+
+from app.utils.artifacts import get_artifact_service
+from app.utils.cancellation import CancellableRunner, CancelOnDisconnect
+from app.utils.sessions import get_session_service
+
+logger = logging.getLogger(__name__)
+
+_SESSION = "/apps/{app_name}/users/{user_id}/sessions/{session_id}"
+
+
+def create_app(agents_dir: str, allow_origins: list[str] | None = None) -> FastAPI:
+    """The API server for the agents under `agents_dir`."""
+    session_service = get_session_service()
+    artifact_service = get_artifact_service()
+    memory_service = InMemoryMemoryService()
+    loader = AgentLoader(agents_dir)
+    runners: dict[str, Runner] = {}
+
+    def runner_for(app_name: str) -> Runner:
+        if app_name not in runners:
+            envs.load_dotenv_for_agent(os.path.basename(app_name), agents_dir)
+            runners[app_name] = CancellableRunner(
+                app_name=app_name,
+                agent=loader.load_agent(app_name),
+                session_service=session_service,
+                artifact_service=artifact_service,
+                memory_service=memory_service,
+            )
+        return runners[app_name]
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        yield
+        await close_runners(list(runners.values()))
+
+    app = FastAPI(lifespan=lifespan)
+    if allow_origins:
+        app.add_middleware(
+            CORSMiddleware,
+            allow_origins=allow_origins,
+            allow_credentials=True,
+            allow_methods=["*"],
+            allow_headers=["*"],
+        )
+
+    async def existing_session(app_name: str, user_id: str, session_id: str) -> Session:
+        session = await session_service.get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        )
+        if not session:
+            raise HTTPException(status_code=404, detail="Session not found")
+        return session
+
+    @app.get("/list-apps")
+    def list_apps() -> list[str]:
+        return sorted(
+            path.name
+            for path in Path(agents_dir).iterdir()
+            if path.is_dir() and not path.name.startswith((".", "__"))
+        )
+
+    @app.get(_SESSION, response_model_exclude_none=True)
+    async def get_session(app_name: str, user_id: str, session_id: str) -> Session:
+        return await existing_session(app_name, user_id, session_id)
+
+    @app.get(
+        "/apps/{app_name}/users/{user_id}/sessions", response_model_exclude_none=True
+    )
+    async def list_sessions(app_name: str, user_id: str) -> list[Session]:
+        response = await session_service.list_sessions(
+            app_name=app_name, user_id=user_id
+        )
+        return response.sessions
+
+    @app.post(_SESSION, response_model_exclude_none=True)
+    async def create_session_with_id(
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        state: dict[str, Any] | None = None,
+    ) -> Session:
+        if await session_service.get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        ):
+            raise HTTPException(
+                status_code=400, detail=f"Session already exists: {session_id}"
+            )
+        return await session_service.create_session(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+
+    @app.post(
+        "/apps/{app_name}/users/{user_id}/sessions", response_model_exclude_none=True
+    )
+    async def create_session(
+        app_name: str,
+        user_id: str,
+        state: dict[str, Any] | None = None,
+        events: list[Event] | None = None,
+    ) -> Session:
+        session = await session_service.create_session(
+            app_name=app_name, user_id=user_id, state=state
+        )
+        for event in events or []:
+            await session_service.append_event(session, event)
+        return session
+
+    @app.delete(_SESSION)
+    async def delete_session(app_name: str, user_id: str, session_id: str) -> None:
+        await session_service.delete_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        )
+
+    @app.get(_SESSION + "/artifacts", response_model_exclude_none=True)
+    async def list_artifact_names(
+        app_name: str, user_id: str, session_id: str
+    ) -> list[str]:
+        return await artifact_service.list_artifact_keys(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        )
+
+    @app.get(_SESSION + "/artifacts/{artifact_name}", response_model_exclude_none=True)
+    async def load_artifact(
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        artifact_name: str,
+        version: int | None = Query(None),
+    ) -> types.Part | None:
+        artifact = await artifact_service.load_artifact(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            filename=artifact_name,
+            version=version,
+        )
+        if not artifact:
+            raise HTTPException(status_code=404, detail="Artifact not found")
+        return artifact
+
+    @app.get(
+        _SESSION + "/artifacts/{artifact_name}/versions",
+        response_model_exclude_none=True,
+    )
+    async def list_artifact_versions(
+        app_name: str, user_id: str, session_id: str, artifact_name: str
+    ) -> list[int]:
+        return await artifact_service.list_versions(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            filename=artifact_name,
+        )
+
+    @app.get(
+        _SESSION + "/artifacts/{artifact_name}/versions/{version_id}",
+        response_model_exclude_none=True,
+    )
+    async def load_artifact_version(
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        artifact_name: str,
+        version_id: int,
+    ) -> types.Part | None:
+        return await load_artifact(
+            app_name, user_id, session_id, artifact_name, version_id
+        )
+
+    @app.delete(_SESSION + "/artifacts/{artifact_name}")
+    async def delete_artifact(
+        app_name: str, user_id: str, session_id: str, artifact_name: str
+    ) -> None:
+        await artifact_service.delete_artifact(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            filename=artifact_name,
+        )
+
+    @app.post("/run", response_model_exclude_none=True)
+    async def agent_run(req: AgentRunRequest) -> list[Event]:
+        await existing_session(req.app_name, req.user_id, req.session_id)
+        return [
+            event
+            async for event in runner_for(req.app_name).run_async(
+                user_id=req.user_id,
+                session_id=req.session_id,
+                new_message=req.new_message,
+            )
+        ]
+
+    @app.post("/run_sse")
+    async def agent_run_sse(req: AgentRunRequest) -> StreamingResponse:
+        await existing_session(req.app_name, req.user_id, req.session_id)
+        mode = StreamingMode.SSE if req.streaming else StreamingMode.NONE
+
+        async def events() -> AsyncGenerator[str, None]:
+            try:
+                async for event in runner_for(req.app_name).run_async(
+                    user_id=req.user_id,
+                    session_id=req.session_id,
+                    new_message=req.new_message,
+                    run_config=RunConfig(streaming_mode=mode),
+                ):
+                    data = event.model_dump_json(exclude_none=True, by_alias=True)
+                    yield f"data: {data}\n\n"
+            except Exception as e:
+                logger.exception("Run failed: %s", e)
+                yield f'data: {{"error": "{e}"}}\n\n'
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("agents_dir", nargs="?", default=".")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--allow_origins", action="append", default=[])
+    args = parser.parse_args(argv)
+
+    app = create_app(args.agents_dir, args.allow_origins)
+    uvicorn.run(CancelOnDisconnect(app), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Local fallbacks served in degraded mode (see `app.utils.degraded`).
+
+Each fallback answers without a model call, preferring a material prepared
+ahead of time (`make prewarm`) and otherwise building one locally:
+worksheets from the question bank, word games from the puzzle engine and
+mindmaps from trees generated earlier. Agents without a fallback of their
+own, the root and managers included, answer by the kind of material the
+teacher asked for.
+"""
+
+import re
+
+from app.utils.degraded import DegradedMode, FallbackAnswer, FallbackRequest
+from app.utils.material_cache import get_material_cache
+
+from .sub_agents.differentiated_materials.sub_agents.worksheet_generator.question_bank import (
+    build_worksheet,
+    vocabulary,
+)
+from .sub_agents.fun_activity.sub_agents.word_game_generator.tools import (
+    GAMES,
+    render_word_games,
+)
+from .sub_agents.visual_aid_agent.sub_agents.mindmap_generator.render import (
+    render_markdown,
+)
+from .sub_agents.visual_aid_agent.sub_agents.mindmap_generator.schema import Mindmap
+from .sub_agents.visual_aid_agent.sub_agents.mindmap_generator.trees import (
+    cached_tree,
+)
+
+PREPARED = "prepared in advance"
+QUESTION_BANK = "built from the local question bank"
+PUZZLE_ENGINE = "built by the local puzzle engine"
+CACHED_TREE = "rendered from a mindmap made earlier"
+
+# What a teacher asked for, by the words they used.
+_MATERIALS = [
+    ("worksheet", re.compile(r"\bworksheets?\b|\bpractice sheets?\b", re.I)),
+    (
+        "word_games",
+        re.compile(
+            r"\b(?:word games?|crosswords?|word search(?:es)?|scrambles?)\b", re.I
+        ),
+    ),
+    ("mindmap", re.compile(r"\bmind ?maps?\b", re.I)),
+    ("quiz", re.compile(r"\bquiz(?:zes)?\b", re.I)),
+    ("lesson_plan", re.compile(r"\blesson plans?\b", re.I)),
+]
+
+
+def _prepared(material_type: str, request: FallbackRequest) -> FallbackAnswer | None:
+    material = get_material_cache().get(material_type, request.topic, request.grade)
+    return FallbackAnswer(material.content, PREPARED) if material else None
+
+
+def worksheet(request: FallbackRequest) -> FallbackAnswer | None:
+    prepared = _prepared("worksheet", request)
+    if prepared is not None:
+        return prepared
+    built = build_worksheet(request.topic, request.grade)
+    return FallbackAnswer(built[0], QUESTION_BANK) if built else None
+
+
+def answer_key(request: FallbackRequest) -> FallbackAnswer | None:
+    # Prepared worksheets come with their answer key.
+    if _prepared("worksheet", request) is not None:
+        return FallbackAnswer(
+            "The answer key is part of the worksheet above.", PREPARED
+        )
+    built = build_worksheet(request.topic, request.grade)
+    return FallbackAnswer(built[1], QUESTION_BANK) if built else None
+
+
+def _tree_vocabulary(tree: Mindmap) -> list[tuple[str, str]]:
+    """Short branch labels of a mindmap, each clued by its parent branch."""
+    entries = []
+    parents: dict[int, str] = {0: tree.topic}
+    for level, label in tree.entries():
+        parents[level] = label
+        if level >= 2 and len(label.split()) <= 2 and len(label) <= 14:
+            entries.append((label, f"Comes under “{parents[level - 1]}”"))
+    return entries
+
+
+def word_games(request: FallbackRequest) -> FallbackAnswer | None:
+    entries = vocabulary(request.topic)
+    if entries is None:
+        tree = cached_tree(request.topic, request.grade)
+        entries = _tree_vocabulary(tree) if tree else []
+    if len(entries) < 4:
+        return None
+    markdown, _ = render_word_games(
+        request.topic.capitalize(), request.grade or "any", entries, list(GAMES)
+    )
+    return FallbackAnswer(markdown, PUZZLE_ENGINE)
+
+
+def mindmap(request: FallbackRequest) -> FallbackAnswer | None:
+    tree = cached_tree(request.topic, request.grade)
+    if tree is not None:
+        return FallbackAnswer(render_markdown(tree), CACHED_TREE)
+    prepared = _prepared("mindmap", request)
+    if prepared is not None:
+        return prepared
+    entries = vocabulary(request.topic)
+    if entries is None:
+        return None
+    # Key words as branches, their meanings as leaves.
+    tree = Mindmap(
+        topic=request.topic.capitalize(),
+        grade=request.grade or "any",
+        nodes=[
+            node
+            for word, meaning in entries
+            for node in (f"1 {word.capitalize()}", f"2 {meaning}")
+        ],
+    )
+    return FallbackAnswer(render_markdown(tree), QUESTION_BANK)
+
+
+_BY_MATERIAL = {
+    "worksheet": worksheet,
+    "word_games": word_games,
+    "mindmap": mindmap,
+    "quiz": lambda request: _prepared("quiz", request),
+    "lesson_plan": lambda request: _prepared("lesson_plan", request),
+}
+
+
+def by_material(request: FallbackRequest) -> FallbackAnswer | None:
+    """Answer by the kind of material the teacher asked for."""
+    for material, pattern in _MATERIALS:
+        if pattern.search(request.text):
+            return _BY_MATERIAL[material](request)
+    return None
+
+
+degraded_mode = DegradedMode(
+    fallbacks={
+        "worksheet_creator_agent": worksheet,
+        "answerkey_creator_agent": answer_key,
+        "word_game_generator_agent": word_games,
+        "mindmap_generator_agent": mindmap,
+    },
+    default=by_material,
+)
@@ -0,0 +1,408 @@
+"""
+Pre-warm Job - Prepare next week's materials before teachers ask for them
+
+Teachers request materials for the same syllabus topics right before class.
+This job reads the term syllabus, generates worksheets, quizzes, mindmaps and
+lesson plans for next week's topics with the existing leaf agents, and stores
+them in the material cache that answers such requests before the root agent
+calls the model (see `app.utils.material_cache`; the cache is a local file,
+so run the job where the server reads it).
+
+Schedule it off-peak, e.g. with cron on Sunday night:
+
+    0 23 * * 0  cd /srv/sahayak && make prewarm SYLLABUS=syllabus.json
+
+Syllabus format (JSON):
+
+    {
+      "term_start": "2026-06-15",
+      "weeks": [
+        {"week": 1, "topics": [
+          {"subject": "Maths", "topic": "Fractions", "grade": "5",
+           "materials": ["worksheet", "quiz"], "expected_requests": 12}
+        ]}
+      ]
+    }
+
+`materials` defaults to all material types and `expected_requests` (the demand
+estimate used to prioritise work and predict the hit rate) defaults to 1.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+
+from google.adk.agents import BaseAgent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from app.sub_agents.differentiated_materials.sub_agents.worksheet_generator import (
+    worksheet_generator_agent,
+)
+from app.sub_agents.fun_activity.sub_agents.quiz_generator import (
+    quiz_generator_agent,
+)
+from app.sub_agents.planning.subagents.content_planner import content_planner_agent
+from app.sub_agents.planning.subagents.objective_mapper import objective_mapper_agent
+from app.sub_agents.planning.subagents.subtopic_decomposer import (
+    subtopic_decomposer_agent,
+)
+from app.sub_agents.visual_aid_agent.sub_agents.mindmap_generator import (
+    mindmap_generator_agent,
+)
+from app.utils.material_cache import (
+    MATERIAL_TYPES,
+    MaterialCache,
+    get_material_cache,
+    normalize_material_type,
+)
+
+# Leaf agents and the requests sent to them, in order, for each material type.
+# Steps share one session, so later steps see the earlier outputs.
+GENERATION_STEPS: dict[str, list[tuple[BaseAgent, str]]] = {
+    "worksheet": [
+        (
+            worksheet_generator_agent,
+            "Create a baseline {subject} worksheet on {topic} for grade {grade}.",
+        ),
+    ],
+    "quiz": [
+        (quiz_generator_agent, "Create a {subject} quiz on {topic} for grade {grade}."),
+    ],
+    "mindmap": [
+        (
+            mindmap_generator_agent,
+            "Create a mindmap on the {subject} topic {topic} for grade {grade}.",
+        ),
+    ],
+    "lesson_plan": [
+        (
+            subtopic_decomposer_agent,
+            "Break the {subject} topic {topic} into subtopics for a one-week "
+            "lesson plan for grade {grade}.",
+        ),
+        (objective_mapper_agent, "Map learning objectives for these subtopics."),
+        (
+            content_planner_agent,
+            "Create the content plan for each of these subtopics for grade {grade}.",
+        ),
+    ],
+}
+
+
+@dataclass
+class SyllabusTopic:
+    """One topic taught in a given week."""
+
+    topic: str
+    grade: str
+    subject: str = ""
+    materials: tuple[str, ...] = MATERIAL_TYPES
+    expected_requests: float = 1
+
+
+@dataclass
+class Syllabus:
+    """The term syllabus: which topics are taught in which week."""
+
+    term_start: date
+    weeks: dict[int, list[SyllabusTopic]] = field(default_factory=dict)
+
+    def week_number(self, day: date) -> int:
+        """1-based week of term that contains `day`."""
+        return (day - self.term_start).days // 7 + 1
+
+    def week_start(self, week: int) -> date:
+        return self.term_start + timedelta(weeks=week - 1)
+
+
+@dataclass
+class PrewarmItem:
+    """One material to generate for one topic."""
+
+    material_type: str
+    topic: SyllabusTopic
+
+
+def load_syllabus(path: str | Path) -> Syllabus:
+    """Load and validate a syllabus JSON file."""
+    with open(path) as f:
+        data = json.load(f)
+
+    syllabus = Syllabus(term_start=date.fromisoformat(data["term_start"]))
+    for week in data["weeks"]:
+        topics = []
+        for entry in week["topics"]:
+            materials = tuple(
+                normalize_material_type(m)
+                for m in entry.get("materials", MATERIAL_TYPES)
+            )
+            unknown = set(materials) - set(GENERATION_STEPS)
+            if unknown:
+                raise ValueError(
+                    f"❌ Unknown material type(s) {sorted(unknown)} for topic "
+                    f"{entry['topic']!r}. Use any of: {', '.join(MATERIAL_TYPES)}"
+                )
+            topics.append(
+                SyllabusTopic(
+                    topic=entry["topic"],
+                    grade=str(entry["grade"]),
+                    subject=entry.get("subject", ""),
+                    materials=materials,
+                    expected_requests=float(entry.get("expected_requests", 1)),
+                )
+            )
+        syllabus.weeks[int(week["week"])] = topics
+    return syllabus
+
+
+def plan_items(topics: list[SyllabusTopic]) -> list[PrewarmItem]:
+    """One item per (topic, material), most requested first."""
+    items = [
+        PrewarmItem(material_type=material, topic=topic)
+        for topic in topics
+        for material in topic.materials
+    ]
+    return sorted(items, key=lambda item: item.topic.expected_requests, reverse=True)
+
+
+async def generate_item(item: PrewarmItem) -> tuple[str, int]:
+    """Run the leaf agents for one item; return the material and tokens used."""
+    session_service = InMemorySessionService()
+    session = await session_service.create_session(
+        app_name="prewarm", user_id="prewarm"
+    )
+    topic = item.topic
+    fields = {
+        "topic": topic.topic,
+        "grade": topic.grade,
+        "subject": topic.subject or "general",
+    }
+
+    outputs: list[str] = []
+    tokens = 0
+    for agent, request in GENERATION_STEPS[item.material_type]:
+        runner = Runner(
+            app_name="prewarm", agent=agent, session_service=session_service
+        )
+        message = types.Content(
+            role="user", parts=[types.Part(text=request.format(**fields))]
+        )
+        async for event in runner.run_async(
+            user_id=session.user_id, session_id=session.id, new_message=message
+        ):
+            if event.partial:
+                continue
+            if event.usage_metadata and event.usage_metadata.total_token_count:
+                tokens += event.usage_metadata.total_token_count
+            if event.is_final_response() and event.content and event.content.parts:
+                text = "".join(
+                    part.text
+                    for part in event.content.parts
+                    if part.text and not part.thought
+                )
+                if text.strip():
+                    outputs.append(text.strip())
+    return "\n\n".join(outputs), tokens
+
+
+@dataclass
+class PrewarmResult:
+    planned: int = 0
+    generated: int = 0
+    already_cached: int = 0
+    failed: int = 0
+    skipped_for_budget: int = 0
+    tokens: int = 0
+    predicted_hit_rate: float = 0.0
+
+
+async def prewarm(
+    items: list[PrewarmItem],
+    cache: MaterialCache,
+    budget_tokens: int,
+    max_items: int | None = None,
+    concurrency: int = 2,
+    refresh: bool = False,
+) -> PrewarmResult:
+    """
+    Generate and cache the planned items until the token budget is spent.
+
+    The budget is checked before each item starts, so a run can exceed it by at
+    most `concurrency` items. The predicted hit rate is the share of expected
+    requests whose material is in the cache when the run finishes.
+    """
+    result = PrewarmResult(planned=len(items))
+    semaphore = asyncio.Semaphore(concurrency)
+    covered_demand = 0.0
+    started = 0
+
+    async def run(item: PrewarmItem) -> None:
+        nonlocal covered_demand, started
+        topic = item.topic
+        if not refresh and cache.get(
+            item.material_type, topic.topic, topic.grade, record=False
+        ):
+            result.already_cached += 1
+            covered_demand += topic.expected_requests
+            return
+
+        async with semaphore:
+            over_budget = result.tokens >= budget_tokens
+            if over_budget or (max_items is not None and started >= max_items):
+                result.skipped_for_budget += 1
+                return
+            started += 1
+            label = f"{item.material_type} · {topic.topic} · grade {topic.grade}"
+            try:
+                content, tokens = await generate_item(item)
+            except Exception as e:
+                result.failed += 1
+                print(f"❌ {label}: {e}")
+                return
+            result.tokens += tokens
+            if not content:
+                result.failed += 1
+                print(f"⚠️  {label}: agents returned no content")
+                return
+            cache.put(
+                item.material_type,
+                topic.topic,
+                topic.grade,
+                content,
+                source="prewarm",
+                tokens=tokens,
+            )
+            result.generated += 1
+            covered_demand += topic.expected_requests
+            print(f"✅ {label} ({tokens} tokens)")
+
+    await asyncio.gather(*(run(item) for item in items))
+
+    total_demand = sum(item.topic.expected_requests for item in items)
+    result.predicted_hit_rate = covered_demand / total_demand if total_demand else 0.0
+    return result
+
+
+def in_off_peak_window(now: datetime, window: str) -> bool:
+    """Whether `now` falls in an "HH-HH" window, which may wrap past midnight."""
+    start, end = (int(hour) for hour in window.split("-"))
+    if start <= end:
+        return start <= now.hour < end
+    return now.hour >= start or now.hour < end
+
+
+def report(cache: MaterialCache, week_start: date) -> None:
+    """Print the predicted vs. actual hit rate for a pre-warmed week."""
+    run = cache.last_run(week_start.isoformat())
+    since = datetime.combine(week_start, time.min).timestamp()
+    until = since + timedelta(weeks=1).total_seconds()
+    hits, lookups = cache.hit_rate(since, until)
+
+    print(f"\n📋 Pre-warm report for week starting {week_start.isoformat()}")
+    if run is None:
+        print("  No finished pre-warm run recorded for this week.")
+    else:
+        print(
+            f"  Generated: {run['generated']} of {run['planned']} items "
+            f"({run['tokens']} tokens)"
+        )
+        print(f"  Predicted hit rate: {run['predicted_hit_rate']:.1%}")
+    if lookups:
+        print(f"  Actual hit rate: {hits / lookups:.1%} ({hits} of {lookups} lookups)")
+    else:
+        print("  Actual hit rate: no lookups recorded yet")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--syllabus", required=True, help="Path to the syllabus JSON")
+    parser.add_argument(
+        "--week-start",
+        type=date.fromisoformat,
+        help="Any date in the week to prepare (default: one week from today)",
+    )
+    parser.add_argument(
+        "--budget-tokens",
+        type=int,
+        default=500_000,
+        help="Stop starting new items once this many tokens are used",
+    )
+    parser.add_argument(
+        "--max-items", type=int, help="Generate at most this many items"
+    )
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument(
+        "--off-peak-hours",
+        default="22-6",
+        help="Local hours (HH-HH) the job may run in; see --force",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Run outside the off-peak window"
+    )
+    parser.add_argument(
+        "--refresh", action="store_true", help="Regenerate items already cached"
+    )
+    parser.add_argument(
+        "--report",
+        action="store_true",
+        help="Only print predicted vs. actual hit rate for the week",
+    )
+    args = parser.parse_args(argv)
+
+    syllabus = load_syllabus(args.syllabus)
+    week = syllabus.week_number(args.week_start or date.today() + timedelta(weeks=1))
+    week_start = syllabus.week_start(week)
+    cache = get_material_cache()
+
+    if args.report:
+        report(cache, week_start)
+        return 0
+
+    if not args.force and not in_off_peak_window(datetime.now(), args.off_peak_hours):
+        print(
+            f"⏰ Outside the off-peak window ({args.off_peak_hours}h). "
+            "Use --force to run anyway."
+        )
+        return 1
+
+    topics = syllabus.weeks.get(week, [])
+    if not topics:
+        print(f"No syllabus topics for week {week} ({week_start.isoformat()})")
+        return 0
+
+    items = plan_items(topics)
+    print(
+        f"🚀 Pre-warming {len(items)} items for week {week} "
+        f"({week_start.isoformat()}), budget {args.budget_tokens} tokens"
+    )
+    run_id = cache.start_run(week_start.isoformat(), planned=len(items))
+    result = asyncio.run(
+        prewarm(
+            items,
+            cache,
+            budget_tokens=args.budget_tokens,
+            max_items=args.max_items,
+            concurrency=args.concurrency,
+            refresh=args.refresh,
+        )
+    )
+    cache.finish_run(run_id, result.generated, result.tokens, result.predicted_hit_rate)
+
+    print("\n📋 Pre-warm summary:")
+    print(f"  Generated: {result.generated}")
+    print(f"  Already cached: {result.already_cached}")
+    print(f"  Skipped (budget): {result.skipped_for_budget}")
+    print(f"  Failed: {result.failed}")
+    print(f"  Tokens used: {result.tokens}")
+    print(f"  Predicted hit rate: {result.predicted_hit_rate:.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,5 @@
 from google.adk.agents import LlmAgent
+from app.utils.hedging import hedged_model
 from . import prompt
 from .sub_agents.grade_adapter import grade_adapter_agent
 from .sub_agents.variation_generator import variation_generator_agent
@@ -12,7 +13,7 @@ MODEL = os.getenv("MODEL")
 
 differentiated_materials_agent = LlmAgent(
     name="differentiated_materials_agent",
-    model=MODEL,
+    model=hedged_model(MODEL),
     description=(
         dedent("""
         You are a manager agent that is responsible for overseeing the work of the other agents.
@@ -3,12 +3,14 @@
 import os
 
 from google.adk import Agent
+from app.utils.coalescing import coalesced_model
+
 from . import prompt
 
 MODEL = os.getenv("MODEL")
 
 grade_adapter_agent = Agent(
-    model=MODEL,
+    model=coalesced_model(MODEL),
     name="grade_adapter_agent",
     instruction=prompt.CONTENT_SIMPLIFICATION_PROMPT,
     output_key="simplified_content",
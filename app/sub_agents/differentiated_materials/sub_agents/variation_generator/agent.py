@@ -1,15 +1,81 @@
 """variation_generator_agent"""
 
 import os
+import re
+from collections.abc import Mapping
+from typing import Any
 
 from google.adk import Agent
+from google.adk.planners import BuiltInPlanner
+from google.genai import types
+
+from app.utils.chunked_generation import (
+    Chunk,
+    ChunkedGenerationAgent,
+    chunk_instruction,
+)
+from app.utils.coalescing import coalesced_model
+
 from . import prompt
 
 MODEL = os.getenv("MODEL")
 
-variation_generator_agent = Agent(
-    model=MODEL,
+# Output budget for one worksheet variation, thinking included.
+VARIATION_MAX_OUTPUT_TOKENS = 3072
+VARIATION_THINKING_BUDGET = 512
+DEFAULT_VARIATIONS = 3
+MAX_VARIATIONS = 5
+
+# Each variation leads with a different mix so they do not overlap.
+QUESTION_FORMATS = [
+    "multiple choice and true/false",
+    "short answer and fill-in-the-blank",
+    "matching and one-word answers",
+    "word problems and long answer",
+    "true/false with correction and sequencing",
+]
+
+
+def plan_variations(state: Mapping[str, Any], request: str) -> list[Chunk]:
+    """One chunk per variation; honours "4 variations" in the request."""
+    match = re.search(r"(\d+)\s+(?:different\s+)?(?:variations|versions)", request)
+    count = int(match.group(1)) if match else DEFAULT_VARIATIONS
+    count = max(1, min(count, MAX_VARIATIONS))
+
+    baseline = state.get("baseline_worksheet")
+    source = f"\n\nBaseline worksheet:\n{baseline}" if baseline else ""
+    return [
+        Chunk(
+            key=f"variation_{number}",
+            brief=(
+                f"Write only Variation {number} of {count}. Use mainly "
+                f"{QUESTION_FORMATS[(number - 1) % len(QUESTION_FORMATS)]} "
+                f"questions.{source}"
+            ),
+        )
+        for number in range(1, count + 1)
+    ]
+
+
+variation_chunk_agent = Agent(
+    model=coalesced_model(MODEL),
+    name="variation_chunk_agent",
+    instruction=chunk_instruction(prompt.VARIATION_GENERATION_PROMPT),
+    include_contents="none",
+    generate_content_config=types.GenerateContentConfig(
+        max_output_tokens=VARIATION_MAX_OUTPUT_TOKENS
+    ),
+    planner=BuiltInPlanner(
+        thinking_config=types.ThinkingConfig(thinking_budget=VARIATION_THINKING_BUDGET)
+    ),
+    disallow_transfer_to_parent=True,
+    disallow_transfer_to_peers=True,
+)
+
+variation_generator_agent = ChunkedGenerationAgent(
     name="variation_generator_agent",
-    instruction=prompt.VARIATION_GENERATION_PROMPT,
+    description="Generates worksheet variations, one variation at a time.",
+    generator=variation_chunk_agent,
+    plan_chunks=plan_variations,
     output_key="content_variations",
 )
@@ -20,4 +20,5 @@ Output Requirements:
 - Present each worksheet variation clearly, labeled as "Variation 1", "Variation 2", etc.
 - For each variation, list all questions in a structured format.
 - Do not include answers or explanations.
+- Write only the variation described at the end of these instructions; the other variations are written separately.
 """
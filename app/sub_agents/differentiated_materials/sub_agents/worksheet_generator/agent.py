@@ -4,13 +4,15 @@ import os
 
 from google.adk.agents import LlmAgent, SequentialAgent
 
+from app.utils.coalescing import coalesced_model
+
 from . import prompt
 from .tools import calculator
 
 MODEL = os.getenv("MODEL")
 
 worksheet_creator_agent = LlmAgent(
-    model=MODEL,
+    model=coalesced_model(MODEL),
     name="worksheet_creator_agent",
     instruction=prompt.WORKSHEET_CREATION_PROMPT,
     output_key="baseline_worksheet",
@@ -18,7 +20,7 @@ worksheet_creator_agent = LlmAgent(
 )
 
 answersheet_creator_agent = LlmAgent(
-    model=MODEL,
+    model=coalesced_model(MODEL),
     name="answerkey_creator_agent",
     instruction=prompt.ANSWERSHEET_CREATION_PROMPT,
     output_key="baseline_answersheet",
@@ -0,0 +1,318 @@
+"""
+Local question bank: worksheets built without a model call.
+
+Used in degraded mode (see `app.utils.degraded`). Arithmetic topics get
+generated sums scaled to the grade; other common primary-school topics get
+vocabulary questions from a small built-in word list. Worksheets are seeded
+from their topic and grade, so the worksheet and its answer key, built
+separately, always agree.
+"""
+
+import hashlib
+import random
+import re
+from fractions import Fraction
+
+from app.utils.material_cache import normalize_grade, normalize_topic
+
+# Topic vocabulary: (word, grade-neutral meaning) pairs.
+VOCABULARY: dict[str, list[tuple[str, str]]] = {
+    "water cycle": [
+        ("evaporation", "water turning into vapour when it is heated"),
+        ("condensation", "water vapour cooling into tiny drops"),
+        ("precipitation", "water falling from clouds as rain, snow or hail"),
+        ("collection", "water gathering in rivers, lakes and oceans"),
+        ("cloud", "a mass of tiny water drops floating in the sky"),
+        ("vapour", "water in the form of a gas"),
+        ("groundwater", "water stored under the ground"),
+        ("transpiration", "plants giving out water vapour through their leaves"),
+    ],
+    "photosynthesis": [
+        ("chlorophyll", "the green pigment that captures sunlight"),
+        ("sunlight", "the energy plants use to make food"),
+        ("carbon dioxide", "the gas plants take in from the air"),
+        ("oxygen", "the gas plants give out while making food"),
+        ("glucose", "the sugar plants make as food"),
+        ("leaf", "the part of the plant where most food is made"),
+        ("stomata", "tiny openings on a leaf for gases to pass"),
+        ("water", "what roots absorb from the soil for making food"),
+    ],
+    "plants": [
+        ("root", "holds the plant in the soil and absorbs water"),
+        ("stem", "carries water and food through the plant"),
+        ("leaf", "makes food for the plant"),
+        ("flower", "the part that makes seeds"),
+        ("seed", "grows into a new plant"),
+        ("fruit", "protects the seeds inside it"),
+        ("germination", "a seed starting to grow"),
+        ("pollination", "moving pollen from one flower to another"),
+    ],
+    "animals": [
+        ("herbivore", "an animal that eats only plants"),
+        ("carnivore", "an animal that eats other animals"),
+        ("omnivore", "an animal that eats plants and animals"),
+        ("habitat", "the natural home of an animal"),
+        ("mammal", "an animal that feeds its young on milk"),
+        ("reptile", "a cold-blooded animal with scaly skin"),
+        ("amphibian", "an animal that lives both in water and on land"),
+        ("migration", "animals moving to another place with the seasons"),
+    ],
+    "solar system": [
+        ("sun", "the star at the centre of our solar system"),
+        ("planet", "a large body that moves around the sun"),
+        ("orbit", "the path of a planet around the sun"),
+        ("moon", "a natural satellite of a planet"),
+        ("mercury", "the planet closest to the sun"),
+        ("jupiter", "the largest planet"),
+        ("earth", "the only planet known to have life"),
+        ("gravity", "the force that keeps planets in their orbits"),
+    ],
+    "human body": [
+        ("heart", "pumps blood around the body"),
+        ("lungs", "take in oxygen when we breathe"),
+        ("brain", "controls the whole body"),
+        ("skeleton", "the frame of bones that supports the body"),
+        ("stomach", "where food is broken down"),
+        ("muscle", "helps the body move"),
+        ("skin", "covers and protects the body"),
+        ("kidney", "cleans the blood and makes urine"),
+    ],
+    "food and nutrition": [
+        ("carbohydrates", "nutrients that give us energy"),
+        ("proteins", "nutrients that help the body grow and repair"),
+        ("fats", "nutrients that store energy"),
+        ("vitamins", "nutrients that keep us healthy, found in fruits"),
+        ("minerals", "nutrients such as calcium and iron"),
+        ("fibre", "roughage that helps digestion"),
+        ("balanced diet", "food with all nutrients in the right amounts"),
+        ("deficiency", "an illness caused by lack of a nutrient"),
+    ],
+    "weather": [
+        ("temperature", "how hot or cold it is"),
+        ("humidity", "the amount of water vapour in the air"),
+        ("rainfall", "the amount of rain that falls"),
+        ("wind", "moving air"),
+        ("monsoon", "the season of heavy rain in India"),
+        ("thermometer", "an instrument to measure temperature"),
+        ("forecast", "a prediction of the weather"),
+        ("climate", "the usual weather of a place over many years"),
+    ],
+    "magnets": [
+        ("magnet", "an object that attracts iron"),
+        ("pole", "the end of a magnet where its pull is strongest"),
+        ("attract", "to pull towards"),
+        ("repel", "to push away"),
+        ("compass", "a tool with a magnetic needle that shows direction"),
+        ("iron", "a metal that magnets attract"),
+        ("north pole", "the end of a magnet that points north"),
+        ("magnetic", "attracted by a magnet"),
+    ],
+    "states of matter": [
+        ("solid", "matter with a fixed shape"),
+        ("liquid", "matter that flows and takes the shape of its container"),
+        ("gas", "matter that spreads out to fill any space"),
+        ("melting", "a solid changing into a liquid"),
+        ("freezing", "a liquid changing into a solid"),
+        ("boiling", "a liquid changing into a gas at a high temperature"),
+        ("particles", "the tiny bits that all matter is made of"),
+        ("volume", "the space that matter takes up"),
+    ],
+    "shapes": [
+        ("triangle", "a shape with three sides"),
+        ("square", "a shape with four equal sides and four right angles"),
+        ("rectangle", "a shape with four right angles and opposite sides equal"),
+        ("circle", "a round shape with every point the same distance from the centre"),
+        ("pentagon", "a shape with five sides"),
+        ("hexagon", "a shape with six sides"),
+        ("vertex", "a corner where two sides meet"),
+        ("perimeter", "the distance all the way around a shape"),
+    ],
+    "fractions": [
+        ("fraction", "a part of a whole"),
+        ("numerator", "the number above the line in a fraction"),
+        ("denominator", "the number below the line in a fraction"),
+        ("half", "one of two equal parts"),
+        ("quarter", "one of four equal parts"),
+        ("equivalent", "fractions that show the same amount"),
+        ("proper fraction", "a fraction smaller than one whole"),
+        ("mixed number", "a whole number and a fraction together"),
+    ],
+    "multiplication": [
+        ("product", "the answer when numbers are multiplied"),
+        ("factor", "a number multiplied by another"),
+        ("multiple", "the product of a number and a whole number"),
+        ("times table", "a list of the multiples of a number"),
+        ("array", "objects arranged in equal rows and columns"),
+        ("double", "to multiply by two"),
+        ("square number", "a number multiplied by itself"),
+        ("repeated addition", "adding the same number again and again"),
+    ],
+}
+
+# Other names teachers use for the topics above.
+TOPIC_ALIASES = {
+    "rain": "water cycle",
+    "evaporation": "water cycle",
+    "how plants make food": "photosynthesis",
+    "parts of a plant": "plants",
+    "parts of plants": "plants",
+    "plant": "plants",
+    "animal": "animals",
+    "planets": "solar system",
+    "space": "solar system",
+    "body": "human body",
+    "organs": "human body",
+    "nutrition": "food and nutrition",
+    "food": "food and nutrition",
+    "seasons": "weather",
+    "magnetism": "magnets",
+    "solids liquids and gases": "states of matter",
+    "matter": "states of matter",
+    "geometry": "shapes",
+    "tables": "multiplication",
+    "times tables": "multiplication",
+}
+
+# Printed signs, not the ASCII look-alikes.
+MINUS = "\u2212"
+TIMES = "\u00d7"
+
+# Arithmetic topics, by a word that names them.
+ARITHMETIC = {
+    "addition": "addition",
+    "add": "addition",
+    "sum": "addition",
+    "subtraction": "subtraction",
+    "subtract": "subtraction",
+    "difference": "subtraction",
+    "multiplication": "multiplication",
+    "multiply": "multiplication",
+    "tables": "multiplication",
+    "division": "division",
+    "divide": "division",
+    "fractions": "fractions",
+    "fraction": "fractions",
+    "arithmetic": "mixed",
+    "numbers": "mixed",
+    "maths": "mixed",
+    "math": "mixed",
+    "mathematics": "mixed",
+}
+
+
+def _rng(topic: str, grade: str) -> random.Random:
+    digest = hashlib.sha256(f"{topic}\n{grade}".encode()).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def _grade_number(grade: str) -> int:
+    level = normalize_grade(grade)
+    return max(1, min(int(level), 12)) if level.isdigit() else 4
+
+
+def find_topic(topic: str) -> str | None:
+    """The bank topic a teacher's topic refers to, if there is one."""
+    name = normalize_topic(topic)
+    for candidate in (name, TOPIC_ALIASES.get(name)):
+        if candidate in VOCABULARY:
+            return candidate
+    for key in (*VOCABULARY, *TOPIC_ALIASES):
+        if re.search(rf"\b{re.escape(key)}\b", name):
+            return TOPIC_ALIASES.get(key, key)
+    return None
+
+
+def vocabulary(topic: str) -> list[tuple[str, str]] | None:
+    """(word, meaning) pairs for a topic in the bank, or None."""
+    key = find_topic(topic)
+    return list(VOCABULARY[key]) if key else None
+
+
+def arithmetic_kind(topic: str) -> str | None:
+    words = normalize_topic(topic).split()
+    return next((ARITHMETIC[word] for word in words if word in ARITHMETIC), None)
+
+
+def _fraction_text(value: Fraction) -> str:
+    return str(value.numerator) if value.denominator == 1 else str(value)
+
+
+def _arithmetic_question(kind: str, grade: int, rng: random.Random) -> tuple[str, str]:
+    if kind == "mixed":
+        kinds = ["addition", "subtraction"]
+        if grade >= 3:
+            kinds += ["multiplication", "division"]
+        if grade >= 4:
+            kinds.append("fractions")
+        kind = rng.choice(kinds)
+    # One more digit every two grades: 1-digit sums in grade 1, 5 by grade 8.
+    digits = min(1 + grade // 2, 5)
+    if kind == "addition":
+        a, b = rng.randint(1, 10**digits - 1), rng.randint(1, 10**digits - 1)
+        return f"{a} + {b} = ____", str(a + b)
+    if kind == "subtraction":
+        a, b = sorted((rng.randint(1, 10**digits - 1) for _ in range(2)), reverse=True)
+        return f"{a} {MINUS} {b} = ____", str(a - b)
+    if kind == "multiplication":
+        a = rng.randint(2, 10 if grade <= 3 else 10 * min(grade - 2, 9))
+        b = rng.randint(2, 10 if grade <= 4 else 20)
+        return f"{a} {TIMES} {b} = ____", str(a * b)
+    if kind == "division":
+        b = rng.randint(2, 10 if grade <= 4 else 25)
+        quotient = rng.randint(2, 10 if grade <= 3 else 12 * min(grade - 2, 8))
+        return f"{b * quotient} ÷ {b} = ____", str(quotient)
+    # Fractions: like denominators up to grade 4, unlike ones after.
+    d1 = rng.randint(2, 10)
+    d2 = d1 if grade <= 4 else rng.randint(2, 10)
+    n1, n2 = rng.randint(1, d1 - 1), rng.randint(1, d2 - 1)
+    first, second = Fraction(n1, d1), Fraction(n2, d2)
+    if rng.random() < 0.5 or first < second:
+        sign, answer = "+", first + second
+    else:
+        sign, answer = MINUS, first - second
+    return f"{n1}/{d1} {sign} {n2}/{d2} = ____ (simplest form)", _fraction_text(answer)
+
+
+def _vocabulary_questions(
+    entries: list[tuple[str, str]], rng: random.Random
+) -> tuple[list[str], list[tuple[str, str]]]:
+    """Word bank lines, and (question, answer) pairs, from topic vocabulary."""
+    entries = rng.sample(entries, len(entries))
+    words = sorted(word for word, _ in entries)
+    questions = [
+        (f"Which word from the word bank means: {meaning}?", word.capitalize())
+        for word, meaning in entries[:6]
+    ]
+    questions += [
+        (
+            f"Write one sentence using the word “{word}”.",
+            f"Any correct sentence showing that {word} means {meaning}.",
+        )
+        for word, meaning in entries[6:8]
+    ]
+    return [f"**Word bank:** {', '.join(words)}"], questions
+
+
+def build_worksheet(topic: str, grade: str, count: int = 10) -> tuple[str, str] | None:
+    """
+    A worksheet and its answer key, as markdown, or None for a topic the bank
+    has nothing for.
+    """
+    rng = _rng(normalize_topic(topic), normalize_grade(grade))
+    number = _grade_number(grade)
+    kind = arithmetic_kind(topic)
+    if kind is not None:
+        intro = ["Solve. Show your working in the space given."]
+        questions = [_arithmetic_question(kind, number, rng) for _ in range(count)]
+    else:
+        entries = vocabulary(topic)
+        if entries is None:
+            return None
+        intro, questions = _vocabulary_questions(entries, rng)
+    topic = topic[:1].upper() + topic[1:]
+    title = f"# Worksheet: {topic} (Grade {grade or number})"
+    worksheet = [title, "", *intro, ""]
+    worksheet += [f"{i}. {question}" for i, (question, _) in enumerate(questions, 1)]
+    answers = [f"# Answer Key: {topic} (Grade {grade or number})", ""]
+    answers += [f"{i}. {answer}" for i, (_, answer) in enumerate(questions, 1)]
+    return "\n".join(worksheet), "\n".join(answers)
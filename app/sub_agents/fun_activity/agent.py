@@ -1,4 +1,5 @@
 from google.adk.agents import LlmAgent
+from app.utils.hedging import hedged_model
 # from google.adk.tools.agent_tool import AgentTool
 
 from . import prompt
@@ -14,7 +15,7 @@ MODEL = "gemini-2.5-pro"
 
 fun_activity_agent = LlmAgent(
     name="fun_activity_agent",
-    model=MODEL,
+    model=hedged_model(MODEL),
     description=(
         dedent("""
         You are a manager agent that is responsible for overseeing the work of specialized fun activity generators.
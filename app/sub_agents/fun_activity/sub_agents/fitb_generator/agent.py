@@ -3,14 +3,24 @@
 from google.adk import Agent
 
 # from google.adk.tools import google_search
+from app.utils.coalescing import coalesced_model
+from app.utils.structured_output import StructuredOutput
+
 from . import prompt
+from .schema import FitbActivity, render_markdown
 
 MODEL = "gemini-2.5-flash"
 
 fitb_generator_agent = Agent(
-    model=MODEL,
+    model=coalesced_model(MODEL),
     name="fitb_generator_agent",
     instruction=prompt.FITB_GENERATION_PROMPT,
-    output_key="fitb_activities",
+    output_schema=FitbActivity,
+    after_model_callback=StructuredOutput(
+        FitbActivity, output_key="fitb_activities", render=render_markdown
+    ),
+    # Structured leaves reply once and hand control back to the root agent.
+    disallow_transfer_to_parent=True,
+    disallow_transfer_to_peers=True,
     # tools=[google_search],
 )
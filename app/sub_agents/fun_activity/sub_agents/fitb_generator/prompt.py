@@ -16,13 +16,10 @@ Instructions:
 
 Output Requirements:
 
-- Present the fill-in-the-blank activity in a clear, organized format.
-- Include the topic name and target grade level at the top.
-- Provide clear instructions for students on how to complete the activity.
+- Respond only with JSON matching the response schema; do not add markdown or formatting, it is rendered for the teacher automatically.
+- Mark each blank in a sentence as ____ and list its answers in order.
 - Include a word bank or hints if appropriate for the grade level.
-- Provide an answer key with explanations for learning reinforcement.
-- Suggest estimated completion time.
-- Make the activity engaging with interesting content and relevant context.
+- Provide explanations for learning reinforcement and an estimated completion time.
 - Ensure the difficulty level is appropriate for the target grade.
 - Include variations or extensions for different ability levels.
 """
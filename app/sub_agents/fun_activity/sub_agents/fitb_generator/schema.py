@@ -0,0 +1,68 @@
+"""Output schema and markdown renderer for the fitb_generator_agent."""
+
+from pydantic import BaseModel, Field
+
+from app.utils.item_bank import ItemFormat
+from app.utils.structured_output import render_list
+
+
+class BlankItem(BaseModel):
+    sentence: str = Field(description="Sentence with each blank written as ____.")
+    answers: list[str] = Field(description="Answers for the blanks, in order.")
+    hint: str | None = None
+    explanation: str | None = None
+
+
+class FitbActivity(BaseModel):
+    topic: str
+    grade: str
+    instructions: str
+    word_bank: list[str] | None = None
+    estimated_minutes: int | None = None
+    items: list[BlankItem]
+    extensions: list[str] | None = Field(
+        default=None, description="Variations for different ability levels."
+    )
+
+
+def render_markdown(activity: FitbActivity) -> str:
+    """Render a fill-in-the-blank activity and its answer key as markdown."""
+    lines = [
+        f"## Fill in the Blanks: {activity.topic}",
+        f"**Grade:** {activity.grade}",
+    ]
+    if activity.estimated_minutes:
+        lines.append(f"**Estimated time:** {activity.estimated_minutes} minutes")
+    lines += ["", f"**Instructions:** {activity.instructions}"]
+    if activity.word_bank:
+        lines += ["", f"**Word bank:** {' · '.join(activity.word_bank)}"]
+    lines.append("")
+
+    for number, item in enumerate(activity.items, start=1):
+        line = f"{number}. {item.sentence}"
+        if item.hint:
+            line += f" _(Hint: {item.hint})_"
+        lines.append(line)
+    lines += ["", "### Answer Key"]
+
+    for number, item in enumerate(activity.items, start=1):
+        answer = f"{number}. **{', '.join(item.answers)}**"
+        if item.explanation:
+            answer += f" — {item.explanation}"
+        lines.append(answer)
+
+    if activity.extensions:
+        lines += ["", "### Extensions", render_list(activity.extensions)]
+    return "\n".join(lines)
+
+
+# Where blank items are kept, for the item bank (see app.utils.item_bank).
+FITB_ITEMS = ItemFormat(
+    field="items",
+    kinds=("fill_in_blank",),
+    kind=lambda item: "fill_in_blank",
+    question=lambda item: item["sentence"],
+    answer=lambda item: ", ".join(item["answers"]),
+    word_bank=lambda item: item["answers"],
+    instructions="Fill in each blank with the correct word from the word bank.",
+)
@@ -3,14 +3,24 @@
 from google.adk import Agent
 
 # from google.adk.tools import google_search
+from app.utils.coalescing import coalesced_model
+from app.utils.structured_output import StructuredOutput
+
 from . import prompt
+from .schema import Quiz, render_markdown
 
 MODEL = "gemini-2.5-flash"
 
 quiz_generator_agent = Agent(
-    model=MODEL,
+    model=coalesced_model(MODEL),
     name="quiz_generator_agent",
     instruction=prompt.QUIZ_GENERATION_PROMPT,
-    output_key="quiz_activities",
+    output_schema=Quiz,
+    after_model_callback=StructuredOutput(
+        Quiz, output_key="quiz_activities", render=render_markdown
+    ),
+    # Structured leaves reply once and hand control back to the root agent.
+    disallow_transfer_to_parent=True,
+    disallow_transfer_to_peers=True,
     # tools=[google_search],
 )
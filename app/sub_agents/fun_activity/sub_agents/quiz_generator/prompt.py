@@ -15,11 +15,8 @@ Instructions:
 
 Output Requirements:
 
-- Present the quiz in a clear, organized format with numbered questions.
-- Include the topic name and target grade level at the top.
-- Provide clear instructions for students on how to complete the quiz.
-- Include an answer key with explanations for educational value.
-- Suggest estimated completion time.
-- Make the quiz engaging with interesting question formats and relevant content.
+- Respond only with JSON matching the response schema; do not add markdown or formatting, it is rendered for the teacher automatically.
+- Give every question its answer, and an explanation where it adds educational value.
+- Provide clear instructions for students and an estimated completion time.
 - Ensure questions are challenging but achievable for the target grade level.
 """
@@ -0,0 +1,63 @@
+"""Output schema and markdown renderer for the quiz_generator_agent."""
+
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+from app.utils.item_bank import ItemFormat
+
+
+class QuizQuestion(BaseModel):
+    question: str
+    type: Literal["multiple_choice", "true_false", "matching", "short_answer"]
+    options: list[str] | None = Field(
+        default=None, description="Choices for multiple choice or matching items."
+    )
+    answer: str
+    explanation: str | None = None
+    difficulty: Literal["easy", "medium", "hard"] | None = None
+
+
+class Quiz(BaseModel):
+    topic: str
+    grade: str
+    instructions: str = Field(description="How students should complete the quiz.")
+    estimated_minutes: int | None = None
+    questions: list[QuizQuestion]
+
+
+def render_markdown(quiz: Quiz) -> str:
+    """Render a quiz and its answer key as markdown."""
+    lines = [
+        f"## Quiz: {quiz.topic}",
+        f"**Grade:** {quiz.grade}",
+    ]
+    if quiz.estimated_minutes:
+        lines.append(f"**Estimated time:** {quiz.estimated_minutes} minutes")
+    lines += ["", f"**Instructions:** {quiz.instructions}", ""]
+
+    for number, question in enumerate(quiz.questions, start=1):
+        kind = question.type.replace("_", " ")
+        lines.append(f"{number}. {question.question} _({kind})_")
+        for letter, option in zip("abcdefghij", question.options or [], strict=False):
+            lines.append(f"    {letter}) {option}")
+    lines += ["", "### Answer Key"]
+
+    for number, question in enumerate(quiz.questions, start=1):
+        answer = f"{number}. **{question.answer}**"
+        if question.explanation:
+            answer += f" — {question.explanation}"
+        lines.append(answer)
+    return "\n".join(lines)
+
+
+# Where quiz questions are kept, for the item bank (see app.utils.item_bank).
+QUIZ_ITEMS = ItemFormat(
+    field="questions",
+    kinds=("multiple_choice", "true_false", "matching", "short_answer"),
+    kind=lambda item: item["type"],
+    question=lambda item: item["question"],
+    answer=lambda item: item["answer"],
+    label=lambda item: item.get("difficulty"),
+    instructions="Answer every question. Choose the best option where options are given.",
+)
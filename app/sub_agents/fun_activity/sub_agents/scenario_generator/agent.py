@@ -3,12 +3,14 @@
 from google.adk import Agent
 
 # from google.adk.tools import google_search
+from app.utils.coalescing import coalesced_model
+
 from . import prompt
 
 MODEL = "gemini-2.5-flash"
 
 scenario_generator_agent = Agent(
-    model=MODEL,
+    model=coalesced_model(MODEL),
     name="scenario_generator_agent",
     instruction=prompt.SCENARIO_GENERATION_PROMPT,
     output_key="scenario_activities",
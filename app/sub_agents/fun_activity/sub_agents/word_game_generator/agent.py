@@ -3,14 +3,19 @@
 from google.adk import Agent
 
 # from google.adk.tools import google_search
+from app.utils.coalescing import coalesced_model
+
 from . import prompt
+from .tools import attach_puzzles, build_word_games
 
 MODEL = "gemini-2.5-flash"
 
 word_game_generator_agent = Agent(
-    model=MODEL,
+    model=coalesced_model(MODEL),
     name="word_game_generator_agent",
     instruction=prompt.WORD_GAME_GENERATION_PROMPT,
     output_key="word_game_activities",
     # tools=[google_search],
+    tools=[build_word_games],
+    after_model_callback=attach_puzzles,
 )
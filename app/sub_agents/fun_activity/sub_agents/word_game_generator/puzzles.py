@@ -0,0 +1,467 @@
+"""
+Deterministic word-game engine: crosswords, word searches and scrambles.
+
+The model only chooses the vocabulary and writes the clues; grids and answer
+keys are built here, so they are always valid and cost no output tokens.
+Puzzles are seeded from their words, so the same request yields the same
+puzzle (which keeps coalescing and caching effective).
+
+Words in any script are supported. A grid cell holds one grapheme, a letter
+with its vowel signs and other marks, and an Indic conjunct (consonants
+joined by a virama) stays in one cell, as in printed Hindi or Marathi
+crosswords: "किताब" fills three cells, कि, ता and ब.
+"""
+
+import functools
+import hashlib
+import random
+import string
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+ACROSS = (0, 1)
+DOWN = (1, 0)
+
+# Word search directions, easiest first.
+DIRECTIONS = {
+    "right": (0, 1),
+    "down": (1, 0),
+    "down-right": (1, 1),
+    "up-right": (-1, 1),
+    "left": (0, -1),
+    "up": (-1, 0),
+    "up-left": (-1, -1),
+    "down-left": (1, -1),
+}
+
+
+# Zero-width (non-)joiners, which shape Indic conjuncts inside a word.
+_JOINERS = "\u200c\u200d"
+# Viramas that join the next consonant into a conjunct (Devanagari, Bengali,
+# Gujarati, Odia, Telugu, Malayalam); a Tamil pulli ends its own cell.
+_LINKERS = "\u094d\u09cd\u0acd\u0b4d\u0c4d\u0d4d"
+
+
+def normalize_word(word: str) -> str:
+    """Uppercase a word and drop spaces, hyphens, digits and other non-letters."""
+    return "".join(
+        char
+        for char in unicodedata.normalize("NFC", word.upper())
+        if unicodedata.category(char)[0] in "LM" or char in _JOINERS
+    )
+
+
+@functools.lru_cache(maxsize=4096)
+def graphemes(word: str) -> tuple[str, ...]:
+    """
+    The grid cells a word fills: each letter with the marks that follow it,
+    and consonants joined into a conjunct kept together.
+    """
+    cells: list[str] = []
+    for char in word:
+        if cells and (
+            unicodedata.category(char) in ("Mn", "Mc", "Me")
+            or char in _JOINERS
+            or cells[-1][-1] in _LINKERS + _JOINERS
+        ):
+            cells[-1] += char
+        else:
+            cells.append(char)
+    return tuple(cells)
+
+
+def word_length(word: str) -> int:
+    """Cells a (normalised) word fills."""
+    return len(graphemes(word))
+
+
+def seed_for(words: list[str]) -> int:
+    """Stable seed derived from the word list."""
+    digest = hashlib.sha256("\n".join(words).encode()).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+@dataclass
+class Placement:
+    word: str
+    clue: str
+    row: int
+    col: int
+    direction: tuple[int, int]
+    number: int = 0
+
+    def cells(self) -> list[tuple[int, int]]:
+        dr, dc = self.direction
+        return [
+            (self.row + dr * i, self.col + dc * i)
+            for i in range(word_length(self.word))
+        ]
+
+
+@dataclass
+class Crossword:
+    rows: int
+    cols: int
+    placements: list[Placement]
+    unplaced: list[str] = field(default_factory=list)
+
+    def grid(self) -> list[list[str]]:
+        grid = [[""] * self.cols for _ in range(self.rows)]
+        for placement in self.placements:
+            for (r, c), letter in zip(
+                placement.cells(), graphemes(placement.word), strict=True
+            ):
+                grid[r][c] = letter
+        return grid
+
+
+class _CrosswordBuilder:
+    """
+    Backtracking crossword layout.
+
+    Filled cells are indexed by letter, so candidate placements for a word are
+    found by looking up the cells holding each of its letters instead of
+    scanning the grid.
+    """
+
+    def __init__(self, size: int, max_nodes: int) -> None:
+        self.size = size
+        self.max_nodes = max_nodes
+        self.grid: list[list[str]] = [[""] * size for _ in range(size)]
+        self.by_letter: dict[str, set[tuple[int, int]]] = defaultdict(set)
+        self.nodes = 0
+
+    def _fits(self, word: str, row: int, col: int, direction: tuple[int, int]) -> int:
+        """Number of crossings if `word` fits at (row, col), else -1."""
+        dr, dc = direction
+        letters = graphemes(word)
+        end_r, end_c = row + dr * (len(letters) - 1), col + dc * (len(letters) - 1)
+        if not (0 <= row and 0 <= col and end_r < self.size and end_c < self.size):
+            return -1
+        # The cells just before and after the word must be empty.
+        for r, c in ((row - dr, col - dc), (end_r + dr, end_c + dc)):
+            if 0 <= r < self.size and 0 <= c < self.size and self.grid[r][c]:
+                return -1
+        crossings = 0
+        for i, letter in enumerate(letters):
+            r, c = row + dr * i, col + dc * i
+            cell = self.grid[r][c]
+            if cell:
+                if cell != letter:
+                    return -1
+                crossings += 1
+                continue
+            # New letters may not touch a parallel word side-on.
+            for sr, sc in ((r + dc, c + dr), (r - dc, c - dr)):
+                if 0 <= sr < self.size and 0 <= sc < self.size and self.grid[sr][sc]:
+                    return -1
+        if crossings == len(letters):
+            return -1
+        return crossings
+
+    def candidates(self, word: str) -> list[tuple[int, int, tuple[int, int]]]:
+        """Placements crossing the grid, best (most crossings, central) first."""
+        found: dict[tuple[int, int, tuple[int, int]], int] = {}
+        for i, letter in enumerate(graphemes(word)):
+            for r, c in self.by_letter.get(letter, ()):
+                for direction in (ACROSS, DOWN):
+                    dr, dc = direction
+                    start = (r - dr * i, c - dc * i, direction)
+                    if start not in found:
+                        found[start] = self._fits(word, *start)
+        centre = self.size / 2
+        return sorted(
+            (start for start, crossings in found.items() if crossings > 0),
+            key=lambda start: (
+                -found[start],
+                abs(start[0] - centre) + abs(start[1] - centre),
+                start[0],
+                start[1],
+            ),
+        )
+
+    def place(
+        self, word: str, row: int, col: int, direction: tuple[int, int]
+    ) -> list[tuple[int, int]]:
+        dr, dc = direction
+        added = []
+        for i, letter in enumerate(graphemes(word)):
+            r, c = row + dr * i, col + dc * i
+            if not self.grid[r][c]:
+                self.grid[r][c] = letter
+                self.by_letter[letter].add((r, c))
+                added.append((r, c))
+        return added
+
+    def remove(self, added: list[tuple[int, int]]) -> None:
+        for r, c in added:
+            self.by_letter[self.grid[r][c]].discard((r, c))
+            self.grid[r][c] = ""
+
+    def build(
+        self, words: list[str], branching: int = 3
+    ) -> tuple[list[tuple[str, int, int, tuple[int, int]]], list[str]]:
+        """Place as many words as possible; returns (placements, unplaced)."""
+        first = words[0]
+        start_col = (self.size - word_length(first)) // 2
+        self.place(first, self.size // 2, start_col, ACROSS)
+        placed = [(first, self.size // 2, start_col, ACROSS)]
+        best: list[tuple[str, int, int, tuple[int, int]]] = list(placed)
+
+        def search(index: int) -> bool:
+            """True once every word is placed; otherwise keeps the best layout."""
+            nonlocal best
+            if len(placed) > len(best):
+                best = list(placed)
+            if len(best) == len(words):
+                return True
+            # Stop when out of budget or when this branch can't beat the best.
+            remaining = len(words) - index
+            if index == len(words) or len(placed) + remaining <= len(best):
+                return False
+            self.nodes += 1
+            if self.nodes > self.max_nodes:
+                return False
+            for row, col, direction in self.candidates(words[index])[:branching]:
+                added = self.place(words[index], row, col, direction)
+                placed.append((words[index], row, col, direction))
+                if search(index + 1):
+                    return True
+                placed.pop()
+                self.remove(added)
+            # Leave out a word that doesn't fit rather than failing the puzzle.
+            return search(index + 1)
+
+        search(1)
+
+        # Words skipped early may cross words placed after them: retry them on
+        # the best layout until no more fit.
+        self.grid = [[""] * self.size for _ in range(self.size)]
+        self.by_letter.clear()
+        for word, row, col, direction in best:
+            self.place(word, row, col, direction)
+        placed_words = {word for word, *_ in best}
+        progress = True
+        while progress:
+            progress = False
+            for word in words:
+                if word in placed_words:
+                    continue
+                options = self.candidates(word)
+                if options:
+                    row, col, direction = options[0]
+                    self.place(word, row, col, direction)
+                    best.append((word, row, col, direction))
+                    placed_words.add(word)
+                    progress = True
+        return best, [word for word in words if word not in placed_words]
+
+
+def build_crossword(
+    entries: list[tuple[str, str]],
+    size: int = 15,
+    max_nodes: int = 1000,
+) -> Crossword:
+    """
+    Lay out a crossword from (word, clue) pairs on a grid of at most size x size.
+
+    Longer words are placed first, each trying its best few crossings before
+    backtracking; `max_nodes` bounds the search. Words that cannot be crossed
+    into the grid, are too long for it or are shorter than two letters are
+    reported in `unplaced`, and the grid is cropped to the placed words.
+    """
+    clues: dict[str, str] = {}
+    left_out: list[str] = []
+    for entry, clue in entries:
+        word = normalize_word(entry)
+        if not 2 <= word_length(word) <= size:
+            left_out.append(word or entry)
+        else:
+            clues.setdefault(word, clue)
+    if not clues:
+        return Crossword(0, 0, [], left_out)
+
+    words = sorted(clues, key=lambda w: (-word_length(w), w))
+    builder = _CrosswordBuilder(size, max_nodes)
+    placed, unplaced = builder.build(words)
+
+    top = min(row for _, row, _, _ in placed)
+    left = min(col for _, _, col, _ in placed)
+    placements = [
+        Placement(word, clues[word], row - top, col - left, direction)
+        for word, row, col, direction in placed
+    ]
+    rows = max(p.cells()[-1][0] for p in placements) + 1
+    cols = max(p.cells()[-1][1] for p in placements) + 1
+
+    # Number the starting cells in reading order, as printed crosswords do.
+    numbers: dict[tuple[int, int], int] = {}
+    for placement in sorted(placements, key=lambda p: (p.row, p.col)):
+        start = (placement.row, placement.col)
+        numbers.setdefault(start, len(numbers) + 1)
+        placement.number = numbers[start]
+    return Crossword(rows, cols, placements, unplaced + left_out)
+
+
+@dataclass
+class WordSearch:
+    grid: list[list[str]]
+    placements: list[Placement]
+    unplaced: list[str] = field(default_factory=list)
+
+
+def build_word_search(
+    words: list[str],
+    size: int = 12,
+    directions: tuple[str, ...] = ("right", "down", "down-right", "up-right"),
+    seed: int | None = None,
+    attempts: int = 200,
+) -> WordSearch:
+    """
+    Hide words in a size x size letter grid; words may share letters. Words
+    that do not fit, or are shorter than two letters, are reported in
+    `unplaced`. The other cells are filled with random Latin capitals, or with
+    the words' own letters when any word is in another script.
+    """
+    normalized = {normalize_word(word): word for word in words}
+    unique = sorted(
+        (word for word in normalized if 2 <= word_length(word) <= size),
+        key=lambda w: (-word_length(w), w),
+    )
+    rng = random.Random(seed if seed is not None else seed_for(unique))
+    grid = [[""] * size for _ in range(size)]
+    vectors = [DIRECTIONS[name] for name in directions]
+    placements: list[Placement] = []
+    unplaced = sorted(
+        word or entry for word, entry in normalized.items() if word not in unique
+    )
+
+    for word in unique:
+        letters = graphemes(word)
+        length = len(letters)
+        for _ in range(attempts):
+            dr, dc = rng.choice(vectors)
+            rows = range(max(0, -dr * (length - 1)), size - max(0, dr * (length - 1)))
+            cols = range(max(0, -dc * (length - 1)), size - max(0, dc * (length - 1)))
+            row, col = rng.choice(rows), rng.choice(cols)
+            cells = [(row + dr * i, col + dc * i) for i in range(length)]
+            if all(grid[r][c] in ("", letters[i]) for i, (r, c) in enumerate(cells)):
+                for (r, c), letter in zip(cells, letters, strict=True):
+                    grid[r][c] = letter
+                placements.append(Placement(word, "", row, col, (dr, dc)))
+                break
+        else:
+            unplaced.append(word)
+
+    if all(word.isascii() for word in unique):
+        filler: list[str] = list(string.ascii_uppercase)
+    else:
+        filler = sorted({letter for word in unique for letter in graphemes(word)})
+    for row_cells in grid:
+        for c, cell in enumerate(row_cells):
+            if not cell:
+                row_cells[c] = rng.choice(filler)
+    return WordSearch(grid, placements, unplaced)
+
+
+def scramble(word: str, rng: random.Random) -> str:
+    """Shuffle a word's letters so that it reads differently, when possible."""
+    letters = list(graphemes(normalize_word(word)))
+    if len(set(letters)) < 2:
+        return "".join(letters)
+    original = letters[:]
+    while letters == original:
+        rng.shuffle(letters)
+    return "".join(letters)
+
+
+def build_scrambles(
+    entries: list[tuple[str, str]], seed: int | None = None
+) -> list[tuple[str, str, str]]:
+    """(scrambled, word, clue) for each entry."""
+    words = [normalize_word(word) for word, _ in entries]
+    rng = random.Random(seed if seed is not None else seed_for(words))
+    return [
+        (scramble(word, rng), word, clue)
+        for word, (_, clue) in zip(words, entries, strict=True)
+        if word
+    ]
+
+
+def _direction_name(direction: tuple[int, int]) -> str:
+    return next(name for name, vector in DIRECTIONS.items() if vector == direction)
+
+
+def _code_block(rows: list[str]) -> list[str]:
+    return ["```", *rows, "```"]
+
+
+def render_crossword(crossword: Crossword) -> tuple[str, str]:
+    """Markdown for the puzzle (numbered grid and clues) and its answer key."""
+    grid = crossword.grid()
+    numbers = {(p.row, p.col): p.number for p in crossword.placements}
+    puzzle_rows = []
+    answer_rows = []
+    for r, row in enumerate(grid):
+        # Open cells are boxes, numbered where a word starts; blocked cells are blank.
+        puzzle_rows.append(
+            "".join(
+                f"[{numbers.get((r, c), ''):<2}]" if cell else "    "
+                for c, cell in enumerate(row)
+            ).rstrip()
+        )
+        answer_rows.append(" ".join(cell or "." for cell in row))
+
+    clue_lines = []
+    for title, direction in (("Across", ACROSS), ("Down", DOWN)):
+        clue_lines += ["", f"**{title}**"]
+        clue_lines += [
+            f"{p.number}. {p.clue} ({word_length(p.word)})"
+            for p in sorted(crossword.placements, key=lambda p: p.number)
+            if p.direction == direction
+        ]
+    puzzle = "\n".join(_code_block(puzzle_rows) + clue_lines)
+
+    answers = [
+        f"{p.number} {'Across' if p.direction == ACROSS else 'Down'}: {p.word}"
+        for p in sorted(crossword.placements, key=lambda p: (p.number, p.direction))
+    ]
+    answer_key = "\n".join([*_code_block(answer_rows), "", *answers])
+    return puzzle, answer_key
+
+
+def render_word_search(search: WordSearch) -> tuple[str, str]:
+    """Markdown for the word search grid and word list, and its answer key."""
+    puzzle_rows = [" ".join(row) for row in search.grid]
+    words = sorted(p.word for p in search.placements)
+    puzzle = "\n".join(
+        [*_code_block(puzzle_rows), "", "**Find these words:** " + ", ".join(words)]
+    )
+
+    solution = [["."] * len(row) for row in search.grid]
+    for placement in search.placements:
+        for (r, c), letter in zip(
+            placement.cells(), graphemes(placement.word), strict=True
+        ):
+            solution[r][c] = letter
+    locations = [
+        f"{p.word}: row {p.row + 1}, column {p.col + 1}, {_direction_name(p.direction)}"
+        for p in sorted(search.placements, key=lambda p: p.word)
+    ]
+    answer_key = "\n".join(
+        [*_code_block([" ".join(row) for row in solution]), "", *locations]
+    )
+    return puzzle, answer_key
+
+
+def render_scrambles(scrambles: list[tuple[str, str, str]]) -> tuple[str, str]:
+    """Markdown for the scrambled words with clues, and the answer key."""
+    puzzle = "\n".join(
+        f"{n}. **{scrambled}**: {clue}"
+        for n, (scrambled, _, clue) in enumerate(scrambles, start=1)
+    )
+    answer_key = "\n".join(
+        f"{n}. {word}" for n, (_, word, _) in enumerate(scrambles, start=1)
+    )
+    return puzzle, answer_key
@@ -0,0 +1,167 @@
+"""Tools for the word_game_generator_agent."""
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmResponse
+from google.adk.tools import ToolContext
+from google.genai import types
+
+from app.utils.material_cache import normalize_grade
+from app.utils.metrics import counters
+from app.utils.tokens import estimate_tokens
+
+from .puzzles import (
+    build_crossword,
+    build_scrambles,
+    build_word_search,
+    normalize_word,
+    render_crossword,
+    render_scrambles,
+    render_word_search,
+)
+
+GAMES = ("crossword", "word_search", "scramble")
+
+# Puzzles built during this invocation, shown after the agent's reply.
+PUZZLES_KEY = "temp:word_game_puzzles"
+
+_counters = counters("word_games")
+
+
+def _word_search_directions(grade: str) -> tuple[str, ...]:
+    """Younger students only read forwards; older ones also get diagonals and reversals."""
+    level = normalize_grade(grade)
+    number = int(level) if level.isdigit() else 6
+    if number <= 3:
+        return ("right", "down")
+    if number <= 6:
+        return ("right", "down", "down-right", "up-right")
+    return (
+        "right",
+        "down",
+        "down-right",
+        "up-right",
+        "left",
+        "up",
+        "up-left",
+        "down-left",
+    )
+
+
+def render_word_games(
+    topic: str,
+    grade: str,
+    entries: list[tuple[str, str]],
+    games: list[str],
+    grid_size: int = 15,
+) -> tuple[str, dict[str, dict]]:
+    """
+    Build the puzzles for (word, clue) `entries` and render them, answer keys
+    last. Returns the markdown and, per game, the words placed and left out.
+    """
+    words = [word for word, _ in entries]
+    sections = [f"# Word Games: {topic} (Grade {grade})"]
+    answer_keys = []
+    summary: dict[str, dict] = {}
+
+    if "crossword" in games:
+        crossword = build_crossword(entries, size=grid_size)
+        puzzle, answers = render_crossword(crossword)
+        sections += ["", "## Crossword", "", puzzle]
+        answer_keys += ["", "### Crossword", "", answers]
+        summary["crossword"] = {
+            "placed": len(crossword.placements),
+            "unplaced": crossword.unplaced,
+        }
+    if "word_search" in games:
+        search = build_word_search(
+            words, size=grid_size, directions=_word_search_directions(grade)
+        )
+        puzzle, answers = render_word_search(search)
+        sections += ["", "## Word Search", "", puzzle]
+        answer_keys += ["", "### Word Search", "", answers]
+        summary["word_search"] = {
+            "placed": len(search.placements),
+            "unplaced": search.unplaced,
+        }
+    if "scramble" in games:
+        scrambles = build_scrambles(entries)
+        puzzle, answers = render_scrambles(scrambles)
+        sections += ["", "## Word Scramble", "", puzzle]
+        answer_keys += ["", "### Word Scramble", "", answers]
+        summary["scramble"] = {
+            "placed": len(scrambles),
+            "unplaced": [word for word in words if not normalize_word(word)],
+        }
+
+    markdown = "\n".join([*sections, "", "## Answer Keys", *answer_keys])
+    _counters.inc("puzzles_built", len(summary))
+    _counters.inc("words_unplaced", sum(len(s["unplaced"]) for s in summary.values()))
+    return markdown, summary
+
+
+def build_word_games(
+    topic: str,
+    grade: str,
+    words: list[str],
+    clues: list[str],
+    games: list[str],
+    tool_context: ToolContext,
+    grid_size: int = 15,
+) -> dict:
+    """
+    Build crosswords, word searches and word scrambles with answer keys.
+
+    The puzzles are shown to the teacher below your reply, so do not repeat
+    any grid, word list or answer in your reply.
+
+    Args:
+        topic: The topic of the word games, e.g. "Photosynthesis".
+        grade: The grade level, e.g. "5".
+        words: Topic vocabulary, one word or short phrase per entry.
+        clues: One grade-appropriate clue per word, in the same order.
+        games: Any of "crossword", "word_search" and "scramble".
+        grid_size: Largest grid side length, from 8 to 25.
+
+    Returns:
+        Which puzzles were built and any words that did not fit.
+    """
+    if len(clues) != len(words):
+        return {"error": "Provide exactly one clue per word."}
+    unknown = [game for game in games if game not in GAMES]
+    if unknown:
+        return {"error": f"Unknown games {unknown}; choose from {list(GAMES)}."}
+
+    markdown, summary = render_word_games(
+        topic,
+        grade,
+        list(zip(words, clues, strict=True)),
+        games,
+        grid_size=max(8, min(grid_size, 25)),
+    )
+    tool_context.state[PUZZLES_KEY] = markdown
+    _counters.inc("output_tokens_saved", estimate_tokens(markdown))
+    return {"status": "built", "games": summary}
+
+
+def attach_puzzles(
+    callback_context: CallbackContext, llm_response: LlmResponse
+) -> LlmResponse | None:
+    """`after_model_callback` appending the built puzzles to the agent's final reply."""
+    puzzles = callback_context.state.get(PUZZLES_KEY)
+    content = llm_response.content
+    if (
+        not puzzles
+        or llm_response.partial
+        or not content
+        or not content.parts
+        or any(part.function_call for part in content.parts)
+    ):
+        return None
+    callback_context.state[PUZZLES_KEY] = None
+    return LlmResponse(
+        content=types.Content(
+            role="model", parts=[*content.parts, types.Part(text="\n\n" + puzzles)]
+        ),
+        usage_metadata=llm_response.usage_metadata,
+        turn_complete=llm_response.turn_complete,
+    )
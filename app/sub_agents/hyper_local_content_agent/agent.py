@@ -1,12 +1,48 @@
 from google.adk.agents import LlmAgent
-from .prompt import HYPER_LOCAL_CONTENT_PROMPT
+from app.utils.chunked_generation import chunk_instruction
+from app.utils.coalescing import coalesced_model
+
+from .multilingual import MultilingualContentAgent
+from .prompt import (
+    HYPER_LOCAL_CONTENT_PROMPT,
+    TEACHER_PROFILE_PROMPT,
+    TRANSLATION_PROMPT,
+)
 import os
 
 model = os.getenv("MODEL")
+# Adapting finished content needs far less reasoning than writing it.
+translation_model = os.getenv("TRANSLATION_MODEL", "gemini-2.5-flash-lite")
 
-hyper_local_content_agent = LlmAgent(
-    name="hyper_local_content_agent",
-    model=model,
+hyper_local_writer_agent = LlmAgent(
+    name="hyper_local_writer_agent",
+    model=coalesced_model(model),
     description="Creates culturally relevant, grade-appropriate educational content in local languages based on the teacher’s request.",
-    instruction=HYPER_LOCAL_CONTENT_PROMPT,
+    instruction=HYPER_LOCAL_CONTENT_PROMPT + TEACHER_PROFILE_PROMPT,
+)
+
+hyper_local_canonical_agent = LlmAgent(
+    name="hyper_local_canonical_agent",
+    model=coalesced_model(model),
+    instruction=chunk_instruction(HYPER_LOCAL_CONTENT_PROMPT),
+    include_contents="none",
+    disallow_transfer_to_parent=True,
+    disallow_transfer_to_peers=True,
+)
+
+hyper_local_translator_agent = LlmAgent(
+    name="hyper_local_translator_agent",
+    model=coalesced_model(translation_model),
+    instruction=chunk_instruction(TRANSLATION_PROMPT),
+    include_contents="none",
+    disallow_transfer_to_parent=True,
+    disallow_transfer_to_peers=True,
+)
+
+hyper_local_content_agent = MultilingualContentAgent(
+    name="hyper_local_content_agent",
+    description="Creates culturally relevant, grade-appropriate educational content in local languages based on the teacher's request, including the same content in several languages at once.",
+    writer=hyper_local_writer_agent,
+    canonical_writer=hyper_local_canonical_agent,
+    translator=hyper_local_translator_agent,
 )
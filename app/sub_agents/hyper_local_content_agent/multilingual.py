@@ -0,0 +1,236 @@
+"""
+Multilingual batch generation.
+
+When a teacher asks for the same content in several languages, the content is
+written once in English (the canonical version) and then adapted into every
+other language concurrently by a cheaper translation model. Translations are
+cached by (source hash, target language, grade).
+"""
+
+import logging
+import re
+import time
+from collections.abc import AsyncGenerator
+from typing import Any
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from app.utils.chunked_generation import merge_final_events, run_with_brief
+from app.utils.metrics import counters
+from app.utils.teacher_profiles import LANGUAGES
+from app.utils.translation_cache import get_translation_cache
+
+logger = logging.getLogger(__name__)
+
+CANONICAL_LANGUAGE = "English"
+NO_DRAFT = (
+    "I couldn't write this content, so there is nothing to translate yet. "
+    "Please ask again."
+)
+
+_LANGUAGE = r"(?:" + "|".join(LANGUAGES) + r")(?![-\w])"
+_LANGUAGE_LIST = rf"{_LANGUAGE}(?:\s*(?:,|&|/|\band\b|\bor\b)\s*{_LANGUAGE})*"
+# Only target-language phrasing counts: "in Hindi and Marathi", "translate it
+# to Tamil", "English and Odia versions". "Teach English grammar to
+# Hindi-speaking students" or "Hindi medium schools" name languages without
+# asking for content in them.
+_TARGET_PATTERN = re.compile(
+    r"(?:\b(?:in|into)\s+(?:both\s+)?"
+    r"|\b(?:translat|adapt)\w*\s+(?:\w+\s+){0,3}?to\s+)"
+    rf"({_LANGUAGE_LIST})(?!\s+(?:medium|speakers?|students?|grammar|literature)\b)"
+    rf"|\b({_LANGUAGE_LIST})\s+(?:versions?|translations?|copies)\b",
+    re.IGNORECASE,
+)
+_LANGUAGE_PATTERN = re.compile(_LANGUAGE, re.IGNORECASE)
+_GRADE_PATTERN = re.compile(r"\b(?:grade|class|std\.?|standard)\s*(\d{1,2})\b", re.I)
+
+_counters = counters("multilingual")
+
+
+def requested_languages(request: str) -> list[str]:
+    """Languages the request asks for content in, in order of first mention."""
+    found = (
+        language.group(0).capitalize()
+        for target in _TARGET_PATTERN.finditer(request)
+        for language in _LANGUAGE_PATTERN.finditer(target.group(1) or target.group(2))
+    )
+    return list(dict.fromkeys(found))
+
+
+def requested_grade(request: str) -> str | None:
+    match = _GRADE_PATTERN.search(request)
+    return match.group(1) if match else None
+
+
+def _final_text(event: Event) -> str | None:
+    if event.partial or not event.content or not event.content.parts:
+        return None
+    text = "".join(
+        part.text for part in event.content.parts if part.text and not part.thought
+    )
+    return text or None
+
+
+class MultilingualContentAgent(BaseAgent):
+    """
+    Runs `writer` for single-language requests; batches multi-language ones.
+
+    In batch mode `canonical_writer` writes the English version once and
+    `translator` adapts it into the other requested languages, at most
+    `max_concurrency` at a time; each translation is shown whole, in the
+    order the languages were asked for. The canonical draft is not shown to
+    the teacher unless English was one of the languages asked for.
+    """
+
+    writer: LlmAgent
+    canonical_writer: LlmAgent
+    translator: LlmAgent
+    max_concurrency: int = 4
+
+    def __init__(
+        self,
+        *,
+        writer: LlmAgent,
+        canonical_writer: LlmAgent,
+        translator: LlmAgent,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(  # type: ignore[call-arg]
+            writer=writer,
+            canonical_writer=canonical_writer,
+            translator=translator,
+            sub_agents=[writer, canonical_writer, translator],
+            **kwargs,
+        )
+
+    async def _translate(
+        self,
+        ctx: InvocationContext,
+        index: int,
+        language: str,
+        grade: str,
+        canonical: str,
+        results: dict[str, str],
+        latency_ms: dict[str, float],
+    ) -> AsyncGenerator[Event, None]:
+        start = time.perf_counter()
+        branch = f"{ctx.branch or self.name}.{index:02d}_{language.lower()}"
+        cache = get_translation_cache()
+        cached = cache.get(canonical, language, grade)
+        if cached is not None:
+            _counters.inc(f"cache_hits.{language}")
+            results[language] = cached
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=branch,
+                content=types.Content(role="model", parts=[types.Part(text=cached)]),
+            )
+        else:
+            brief = (
+                f"Target language: {language}\nGrade: {grade}\n\nContent:\n{canonical}"
+            )
+            async for event in run_with_brief(self.translator, ctx, branch, brief):
+                text = _final_text(event)
+                if text and event.author == self.translator.name:
+                    results[language] = text
+                yield event
+            if language in results:
+                model = getattr(self.translator.model, "model", self.translator.model)
+                cache.put(canonical, language, grade, results[language], str(model))
+
+        latency_ms[language] = (time.perf_counter() - start) * 1000
+        _counters.inc(f"requests.{language}")
+        _counters.inc(f"latency_ms.{language}", latency_ms[language])
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        request = (
+            "".join(part.text or "" for part in (ctx.user_content.parts or []))
+            if ctx.user_content
+            else ""
+        )
+        languages = requested_languages(request)
+        if len(languages) < 2:
+            async for event in self.writer.run_async(ctx):
+                yield event
+            return
+
+        _counters.inc("batches")
+        grade = requested_grade(request) or str(
+            ctx.session.state.get("teacher_grade") or "unspecified"
+        )
+        targets = [language for language in languages if language != CANONICAL_LANGUAGE]
+        latency_ms: dict[str, float] = {}
+        results: dict[str, str] = {}
+
+        start = time.perf_counter()
+        brief = (
+            f"Teacher's request: {request}\n\n"
+            f"Write this content in {CANONICAL_LANGUAGE} only. It will be adapted "
+            f"into {', '.join(targets)} separately, so do not translate it yourself."
+        )
+        branch = f"{ctx.branch or self.name}.00_canonical"
+        async for event in run_with_brief(self.canonical_writer, ctx, branch, brief):
+            text = _final_text(event)
+            if text and event.author == self.canonical_writer.name:
+                results[CANONICAL_LANGUAGE] = text
+        latency_ms[CANONICAL_LANGUAGE] = (time.perf_counter() - start) * 1000
+        _counters.inc(f"requests.{CANONICAL_LANGUAGE}")
+        _counters.inc(
+            f"latency_ms.{CANONICAL_LANGUAGE}", latency_ms[CANONICAL_LANGUAGE]
+        )
+        canonical = results.get(CANONICAL_LANGUAGE)
+        if not canonical:
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=ctx.branch,
+                error_code="NO_CANONICAL_DRAFT",
+                error_message=f"The {CANONICAL_LANGUAGE} draft was not written.",
+                content=types.Content(role="model", parts=[types.Part(text=NO_DRAFT)]),
+            )
+            return
+        if CANONICAL_LANGUAGE in languages:
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=branch,
+                content=types.Content(role="model", parts=[types.Part(text=canonical)]),
+            )
+
+        # One message per language, in the order they were asked for.
+        runs = {
+            language: self._translate(
+                ctx, index, language, grade, canonical, results, latency_ms
+            )
+            for index, language in enumerate(targets, start=1)
+        }
+        async for event in merge_final_events(runs, self.max_concurrency):
+            yield event
+
+        logger.info(
+            "Multilingual batch latency: %s",
+            ", ".join(f"{lang} {ms:.0f}ms" for lang, ms in latency_ms.items()),
+        )
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(
+                state_delta={
+                    "hyper_local_content": {
+                        language: results[language]
+                        for language in languages
+                        if language in results
+                    },
+                    "hyper_local_latency_ms": {
+                        language: round(ms) for language, ms in latency_ms.items()
+                    },
+                }
+            ),
+        )
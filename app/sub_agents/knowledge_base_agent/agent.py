@@ -1,4 +1,6 @@
 from google.adk.agents import Agent
+from app.utils.coalescing import coalesced_model
+
 from .prompt import KNOWLEDGE_BASE_PROMPT
 import os
 
@@ -6,7 +8,7 @@ model = os.getenv("MODEL")
 
 knowledge_base_agent = Agent(
     name="knowledge_base_agent",
-    model=model,
+    model=coalesced_model(model),
     description="Provides simple, analogy-rich explanations for complex student questions in the teacher’s preferred language.",
     instruction=KNOWLEDGE_BASE_PROMPT,
 )
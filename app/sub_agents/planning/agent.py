@@ -1,43 +1,76 @@
 from google.adk.agents import LlmAgent
+from app.utils.hedging import hedged_model
 from . import prompt
+from .map_reduce import MapReduceLessonPlanner
 from .subagents.subtopic_decomposer import subtopic_decomposer_agent
-from .subagents.objective_mapper import objective_mapper_agent
+from .subagents.objective_mapper import (
+    day_objective_mapper_agent,
+    objective_mapper_agent,
+)
 from .subagents.content_planner import content_planner_agent
 from textwrap import dedent
+import os
 
 MODEL = "gemini-2.5-pro"
 
-lesson_planning_agent = LlmAgent(
-    name="lesson_planning_agent",
-    model=MODEL,
-    description=(
-        dedent("""
-        You are a manager agent that is responsible for overseeing the creation of comprehensive weekly lesson plans.
+# "map_reduce" plans every day of the week concurrently and assembles the plan
+# locally; "delegate" lets an LLM manager call the planners one at a time.
+PLANNING_MODE = os.getenv("LESSON_PLANNING_MODE", "map_reduce")
+PLANNING_CONCURRENCY = int(os.getenv("LESSON_PLANNING_CONCURRENCY", "5"))
+
+
+def _map_reduce_planner() -> MapReduceLessonPlanner:
+    return MapReduceLessonPlanner(
+        name="lesson_planning_agent",
+        description=(
+            "Creates comprehensive weekly lesson plans: breaks the topic into "
+            "daily subtopics, then maps learning objectives and plans content "
+            "for every day in parallel."
+        ),
+        decomposer=subtopic_decomposer_agent,
+        objective_mapper=day_objective_mapper_agent,
+        content_planner=content_planner_agent,
+        max_concurrency=PLANNING_CONCURRENCY,
+    )
+
 
-        Always delegate the task to the appropriate agent. Use your best judgement 
-        to determine which agent to delegate to based on the planning needs.
+def _delegating_planner() -> LlmAgent:
+    return LlmAgent(
+        name="lesson_planning_agent",
+        model=hedged_model(MODEL),
+        description=(
+            dedent("""
+            You are a manager agent that is responsible for overseeing the creation of comprehensive weekly lesson plans.
 
-        You are responsible for delegating tasks to the following agents:
-        - subtopic_decomposer: Breaks a topic into age-appropriate sequential subtopics for weekly planning
-        - objective_mapper: Aligns each subtopic with learning goals like Critical Thinking, Creativity, Ethics, Communication, etc.
-        - content_planner: Generates explanations, analogies, activities, and assessments with time recommendations
+            Always delegate the task to the appropriate agent. Use your best judgement 
+            to determine which agent to delegate to based on the planning needs.
 
-        After getting the outputs from these agents, it is your task to compile them into a comprehensive weekly lesson plan.
+            You are responsible for delegating tasks to the following agents:
+            - subtopic_decomposer: Breaks a topic into age-appropriate sequential subtopics for weekly planning
+            - objective_mapper: Aligns each subtopic with learning goals like Critical Thinking, Creativity, Ethics, Communication, etc.
+            - content_planner: Generates explanations, analogies, activities, and assessments with time recommendations
+
+            After getting the outputs from these agents, it is your task to compile them into a comprehensive weekly lesson plan.
         
-        IMPORTANT: Use session state to remember teacher preferences and planning history:
-        - Check teacher preferences: {teacher_preferences} for teaching style, class duration, and assessment frequency
-        - Track recent plans: {recent_plans}  to avoid repetition and suggest improvements
-        - Update current planning session: {current_planning_session} current_planning_session to track planning progress
-        - Use planninghistory: {planning_history}  to provide personalized recommendations based on past plans
-        """)
-    ),
-    instruction=prompt.LESSON_PLANNING_PROMPT,
-    output_key="weekly_lesson_plan",
-    sub_agents=[
-        subtopic_decomposer_agent,
-        objective_mapper_agent,
-        content_planner_agent
-    ],
+            IMPORTANT: Use session state to remember teacher preferences and planning history:
+            - Check teacher preferences: {teacher_preferences} for teaching style, class duration, and assessment frequency
+            - Track recent plans: {recent_plans}  to avoid repetition and suggest improvements
+            - Update current planning session: {current_planning_session} current_planning_session to track planning progress
+            - Use planninghistory: {planning_history}  to provide personalized recommendations based on past plans
+            """)
+        ),
+        instruction=prompt.LESSON_PLANNING_PROMPT,
+        output_key="weekly_lesson_plan",
+        sub_agents=[
+            subtopic_decomposer_agent,
+            objective_mapper_agent,
+            content_planner_agent
+        ],
+    )
+
+
+lesson_planning_agent = (
+    _map_reduce_planner() if PLANNING_MODE == "map_reduce" else _delegating_planner()
 )
 
 root_agent = lesson_planning_agent
@@ -0,0 +1,186 @@
+"""
+Map-reduce lesson planning.
+
+The topic is decomposed into subtopics once, then every teaching day is mapped
+(learning objectives, then the content plan) concurrently, and the days are
+reduced into `weekly_lesson_plan` in day order, the one message the teacher
+sees after the subtopic breakdown. A five-day plan takes roughly one day's
+generation latency instead of five.
+"""
+
+from collections.abc import AsyncGenerator
+from typing import Any
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from app.utils.chunked_generation import (
+    ChunkedGenerationAgent,
+    merge_event_streams,
+    run_with_brief,
+)
+
+from .subagents.content_planner.agent import day_chunk, group_by_day
+
+OBJECTIVES_KEY = "temp:day_objectives"
+NO_PLAN = (
+    "I couldn't break this topic down into subtopics, so there is no lesson "
+    "plan yet. Please ask again, naming the topic, the grade and the number of "
+    "days."
+)
+
+
+def _state_update(event: Event, key: str) -> Any:
+    """The value an event writes to `key` in session state, if any."""
+    return event.actions.state_delta.get(key)
+
+
+class MapReduceLessonPlanner(BaseAgent):
+    """Plans a week by running objective mapping and content planning per day."""
+
+    decomposer: LlmAgent
+    objective_mapper: LlmAgent
+    content_planner: ChunkedGenerationAgent
+    max_concurrency: int = 5
+    """Days planned at once."""
+
+    def __init__(
+        self,
+        *,
+        decomposer: LlmAgent,
+        objective_mapper: LlmAgent,
+        content_planner: ChunkedGenerationAgent,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(  # type: ignore[call-arg]
+            decomposer=decomposer,
+            objective_mapper=objective_mapper,
+            content_planner=content_planner,
+            sub_agents=[decomposer, objective_mapper, content_planner],
+            **kwargs,
+        )
+
+    async def _plan_day(
+        self,
+        ctx: InvocationContext,
+        index: int,
+        day: int,
+        total: int,
+        subtopics: list[dict],
+        out: dict[str, Any],
+    ) -> AsyncGenerator[Event, None]:
+        brief = "Map learning objectives only for these subtopics:\n" + "\n".join(
+            f"- {subtopic['title']}: {subtopic['description']}"
+            for subtopic in subtopics
+        )
+        branch = f"{ctx.branch or self.name}.{index:02d}_day_{day}"
+        objectives: list[dict] = []
+        async for event in run_with_brief(self.objective_mapper, ctx, branch, brief):
+            result = _state_update(event, OBJECTIVES_KEY)
+            if result:
+                objectives = result["subtopics"]
+            yield event
+
+        chunk = day_chunk(
+            day, total, subtopics, {entry["subtopic"]: entry for entry in objectives}
+        )
+        text: list[str] = []
+        async for event in self.content_planner.generate_chunk(ctx, index, chunk, text):
+            yield event
+        out.update(
+            objectives=objectives,
+            state_key=self.content_planner.chunk_state_key(chunk),
+            content="".join(text),
+        )
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        breakdown: dict[str, Any] = {}
+        async for event in self.decomposer.run_async(ctx):
+            breakdown = _state_update(event, "subtopic_breakdown") or breakdown
+            yield event
+        if not breakdown.get("subtopics"):
+            # The decomposer's answer did not match its schema (or had no
+            # subtopics): say so instead of ending without a plan.
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=ctx.branch,
+                error_code="NO_SUBTOPICS",
+                error_message="The topic could not be broken down into subtopics.",
+                content=types.Content(role="model", parts=[types.Part(text=NO_PLAN)]),
+            )
+            return
+
+        days = group_by_day(breakdown["subtopics"])
+        outputs: dict[int, dict[str, Any]] = {day: {} for day in days}
+        runs = [
+            self._plan_day(ctx, index, day, len(days), subtopics, outputs[day])
+            for index, (day, subtopics) in enumerate(days.items(), start=1)
+        ]
+        # The days' own events stay off the teacher's stream: everything they
+        # produce reaches the assembled plan and its state below, and shown
+        # as well it would be the same plan twice.
+        async for _ in merge_event_streams(runs, self.max_concurrency):
+            pass
+
+        plan = render_weekly_plan(breakdown, days, outputs)
+        state_delta: dict[str, Any] = {
+            output["state_key"]: output["content"] for output in outputs.values()
+        }
+        state_delta.update(
+            {
+                self.content_planner.output_key: [
+                    output["state_key"] for output in outputs.values()
+                ],
+                "learning_objectives": {
+                    "topic": breakdown["topic"],
+                    "grade": breakdown["grade"],
+                    "subtopics": [
+                        entry
+                        for output in outputs.values()
+                        for entry in output["objectives"]
+                    ],
+                },
+                "weekly_lesson_plan": plan,
+            }
+        )
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=plan)]),
+            actions=EventActions(state_delta=state_delta),
+        )
+
+
+def render_weekly_plan(
+    breakdown: dict[str, Any],
+    days: dict[int, list[dict]],
+    outputs: dict[int, dict[str, Any]],
+) -> str:
+    """Assemble the per-day results into the weekly plan, in day order."""
+    lines = [
+        f"# Weekly Lesson Plan: {breakdown['topic']}",
+        f"**Grade:** {breakdown['grade']}",
+    ]
+    if breakdown.get("prerequisites"):
+        lines += ["", "**Prerequisites:**"]
+        lines += [f"- {item}" for item in breakdown["prerequisites"]]
+
+    for day, subtopics in days.items():
+        output = outputs[day]
+        titles = ", ".join(subtopic["title"] for subtopic in subtopics)
+        lines += ["", f"## Day {day}: {titles}"]
+        if output.get("objectives"):
+            lines += ["", "### Learning Objectives"]
+            for entry in output["objectives"]:
+                lines.append(
+                    f"- **{entry['subtopic']}** ({', '.join(entry['primary_goals'])})"
+                )
+                lines += [f"  - {outcome}" for outcome in entry["outcomes"]]
+        lines += ["", "### Content Plan", "", output.get("content", "").strip()]
+    return "\n".join(lines)
@@ -1,13 +1,94 @@
 """content_planner_agent."""
 
+from collections import defaultdict
+from collections.abc import Mapping
+from typing import Any
+
 from google.adk import Agent
+from google.adk.planners import BuiltInPlanner
+from google.genai import types
+
+from app.utils.chunked_generation import (
+    Chunk,
+    ChunkedGenerationAgent,
+    chunk_instruction,
+)
+from app.utils.coalescing import coalesced_model
+
 from . import prompt
 
 MODEL = "gemini-2.5-flash"
 
-content_planner_agent = Agent(
-    model=MODEL,
+# Output budget for one day of the plan, thinking included.
+DAY_MAX_OUTPUT_TOKENS = 6144
+DAY_THINKING_BUDGET = 1024
+DEFAULT_DAYS = 5
+
+
+def group_by_day(subtopics: list[dict]) -> dict[int, list[dict]]:
+    """Subtopics of a breakdown by teaching day; undated ones get a day each."""
+    days: dict[int, list[dict]] = defaultdict(list)
+    for number, subtopic in enumerate(subtopics, start=1):
+        days[subtopic.get("day") or number].append(subtopic)
+    return dict(sorted(days.items()))
+
+
+def day_chunk(
+    day: int, total: int, subtopics: list[dict], objectives: Mapping[str, dict]
+) -> Chunk:
+    """The chunk planning one day, with the outcomes mapped for its subtopics."""
+    lines = [f"Plan Day {day} of {total} of the week, covering:"]
+    for subtopic in subtopics:
+        lines.append(f"- {subtopic['title']}: {subtopic['description']}")
+        lines += [f"  - {point}" for point in subtopic.get("key_points") or []]
+        entry = objectives.get(subtopic["title"])
+        if entry:
+            lines.append(f"  Outcomes: {'; '.join(entry['outcomes'])}")
+    return Chunk(key=f"day_{day}", brief="\n".join(lines))
+
+
+def plan_days(state: Mapping[str, Any], request: str) -> list[Chunk]:
+    """One chunk per teaching day, from the subtopic breakdown when there is one."""
+    subtopics = (state.get("subtopic_breakdown") or {}).get("subtopics") or []
+    objectives = {
+        entry["subtopic"]: entry
+        for entry in (state.get("learning_objectives") or {}).get("subtopics") or []
+    }
+    if not subtopics:
+        return [
+            Chunk(
+                key=f"day_{day}",
+                brief=f"Plan Day {day} of {DEFAULT_DAYS} of the week.",
+            )
+            for day in range(1, DEFAULT_DAYS + 1)
+        ]
+
+    days = group_by_day(subtopics)
+    return [
+        day_chunk(day, len(days), day_subtopics, objectives)
+        for day, day_subtopics in days.items()
+    ]
+
+
+content_planner_day_agent = Agent(
+    model=coalesced_model(MODEL),
+    name="content_planner_day_agent",
+    instruction=chunk_instruction(prompt.CONTENT_PLANNING_PROMPT),
+    include_contents="none",
+    generate_content_config=types.GenerateContentConfig(
+        max_output_tokens=DAY_MAX_OUTPUT_TOKENS
+    ),
+    planner=BuiltInPlanner(
+        thinking_config=types.ThinkingConfig(thinking_budget=DAY_THINKING_BUDGET)
+    ),
+    disallow_transfer_to_parent=True,
+    disallow_transfer_to_peers=True,
+)
+
+content_planner_agent = ChunkedGenerationAgent(
     name="content_planner_agent",
-    instruction=prompt.CONTENT_PLANNING_PROMPT,
+    description="Generates the content plan for the week, one day at a time.",
+    generator=content_planner_day_agent,
+    plan_chunks=plan_days,
     output_key="content_plan",
-) 
\ No newline at end of file
+)
@@ -33,4 +33,5 @@ Output Requirements:
 - Suggest homework or extension activities.
 - Include classroom management tips for each activity.
 - Ensure all content is grade-appropriate and engaging.
+- Plan only the day described at the end of these instructions; the other days of the week are planned separately.
 """ 
\ No newline at end of file
@@ -1,3 +1,5 @@
 """Objective Mapper Agent."""
 
-from .agent import objective_mapper_agent 
\ No newline at end of file
+from .agent import day_objective_mapper_agent, objective_mapper_agent
+
+__all__ = ["day_objective_mapper_agent", "objective_mapper_agent"]
@@ -1,13 +1,40 @@
 """objective_mapper_agent."""
 
 from google.adk import Agent
+
+from app.utils.chunked_generation import chunk_instruction
+from app.utils.coalescing import coalesced_model
+from app.utils.structured_output import StructuredOutput
+
 from . import prompt
+from .schema import ObjectiveMap, render_markdown
 
 MODEL = "gemini-2.5-flash"
 
 objective_mapper_agent = Agent(
-    model=MODEL,
+    model=coalesced_model(MODEL),
     name="objective_mapper_agent",
     instruction=prompt.OBJECTIVE_MAPPING_PROMPT,
-    output_key="learning_objectives",
-) 
\ No newline at end of file
+    output_schema=ObjectiveMap,
+    after_model_callback=StructuredOutput(
+        ObjectiveMap, output_key="learning_objectives", render=render_markdown
+    ),
+    # Structured leaves reply once and hand control back to the root agent.
+    disallow_transfer_to_parent=True,
+    disallow_transfer_to_peers=True,
+)
+
+# Maps the objectives of one day's subtopics, for map-reduce lesson planning.
+# The result is only needed by the planner, so it is kept out of session state.
+day_objective_mapper_agent = Agent(
+    model=coalesced_model(MODEL),
+    name="day_objective_mapper_agent",
+    instruction=chunk_instruction(prompt.OBJECTIVE_MAPPING_PROMPT),
+    include_contents="none",
+    output_schema=ObjectiveMap,
+    after_model_callback=StructuredOutput(
+        ObjectiveMap, output_key="temp:day_objectives", render=render_markdown
+    ),
+    disallow_transfer_to_parent=True,
+    disallow_transfer_to_peers=True,
+)
@@ -22,12 +22,9 @@ Instructions:
 
 Output Requirements:
 
-- Map each subtopic to specific learning objectives and goals.
+- Respond only with JSON matching the response schema; do not add markdown or formatting, it is rendered for the teacher automatically.
 - Include both primary and secondary learning goals for each subtopic.
-- Provide measurable learning outcomes that can be assessed.
+- Provide measurable learning outcomes and assessment criteria that teachers can observe.
 - Ensure objectives are appropriate for the target grade level.
-- Show how learning goals progress and build throughout the week.
-- Include assessment criteria for each learning objective.
-- Consider how objectives support overall topic mastery.
-- Provide suggestions for how teachers can observe and measure progress.
+- Summarize how learning goals progress and build throughout the week.
 """ 
\ No newline at end of file
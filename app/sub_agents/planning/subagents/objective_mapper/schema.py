@@ -0,0 +1,59 @@
+"""Output schema and markdown renderer for the objective_mapper_agent."""
+
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+from app.utils.structured_output import render_list
+
+LearningGoal = Literal[
+    "Critical Thinking",
+    "Creativity",
+    "Ethics",
+    "Communication",
+    "Collaboration",
+    "Digital Literacy",
+    "Global Awareness",
+    "Self-Directed Learning",
+]
+
+
+class SubtopicObjectives(BaseModel):
+    subtopic: str
+    primary_goals: list[LearningGoal]
+    secondary_goals: list[LearningGoal] | None = None
+    outcomes: list[str] = Field(description="Measurable, observable outcomes.")
+    assessment_criteria: list[str]
+
+
+class ObjectiveMap(BaseModel):
+    topic: str
+    grade: str
+    subtopics: list[SubtopicObjectives]
+    progression: str | None = Field(
+        default=None, description="How the goals build on each other over the week."
+    )
+
+
+def render_markdown(objectives: ObjectiveMap) -> str:
+    """Render a learning objective map as markdown."""
+    lines = [
+        f"## Learning Objectives: {objectives.topic}",
+        f"**Grade:** {objectives.grade}",
+    ]
+    for entry in objectives.subtopics:
+        goals = ", ".join(entry.primary_goals)
+        if entry.secondary_goals:
+            goals += f" (also: {', '.join(entry.secondary_goals)})"
+        lines += [
+            "",
+            f"### {entry.subtopic}",
+            f"**Goals:** {goals}",
+            "**Students will be able to:**",
+            render_list(entry.outcomes),
+            "**Assessment criteria:**",
+            render_list(entry.assessment_criteria),
+        ]
+    if objectives.progression:
+        lines += ["", f"**Progression:** {objectives.progression}"]
+    return "\n".join(lines)
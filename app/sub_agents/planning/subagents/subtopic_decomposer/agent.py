@@ -1,13 +1,24 @@
 """subtopic_decomposer_agent."""
 
 from google.adk import Agent
+
+from app.utils.coalescing import coalesced_model
+from app.utils.structured_output import StructuredOutput
+
 from . import prompt
+from .schema import SubtopicBreakdown, render_markdown
 
 MODEL = "gemini-2.5-flash"
 
 subtopic_decomposer_agent = Agent(
-    model=MODEL,
+    model=coalesced_model(MODEL),
     name="subtopic_decomposer_agent",
     instruction=prompt.SUBTOPIC_DECOMPOSITION_PROMPT,
-    output_key="subtopic_breakdown",
+    output_schema=SubtopicBreakdown,
+    after_model_callback=StructuredOutput(
+        SubtopicBreakdown, output_key="subtopic_breakdown", render=render_markdown
+    ),
+    # Structured leaves reply once and hand control back to the root agent.
+    disallow_transfer_to_parent=True,
+    disallow_transfer_to_peers=True,
 ) 
\ No newline at end of file
@@ -16,12 +16,9 @@ Instructions:
 
 Output Requirements:
 
-- Present a clear breakdown of the main topic into sequential subtopics.
-- Include a brief description of each subtopic and its key learning points.
-- Indicate the logical sequence and dependencies between subtopics.
-- Provide complexity ratings (low, medium, high) for each subtopic.
-- Suggest which subtopics might need more or less time based on complexity.
-- Ensure the breakdown is suitable for weekly lesson planning.
+- Respond only with JSON matching the response schema; do not add markdown or formatting, it is rendered for the teacher automatically.
+- List subtopics in teaching order, with a brief description and key learning points for each.
+- Rate the complexity (low, medium, high) of each subtopic and note which earlier subtopics it depends on.
+- Assign each subtopic to a day of the week, grouping lighter subtopics where sensible.
 - Include any prerequisite knowledge students should have.
-- Consider how subtopics can be grouped for daily lessons within a week.
 """ 
\ No newline at end of file
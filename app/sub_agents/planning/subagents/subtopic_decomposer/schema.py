@@ -0,0 +1,47 @@
+"""Output schema and markdown renderer for the subtopic_decomposer_agent."""
+
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+from app.utils.structured_output import render_list
+
+
+class Subtopic(BaseModel):
+    title: str
+    description: str
+    key_points: list[str]
+    complexity: Literal["low", "medium", "high"]
+    day: int | None = Field(default=None, description="Day of the week, from 1.")
+    depends_on: list[str] | None = Field(
+        default=None, description="Titles of earlier subtopics this builds on."
+    )
+
+
+class SubtopicBreakdown(BaseModel):
+    topic: str
+    grade: str
+    prerequisites: list[str] | None = None
+    subtopics: list[Subtopic]
+
+
+def render_markdown(breakdown: SubtopicBreakdown) -> str:
+    """Render a subtopic breakdown as markdown."""
+    lines = [
+        f"## Subtopic Breakdown: {breakdown.topic}",
+        f"**Grade:** {breakdown.grade}",
+    ]
+    if breakdown.prerequisites:
+        lines += ["", "**Prerequisites:**", render_list(breakdown.prerequisites)]
+
+    for number, subtopic in enumerate(breakdown.subtopics, start=1):
+        day = f"Day {subtopic.day}: " if subtopic.day else ""
+        lines += [
+            "",
+            f"### {number}. {day}{subtopic.title} ({subtopic.complexity} complexity)",
+            subtopic.description,
+            render_list(subtopic.key_points),
+        ]
+        if subtopic.depends_on:
+            lines.append(f"_Builds on: {', '.join(subtopic.depends_on)}_")
+    return "\n".join(lines)
@@ -1,4 +1,5 @@
 from google.adk.agents import LlmAgent
+from app.utils.hedging import hedged_model
 
 from . import prompt
 from .sub_agents.mindmap_generator import mindmap_generator_agent
@@ -12,7 +13,7 @@ MODEL = os.getenv("MODEL")
 
 visual_aid_agent = LlmAgent(
     name="visual_aid_agent",
-    model=MODEL,
+    model=hedged_model(MODEL),
     description=(
         dedent("""
         You are a manager agent responsible for creating visual learning aids for teachers.
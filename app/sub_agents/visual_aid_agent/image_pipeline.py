@@ -0,0 +1,67 @@
+"""
+Post-processing of generated images for low-bandwidth classrooms.
+
+The image model returns a full-resolution PNG, often several megabytes, which
+is slow to load on rural mobile connections. Every generated image is turned
+into three files instead:
+
+- the main image, downscaled and compressed as WebP (or AVIF),
+- a small thumbnail for chat previews,
+- a grayscale variant for printing on black-and-white printers.
+
+Encoding is CPU-bound, so it runs in a process pool off the event loop. The
+workers are started by a fork server (or spawned where there is none) rather
+than forked from the threaded server process, and only import
+`app.utils.image_encoding`.
+"""
+
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from app.config import config
+from app.utils.image_encoding import ImageVariants, effective_format, process_image
+from app.utils.metrics import counters
+
+_counters = counters("image_pipeline")
+_pool: ProcessPoolExecutor | None = None
+
+
+@functools.cache
+def image_format() -> str:
+    """
+    The format main images are written in: `config.image_format`, or WebP
+    when it is AVIF and Pillow cannot encode AVIF. Cached outputs are looked
+    up under the same format.
+    """
+    return effective_format(config.image_format)
+
+
+def _pool_context() -> multiprocessing.context.BaseContext:
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    context = multiprocessing.get_context("forkserver")
+    # The fork server would otherwise re-import the server's __main__.
+    context.set_forkserver_preload(["app.utils.image_encoding"])
+    return context
+
+
+async def process_generated_image(data: bytes, stem: Path) -> ImageVariants:
+    """Run the pipeline for one generated image in the shared process pool."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=config.image_workers, mp_context=_pool_context()
+        )
+    loop = asyncio.get_running_loop()
+    variants = await loop.run_in_executor(
+        _pool, process_image, data, str(stem), image_format()
+    )
+    _counters.inc("images")
+    _counters.inc("bytes_in", variants.original_bytes)
+    _counters.inc("bytes_out", variants.output_bytes)
+    _counters.inc("bytes_saved", variants.bytes_saved)
+    _counters.inc("encode_ms", variants.encode_ms)
+    return variants
@@ -0,0 +1,697 @@
+"""
+Local Mermaid linter with automatic repair.
+
+Checks flowchart/graph and mindmap code with a small parser before it is sent
+to the renderer, and fixes the mistakes models make most often: a missing or
+invalid direction, node IDs with spaces or punctuation, labels with brackets or
+quotes that are not quoted, `->` arrows, markdown bullets in mindmaps, several
+mindmap roots and unbalanced subgraphs. What cannot be fixed safely is
+reported with its line and column, so one corrected tool call is enough.
+
+Other diagram types (sequence, class, gantt, ...) are passed through unchecked.
+"""
+
+import re
+from dataclasses import dataclass, field
+
+from app.utils.metrics import counters
+
+DIRECTIONS = ("TD", "TB", "BT", "RL", "LR")
+DEFAULT_DIRECTION = "TD"
+
+# Diagram types the renderer supports but this linter does not check.
+OTHER_DIAGRAMS = (
+    "sequenceDiagram",
+    "classDiagram",
+    "stateDiagram",
+    "stateDiagram-v2",
+    "erDiagram",
+    "journey",
+    "gantt",
+    "pie",
+    "quadrantChart",
+    "requirementDiagram",
+    "gitGraph",
+    "C4Context",
+    "timeline",
+    "sankey-beta",
+    "xychart-beta",
+    "block-beta",
+)
+
+# Statements other than node chains that flowcharts allow.
+FLOWCHART_KEYWORDS = ("classDef", "class", "style", "linkStyle", "click", "direction")
+
+# (opener, closers) of node shapes, longest openers first.
+SHAPES = (
+    ("(((", (")))",)),
+    ("([", ("])",)),
+    ("[(", (")]",)),
+    ("[[", ("]]",)),
+    ("((", ("))",)),
+    ("{{", ("}}",)),
+    ("[/", ("/]", "\\]")),
+    ("[\\", ("\\]", "/]")),
+    ("(", (")",)),
+    ("[", ("]",)),
+    ("{", ("}",)),
+    (">", ("]",)),
+)
+
+_LEGAL_ID = re.compile(r"[A-Za-z0-9_]+")
+_ID_WORDS = re.compile(r"[A-Za-z0-9_]+")
+_UNSAFE_LABEL = re.compile(r'[()\[\]{}<>|"]')
+_CLASS_SUFFIX = re.compile(r":::[\w-]+$")
+_FENCE = re.compile(r"```[ \t]*(?:mermaid)?[ \t]*\n(.*?)(?:```|\Z)", re.S)
+_HEADER = re.compile(r"\s*(graph|flowchart)\b(.*)$", re.I)
+_BULLET = re.compile(r"(?:[-*+]|\d+[.)])\s+")
+_EDGE = re.compile(
+    r"\s*(?:"
+    # A -- label --> B
+    r"(?P<open>--|==|-\.)\s+(?P<text>[^|\"]+?)\s+"
+    r"(?P<close>-{2,}[>ox]|-{3,}|={2,}[>ox]|={3,}|\.-+[>ox]?)"
+    # A --> B, A -.-> B, A ==> B, A ~~~ B, optionally with |label|
+    r"|(?P<arrow><?(?:-{2,}[>ox]?|={2,}[>ox]?|-\.+-[>ox]?|~~~)|->)"
+    r"(?:\s*\|(?P<label>[^|]*)\|)?"
+    r")\s*"
+)
+
+_counters = counters("mermaid_lint")
+
+
+@dataclass
+class LintIssue:
+    """A problem found in Mermaid code, and whether it was repaired."""
+
+    line: int
+    column: int
+    """1-based position in the code as it was given."""
+    code: str
+    """Short identifier of the kind of problem, e.g. "illegal-node-id"."""
+    message: str
+    fixed: bool = False
+
+    def __str__(self) -> str:
+        status = "fixed" if self.fixed else "error"
+        return f"line {self.line}, column {self.column}: {self.message} [{status}]"
+
+
+@dataclass
+class LintResult:
+    """Repaired Mermaid code and the issues found in the original."""
+
+    source: str
+    diagram_type: str | None
+    issues: list[LintIssue] = field(default_factory=list)
+
+    @property
+    def errors(self) -> list[LintIssue]:
+        return [issue for issue in self.issues if not issue.fixed]
+
+    @property
+    def fixes(self) -> list[LintIssue]:
+        return [issue for issue in self.issues if issue.fixed]
+
+    @property
+    def ok(self) -> bool:
+        """Whether the (repaired) code is expected to render."""
+        return not self.errors
+
+
+def quote_label(text: str) -> str:
+    """Wrap a label in double quotes, escaping quotes inside it."""
+    return '"' + text.strip().replace('"', "#quot;") + '"'
+
+
+def _top_level(text: str) -> tuple[list[bool], int | None, list[int]]:
+    """
+    Mark which characters of a statement are outside brackets, quotes and
+    edge labels. Also returns where an unterminated bracket, quote or label
+    starts, and the positions of closing brackets without an opener.
+    """
+    flags: list[bool] = []
+    openers: list[int] = []
+    quote: int | None = None
+    pipe: int | None = None
+    stray: list[int] = []
+    for i, char in enumerate(text):
+        if quote is not None:
+            flags.append(False)
+            if char == '"':
+                quote = None
+            continue
+        if char == '"':
+            quote = i
+            flags.append(False)
+            continue
+        if pipe is not None:
+            flags.append(False)
+            if char == "|":
+                pipe = None
+            continue
+        if not openers and char == "|":
+            pipe = i
+            flags.append(False)
+            continue
+        is_asymmetric = (
+            char == ">" and i and (text[i - 1].isalnum() or text[i - 1] == "_")
+        )
+        if char in "[({" or (is_asymmetric and not openers):
+            openers.append(i)
+            flags.append(False)
+            continue
+        if char in "])}":
+            if openers:
+                openers.pop()
+                flags.append(False)
+                continue
+            stray.append(i)
+        flags.append(not openers)
+    unterminated = quote if quote is not None else pipe
+    if unterminated is None and openers:
+        unterminated = openers[0]
+    return flags, unterminated, stray
+
+
+def _split_top_level(text: str, separator: str) -> list[tuple[int, str]]:
+    """Split on `separator` where it is outside brackets and quotes."""
+    flags, _, _ = _top_level(text)
+    parts, start = [], 0
+    for i, char in enumerate(text):
+        if char == separator and flags[i]:
+            parts.append((start, text[start:i]))
+            start = i + 1
+    parts.append((start, text[start:]))
+    return parts
+
+
+class _Linter:
+    def __init__(self, source: str, repair: bool, first_line: int) -> None:
+        self.lines = source.split("\n")
+        self.repair = repair
+        self.first_line = first_line
+        self.issues: list[LintIssue] = []
+        # Every ID-like word in the diagram, so generated IDs never collide.
+        self.taken = set(_ID_WORDS.findall(source))
+        self.renamed: dict[str, str] = {}
+
+    def _add(
+        self, index: int, column: int, code: str, message: str, fixed: bool
+    ) -> None:
+        self.issues.append(
+            LintIssue(self.first_line + index + 1, column + 1, code, message, fixed)
+        )
+
+    def fix(self, index: int, column: int, code: str, message: str) -> bool:
+        """Record a repairable issue; returns whether to repair it."""
+        self._add(index, column, code, message, self.repair)
+        return self.repair
+
+    def error(self, index: int, column: int, code: str, message: str) -> None:
+        self._add(index, column, code, message, False)
+
+    def new_id(self, text: str) -> str:
+        if text in self.renamed:
+            return self.renamed[text]
+        base = re.sub(r"[^A-Za-z0-9_]+", "_", text).strip("_") or "node"
+        if base == "end":
+            base = "end_node"
+        candidate, n = base, 2
+        while candidate in self.taken:
+            candidate, n = f"{base}_{n}", n + 1
+        self.taken.add(candidate)
+        self.renamed[text] = candidate
+        return candidate
+
+    # Shapes and labels, shared by flowcharts and mindmaps
+
+    def shape(self, text: str, index: int, column: int) -> str | None:
+        """Check a node shape such as `[label]` and return it, repaired."""
+        for opener, closers in SHAPES:
+            if not text.startswith(opener):
+                continue
+            closer = next(
+                (
+                    c
+                    for c in closers
+                    if text.endswith(c) and len(text) >= len(opener) + len(c)
+                ),
+                None,
+            )
+            if closer is None:
+                last = text[-1]
+                if last in ")]}" and len(text) > len(opener):
+                    if not self.fix(
+                        index,
+                        column + len(text) - 1,
+                        "mismatched-bracket",
+                        f"node shape opened with '{opener}' is closed with '{last}'",
+                    ):
+                        return text
+                    closer = closers[0]
+                    label = text[len(opener) : -1].rstrip("])}")
+                    return opener + self.label(label, index, column) + closer
+                self.error(
+                    index,
+                    column,
+                    "unexpected-text",
+                    f"unexpected text after the node shape in '{text}'",
+                )
+                return None
+            label = text[len(opener) : len(text) - len(closer)]
+            return opener + self.label(label, index, column + len(opener)) + closer
+        return None
+
+    def label(self, label: str, index: int, column: int) -> str:
+        stripped = label.strip()
+        if len(stripped) >= 2 and stripped[0] == stripped[-1] == '"':
+            if '"' not in stripped[1:-1]:
+                return label
+            if self.fix(
+                index, column, "unescaped-quote", "label contains a double quote"
+            ):
+                return quote_label(stripped[1:-1])
+            return label
+        if _UNSAFE_LABEL.search(stripped) and self.fix(
+            index,
+            column,
+            "unquoted-label",
+            f"label '{stripped}' contains brackets, quotes or '|' and must be quoted",
+        ):
+            return quote_label(stripped)
+        return label
+
+    # Flowcharts
+
+    def flowchart(self, header_index: int) -> list[str]:
+        lines = self.lines
+        out = lines[:header_index]
+        match = _HEADER.match(lines[header_index])
+        assert match is not None
+        keyword, rest = match.group(1), match.group(2)
+        column = match.start(1)
+        direction, _, body = rest.partition(";")
+        direction = direction.strip()
+        if keyword not in ("graph", "flowchart") and self.fix(
+            header_index, column, "header-case", f"'{keyword}' must be lowercase"
+        ):
+            keyword = keyword.lower()
+        if direction.upper() in DIRECTIONS:
+            if direction != direction.upper() and self.fix(
+                header_index, column, "direction-case", "direction must be uppercase"
+            ):
+                direction = direction.upper()
+        elif not direction:
+            if self.fix(
+                header_index,
+                column + len(keyword),
+                "missing-direction",
+                f"'{keyword}' needs a direction ({', '.join(DIRECTIONS)})",
+            ):
+                direction = DEFAULT_DIRECTION
+        elif _EDGE.search(direction) or "[" in direction:
+            # `graph A --> B`: the direction was left out before a statement.
+            if self.fix(
+                header_index,
+                column + len(keyword),
+                "missing-direction",
+                f"'{keyword}' needs a direction ({', '.join(DIRECTIONS)})",
+            ):
+                body = direction + (";" + body if body else "")
+                direction = DEFAULT_DIRECTION
+        elif self.fix(
+            header_index,
+            column + len(keyword) + 1,
+            "invalid-direction",
+            f"'{direction}' is not a direction ({', '.join(DIRECTIONS)})",
+        ):
+            direction = DEFAULT_DIRECTION
+        header = (
+            f"{lines[header_index][: match.start(1)]}{keyword} {direction}".rstrip()
+        )
+        if body.strip():
+            offset = len(lines[header_index]) - len(body)
+            header += "; " + self.flowchart_line(body, header_index, offset).strip()
+        elif rest.rstrip().endswith(";"):
+            header += ";"
+        out.append(header)
+
+        subgraphs: list[int] = []
+        for index in range(header_index + 1, len(lines)):
+            line = lines[index]
+            stripped = line.strip()
+            first = stripped.split(maxsplit=1)[0] if stripped else ""
+            if not stripped or stripped.startswith("%%"):
+                out.append(line)
+            elif first == "subgraph":
+                subgraphs.append(index)
+                out.append(self.subgraph(line, index))
+            elif first.rstrip(";") == "end" and stripped.rstrip(";") == "end":
+                if subgraphs:
+                    subgraphs.pop()
+                    out.append(line)
+                elif not self.fix(
+                    index,
+                    line.index("end"),
+                    "unmatched-end",
+                    "'end' without a subgraph",
+                ):
+                    out.append(line)
+            elif first in FLOWCHART_KEYWORDS:
+                out.append(line)
+            else:
+                out.append(self.flowchart_line(line, index, 0))
+        for index in reversed(subgraphs):
+            if self.fix(
+                index,
+                len(lines[index]) - len(lines[index].lstrip()),
+                "unclosed-subgraph",
+                "subgraph is never closed with 'end'",
+            ):
+                out.append("end")
+        return out
+
+    def subgraph(self, line: str, index: int) -> str:
+        indent = line[: len(line) - len(line.lstrip())]
+        rest = line.strip()[len("subgraph") :].strip().rstrip(";")
+        titled = re.fullmatch(r"(\w+)\s*\[(.*)\]", rest)
+        if titled:
+            title = self.label(titled.group(2), index, line.index("[") + 1)
+            if title == titled.group(2):
+                return line
+            return f"{indent}subgraph {titled.group(1)}[{title}]"
+        if _UNSAFE_LABEL.search(rest) and self.fix(
+            index,
+            line.index("subgraph") + 9,
+            "unquoted-label",
+            f"subgraph title '{rest}' contains brackets or quotes and must be quoted",
+        ):
+            return f"{indent}subgraph {self.new_id(rest)}[{quote_label(rest)}]"
+        return line
+
+    def flowchart_line(self, line: str, index: int, offset: int) -> str:
+        indent = line[: len(line) - len(line.lstrip())]
+        statements = [
+            (start, statement)
+            for start, statement in _split_top_level(line, ";")
+            if statement.strip()
+        ]
+        repaired = [
+            self.statement(statement, index, offset + start)
+            for start, statement in statements
+        ]
+        if repaired == [statement for _, statement in statements]:
+            return line
+        trailing = ";" if line.rstrip().endswith(";") else ""
+        return indent + "; ".join(s.strip() for s in repaired) + trailing
+
+    def statement(self, text: str, index: int, column: int) -> str:
+        flags, unterminated, stray = _top_level(text)
+        if unterminated is not None:
+            self.error(
+                index,
+                column + unterminated,
+                "unterminated",
+                f"'{text[unterminated]}' is never closed",
+            )
+            return text
+        for position in stray:
+            self.error(
+                index,
+                column + position,
+                "unexpected-bracket",
+                f"unexpected '{text[position]}'",
+            )
+        if stray:
+            return text
+
+        # Alternate node groups and edges: node (edge node)*
+        pieces: list[tuple[str, int, str]] = []
+        start = i = 0
+        while i < len(text):
+            if flags[i]:
+                edge = _EDGE.match(text, i) if text[i] in " \t-=<.~" else None
+                if edge:
+                    pieces.append(("nodes", start, text[start:i]))
+                    pieces.append(("edge", i, self.edge(edge, index, column + i)))
+                    start = i = edge.end()
+                    continue
+            i += 1
+        pieces.append(("nodes", start, text[start:]))
+
+        out = []
+        for kind, start, piece in pieces:
+            if kind == "edge":
+                out.append(piece)
+                continue
+            if not piece.strip():
+                side = "source" if start == 0 else "target"
+                self.error(
+                    index, column + start, f"missing-{side}", f"edge has no {side} node"
+                )
+                return text
+            nodes = [
+                self.node(node, index, column + start + offset)
+                for offset, node in _split_top_level(piece, "&")
+            ]
+            out.append(" & ".join(node.strip() for node in nodes))
+        repaired = " ".join(out)
+        original = " ".join(text.split())
+        return (
+            text
+            if repaired == original or " ".join(repaired.split()) == original
+            else repaired
+        )
+
+    def edge(self, match: re.Match[str], index: int, column: int) -> str:
+        column += len(match.group(0)) - len(match.group(0).lstrip())
+        if match.group("open"):
+            text = match.group("text")
+            close = match.group("close")
+            if _UNSAFE_LABEL.search(text) and self.fix(
+                index, column, "unquoted-label", f"edge label '{text}' must be quoted"
+            ):
+                return f"{close}|{quote_label(text)}|"
+            return f"{match.group('open')} {text} {close}"
+        arrow = match.group("arrow")
+        if arrow == "->" and self.fix(
+            index, column, "short-arrow", "'->' is not a Mermaid arrow, use '-->'"
+        ):
+            arrow = "-->"
+        label = match.group("label")
+        if label is None:
+            return arrow
+        return f"{arrow}|{self.label(label, index, column + len(arrow) + 1)}|"
+
+    def node(self, text: str, index: int, column: int) -> str:
+        column += len(text) - len(text.lstrip())
+        text = text.strip()
+        suffix = ""
+        if class_suffix := _CLASS_SUFFIX.search(text):
+            suffix, text = class_suffix.group(0), text[: class_suffix.start()]
+        split = re.match(r'([^\[\](){}>"]*)(.*)$', text, re.S)
+        assert split is not None
+        node_id, shape = split.group(1).rstrip(), split.group(2)
+        # `A>label]` is the asymmetric shape, but `A >` is not.
+        if shape.startswith(">") and split.group(1) != node_id:
+            shape = ""
+            node_id = text
+
+        repaired_shape = (
+            self.shape(shape, index, column + len(split.group(1))) if shape else ""
+        )
+        if repaired_shape is None:
+            return text + suffix
+
+        if not node_id:
+            if self.fix(index, column, "missing-node-id", "node shape has no ID"):
+                label = shape.strip('[](){}>/\\"')
+                node_id = self.new_id(label)
+        elif node_id == "end":
+            if self.fix(index, column, "reserved-node-id", "'end' cannot be a node ID"):
+                node_id = self.new_id("end")
+                repaired_shape = repaired_shape or '["end"]'
+        elif not _LEGAL_ID.fullmatch(node_id):
+            if self.fix(
+                index,
+                column,
+                "illegal-node-id",
+                f"node ID '{node_id}' may only contain letters, digits and underscores",
+            ):
+                label = node_id
+                node_id = self.new_id(node_id)
+                repaired_shape = repaired_shape or f"[{quote_label(label)}]"
+        return node_id + repaired_shape + suffix
+
+    # Mindmaps
+
+    def mindmap(self, header_index: int) -> list[str]:
+        out = self.lines[: header_index + 1]
+        nodes: list[tuple[int, int, str]] = []
+        for index in range(header_index + 1, len(self.lines)):
+            line = self.lines[index].replace("\t", "    ")
+            stripped = line.strip()
+            if not stripped or stripped.startswith("%%") or stripped.startswith("::"):
+                nodes.append((index, -1, self.lines[index]))
+                continue
+            indent = len(line) - len(stripped)
+            if (bullet := _BULLET.match(stripped)) and self.fix(
+                index, indent, "markdown-bullet", "mindmap nodes have no bullet markers"
+            ):
+                stripped = stripped[bullet.end() :]
+            nodes.append(
+                (
+                    index,
+                    indent,
+                    " " * indent + self.mindmap_node(stripped, index, indent),
+                )
+            )
+
+        real = [(index, indent) for index, indent, _ in nodes if indent >= 0]
+        if not real:
+            self.error(header_index, 0, "empty", "mindmap has no nodes")
+            return out
+        root_index, root_indent = real[0]
+        extra_roots = [index for index, indent in real[1:] if indent <= root_indent]
+        shift = 0
+        if extra_roots and self.fix(
+            extra_roots[0],
+            0,
+            "multiple-roots",
+            "a mindmap has one root; indent this node below it",
+        ):
+            shift = root_indent + 2 - min(indent for _, indent in real[1:])
+        for index, indent, line in nodes:
+            if shift and indent >= 0 and index != root_index:
+                line = " " * shift + line
+            out.append(line)
+        return out
+
+    def mindmap_node(self, text: str, index: int, column: int) -> str:
+        suffix = ""
+        if class_suffix := _CLASS_SUFFIX.search(text):
+            suffix, text = class_suffix.group(0), text[: class_suffix.start()].rstrip()
+        split = re.match(r'([^\[\](){}"]*)(.*)$', text, re.S)
+        assert split is not None
+        node_id, shape = split.group(1), split.group(2)
+        if not shape:
+            return text + suffix
+        # Brackets inside plain text ("Energy (kJ)") are not a shape.
+        is_shape = node_id.strip() == node_id and " " not in node_id
+        repaired = None
+        if is_shape:
+            flags, unterminated, stray = _top_level(shape)
+            if unterminated is None and not stray and not any(flags[1:-1]):
+                repaired = self.shape(shape, index, column + len(node_id))
+        if repaired is not None:
+            return node_id + repaired + suffix
+        if self.fix(
+            index,
+            column,
+            "unquoted-label",
+            f"node text '{text}' contains brackets and must be quoted",
+        ):
+            return f"{self.new_id(node_id or 'node')}[{quote_label(text)}]" + suffix
+        return text + suffix
+
+
+def extract_mermaid(text: str) -> tuple[str, int]:
+    """The diagram inside a ```mermaid fence, if any, and its first line number."""
+    match = _FENCE.search(text)
+    if not match:
+        return text, 0
+    return match.group(1), text[: match.start(1)].count("\n")
+
+
+def lint_mermaid(code: str, repair: bool = True) -> LintResult:
+    """
+    Check Mermaid code and repair what can be repaired safely.
+
+    With `repair=False` every problem is reported as an error and the code is
+    returned unchanged, which is what the renderer would make of it.
+    """
+    source, first_line = extract_mermaid(code)
+    issues: list[LintIssue] = []
+    if source is not code and repair:
+        issues.append(
+            LintIssue(1, 1, "fenced", "code is wrapped in a markdown fence", fixed=True)
+        )
+    elif source is not code:
+        source = code
+        first_line = 0
+
+    linter = _Linter(source.strip("\n"), repair, first_line)
+    lines = linter.lines
+    header_index = 0
+    # Skip blank lines, comments and a front matter block.
+    while header_index < len(lines):
+        stripped = lines[header_index].strip()
+        if stripped == "---":
+            header_index += 1
+            while header_index < len(lines) and lines[header_index].strip() != "---":
+                header_index += 1
+        elif stripped and not stripped.startswith("%%"):
+            break
+        header_index += 1
+
+    if header_index >= len(lines):
+        linter.error(0, 0, "empty", "no diagram found")
+        return LintResult(source, None, issues + linter.issues)
+
+    header = lines[header_index].strip()
+    keyword = header.split(maxsplit=1)[0].rstrip(";")
+    if _HEADER.match(lines[header_index]):
+        diagram_type = "flowchart"
+        out = linter.flowchart(header_index)
+    elif keyword.lower() == "mindmap":
+        diagram_type = "mindmap"
+        if keyword != "mindmap" and linter.fix(
+            header_index, 0, "header-case", "'mindmap' must be lowercase"
+        ):
+            lines[header_index] = "mindmap"
+        out = linter.mindmap(header_index)
+    elif keyword in OTHER_DIAGRAMS:
+        return LintResult(source, keyword, issues)
+    elif any(_EDGE.search(line) for line in lines[header_index:]):
+        diagram_type = "flowchart"
+        if linter.fix(
+            header_index,
+            0,
+            "missing-header",
+            f"diagram must start with a type such as 'flowchart {DEFAULT_DIRECTION}'",
+        ):
+            lines.insert(header_index, f"flowchart {DEFAULT_DIRECTION}")
+            # Issues found below refer to the original line numbers.
+            linter.first_line -= 1
+            out = linter.flowchart(header_index)
+        else:
+            out = lines
+    else:
+        linter.error(
+            header_index,
+            0,
+            "unknown-diagram",
+            f"'{keyword}' is not a diagram type; start with 'flowchart "
+            f"{DEFAULT_DIRECTION}' or 'mindmap'",
+        )
+        return LintResult(source, None, issues + linter.issues)
+
+    repaired = "\n".join(out) if repair else source
+    return LintResult(repaired, diagram_type, issues + linter.issues)
+
+
+def prepare_for_render(code: str) -> LintResult:
+    """
+    Lint and repair model-written Mermaid code before rendering it.
+
+    Counts diagrams that rendered only thanks to the repair: each of them would
+    otherwise have failed and cost another model turn to fix.
+    """
+    result = lint_mermaid(code)
+    _counters.inc("diagrams")
+    _counters.inc("fixes", len(result.fixes))
+    if not result.ok:
+        _counters.inc("invalid")
+    elif result.fixes:
+        _counters.inc("round_trips_avoided")
+    return result
@@ -0,0 +1,201 @@
+"""
+Visual rendering tools shared by the visual aid sub-agents.
+
+Image generation and Mermaid rendering used to be defined separately by each
+agent that needed them. They now live here, as one set of tools, so every
+agent shares:
+
+- one image model (`config.image_model`),
+- one render cache: outputs are stored under `config.visual_output_dir` by
+  content hash, so an image or diagram is produced once, whichever agent asks;
+  each output is then saved as a versioned session artifact, which is how it
+  reaches the client,
+- one bounded thread pool for blocking SVG work, and the image pipeline's
+  process pool for encoding generated images (see `image_pipeline`),
+- the `visual_rendering` counters: calls, cache hits, errors and latency per
+  tool.
+"""
+
+import asyncio
+import functools
+import time
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, TypeVar
+
+import mermaid as md
+from google import genai
+from google.adk.tools import FunctionTool, ToolContext
+from google.genai import types
+
+from app.config import config
+from app.utils.artifacts import save_file_artifact
+from app.utils.coalescing import fingerprint, image_generation, mermaid_render
+from app.utils.image_encoding import variant_paths
+from app.utils.metrics import counters
+
+from .image_pipeline import image_format, process_generated_image
+from .mermaid_lint import prepare_for_render
+
+IMAGE_MODEL = config.image_model
+
+# Artifact names; every new output becomes a new version of its artifact.
+IMAGE_ARTIFACT = "visual_aid_image"
+DIAGRAM_ARTIFACT = "diagram.svg"
+MIME_TYPES = {
+    ".webp": "image/webp",
+    ".avif": "image/avif",
+    ".png": "image/png",
+    ".svg": "image/svg+xml",
+}
+
+_T = TypeVar("_T")
+
+_counters = counters("visual_rendering")
+_executor: ThreadPoolExecutor | None = None
+
+
+def _output_path(kind: str, key: str, suffix: str) -> Path:
+    directory = Path(config.visual_output_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f"{kind}_{key[:16]}{suffix}"
+
+
+async def run_in_pool(fn: Callable[..., _T], *args: Any) -> _T:
+    """Run blocking rendering work in the shared, bounded thread pool."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=config.render_workers, thread_name_prefix="visual-render"
+        )
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(fn, *args))
+
+
+@asynccontextmanager
+async def _measured(tool: str) -> AsyncIterator[None]:
+    _counters.inc(f"calls.{tool}")
+    start = time.perf_counter()
+    try:
+        yield
+    except asyncio.CancelledError:
+        # The teacher went away mid-render; see app.utils.cancellation.
+        _counters.inc(f"cancelled.{tool}")
+        raise
+    except Exception:
+        _counters.inc(f"errors.{tool}")
+        raise
+    finally:
+        _counters.inc(f"latency_ms.{tool}", (time.perf_counter() - start) * 1000)
+
+
+async def _generate_image(prompt: str, stem: Path) -> dict:
+    client = genai.Client()
+    response = await client.aio.models.generate_content(
+        model=IMAGE_MODEL,
+        contents=prompt,
+        config=types.GenerateContentConfig(response_modalities=["TEXT", "IMAGE"]),
+    )
+    content = response.candidates[0].content if response.candidates else None
+    for part in (content.parts if content else None) or []:
+        if part.inline_data is not None and part.inline_data.data:
+            variants = await process_generated_image(part.inline_data.data, stem)
+            return variants.to_dict()
+    raise RuntimeError("The image model returned no image")
+
+
+async def _save_artifacts(
+    tool_context: ToolContext, files: dict[str, str]
+) -> dict[str, int]:
+    """Save output files as session artifacts, named by `files` keys."""
+    versions = {}
+    for filename, path in files.items():
+        mime_type = MIME_TYPES[Path(path).suffix]
+        version = await save_file_artifact(tool_context, filename, path, mime_type)
+        if version is not None:
+            versions[filename] = version
+    return versions
+
+
+async def generate_image_from_prompt(prompt: str, tool_context: ToolContext) -> dict:
+    """Generate an image for a visual aid.
+
+    Args:
+        prompt: Description of the image to generate.
+
+    Returns:
+        The artifact names and versions of the compressed image, its
+        thumbnail and a grayscale print version, with the bytes saved by
+        compression.
+    """
+    async with _measured("generate_image"):
+        key = fingerprint(IMAGE_MODEL, prompt)
+        stem = _output_path("image", key, "")
+        paths = variant_paths(stem, image_format())
+        if all(path.exists() for path in paths):
+            _counters.inc("cache_hits.generate_image")
+            main, thumbnail, print_version = (str(path) for path in paths)
+            result = {"main": main, "thumbnail": thumbnail, "print": print_version}
+        else:
+            result = dict(
+                await image_generation.do(key, lambda: _generate_image(prompt, stem))
+            )
+        main = result.pop("main")
+        artifacts = await _save_artifacts(
+            tool_context,
+            {
+                f"{IMAGE_ARTIFACT}{Path(main).suffix}": main,
+                f"{IMAGE_ARTIFACT}_thumb.webp": result.pop("thumbnail"),
+                f"{IMAGE_ARTIFACT}_print.png": result.pop("print"),
+            },
+        )
+        return {"status": "generated", "artifacts": artifacts, **result}
+
+
+def _render_svg(code: str, path: Path) -> str:
+    md.Mermaid(code).to_svg(path=path)
+    return str(path)
+
+
+async def render_mermaid_diagram(mermaid_code: str, tool_context: ToolContext) -> dict:
+    """Check, repair and render Mermaid diagram code to an SVG file.
+
+    Common syntax mistakes (missing direction, illegal node IDs, unquoted
+    labels, ...) are repaired before rendering. Mistakes that cannot be
+    repaired are returned with their line and column instead.
+
+    Args:
+        mermaid_code: Mermaid flowchart, graph or mindmap code.
+
+    Returns:
+        The artifact name and version of the SVG, plus the repaired code if it
+        was changed, or the errors to fix.
+    """
+    async with _measured("render_mermaid"):
+        result = prepare_for_render(mermaid_code)
+        if not result.ok:
+            return {
+                "status": "error",
+                "errors": [str(issue) for issue in result.errors],
+            }
+
+        key = fingerprint(result.source)
+        path = _output_path("mermaid", key, ".svg")
+        if path.exists():
+            _counters.inc("cache_hits.render_mermaid")
+        else:
+            await mermaid_render.do(
+                key, lambda: run_in_pool(_render_svg, result.source, path)
+            )
+        artifacts = await _save_artifacts(tool_context, {DIAGRAM_ARTIFACT: str(path)})
+        response: dict = {"status": "rendered", "artifacts": artifacts}
+        if result.fixes:
+            response["repaired_code"] = result.source
+            response["fixes"] = [str(issue) for issue in result.fixes]
+        return response
+
+
+generate_image_tool = FunctionTool(func=generate_image_from_prompt)
+render_mermaid_tool = FunctionTool(func=render_mermaid_diagram)
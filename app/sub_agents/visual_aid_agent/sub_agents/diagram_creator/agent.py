@@ -1,18 +1,16 @@
 from google.adk.agents import LlmAgent
+from app.utils.coalescing import coalesced_model
+
 from ... import prompt
-from .tools import generate_image_from_prompt, render_mermaid_diagram
-from google.adk.tools import FunctionTool
+from ...rendering import generate_image_tool, render_mermaid_tool
 import os
 
 MODEL = os.getenv("MODEL")
 
 
-generate_image_tool = FunctionTool(func=generate_image_from_prompt)
-render_mermaid_tool = FunctionTool(func=render_mermaid_diagram)
-
 diagram_creator_agent = LlmAgent(
     name="diagram_creator_agent",
-    model=MODEL,
+    model=coalesced_model(MODEL),
     description=(
         "A specialized agent for creating educational diagrams, flowcharts, process diagrams, "
         "and visual representations. This agent illustrates concepts, processes, and structures "
@@ -1,5 +1,11 @@
 from google.adk.agents import LlmAgent
+from app.utils.coalescing import coalesced_model
+from app.utils.structured_output import StructuredOutput
+
 from ... import prompt
+from .render import render_markdown
+from .schema import Mindmap
+from .trees import remember_tree
 import os
 
 MODEL = os.getenv("MODEL")
@@ -7,12 +13,21 @@ MODEL = os.getenv("MODEL")
 
 mindmap_generator_agent = LlmAgent(
     name="mindmap_generator_agent",
-    model=MODEL,
+    model=coalesced_model(MODEL),
     description=(
         "A specialized agent for creating educational mindmaps and knowledge maps. "
         "This agent helps visualize relationships between concepts, ideas, and information "
         "in a hierarchical, easy-to-understand format appropriate for different grade levels."
     ),
     instruction=prompt.MINDMAP_GENERATOR_PROMPT,
-    output_key="mindmap_output",
+    # The model writes the tree once; the outline, ASCII art, Mermaid code and
+    # print layout are rendered from it locally.
+    output_schema=Mindmap,
+    after_model_callback=StructuredOutput(
+        Mindmap, output_key="mindmap_output", render=render_markdown
+    ),
+    # Kept for degraded mode; see trees.py.
+    after_agent_callback=remember_tree,
+    disallow_transfer_to_parent=True,
+    disallow_transfer_to_peers=True,
 )
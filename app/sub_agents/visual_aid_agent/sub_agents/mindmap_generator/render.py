@@ -0,0 +1,186 @@
+"""
+Local renderers for mindmaps.
+
+The model writes a mindmap once, as a compact tree (see `schema.Mindmap`);
+every format the teacher sees is derived from it here, in milliseconds and
+without output tokens: a markdown outline, ASCII art, drawing steps for the
+blackboard, Mermaid `mindmap` and `flowchart` code, and a boxed print layout.
+"""
+
+import textwrap
+from dataclasses import dataclass, field
+
+from ...mermaid_lint import quote_label
+from .schema import Mindmap
+
+# Chalk and marker colours suggested for the main branches, in order.
+PALETTE = ["blue", "green", "orange", "purple", "red", "brown", "pink", "teal"]
+PRINT_WIDTH = 72
+
+
+@dataclass
+class Node:
+    label: str
+    children: list["Node"] = field(default_factory=list)
+
+    def count(self) -> int:
+        return 1 + sum(child.count() for child in self.children)
+
+
+def build_tree(mindmap: Mindmap) -> Node:
+    """Nest the outline-ordered nodes of a mindmap under its topic."""
+    root = Node(mindmap.topic.strip())
+    path = [root]
+    for level, label in mindmap.entries():
+        node = Node(label)
+        # Levels were repaired by the schema, so the parent is on the path.
+        del path[level:]
+        path[-1].children.append(node)
+        path.append(node)
+    return root
+
+
+def render_outline(root: Node) -> str:
+    lines = [f"**{root.label}**"]
+
+    def walk(node: Node, depth: int) -> None:
+        for child in node.children:
+            lines.append(f"{'  ' * depth}- {child.label}")
+            walk(child, depth + 1)
+
+    walk(root, 0)
+    return "\n".join(lines)
+
+
+def render_ascii(root: Node) -> str:
+    lines = [root.label]
+
+    def walk(node: Node, prefix: str) -> None:
+        for index, child in enumerate(node.children):
+            last = index == len(node.children) - 1
+            lines.append(f"{prefix}{'└── ' if last else '├── '}{child.label}")
+            walk(child, prefix + ("    " if last else "│   "))
+
+    walk(root, "")
+    return "\n".join(lines)
+
+
+def render_drawing_steps(root: Node) -> str:
+    """Steps for drawing the mindmap by hand, with a colour per main branch."""
+    steps = [f"Write **{root.label}** in the centre of the board and circle it."]
+    for index, branch in enumerate(root.children):
+        colour = PALETTE[index % len(PALETTE)]
+        step = f"In {colour}, draw a branch labelled **{branch.label}**."
+        if branch.children:
+            labels = ", ".join(child.label for child in branch.children)
+            step += f" Off it, draw smaller branches: {labels}."
+        steps.append(step)
+    if any(child.children for branch in root.children for child in branch.children):
+        steps.append("Add the remaining details as short twigs, following the outline.")
+    return "\n".join(f"{number}. {step}" for number, step in enumerate(steps, 1))
+
+
+def render_mermaid_mindmap(root: Node) -> str:
+    lines = ["mindmap", f"  root(({quote_label(root.label)}))"]
+    counter = 0
+
+    def walk(node: Node, depth: int) -> None:
+        nonlocal counter
+        for child in node.children:
+            counter += 1
+            lines.append(f"{'  ' * depth}n{counter}[{quote_label(child.label)}]")
+            walk(child, depth + 1)
+
+    walk(root, 2)
+    return "\n".join(lines)
+
+
+def render_mermaid_graph(root: Node, direction: str = "LR") -> str:
+    lines = [f"flowchart {direction}", f"    n0(({quote_label(root.label)}))"]
+    counter = 0
+
+    def walk(node: Node, node_id: str) -> None:
+        nonlocal counter
+        for child in node.children:
+            counter += 1
+            child_id = f"n{counter}"
+            lines.append(f"    {node_id} --> {child_id}[{quote_label(child.label)}]")
+            walk(child, child_id)
+
+    walk(root, "n0")
+    return "\n".join(lines)
+
+
+def render_print(root: Node, width: int = PRINT_WIDTH) -> str:
+    """A boxed, page-width layout: the topic as a banner, a box per branch."""
+    inner = width - 4
+    rule = "+" + "-" * (width - 2) + "+"
+    lines = ["=" * width]
+    lines += [
+        line.center(width).rstrip() for line in textwrap.wrap(root.label.upper(), width)
+    ]
+    lines.append("=" * width)
+
+    def add(text: str, indent: str) -> None:
+        for line in textwrap.wrap(
+            text, inner, initial_indent=indent, subsequent_indent=indent + "    "
+        ):
+            lines.append(f"| {line.ljust(inner)} |")
+
+    def walk(node: Node, number: str, indent: str) -> None:
+        for position, child in enumerate(node.children, 1):
+            add(f"{number}.{position} {child.label}", indent)
+            walk(child, f"{number}.{position}", indent + "  ")
+
+    for index, branch in enumerate(root.children, 1):
+        lines.append(rule)
+        add(f"{index}. {branch.label.upper()}", "")
+        walk(branch, str(index), "  ")
+    if root.children:
+        lines.append(rule)
+    return "\n".join(lines)
+
+
+def render_formats(mindmap: Mindmap) -> dict[str, str]:
+    """Every format of a mindmap, by name."""
+    root = build_tree(mindmap)
+    return {
+        "outline": render_outline(root),
+        "ascii": render_ascii(root),
+        "drawing_steps": render_drawing_steps(root),
+        "mermaid_mindmap": render_mermaid_mindmap(root),
+        "mermaid_graph": render_mermaid_graph(root),
+        "print": render_print(root),
+    }
+
+
+def render_markdown(mindmap: Mindmap) -> str:
+    """The teacher's reply: all formats, rendered from the one tree."""
+    formats = render_formats(mindmap)
+    return "\n".join(
+        [
+            f"## Mindmap: {mindmap.topic}",
+            f"**Grade:** {mindmap.grade}",
+            "",
+            "### Outline",
+            formats["outline"],
+            "",
+            "### Mindmap",
+            "```",
+            formats["ascii"],
+            "```",
+            "",
+            "### Drawing it on the board",
+            formats["drawing_steps"],
+            "",
+            "### Mermaid",
+            "```mermaid",
+            formats["mermaid_mindmap"],
+            "```",
+            "",
+            "### Printable layout",
+            "```",
+            formats["print"],
+            "```",
+        ]
+    )
@@ -0,0 +1,62 @@
+"""Output schema for the mindmap_generator_agent: one compact tree."""
+
+import re
+
+from pydantic import BaseModel, Field, model_validator
+
+from app.utils.material_cache import normalize_grade
+
+# Levels of a mindmap, the central topic included, by highest grade.
+DEPTH_BY_GRADE = [(2, 3), (5, 4), (8, 5), (12, 6)]
+DEFAULT_DEPTH = 4
+
+_NODE = re.compile(r"\s*(\d+)[.)]?\s+(.*\S)\s*$")
+
+
+def max_depth(grade: str | int) -> int:
+    """Levels allowed for a grade: 3 for grades 1-2 up to 6 for grades 9-12."""
+    level = normalize_grade(grade)
+    if not level.isdigit():
+        return DEFAULT_DEPTH
+    for highest, depth in DEPTH_BY_GRADE:
+        if int(level) <= highest:
+            return depth
+    return DEPTH_BY_GRADE[-1][1]
+
+
+class Mindmap(BaseModel):
+    topic: str = Field(description="The central topic.")
+    grade: str
+    # "<level> <label>" strings rather than objects: the tree costs a few
+    # tokens per node on top of its labels.
+    nodes: list[str] = Field(
+        description="Every branch in outline order, as its level and label: "
+        '"1 Inputs", "2 Sunlight", "3 Captured by chlorophyll", "2 Water", '
+        '"1 Outputs". Level 1 is a main branch; each branch follows its parent.'
+    )
+
+    def entries(self) -> list[tuple[int, str]]:
+        """(level, label) of every node, in outline order."""
+        return [
+            (int(level), label)
+            for level, label in (n.split(" ", 1) for n in self.nodes)
+        ]
+
+    @model_validator(mode="after")
+    def _limit_depth(self) -> "Mindmap":
+        """Repair skipped levels and drop nodes deeper than the grade allows."""
+        limit = max_depth(self.grade) - 1
+        kept: list[str] = []
+        previous = 0
+        for node in self.nodes:
+            match = _NODE.match(node)
+            # A node without a level continues at the level of the one before.
+            level, label = (
+                (int(match[1]), match[2]) if match else (previous, node.strip())
+            )
+            level = max(1, min(level, previous + 1))
+            if level <= limit and label:
+                kept.append(f"{level} {label}")
+                previous = level
+        self.nodes = kept
+        return self
@@ -0,0 +1,39 @@
+"""
+Generated mindmap trees, kept for reuse when the model is unavailable.
+
+Every tree the mindmap_generator_agent writes is stored in the material cache
+under its topic and grade; in degraded mode (see `app.utils.degraded`) a
+mindmap is rendered from the stored tree instead of generated.
+"""
+
+import json
+
+from google.adk.agents.callback_context import CallbackContext
+
+from app.utils.material_cache import get_material_cache
+
+from .schema import Mindmap
+
+TREE_MATERIAL = "mindmap_tree"
+
+
+def remember_tree(callback_context: CallbackContext) -> None:
+    """`after_agent_callback` storing the tree the agent just wrote."""
+    tree = callback_context.state.get("mindmap_output")
+    if not tree or not tree.get("topic"):
+        return
+    get_material_cache().put(
+        TREE_MATERIAL,
+        tree["topic"],
+        tree.get("grade", ""),
+        json.dumps(tree),
+        source=callback_context.agent_name,
+    )
+
+
+def cached_tree(topic: str, grade: str) -> Mindmap | None:
+    """The most recent tree generated for a topic and grade, if any."""
+    material = get_material_cache().get(TREE_MATERIAL, topic, grade)
+    if material is None:
+        return None
+    return Mindmap.model_validate_json(material.content)
@@ -1,19 +1,16 @@
 from google.adk.agents import LlmAgent
-from google.adk.tools import FunctionTool
+from app.utils.coalescing import coalesced_model
+
 from ... import prompt
-from .tools import generate_image_from_prompt, render_mermaid_diagram
+from ...rendering import generate_image_tool, render_mermaid_tool
 import os
 
 MODEL = os.getenv("MODEL")
 
 
-generate_image_tool = FunctionTool(func=generate_image_from_prompt)
-render_mermaid_tool = FunctionTool(func=render_mermaid_diagram)
-
-
 visual_guide_generator_agent = LlmAgent(
     name="visual_guide_generator_agent",
-    model=MODEL,
+    model=coalesced_model(MODEL),
     description=(
         "A specialized agent for creating step-by-step visual learning guides, instructional graphics, "
         "and educational visual aids. This agent breaks down complex concepts into digestible visual steps "
@@ -0,0 +1,675 @@
+"""
+Artifact storage for files generated by tools (images, diagrams, ...).
+
+Tools save their outputs as versioned ADK artifacts through
+`ToolContext.save_artifact` (see `save_file_artifact`), so they reach the
+client through the runner instead of being written to the working directory.
+Three pieces sit behind that:
+
+- `LocalArtifactService`, a filesystem backend for development, storing each
+  distinct content once under its SHA-256 and versions as small manifests,
+- `StreamingGcsArtifactService`, a GCS backend with chunked (resumable)
+  uploads off the event loop and the content hash stored as blob metadata,
+- `DeduplicatingGcsArtifactService`, the GCS backend used in deployments,
+  which also stores each distinct content once and keeps versions as
+  references to it,
+- `CachedArtifactService`, which wraps either one, caches version lists and
+  content hashes, and skips saving a new version whose content is identical to
+  the latest one.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+from pathlib import Path
+from typing import Any
+from urllib.parse import quote, unquote
+
+from google.adk.artifacts import BaseArtifactService, GcsArtifactService
+from google.adk.tools import ToolContext
+from google.genai import types
+
+from app.utils.metrics import counters
+
+STREAM_CHUNK_BYTES = 1024 * 1024
+# GCS resumable upload chunk size; must be a multiple of 256 KiB.
+GCS_CHUNK_BYTES = 8 * 1024 * 1024
+# Where DeduplicatingGcsArtifactService stores content, by SHA-256.
+CONTENT_PREFIX = "_blobs/"
+
+_counters = counters("artifacts")
+
+
+def _part_bytes(artifact: types.Part) -> tuple[bytes, str]:
+    if artifact.inline_data and artifact.inline_data.data is not None:
+        return artifact.inline_data.data, artifact.inline_data.mime_type or ""
+    return (artifact.text or "").encode(), "text/plain"
+
+
+def content_hash(artifact: types.Part) -> str:
+    """SHA-256 of an artifact's bytes."""
+    return hashlib.sha256(_part_bytes(artifact)[0]).hexdigest()
+
+
+def _scope(session_id: str, filename: str) -> str:
+    # Files named "user:..." are shared by all of a user's sessions.
+    return "user" if filename.startswith("user:") else session_id
+
+
+class LocalArtifactService(BaseArtifactService):
+    """
+    Artifacts on the local filesystem, for development.
+
+    Layout under `root`:
+
+        blobs/<sha[:2]>/<sha>                          content, stored once
+        <app>/<user>/<session>/<filename>/<version>.json   manifest per version
+    """
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.root / "blobs" / digest[:2] / digest
+
+    def _artifact_dir(
+        self, app_name: str, user_id: str, session_id: str, filename: str
+    ) -> Path:
+        return (
+            self.root
+            / quote(app_name, safe="")
+            / quote(user_id, safe="")
+            / quote(_scope(session_id, filename), safe="")
+            / quote(filename, safe="")
+        )
+
+    def _write_blob(self, data: bytes, digest: str) -> None:
+        path = self._blob_path(digest)
+        if path.exists():
+            _counters.inc("blobs_deduplicated")
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Stream into a temporary file and rename, so readers never see a
+        # partial blob and concurrent writers of the same content don't clash.
+        fd, tmp = tempfile.mkstemp(dir=path.parent)
+        with os.fdopen(fd, "wb") as f:
+            view = memoryview(data)
+            for start in range(0, len(view), STREAM_CHUNK_BYTES):
+                f.write(view[start : start + STREAM_CHUNK_BYTES])
+        os.replace(tmp, path)
+        _counters.inc("bytes_written", len(data))
+
+    def _versions(self, directory: Path) -> list[int]:
+        if not directory.is_dir():
+            return []
+        return sorted(int(p.stem) for p in directory.glob("*.json"))
+
+    def _save(
+        self,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        artifact: types.Part,
+    ) -> int:
+        data, mime_type = _part_bytes(artifact)
+        digest = hashlib.sha256(data).hexdigest()
+        self._write_blob(data, digest)
+        directory = self._artifact_dir(app_name, user_id, session_id, filename)
+        directory.mkdir(parents=True, exist_ok=True)
+        manifest = {"sha256": digest, "mime_type": mime_type, "size": len(data)}
+        with self._lock:
+            versions = self._versions(directory)
+            version = versions[-1] + 1 if versions else 0
+            (directory / f"{version}.json").write_text(json.dumps(manifest))
+        return version
+
+    def _manifest(
+        self,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        version: int | None,
+    ) -> dict[str, Any] | None:
+        directory = self._artifact_dir(app_name, user_id, session_id, filename)
+        if version is None:
+            versions = self._versions(directory)
+            if not versions:
+                return None
+            version = versions[-1]
+        path = directory / f"{version}.json"
+        return json.loads(path.read_text()) if path.exists() else None
+
+    def _load(
+        self,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        version: int | None,
+    ) -> types.Part | None:
+        manifest = self._manifest(app_name, user_id, session_id, filename, version)
+        if manifest is None:
+            return None
+        data = self._blob_path(manifest["sha256"]).read_bytes()
+        return types.Part.from_bytes(data=data, mime_type=manifest["mime_type"])
+
+    async def save_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        artifact: types.Part,
+    ) -> int:
+        return await asyncio.to_thread(
+            self._save, app_name, user_id, session_id, filename, artifact
+        )
+
+    async def load_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        version: int | None = None,
+    ) -> types.Part | None:
+        return await asyncio.to_thread(
+            self._load, app_name, user_id, session_id, filename, version
+        )
+
+    async def get_content_hash(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        version: int,
+    ) -> str | None:
+        """SHA-256 of a stored version, read from its manifest."""
+        manifest = await asyncio.to_thread(
+            self._manifest, app_name, user_id, session_id, filename, version
+        )
+        return manifest["sha256"] if manifest else None
+
+    async def list_artifact_keys(
+        self, *, app_name: str, user_id: str, session_id: str
+    ) -> list[str]:
+        user_dir = self.root / quote(app_name, safe="") / quote(user_id, safe="")
+        filenames: set[str] = set()
+        for scope in (quote(session_id, safe=""), "user"):
+            directory = user_dir / scope
+            if directory.is_dir():
+                filenames.update(unquote(p.name) for p in directory.iterdir())
+        return sorted(filenames)
+
+    async def delete_artifact(
+        self, *, app_name: str, user_id: str, session_id: str, filename: str
+    ) -> None:
+        # Blobs are left in place: other artifacts may share them.
+        directory = self._artifact_dir(app_name, user_id, session_id, filename)
+        for manifest in directory.glob("*.json"):
+            manifest.unlink()
+        if directory.is_dir():
+            directory.rmdir()
+
+    async def list_versions(
+        self, *, app_name: str, user_id: str, session_id: str, filename: str
+    ) -> list[int]:
+        return self._versions(
+            self._artifact_dir(app_name, user_id, session_id, filename)
+        )
+
+
+class StreamingGcsArtifactService(GcsArtifactService):
+    """
+    GcsArtifactService with chunked uploads that don't block the event loop.
+
+    The upstream service uploads each artifact in one blocking request; this
+    one streams it as a resumable upload from a worker thread and records the
+    content hash in the blob's metadata.
+    """
+
+    def __init__(self, bucket_name: str, client: Any = None, **kwargs: Any) -> None:
+        """
+        :param bucket_name: Bucket holding the artifacts
+        :param client: Storage client to use instead of a new
+            `google.cloud.storage.Client(**kwargs)`, e.g. a
+            `app.utils.local_gcs.LocalGcsClient` in tests
+        """
+        if client is None:
+            super().__init__(bucket_name=bucket_name, **kwargs)
+        else:
+            self.bucket_name = bucket_name
+            self.storage_client = client
+            self.bucket = client.bucket(bucket_name)
+
+    async def save_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        artifact: types.Part,
+    ) -> int:
+        data, mime_type = _part_bytes(artifact)
+        versions = await self.list_versions(
+            app_name=app_name, user_id=user_id, session_id=session_id, filename=filename
+        )
+        version = max(versions) + 1 if versions else 0
+        blob = self.bucket.blob(
+            self._get_blob_name(app_name, user_id, session_id, filename, version),
+            chunk_size=GCS_CHUNK_BYTES,
+        )
+        blob.metadata = {"sha256": hashlib.sha256(data).hexdigest()}
+        await asyncio.to_thread(
+            blob.upload_from_file, BytesIO(data), size=len(data), content_type=mime_type
+        )
+        _counters.inc("bytes_written", len(data))
+        return version
+
+    def _list_versions(
+        self, app_name: str, user_id: str, session_id: str, filename: str
+    ) -> list[int]:
+        blob_name = self._get_blob_name(app_name, user_id, session_id, filename, 0)
+        prefix = blob_name.rsplit("/", 1)[0] + "/"
+        blobs = self.storage_client.list_blobs(self.bucket, prefix=prefix)
+        return sorted(int(blob.name.rsplit("/", 1)[1]) for blob in blobs)
+
+    async def list_versions(
+        self, *, app_name: str, user_id: str, session_id: str, filename: str
+    ) -> list[int]:
+        return await asyncio.to_thread(
+            self._list_versions, app_name, user_id, session_id, filename
+        )
+
+    async def get_content_hash(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        version: int,
+    ) -> str | None:
+        """SHA-256 of a stored version, from blob metadata (one GCS lookup)."""
+        name = self._get_blob_name(app_name, user_id, session_id, filename, version)
+        blob = await asyncio.to_thread(self.bucket.get_blob, name)
+        return (blob.metadata or {}).get("sha256") if blob else None
+
+
+class _LruBytes:
+    """Byte strings by key, evicting the least recently used beyond `max_bytes`."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._items: OrderedDict[str, bytes] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+            return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                return
+            self._items[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+
+
+class DeduplicatingGcsArtifactService(StreamingGcsArtifactService):
+    """
+    Stores each distinct artifact content once in the bucket.
+
+    Content goes to `_blobs/<sha256>`, uploaded only if no artifact stored it
+    before; large contents are uploaded as parallel parts and composed server
+    side. The usual per-version objects (`<app>/<user>/<session>/<file>/<n>`)
+    become empty references carrying the hash in their metadata, so listing
+    and versioning work as before. Entries written by the plain
+    GcsArtifactService (no hash in their metadata) are still read directly.
+
+    Deleting an artifact removes its references; content blobs are shared and
+    left for a bucket lifecycle rule or a separate sweep.
+    """
+
+    def __init__(
+        self,
+        bucket_name: str,
+        client: Any = None,
+        *,
+        read_cache_bytes: int = 64 * 1024 * 1024,
+        composite_threshold: int = 32 * 1024 * 1024,
+        composite_parts: int = 8,
+        **kwargs: Any,
+    ) -> None:
+        """
+        :param read_cache_bytes: Size of the in-process LRU cache of content
+        :param composite_threshold: Contents at least this large are uploaded
+            as `composite_parts` parallel parts (at most 32, the GCS limit)
+        """
+        super().__init__(bucket_name, client, **kwargs)
+        self.composite_threshold = composite_threshold
+        self.composite_parts = min(composite_parts, 32)
+        self._read_cache = _LruBytes(read_cache_bytes)
+        self._stored: set[str] = set()
+
+    def _content_blob_name(self, digest: str) -> str:
+        return f"{CONTENT_PREFIX}{digest}"
+
+    async def _upload_composite(self, name: str, data: bytes, mime_type: str) -> None:
+        size = -(-len(data) // self.composite_parts)
+        parts = [
+            self.bucket.blob(f"{name}.part{index:02d}")
+            for index in range(-(-len(data) // size))
+        ]
+        await asyncio.gather(
+            *(
+                asyncio.to_thread(
+                    part.upload_from_string,
+                    data[index * size : (index + 1) * size],
+                    content_type=mime_type,
+                )
+                for index, part in enumerate(parts)
+            )
+        )
+        target = self.bucket.blob(name)
+        target.content_type = mime_type
+        await asyncio.to_thread(target.compose, parts)
+        await asyncio.gather(*(asyncio.to_thread(part.delete) for part in parts))
+        _counters.inc("composite_uploads")
+
+    async def _store_content(self, data: bytes, digest: str, mime_type: str) -> None:
+        name = self._content_blob_name(digest)
+        if digest in self._stored or await asyncio.to_thread(
+            self.bucket.blob(name).exists
+        ):
+            self._stored.add(digest)
+            _counters.inc("contents_deduplicated")
+            _counters.inc("bytes_deduplicated", len(data))
+            return
+        if len(data) >= self.composite_threshold:
+            await self._upload_composite(name, data, mime_type)
+        else:
+            blob = self.bucket.blob(name, chunk_size=GCS_CHUNK_BYTES)
+            await asyncio.to_thread(
+                blob.upload_from_file,
+                BytesIO(data),
+                size=len(data),
+                content_type=mime_type,
+            )
+        self._stored.add(digest)
+        self._read_cache.put(digest, data)
+        _counters.inc("bytes_written", len(data))
+
+    async def save_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        artifact: types.Part,
+    ) -> int:
+        data, mime_type = _part_bytes(artifact)
+        digest = hashlib.sha256(data).hexdigest()
+        versions = await self.list_versions(
+            app_name=app_name, user_id=user_id, session_id=session_id, filename=filename
+        )
+        version = max(versions) + 1 if versions else 0
+        await self._store_content(data, digest, mime_type)
+
+        reference = self.bucket.blob(
+            self._get_blob_name(app_name, user_id, session_id, filename, version)
+        )
+        reference.metadata = {"sha256": digest, "size": str(len(data))}
+        await asyncio.to_thread(
+            reference.upload_from_string, b"", content_type=mime_type
+        )
+        return version
+
+    async def load_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        version: int | None = None,
+    ) -> types.Part | None:
+        if version is None:
+            versions = await self.list_versions(
+                app_name=app_name,
+                user_id=user_id,
+                session_id=session_id,
+                filename=filename,
+            )
+            if not versions:
+                return None
+            version = max(versions)
+        name = self._get_blob_name(app_name, user_id, session_id, filename, version)
+        reference = await asyncio.to_thread(self.bucket.get_blob, name)
+        if reference is None:
+            return None
+        digest = (reference.metadata or {}).get("sha256")
+        if digest is None:
+            data = await asyncio.to_thread(reference.download_as_bytes)
+        elif (data := self._read_cache.get(digest)) is not None:
+            _counters.inc("read_cache_hits")
+        else:
+            _counters.inc("read_cache_misses")
+            content = self.bucket.blob(self._content_blob_name(digest))
+            data = await asyncio.to_thread(content.download_as_bytes)
+            self._read_cache.put(digest, data)
+        if not data:
+            return None
+        return types.Part.from_bytes(data=data, mime_type=reference.content_type)
+
+
+class CachedArtifactService(BaseArtifactService):
+    """
+    Caches artifact metadata of another artifact service and deduplicates saves.
+
+    Version lists, artifact keys and content hashes are cached for `ttl`
+    seconds and updated on this process's own writes, so repeated saves and
+    listings in a session don't each cost a storage lookup. Saving content
+    identical to an artifact's latest version returns that version instead of
+    uploading a copy.
+    """
+
+    def __init__(self, inner: BaseArtifactService, ttl: float = 60) -> None:
+        self.inner = inner
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._versions: dict[tuple[str, ...], tuple[float, list[int]]] = {}
+        self._keys: dict[tuple[str, ...], tuple[float, list[str]]] = {}
+        self._hashes: dict[tuple[str, ...], str] = {}
+
+    @staticmethod
+    def _key(
+        app_name: str, user_id: str, session_id: str, filename: str
+    ) -> tuple[str, ...]:
+        return app_name, user_id, _scope(session_id, filename), filename
+
+    def _fresh(self, entry: tuple[float, Any] | None) -> Any:
+        if entry and entry[0] > time.monotonic():
+            _counters.inc("metadata_hits")
+            return entry[1]
+        _counters.inc("metadata_misses")
+        return None
+
+    async def _latest_hash(
+        self, key: tuple[str, ...], session_id: str, version: int
+    ) -> str | None:
+        digest = self._hashes.get((*key, str(version)))
+        if digest is None and hasattr(self.inner, "get_content_hash"):
+            app_name, user_id, _, filename = key
+            digest = await self.inner.get_content_hash(
+                app_name=app_name,
+                user_id=user_id,
+                session_id=session_id,
+                filename=filename,
+                version=version,
+            )
+            if digest:
+                self._hashes[(*key, str(version))] = digest
+        return digest
+
+    async def save_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        artifact: types.Part,
+    ) -> int:
+        key = self._key(app_name, user_id, session_id, filename)
+        digest = content_hash(artifact)
+        versions = await self.list_versions(
+            app_name=app_name, user_id=user_id, session_id=session_id, filename=filename
+        )
+        if (
+            versions
+            and await self._latest_hash(key, session_id, max(versions)) == digest
+        ):
+            _counters.inc("saves_deduplicated")
+            return max(versions)
+
+        version = await self.inner.save_artifact(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            filename=filename,
+            artifact=artifact,
+        )
+        _counters.inc("saves")
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            self._versions[key] = (expires, sorted({*versions, version}))
+            self._hashes[(*key, str(version))] = digest
+            self._keys.pop((app_name, user_id, session_id), None)
+        return version
+
+    async def load_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        version: int | None = None,
+    ) -> types.Part | None:
+        if version is None:
+            versions = await self.list_versions(
+                app_name=app_name,
+                user_id=user_id,
+                session_id=session_id,
+                filename=filename,
+            )
+            if not versions:
+                return None
+            version = max(versions)
+        return await self.inner.load_artifact(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            filename=filename,
+            version=version,
+        )
+
+    async def list_artifact_keys(
+        self, *, app_name: str, user_id: str, session_id: str
+    ) -> list[str]:
+        cache_key = (app_name, user_id, session_id)
+        keys = self._fresh(self._keys.get(cache_key))
+        if keys is None:
+            keys = await self.inner.list_artifact_keys(
+                app_name=app_name, user_id=user_id, session_id=session_id
+            )
+            with self._lock:
+                self._keys[cache_key] = (time.monotonic() + self.ttl, keys)
+        return list(keys)
+
+    async def delete_artifact(
+        self, *, app_name: str, user_id: str, session_id: str, filename: str
+    ) -> None:
+        await self.inner.delete_artifact(
+            app_name=app_name, user_id=user_id, session_id=session_id, filename=filename
+        )
+        key = self._key(app_name, user_id, session_id, filename)
+        with self._lock:
+            self._versions.pop(key, None)
+            self._keys.pop((app_name, user_id, session_id), None)
+
+    async def list_versions(
+        self, *, app_name: str, user_id: str, session_id: str, filename: str
+    ) -> list[int]:
+        key = self._key(app_name, user_id, session_id, filename)
+        versions = self._fresh(self._versions.get(key))
+        if versions is None:
+            versions = await self.inner.list_versions(
+                app_name=app_name,
+                user_id=user_id,
+                session_id=session_id,
+                filename=filename,
+            )
+            with self._lock:
+                self._versions[key] = (time.monotonic() + self.ttl, versions)
+        return list(versions)
+
+
+_service: BaseArtifactService | None = None
+
+
+def get_artifact_service() -> BaseArtifactService:
+    """The artifact service configured for this process (GCS or local)."""
+    global _service
+    if _service is None:
+        from app.config import config
+
+        inner: BaseArtifactService
+        if config.artifact_bucket:
+            inner = DeduplicatingGcsArtifactService(config.artifact_bucket)
+        else:
+            inner = LocalArtifactService(config.artifact_dir)
+        _service = CachedArtifactService(inner)
+    return _service
+
+
+async def save_file_artifact(
+    tool_context: ToolContext, filename: str, path: str | Path, mime_type: str
+) -> int | None:
+    """
+    Save a generated file as a versioned artifact of the current session.
+
+    Returns the version, or None when the runner has no artifact service.
+    """
+    if tool_context._invocation_context.artifact_service is None:
+        return None
+    data = await asyncio.to_thread(Path(path).read_bytes)
+    return await tool_context.save_artifact(
+        filename, types.Part.from_bytes(data=data, mime_type=mime_type)
+    )
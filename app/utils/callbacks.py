@@ -0,0 +1,26 @@
+"""Adding callbacks to agents alongside the ones they already have."""
+
+from typing import Any
+
+from google.adk.agents import BaseAgent
+
+
+def callback_list(existing: Any) -> list:
+    """An agent's callback field (None, one callback or a list) as a list."""
+    if existing is None:
+        return []
+    return existing if isinstance(existing, list) else [existing]
+
+
+def add_callback(
+    agent: BaseAgent, attribute: str, callback: Any, first: bool = True
+) -> None:
+    """
+    Add `callback` to the callbacks `agent` has in `attribute`.
+
+    :param first: Run it before the existing callbacks; otherwise after them
+    """
+    callbacks = callback_list(getattr(agent, attribute))
+    setattr(
+        agent, attribute, [callback, *callbacks] if first else [*callbacks, callback]
+    )
@@ -0,0 +1,177 @@
+"""
+Cancellation of agent runs whose client has gone away.
+
+When a teacher closes the tab or asks again mid-generation, the frontend
+aborts `/api/run_sse` and the proxy closes its connection to the backend.
+Without help, the agent run does not notice until it writes its next event,
+so sub-agents, image generation and Mermaid renders run to completion for
+nobody. Three pieces close the gap:
+
+- `CancelOnDisconnect`, ASGI middleware that watches for the client's
+  disconnect while the response streams and cancels the request's task. The
+  cancellation runs down the runner's generator chain into whatever each
+  agent is awaiting: model calls, tool calls, renders.
+- `CancellableRunner`, an ADK runner that gives every run a
+  `CancellationScope`. Work that runs outside the run's own task (such as a
+  speculative leaf run) registers there and is cancelled with the run.
+- `model_call_cancelled`, called by the model wrappers, which counts
+  cancelled model calls and estimates the output tokens they would still
+  have generated, from the mean output of the same agent's finished calls.
+
+Counters are under "cancellation".
+"""
+
+import asyncio
+import contextvars
+from collections.abc import AsyncGenerator, Callable, Collection
+from typing import Any
+
+from google.adk.events import Event
+from google.adk.runners import Runner
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.metrics import counters
+
+_counters = counters("cancellation")
+
+
+class CancellationScope:
+    """Work belonging to one agent run, cancelled if the run is."""
+
+    def __init__(self) -> None:
+        self._tasks: set[asyncio.Task[Any]] = set()
+        self._callbacks: list[Callable[[], None]] = []
+
+    def track(self, task: "asyncio.Task[Any]") -> None:
+        """Cancel `task` with the run unless it has finished by then."""
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def on_cancel(self, callback: Callable[[], None]) -> None:
+        self._callbacks.append(callback)
+
+    def cancel(self) -> None:
+        for task in list(self._tasks):
+            if not task.done():
+                task.cancel()
+                _counters.inc("background_tasks")
+        for callback in self._callbacks:
+            callback()
+        self._tasks.clear()
+        self._callbacks.clear()
+
+
+_scope: contextvars.ContextVar[CancellationScope | None] = contextvars.ContextVar(
+    "cancellation_scope", default=None
+)
+
+
+def current_scope() -> CancellationScope | None:
+    """The scope of the run the caller belongs to, if it runs in one."""
+    return _scope.get()
+
+
+class CancellableRunner(Runner):
+    """Runner that cancels a run's background work when the run is cancelled."""
+
+    async def run_async(self, **kwargs: Any) -> AsyncGenerator[Event, None]:
+        scope = CancellationScope()
+        # Not reset: the run's generator may be resumed from another context.
+        _scope.set(scope)
+        try:
+            async for event in super().run_async(**kwargs):
+                yield event
+        except (asyncio.CancelledError, GeneratorExit):
+            _counters.inc("runs")
+            scope.cancel()
+            raise
+
+
+class _OutputTokens:
+    """Running mean of output tokens per agent, from finished model calls."""
+
+    def __init__(self) -> None:
+        self._totals: dict[str, tuple[int, int]] = {}
+
+    def add(self, key: str, tokens: int) -> None:
+        total, calls = self._totals.get(key, (0, 0))
+        self._totals[key] = (total + tokens, calls + 1)
+
+    def mean(self, key: str) -> float:
+        total, calls = self._totals.get(key, (0, 0))
+        return total / calls if calls else 0.0
+
+
+_output_tokens = _OutputTokens()
+
+
+def model_call_finished(key: str, output_tokens: int) -> None:
+    """Record the output of a finished model call of `key` (an agent or model)."""
+    _output_tokens.add(key, output_tokens)
+
+
+def model_call_cancelled(key: str, output_tokens: int) -> None:
+    """Record a model call cancelled after producing `output_tokens`."""
+    _counters.inc("model_calls")
+    _counters.inc("tokens_saved", max(0.0, _output_tokens.mean(key) - output_tokens))
+
+
+class CancelOnDisconnect:
+    """
+    ASGI middleware cancelling streaming requests whose client disconnects.
+
+    Starlette only notices a disconnect when it next writes to the socket,
+    which for an agent run can be minutes later. This reads the request body
+    up front, hands the application a replay of it, and watches the
+    connection for the rest of the request.
+    """
+
+    def __init__(self, app: ASGIApp, paths: Collection[str] = ("/run_sse",)) -> None:
+        self.app = app
+        self.paths = set(paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        body: list[Message] = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                _counters.inc("disconnects")
+                return
+            body.append(message)
+            if not message.get("more_body"):
+                break
+
+        disconnected = asyncio.Event()
+
+        async def replay() -> Message:
+            if body:
+                return body.pop(0)
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def watch() -> None:
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        request = asyncio.ensure_future(self.app(scope, replay, send))
+        watcher = asyncio.create_task(watch())
+        cancelled = False
+        try:
+            await asyncio.wait({request, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            if not request.done():
+                cancelled = True
+                _counters.inc("disconnects")
+                disconnected.set()
+                request.cancel()
+            watcher.cancel()
+        try:
+            await request
+        except asyncio.CancelledError:
+            # Nobody is left to answer once the client has gone.
+            if not cancelled:
+                raise
@@ -0,0 +1,378 @@
+"""
+Record and replay of model calls, for deterministic performance testing.
+
+In record mode every Gemini call, streamed chunks and their timings included,
+is written to a cassette: a gzip-compressed JSON-lines file. In replay mode
+the calls are answered from the cassette instead of Vertex, with the recorded
+latencies preserved, scaled or zeroed, so a recorded session can be run again
+offline through new caching, routing or prompt code, and its CPU and
+wall-clock time compared exactly between revisions (see
+`app.benchmarks.replay`).
+
+The transport sits below `HedgedGemini` and `CoalescingGemini`: hedging,
+coalescing, speculation and deadlines all run as usual on top of it. A
+replayed request is matched to a recording by a fingerprint of the request;
+a request that changed (a reworded instruction, compacted history) falls back
+to the agent's next unused recording, in recorded order.
+
+Configured with MODEL_CASSETTE, MODEL_CASSETTE_MODE and
+MODEL_CASSETTE_LATENCY; counters are under "cassette".
+"""
+
+import asyncio
+import atexit
+import gzip
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from collections.abc import AsyncGenerator, Callable
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import Gemini, LlmRequest, LlmResponse
+from google.genai import errors
+
+from app.utils.callbacks import add_callback
+from app.utils.coalescing import fingerprint
+from app.utils.metrics import counters
+
+CASSETTE_VERSION = 1
+# Label ADK puts on every model request, naming the agent that sends it.
+_AGENT_LABEL = "adk_agent_name"
+
+# MODEL_CASSETTE_LATENCY names, besides a plain scale factor.
+_LATENCY = {"preserve": 1.0, "zero": 0.0}
+
+_counters = counters("cassette")
+
+
+class CassetteMiss(LookupError):
+    """A replayed model request that the cassette has no recording for."""
+
+
+@dataclass
+class Recording:
+    """One model call: the request's fingerprint and everything it answered."""
+
+    key: str
+    agent: str
+    model: str
+    stream: bool
+    session: str = ""
+    invocation: str = ""
+    user: str = ""
+    """The teacher's message that started the invocation."""
+    started: float = 0.0
+    """Seconds from the start of the recording to the call."""
+    chunks: list[dict[str, Any]] = field(default_factory=list)
+    offsets: list[float] = field(default_factory=list)
+    """Seconds from the call to each chunk."""
+    error: dict[str, Any] | None = None
+    """How the call failed after its chunks, if it did."""
+    duration: float = 0.0
+
+
+def request_key(llm_request: LlmRequest, stream: bool) -> str:
+    """Fingerprint of everything that determines a model request's answer."""
+    config = (
+        llm_request.config.model_dump(
+            mode="json", exclude_none=True, exclude={"http_options", "labels"}
+        )
+        if llm_request.config
+        else {}
+    )
+    contents = [
+        c.model_dump(mode="json", exclude_none=True) for c in llm_request.contents
+    ]
+    return fingerprint(llm_request.model, contents, config, stream)
+
+
+def _agent(llm_request: LlmRequest) -> str:
+    labels = (llm_request.config and llm_request.config.labels) or {}
+    return labels.get(_AGENT_LABEL, "")
+
+
+def _error_record(error: BaseException) -> dict[str, Any]:
+    if isinstance(error, errors.APIError):
+        return {"type": "api", "code": error.code, "message": error.message}
+    return {"type": type(error).__name__, "message": str(error)}
+
+
+def _raise_recorded(error: dict[str, Any]) -> None:
+    if error["type"] == "api":
+        raise errors.APIError(
+            error["code"],
+            {"error": {"code": error["code"], "message": error["message"]}},
+        )
+    if error["type"] in ("TimeoutError", "DeadlineExceeded"):
+        raise TimeoutError(error["message"])
+    raise ConnectionError(error["message"])
+
+
+class Cassette:
+    """Recordings of model calls, in a gzip-compressed JSON-lines file."""
+
+    def __init__(self, path: str | Path, recordings: list[Recording] | None = None):
+        self.path = Path(path)
+        self.recordings = recordings or []
+        self._lock = threading.Lock()
+        self._file: gzip.GzipFile | None = None
+        self._by_key: dict[str, deque[Recording]] = defaultdict(deque)
+        self._by_agent: dict[str, deque[Recording]] = defaultdict(deque)
+        self._used: set[int] = set()
+        for recording in self.recordings:
+            self._by_key[recording.key].append(recording)
+            self._by_agent[recording.agent].append(recording)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "Cassette":
+        recordings = []
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if header.get("version") != CASSETTE_VERSION:
+                raise ValueError(f"{path}: unsupported cassette {header}")
+            try:
+                for line in f:
+                    recordings.append(Recording(**json.loads(line)))
+            except (EOFError, json.JSONDecodeError):
+                # Recording stopped without closing the file; every complete
+                # line before that is still good.
+                pass
+        return cls(path, recordings)
+
+    def append(self, recording: Recording) -> None:
+        """Add a recording and write it out at once, so a crash loses little."""
+        line = json.dumps(asdict(recording), ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                new = not self.path.exists()
+                self._file = gzip.open(self.path, "ab")
+                if new:
+                    header = {"version": CASSETTE_VERSION, "created_at": time.time()}
+                    self._file.write((json.dumps(header) + "\n").encode())
+            self._file.write(line.encode())
+            # A sync flush keeps the file readable without ending the gzip member.
+            self._file.flush()
+            self.recordings.append(recording)
+        _counters.inc("recorded")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def match(self, key: str, agent: str) -> Recording | None:
+        """
+        The recording answering a request: the next one made for an identical
+        request (the last one again once they are used up), else the agent's
+        next unused recording.
+        """
+        with self._lock:
+            exact = self._by_key.get(key)
+            if exact:
+                recording = exact.popleft() if len(exact) > 1 else exact[0]
+                self._used.add(id(recording))
+                _counters.inc("replayed_exact")
+                return recording
+            queue = self._by_agent.get(agent)
+            while queue:
+                recording = queue.popleft()
+                if id(recording) not in self._used:
+                    self._used.add(id(recording))
+                    _counters.inc("replayed_by_order")
+                    return recording
+        return None
+
+    def sessions(self) -> list[list[str]]:
+        """The teachers' messages of each recorded session, in order."""
+        turns: dict[str, dict[str, str]] = {}
+        for recording in sorted(self.recordings, key=lambda r: r.started):
+            if recording.session and recording.user:
+                invocations = turns.setdefault(recording.session, {})
+                invocations.setdefault(recording.invocation, recording.user)
+        return [list(invocations.values()) for invocations in turns.values()]
+
+
+@dataclass
+class _CallContext:
+    session: str
+    invocation: str
+    user: str
+
+
+_call_context: ContextVar[_CallContext | None] = ContextVar(
+    "cassette_call", default=None
+)
+
+
+class CassetteTransport:
+    """Serves Gemini calls from a cassette, or records them to one."""
+
+    def __init__(
+        self,
+        cassette: Cassette,
+        mode: str,
+        latency_scale: float = 1.0,
+        strict: bool = False,
+    ) -> None:
+        """
+        :param cassette: Where calls are recorded to or replayed from
+        :param mode: "record" or "replay"
+        :param latency_scale: In replay, recorded latencies are multiplied by
+            this: 1 preserves them, 0 answers at once
+        :param strict: In replay, fail requests the cassette has no recording
+            for with `CassetteMiss`, instead of calling the model
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode {mode!r}")
+        self.cassette = cassette
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.strict = strict
+        self._start = time.monotonic()
+        self._real: Callable[..., AsyncGenerator[LlmResponse, None]] | None = None
+
+    async def generate(
+        self, model: Gemini, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        assert self._real is not None
+        key = request_key(llm_request, stream)
+        agent = _agent(llm_request)
+        if self.mode == "replay":
+            recording = self.cassette.match(key, agent)
+            if recording is not None:
+                async for response in self._replay(recording):
+                    yield response
+                return
+            _counters.inc("misses")
+            if self.strict:
+                raise CassetteMiss(
+                    f"No recording for a request of {agent or 'an agent'}"
+                )
+            async for response in self._real(model, llm_request, stream):
+                yield response
+            return
+
+        context = _call_context.get()
+        recording = Recording(
+            key=key,
+            agent=agent,
+            model=llm_request.model or model.model,
+            stream=stream,
+            session=context.session if context else "",
+            invocation=context.invocation if context else "",
+            user=context.user if context else "",
+            started=time.monotonic() - self._start,
+        )
+        start = time.monotonic()
+        try:
+            async for response in self._real(model, llm_request, stream):
+                recording.offsets.append(time.monotonic() - start)
+                recording.chunks.append(
+                    response.model_dump(mode="json", exclude_none=True)
+                )
+                yield response
+        except asyncio.CancelledError:
+            # An abandoned call (a losing hedge, a closed tab) is not a recording.
+            raise
+        except Exception as e:
+            recording.error = _error_record(e)
+            raise
+        finally:
+            recording.duration = time.monotonic() - start
+            if recording.error is not None or recording.chunks:
+                self.cassette.append(recording)
+
+    async def _replay(self, recording: Recording) -> AsyncGenerator[LlmResponse, None]:
+        start = time.monotonic()
+        for offset, chunk in zip(recording.offsets, recording.chunks, strict=True):
+            delay = start + offset * self.latency_scale - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield LlmResponse.model_validate(chunk)
+        if recording.error is not None:
+            delay = start + recording.duration * self.latency_scale - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            _raise_recorded(recording.error)
+
+    def before_model_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> None:
+        """Tag recorded calls with their session and the teacher's message."""
+        ctx = callback_context._invocation_context
+        user = ctx.user_content
+        text = (
+            " ".join(part.text for part in (user.parts or []) if part.text)
+            if user
+            else ""
+        )
+        _call_context.set(_CallContext(ctx.session.id, ctx.invocation_id, text))
+
+    def install(self, agent: BaseAgent | None = None) -> None:
+        """
+        Route every Gemini call in the process through the transport and, in
+        record mode, tag the calls of `agent` and its sub-agents.
+        """
+        global _active
+        if _active is not None:
+            raise RuntimeError("A cassette transport is already installed")
+        _active = self
+        self._real = _gemini_generate
+        Gemini.generate_content_async = _generate  # type: ignore[method-assign]
+        if agent is not None and self.mode == "record":
+            self._tag(agent)
+
+    def _tag(self, agent: BaseAgent) -> None:
+        if isinstance(agent, LlmAgent):
+            add_callback(
+                agent, "before_model_callback", self.before_model_callback, first=False
+            )
+        for sub_agent in agent.sub_agents:
+            self._tag(sub_agent)
+
+    def uninstall(self) -> None:
+        global _active
+        Gemini.generate_content_async = _gemini_generate  # type: ignore[method-assign]
+        _active = None
+        self.cassette.close()
+
+
+_gemini_generate = Gemini.generate_content_async
+_active: CassetteTransport | None = None
+
+
+def _generate(
+    self: Gemini, llm_request: LlmRequest, stream: bool = False
+) -> AsyncGenerator[LlmResponse, None]:
+    if _active is None:
+        return _gemini_generate(self, llm_request, stream)
+    return _active.generate(self, llm_request, stream)
+
+
+def configure(agent: BaseAgent) -> CassetteTransport | None:
+    """Install the transport MODEL_CASSETTE_MODE asks for, if any."""
+    from app.config import config
+
+    if not config.model_cassette_mode:
+        return None
+    mode = config.model_cassette_mode
+    path = Path(config.model_cassette_path)
+    cassette = Cassette.load(path) if mode == "replay" else Cassette(path)
+    latency = config.model_cassette_latency
+    transport = CassetteTransport(
+        cassette,
+        mode,
+        latency_scale=_LATENCY[latency] if latency in _LATENCY else float(latency),
+    )
+    transport.install(agent)
+    if mode == "record":
+        atexit.register(cassette.close)
+    return transport
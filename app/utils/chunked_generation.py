@@ -0,0 +1,276 @@
+"""
+Chunked generation for agents with very long outputs.
+
+A full week of lessons or several worksheet variations in one generation
+streams slowly, overflows tracing spans and gets re-read wholesale by the
+managers. ChunkedGenerationAgent instead splits the output into chunks (a day,
+a variation, ...), generates each one under a per-chunk output token budget,
+and continues a chunk only if the model ran out of tokens.
+
+Each chunk is stored in its own state key (`<output_key>_<chunk key>`) and the
+agent's `output_key` holds the list of those keys, so consumers can load only
+the chunks they need.
+"""
+
+import asyncio
+from collections.abc import AsyncGenerator, Callable, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from app.utils.metrics import counters
+
+# How much of a truncated chunk is quoted back when asking for a continuation.
+CONTINUATION_TAIL_CHARS = 1500
+
+_counters = counters("chunked_generation")
+
+
+@dataclass
+class Chunk:
+    """One independently generated part of a long output."""
+
+    key: str
+    """Short identifier, used in state keys (e.g. "day_1")."""
+    brief: str
+    """What to generate for this chunk, appended to the generator's prompt."""
+
+
+ChunkPlanner = Callable[[Mapping[str, Any], str], list[Chunk]]
+"""Splits a request into chunks, given session state and the teacher's request."""
+
+
+def chunk_instruction(prompt: str) -> Callable[[ReadonlyContext], str]:
+    """
+    Instruction provider for a chunk generator.
+
+    ChunkedGenerationAgent runs the generator with the chunk brief as the
+    invocation's user content; it is appended to the static prompt so the
+    prompt itself stays a cacheable prefix.
+    """
+    prefix = prompt.rstrip() + "\n\n"
+
+    def instruction(context: ReadonlyContext) -> str:
+        return prefix + _text(context.user_content)
+
+    return instruction
+
+
+def _text(content: types.Content | None) -> str:
+    if not content or not content.parts:
+        return ""
+    return "".join(
+        part.text for part in content.parts if part.text and not part.thought
+    )
+
+
+def run_with_brief(
+    agent: BaseAgent, ctx: InvocationContext, branch: str, brief: str
+) -> AsyncGenerator[Event, None]:
+    """Run `agent` on its own branch with `brief` as the invocation's user content."""
+    brief_ctx = ctx.model_copy(
+        update={
+            "branch": branch,
+            "user_content": types.Content(role="user", parts=[types.Part(text=brief)]),
+        }
+    )
+    return agent.run_async(brief_ctx)
+
+
+class ChunkedGenerationAgent(BaseAgent):
+    """
+    Generates a long output chunk by chunk with a budgeted generator agent.
+
+    The generator should use `chunk_instruction`, `include_contents="none"`
+    and a `max_output_tokens` budget in its `generate_content_config`. Each
+    chunk runs on its own branch, so chunks never see each other's drafts.
+    """
+
+    generator: LlmAgent
+    plan_chunks: ChunkPlanner
+    output_key: str
+    max_continuations: int = 2
+    max_concurrency: int = 1
+    """Chunks generated at once; 1 keeps them streaming in order."""
+
+    def __init__(self, *, generator: LlmAgent, **kwargs: Any) -> None:
+        super().__init__(generator=generator, sub_agents=[generator], **kwargs)  # type: ignore[call-arg]
+
+    @property
+    def max_output_tokens(self) -> int | None:
+        config = self.generator.generate_content_config
+        return config.max_output_tokens if config else None
+
+    def chunk_state_key(self, chunk: Chunk) -> str:
+        return f"{self.output_key}_{chunk.key}"
+
+    def _is_truncated(self, final_text: str | None, last: Event | None) -> bool:
+        # When streaming, a response cut off at the token limit never gets its
+        # aggregated (non-partial) event, so a missing one means truncation.
+        if final_text is None:
+            return True
+        usage = last.usage_metadata if last else None
+        if not usage or not self.max_output_tokens:
+            return False
+        used = (usage.candidates_token_count or 0) + (usage.thoughts_token_count or 0)
+        return used >= self.max_output_tokens
+
+    async def generate_chunk(
+        self, ctx: InvocationContext, index: int, chunk: Chunk, out: list[str]
+    ) -> AsyncGenerator[Event, None]:
+        """Generate one chunk, continuing it if cut off; its text goes to `out`."""
+        request = _text(ctx.user_content)
+        branch = f"{ctx.branch or self.name}.{index:02d}_{chunk.key}"
+        text = ""
+        for attempt in range(self.max_continuations + 1):
+            brief = f"Teacher's request: {request}\n\n{chunk.brief}"
+            if attempt:
+                _counters.inc("continuations")
+                brief += (
+                    "\n\nYour previous answer for this part was cut off. It ended "
+                    f"with:\n\n{text[-CONTINUATION_TAIL_CHARS:]}\n\n"
+                    "Continue exactly where it stopped. Do not repeat anything."
+                )
+
+            partial_text = ""
+            final_text: str | None = None
+            last: Event | None = None
+            try:
+                async for event in run_with_brief(self.generator, ctx, branch, brief):
+                    if event.author == self.generator.name:
+                        last = event
+                        piece = _text(event.content)
+                        if event.partial:
+                            partial_text += piece
+                        elif piece:
+                            final_text = piece
+                    yield event
+            except ValueError as e:
+                # ADK's flow raises this when a stream ends on a partial event.
+                if "max output limit" not in str(e):
+                    raise
+
+            text += final_text if final_text is not None else partial_text
+            if not self._is_truncated(final_text, last):
+                break
+        else:
+            _counters.inc("truncated_chunks")
+        _counters.inc("chunks")
+        out.append(text)
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        chunks = self.plan_chunks(ctx.session.state, _text(ctx.user_content))
+        outputs: list[list[str]] = [[] for _ in chunks]
+        runs = [
+            self.generate_chunk(ctx, index, chunk, outputs[index - 1])
+            for index, chunk in enumerate(chunks, start=1)
+        ]
+        async for event in merge_event_streams(runs, self.max_concurrency):
+            yield event
+
+        state_delta: dict[str, Any] = {
+            self.chunk_state_key(chunk): "".join(output)
+            for chunk, output in zip(chunks, outputs, strict=True)
+        }
+        state_delta[self.output_key] = [self.chunk_state_key(c) for c in chunks]
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta=state_delta),
+        )
+
+
+async def merge_event_streams(
+    runs: list[AsyncGenerator[Event, None]], max_concurrency: int
+) -> AsyncGenerator[Event, None]:
+    """
+    Interleave events from up to `max_concurrency` runs at a time.
+
+    Like ParallelAgent, each run is driven by a single task (so tracing spans
+    open and close in the same context) and only advances once its previous
+    event has been consumed, so the runner persists events in yield order.
+    """
+    if max_concurrency <= 1:
+        for run in runs:
+            async for item in run:
+                yield item
+        return
+
+    queue: asyncio.Queue[tuple[Event | None, asyncio.Event | None]] = asyncio.Queue()
+    slots = asyncio.Semaphore(max_concurrency)
+
+    async def drive(run: AsyncGenerator[Event, None]) -> None:
+        try:
+            async with slots:
+                async for event in run:
+                    consumed = asyncio.Event()
+                    await queue.put((event, consumed))
+                    await consumed.wait()
+        finally:
+            queue.put_nowait((None, None))
+
+    tasks = [asyncio.create_task(drive(run)) for run in runs]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            event, consumed = await queue.get()
+            if event is None:
+                remaining -= 1
+                continue
+            yield event
+            if consumed:
+                consumed.set()
+        # Surface exceptions from the runs.
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def merge_final_events(
+    runs: Mapping[Any, AsyncGenerator[Event, None]], max_concurrency: int
+) -> AsyncGenerator[Event, None]:
+    """
+    The runs' final events, all of one run before any of the next.
+
+    The runs still go concurrently; their streamed chunks are dropped, since
+    the frontend appends every text chunk of an author to one message and
+    would splice concurrent runs together mid-sentence. Events of a later run
+    are held back until the runs before it are done.
+    """
+    owners: dict[int, Any] = {}
+    finished: set[Any] = set()
+    held: dict[Any, list[Event]] = {key: [] for key in runs}
+    order = list(runs)
+
+    async def final_events(
+        key: Any, run: AsyncGenerator[Event, None]
+    ) -> AsyncGenerator[Event, None]:
+        async for event in run:
+            if not event.partial:
+                owners[id(event)] = key
+                yield event
+        finished.add(key)
+
+    async for event in merge_event_streams(
+        [final_events(key, run) for key, run in runs.items()], max_concurrency
+    ):
+        held[owners.pop(id(event))].append(event)
+        while order:
+            for ready in held[order[0]]:
+                yield ready
+            held[order[0]].clear()
+            if order[0] not in finished:
+                break
+            order.pop(0)
+    for key in order:
+        for ready in held[key]:
+            yield ready
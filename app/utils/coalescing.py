@@ -0,0 +1,297 @@
+"""
+Single-flight coalescing of identical in-flight work.
+
+When many teachers ask for the same material within seconds of each other,
+only the first request (the leader) does the work; identical requests that
+arrive while it is still running await the leader's result instead of starting
+their own model call, image generation or diagram render.
+"""
+
+import asyncio
+import hashlib
+import json
+from collections.abc import AsyncGenerator, AsyncIterator, Awaitable, Callable
+from typing import Any, Generic, TypeVar
+
+from google.adk.models import LlmRequest, LlmResponse
+from pydantic import BaseModel
+
+from app.utils import speculation
+from app.utils.hedging import HedgedGemini
+from app.utils.metrics import Counters, counters
+
+T = TypeVar("T")
+
+
+class _LeaderCancelled(Exception):
+    """The leader gave up before finishing; followers must do the work themselves."""
+
+
+class _Broadcast(Generic[T]):
+    """Fan-out of a leader's stream to any number of late subscribers."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        self.items: list[T] = []
+        self.error: BaseException | None = None
+        self.done = False
+        self._waiter: asyncio.Future[None] = loop.create_future()
+
+    def publish(self, item: T) -> None:
+        self.items.append(item)
+        self._wake()
+
+    def close(self, error: BaseException | None = None) -> None:
+        self.error = error
+        self.done = True
+        self._wake()
+
+    def _wake(self) -> None:
+        waiter, self._waiter = self._waiter, self.loop.create_future()
+        waiter.set_result(None)
+
+    async def subscribe(self) -> AsyncIterator[T]:
+        index = 0
+        while True:
+            while index < len(self.items):
+                yield self.items[index]
+                index += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            # Shielded so a cancelled subscriber doesn't cancel the shared waiter.
+            await asyncio.shield(self._waiter)
+
+
+async def _numbered(items: AsyncIterator[T]) -> AsyncIterator[tuple[int, T]]:
+    """`enumerate` for async iterators."""
+    index = 0
+    async for item in items:
+        yield index, item
+        index += 1
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key onto one in-flight execution.
+
+    Results are shared, not cached: once the leader finishes, the next request
+    with the same key starts a fresh execution.
+    """
+
+    def __init__(self, name: str, model_call: bool = False) -> None:
+        """
+        :param name: Name of the group, used as the metrics namespace suffix
+        :param model_call: Whether each execution costs a model call, so that
+            coalesced requests are also counted as model calls saved
+        """
+        self.name = name
+        self.model_call = model_call
+        self.counters: Counters = counters(f"coalescing.{name}")
+        self._calls: dict[str, asyncio.Future[Any]] = {}
+        self._streams: dict[str, _Broadcast[Any]] = {}
+
+    def _count_coalesced(self) -> None:
+        self.counters.inc("coalesced")
+        if self.model_call:
+            self.counters.inc("model_calls_saved")
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run `fn`, or await the identical call already in flight for `key`."""
+        self.counters.inc("requests")
+        loop = asyncio.get_running_loop()
+        while True:
+            call = self._calls.get(key)
+            if call is None or call.get_loop() is not loop:
+                break
+            try:
+                result = await asyncio.shield(call)
+            except _LeaderCancelled:
+                continue
+            self._count_coalesced()
+            return result
+
+        future: asyncio.Future[T] = loop.create_future()
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except (asyncio.CancelledError, GeneratorExit):
+            future.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            # Mark the outcome as retrieved so an unawaited failure isn't logged.
+            if future.done() and not future.cancelled():
+                future.exception()
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    async def stream(
+        self,
+        key: str,
+        factory: Callable[[], AsyncIterator[T]],
+        share: Callable[[T], T] | None = None,
+        finished: Callable[[T], bool] | None = None,
+    ) -> AsyncIterator[T]:
+        """
+        Iterate `factory()`, or follow the identical stream already in flight.
+
+        Followers receive every item the leader has produced so far and then
+        each new item as it arrives. `share` copies items handed to followers so
+        that no two consumers mutate the same object.
+
+        If the leader gives up (its own request was cancelled), its followers
+        take over: the first to notice starts `factory()` itself and the
+        others follow it. A follower that had already received items skips as
+        many from the new stream and goes on from there, or stops if its last
+        item was one that `finished` says completes the stream for its
+        consumer.
+        """
+        self.counters.inc("requests")
+        loop = asyncio.get_running_loop()
+        # Items already handed to the consumer, across takeovers.
+        delivered = 0
+        last: list[T] = []
+        while True:
+            broadcast = self._streams.get(key)
+            if broadcast is None or broadcast.loop is not loop:
+                break
+            try:
+                async for index, item in _numbered(broadcast.subscribe()):
+                    if index < delivered:
+                        continue
+                    delivered += 1
+                    last[:] = [item]
+                    yield share(item) if share else item
+            except _LeaderCancelled:
+                if last and finished is not None and finished(last[0]):
+                    return
+                if last:
+                    self.counters.inc("takeovers")
+                continue
+            self._count_coalesced()
+            return
+
+        broadcast = _Broadcast(loop)
+        self._streams[key] = broadcast
+        try:
+            async for index, item in _numbered(factory()):
+                broadcast.publish(item)
+                if index >= delivered:
+                    yield item
+        except (asyncio.CancelledError, GeneratorExit):
+            broadcast.close(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            broadcast.close(e)
+            raise
+        else:
+            broadcast.close()
+        finally:
+            if self._streams.get(key) is broadcast:
+                del self._streams[key]
+
+
+def fingerprint(*parts: Any) -> str:
+    """Stable hash of JSON-serialisable parts, for use as a coalescing key."""
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# Shared groups, so identical work is coalesced across every agent that uses it.
+model_calls = SingleFlight("leaf_generation", model_call=True)
+image_generation = SingleFlight("image_generation", model_call=True)
+mermaid_render = SingleFlight("mermaid_render")
+
+
+def _request_key(llm_request: LlmRequest, stream: bool) -> str:
+    """
+    Key a model request by everything that determines its answer: the model,
+    the whole conversation, the system instruction and the generation config.
+    """
+    contents = [
+        content.model_dump(mode="json", exclude_none=True)
+        for content in llm_request.contents
+    ]
+    config = None
+    if llm_request.config:
+        config = llm_request.config.model_dump(
+            mode="json", exclude_none=True, exclude={"http_options", "response_schema"}
+        )
+        # Structured leaves pass their pydantic class, which doesn't serialise.
+        schema = llm_request.config.response_schema
+        if isinstance(schema, type) and issubclass(schema, BaseModel):
+            config["response_schema"] = schema.model_json_schema()
+        elif schema is not None:
+            config["response_schema"] = str(schema)
+    return fingerprint(llm_request.model, stream, config, contents)
+
+
+class CoalescingGemini(HedgedGemini):
+    """
+    Gemini model whose identical concurrent requests share one model call.
+
+    Requests a speculative run already answered replay its responses instead;
+    the call that does reach the model is hedged (see `HedgedGemini`).
+    """
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        generate = super().generate_content_async
+        key = _request_key(llm_request, stream)
+        if speculation.is_speculating():
+            recorder = speculation.record(key)
+            complete = False
+            try:
+                async for response in generate(llm_request, stream):
+                    recorder.add(response)
+                    yield response
+                complete = True
+            finally:
+                recorder.finish(complete)
+            return
+
+        replay = await speculation.claim(key)
+        if replay is not None:
+            for response in replay:
+                yield response
+            return
+
+        async for response in model_calls.stream(
+            key,
+            lambda: generate(llm_request, stream),
+            share=lambda response: response.model_copy(deep=True),
+            # A follower holding the final response needs nothing more.
+            finished=lambda response: not response.partial,
+        ):
+            yield response
+
+
+def coalesced_model(model: str | None) -> CoalescingGemini:
+    """
+    Wrap a model name for a leaf agent so its generations are coalesced.
+
+    Leaves without an explicit model fall back to the configured default, the
+    model they would otherwise have inherited from the root agent.
+    """
+    if not model:
+        from app.config import config
+
+        model = config.model
+    return CoalescingGemini(model=model)
+
+
+def stats() -> dict[str, float]:
+    """Totals across all coalescing groups."""
+    groups = [model_calls, image_generation, mermaid_render]
+    return {
+        name: sum(group.counters.get(name) for group in groups)
+        for name in ("requests", "coalesced", "model_calls_saved")
+    }
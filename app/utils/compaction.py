@@ -0,0 +1,196 @@
+"""
+History compaction for long teacher sessions.
+
+Every model call of an agent with `include_contents="default"` replays the
+whole session: every earlier turn, the full outputs of every sub-agent, and
+the thoughts streamed by `BuiltInPlanner` (which ADK replays as plain text).
+Prompt size, and with it latency and cost, grows with every turn.
+
+`HistoryCompactor` rebuilds the request contents from a compacted copy of
+the session events, per agent:
+
+- thought parts are dropped from every turn,
+- the last `recent_turns` turns (the current one included) are kept verbatim,
+- in older turns, agent outputs longer than `summary_chars` are replaced by a
+  short summary, or by a reference to the state key that still holds them
+  (e.g. `baseline_worksheet`), and large tool results are truncated,
+- turns beyond `max_turns` are dropped.
+
+The session itself is never modified, so the UI and the stored history keep
+everything.
+"""
+
+import json
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.events import Event
+from google.adk.flows.llm_flows.contents import _get_contents
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from app.utils.callbacks import add_callback
+from app.utils.metrics import counters
+
+_counters = counters("history_compaction")
+
+
+@dataclass(frozen=True)
+class CompactionPolicy:
+    """How much of the session history an agent sees."""
+
+    recent_turns: int = 3
+    """Turns kept verbatim (thoughts aside), the current one included."""
+    max_turns: int | None = 20
+    """Turns sent at all; older ones are dropped. None keeps every turn."""
+    summary_chars: int = 240
+    """Older outputs and tool results longer than this are summarized."""
+    drop_thoughts: bool = True
+
+
+def _is_user_message(event: Event) -> bool:
+    if event.author != "user" or not event.content or not event.content.parts:
+        return False
+    return any(part.function_response is None for part in event.content.parts)
+
+
+def split_turns(events: Sequence[Event]) -> list[list[Event]]:
+    """Group events into turns, each starting with a message from the teacher."""
+    turns: list[list[Event]] = []
+    for event in events:
+        if not turns or _is_user_message(event):
+            turns.append([])
+        turns[-1].append(event)
+    return turns
+
+
+def _preview(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + "…"
+
+
+def _summarize_text(event: Event, text: str, policy: CompactionPolicy) -> str:
+    words = len(text.split())
+    preview = _preview(text, policy.summary_chars)
+    delta = event.actions.state_delta if event.actions else {}
+    for key, value in delta.items():
+        # output_key values hold the event's text (thoughts included).
+        if isinstance(value, str) and text.strip() in value:
+            return (
+                f"[Earlier output of {event.author} ({words} words), kept in "
+                f"state as `{key}`. It began: {preview}]"
+            )
+    return f"[Earlier output of {event.author} ({words} words). It began: {preview}]"
+
+
+def _summarize_response(
+    response: types.FunctionResponse, policy: CompactionPolicy
+) -> types.FunctionResponse | None:
+    text = json.dumps(response.response, ensure_ascii=False, default=str)
+    if len(text) <= policy.summary_chars:
+        return None
+    return types.FunctionResponse(
+        id=response.id,
+        name=response.name,
+        response={"summary": _preview(text, policy.summary_chars)},
+    )
+
+
+def _compact_event(event: Event, policy: CompactionPolicy, old: bool) -> Event | None:
+    """The event as the model should see it; None to leave it out."""
+    if not event.content or not event.content.parts:
+        return event
+    parts: list[types.Part] = []
+    changed = False
+    for part in event.content.parts:
+        if part.thought and policy.drop_thoughts:
+            _counters.inc("thoughts_dropped")
+            changed = True
+            continue
+        if old and event.author != "user" and part.text:
+            if len(part.text) > policy.summary_chars:
+                part = types.Part(text=_summarize_text(event, part.text, policy))
+                _counters.inc("outputs_summarized")
+                changed = True
+        elif old and part.function_response:
+            summary = _summarize_response(part.function_response, policy)
+            if summary is not None:
+                part = types.Part(function_response=summary)
+                _counters.inc("tool_results_summarized")
+                changed = True
+        parts.append(part)
+    if not changed:
+        return event
+    if not parts:
+        return None
+    return event.model_copy(
+        update={"content": types.Content(role=event.content.role, parts=parts)}
+    )
+
+
+def compact_events(events: Sequence[Event], policy: CompactionPolicy) -> list[Event]:
+    """Compacted copies of `events`; unchanged events are shared, not copied."""
+    turns = split_turns(events)
+    if policy.max_turns is not None and len(turns) > policy.max_turns:
+        _counters.inc("turns_dropped", len(turns) - policy.max_turns)
+        turns = turns[-policy.max_turns :]
+    first_recent = len(turns) - policy.recent_turns
+    compacted = []
+    for number, turn in enumerate(turns):
+        for event in turn:
+            kept = _compact_event(event, policy, old=number < first_recent)
+            if kept is not None:
+                compacted.append(kept)
+    return compacted
+
+
+def _text_chars(contents: Sequence[types.Content]) -> int:
+    return sum(
+        len(part.text or "") for content in contents for part in content.parts or []
+    )
+
+
+class HistoryCompactor:
+    """
+    `before_model_callback` that compacts the history sent to the model.
+
+    Agents get the `default` policy unless `policies` names them; a None
+    policy turns compaction off for that agent.
+    """
+
+    def __init__(
+        self,
+        default: CompactionPolicy | None = None,
+        policies: Mapping[str, CompactionPolicy | None] | None = None,
+    ) -> None:
+        self.default = default or CompactionPolicy()
+        self.policies = dict(policies or {})
+
+    def policy(self, agent_name: str) -> CompactionPolicy | None:
+        return self.policies.get(agent_name, self.default)
+
+    def before_model_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> None:
+        ctx = callback_context._invocation_context
+        policy = self.policy(ctx.agent.name)
+        if policy is None:
+            return
+        events = compact_events(ctx.session.events, policy)
+        # The same function ADK's contents processor uses, on compacted events.
+        contents = _get_contents(ctx.branch, events, ctx.agent.name)
+        _counters.inc("requests")
+        _counters.inc("chars_before", _text_chars(llm_request.contents))
+        _counters.inc("chars_after", _text_chars(contents))
+        llm_request.contents = contents
+
+    def install(self, agent: BaseAgent) -> None:
+        """Add the callback to `agent` and every sub-agent that sees history."""
+        if isinstance(agent, LlmAgent) and agent.include_contents == "default":
+            add_callback(agent, "before_model_callback", self.before_model_callback)
+        for sub_agent in agent.sub_agents:
+            self.install(sub_agent)
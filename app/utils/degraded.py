@@ -0,0 +1,328 @@
+"""
+Load shedding: a degraded mode with local fallbacks when the model is overloaded.
+
+When the Vertex quota runs out or the service slows down, every agent would
+otherwise fail or stall with it. `LoadShedder` watches the model calls in
+flight, how long recent calls waited for their first response chunk and how
+many of them failed with overload errors; past any of its thresholds it
+switches to degraded mode for a cool-down period, after which calls are let
+through again to probe whether the service has recovered. A long generation
+that streams steadily is not a sign of overload and does not count.
+
+In degraded mode `DegradedMode` answers in place of the model, from a
+fallback registered for the agent: a material prepared ahead of time, or one
+built locally (see `app.fallbacks`). Every such answer starts with a visible
+notice and carries `{"degraded": true, ...}` in the event's custom metadata,
+so the frontend can mark it.
+
+Counters are under "degraded".
+"""
+
+import contextlib
+import re
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from typing import Any
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import errors, types
+
+from app.utils.callbacks import add_callback
+from app.utils.metrics import counters
+
+_counters = counters("degraded")
+
+# Errors that mean the service is out of quota or overloaded.
+_OVERLOAD_CODES = frozenset({429, 503, 504})
+
+NOTICE = (
+    "> ⚠️ **Degraded mode:** Sahayak is under heavy load, so this answer was "
+    "prepared without the AI model ({source}). Ask again in a few minutes for "
+    "a fully generated version."
+)
+UNAVAILABLE = (
+    "> ⚠️ **Degraded mode:** Sahayak is under heavy load and can't prepare this "
+    "without the AI model right now. Please ask again in a few minutes."
+)
+
+
+def is_overload(error: BaseException) -> bool:
+    """Quota exhaustion, overload responses and calls that ran out of time."""
+    if isinstance(error, errors.APIError):
+        return error.code in _OVERLOAD_CODES
+    return isinstance(error, TimeoutError)
+
+
+@dataclass
+class TrackedCall:
+    """A model call tracked by `LoadShedder.track`."""
+
+    start: float
+    limit: float
+    """Seconds the call may wait for its first response before it counts as slow."""
+    first_response: float | None = None
+
+    def responded(self, now: float) -> None:
+        """Note the call's first response (chunk); later ones are ignored."""
+        if self.first_response is None:
+            self.first_response = now
+
+
+class LoadShedder:
+    """Decides, from the model calls it tracks, when to shed load."""
+
+    def __init__(
+        self,
+        max_in_flight: int = 32,
+        max_latency: float = 45.0,
+        max_error_rate: float = 0.5,
+        window: int = 50,
+        min_samples: int = 5,
+        cooldown: float = 30.0,
+        forced: bool | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        :param max_in_flight: Model calls waiting or running at once, beyond
+            which new work is shed
+        :param max_latency: Seconds; shed when the p95 time to first response
+            of recent calls, or the wait of a call in flight that has not
+            responded yet, exceeds it. A call with a longer deadline (a
+            non-streamed generation) may wait until its deadline instead
+        :param max_error_rate: Shed when more than this share of recent calls
+            failed with an overload error
+        :param window: Recent calls the latency and error rate are taken over
+        :param min_samples: Calls needed before latency and errors are judged
+        :param cooldown: Seconds degraded mode lasts once entered
+        :param forced: True to always shed, False to never shed, None to decide
+            from the thresholds
+        """
+        self.max_in_flight = max_in_flight
+        self.max_latency = max_latency
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.forced = forced
+        self.clock = clock
+        self.counters = _counters
+        self._in_flight: dict[int, TrackedCall] = {}
+        self._next_call = 0
+        self._latencies: deque[float] = deque(maxlen=window)
+        """Time to first response of recent calls, as a share of their limit."""
+        self._failures: deque[bool] = deque(maxlen=window)
+        self._until = 0.0
+        self._reason: str | None = None
+
+    @contextlib.contextmanager
+    def track(self, deadline: float | None = None) -> Iterator[TrackedCall]:
+        """
+        Track one model call, from the moment it is queued to its answer.
+
+        Call `responded` on the yielded call when its first response arrives;
+        a call that never does is timed to its end. `deadline` (on `clock`)
+        is when the call's own budget runs out.
+        """
+        call_id = self._next_call
+        self._next_call += 1
+        start = self.clock()
+        limit = self.max_latency
+        if deadline is not None:
+            limit = max(limit, deadline - start)
+        call = self._in_flight[call_id] = TrackedCall(start, limit)
+        try:
+            yield call
+        except Exception as e:
+            self._failures.append(is_overload(e))
+            raise
+        else:
+            self._failures.append(False)
+            first = self.clock() if call.first_response is None else call.first_response
+            self._latencies.append((first - start) / limit)
+        finally:
+            # Cancelled calls say nothing about the service and are not counted.
+            self._in_flight.pop(call_id, None)
+
+    def _overloaded(self, now: float) -> str | None:
+        if len(self._in_flight) > self.max_in_flight:
+            return "queue"
+        if any(
+            call.first_response is None and now - call.start > call.limit
+            for call in self._in_flight.values()
+        ):
+            return "latency"
+        if len(self._latencies) >= self.min_samples:
+            ordered = sorted(self._latencies)
+            if ordered[int(0.95 * (len(ordered) - 1))] > 1:
+                return "latency"
+        if len(self._failures) >= self.min_samples:
+            if sum(self._failures) / len(self._failures) > self.max_error_rate:
+                return "errors"
+        return None
+
+    def degraded(self) -> str | None:
+        """Why load is being shed ("queue", "latency", "errors"), or None."""
+        if self.forced is not None:
+            return "forced" if self.forced else None
+        now = self.clock()
+        if now < self._until:
+            return self._reason
+        reason = self._overloaded(now)
+        if reason is None:
+            if self._reason is not None:
+                self._reason = None
+                self.counters.inc("recovered")
+            return None
+        if self._reason is None:
+            self.counters.inc(f"entered.{reason}")
+        self._reason = reason
+        self._until = now + self.cooldown
+        # Judge the service afresh after the cool-down, from the calls then
+        # let through; the ones that tripped the switch would trip it again.
+        self._latencies.clear()
+        self._failures.clear()
+        return reason
+
+
+@dataclass
+class FallbackRequest:
+    """What a fallback knows of the teacher's request."""
+
+    agent: str
+    text: str
+    topic: str
+    grade: str
+    state: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class FallbackAnswer:
+    text: str
+    source: str
+    """How the answer was made, shown in the notice: "prepared in advance", ..."""
+
+
+Fallback = Callable[[FallbackRequest], FallbackAnswer | None]
+
+_TOPIC = re.compile(
+    r"\b(?:on|about|of|for|explaining|covering)\s+(?:the topic\s+)?"
+    r"(?!(?:class|grade|std|students|my|a|an)\b)"
+    r"(.+?)(?=\s+(?:for|in|with|to)\b|\s*[,.?!]|$)",
+    re.I,
+)
+_GRADE = re.compile(
+    r"\b(?:grade|class|std\.?|standard)\s*(\d{1,2})\b"
+    r"|\b(\d{1,2})(?:st|nd|rd|th)\s+(?:grade|class|std)\b",
+    re.I,
+)
+
+
+def parse_request(agent: str, text: str, state: dict[str, Any]) -> FallbackRequest:
+    """Pull the topic and grade out of a request, the grade falling back to state."""
+    topic = _TOPIC.search(text)
+    grade = _GRADE.search(text)
+    known_grade = str(state.get("teacher_grade") or "").split(",")[0].strip()
+    return FallbackRequest(
+        agent=agent,
+        text=text,
+        topic=topic.group(1).strip() if topic else text.strip(),
+        grade=(grade.group(1) or grade.group(2)) if grade else known_grade,
+        state=state,
+    )
+
+
+class DegradedMode:
+    """
+    `before_model_callback` answering from local fallbacks while load is shed.
+
+    Install it ahead of every other model callback, so a shed call does not
+    start speculation or compete for a deadline.
+    """
+
+    def __init__(
+        self,
+        fallbacks: dict[str, Fallback],
+        default: Fallback,
+        shedder: "LoadShedder | None" = None,
+    ) -> None:
+        """
+        :param fallbacks: Fallback for each agent name
+        :param default: Fallback for every other agent, and for agents whose
+            own fallback has nothing for a request
+        :param shedder: Defaults to the process-wide one (`get_load_shedder`)
+        """
+        self.fallbacks = fallbacks
+        self.default = default
+        self._shedder = shedder
+
+    @property
+    def shedder(self) -> LoadShedder:
+        return self._shedder or get_load_shedder()
+
+    def answer(self, request: FallbackRequest) -> FallbackAnswer | None:
+        """The agent's fallback answer, else the default one, else None."""
+        fallback = self.fallbacks.get(request.agent)
+        answer = fallback(request) if fallback else None
+        return answer if answer is not None else self.default(request)
+
+    def before_model_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> LlmResponse | None:
+        reason = self.shedder.degraded()
+        if reason is None:
+            return None
+        user_content = callback_context.user_content
+        text = (
+            " ".join(part.text for part in (user_content.parts or []) if part.text)
+            if user_content
+            else ""
+        )
+        request = parse_request(
+            callback_context.agent_name, text, callback_context.state.to_dict()
+        )
+        start = time.perf_counter()
+        answer = self.answer(request)
+        _counters.inc("served")
+        _counters.inc(f"served.{request.agent}")
+        _counters.inc(f"reason.{reason}")
+        _counters.inc("fallback_ms", (time.perf_counter() - start) * 1000)
+        if answer is None:
+            _counters.inc("unanswered")
+            text, source = UNAVAILABLE, None
+        else:
+            text = f"{NOTICE.format(source=answer.source)}\n\n{answer.text}"
+            source = answer.source
+        return LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=text)]),
+            custom_metadata={"degraded": True, "reason": reason, "source": source},
+            turn_complete=True,
+        )
+
+    def install(self, agent: BaseAgent) -> None:
+        """Add the callback, first, to `agent` and all its LLM sub-agents."""
+        if isinstance(agent, LlmAgent):
+            add_callback(agent, "before_model_callback", self.before_model_callback)
+        for sub_agent in agent.sub_agents:
+            self.install(sub_agent)
+
+
+_default_shedder: LoadShedder | None = None
+
+
+def get_load_shedder() -> LoadShedder:
+    """Return the process-wide shedder, configured from config."""
+    global _default_shedder
+    if _default_shedder is None:
+        from app.config import config
+
+        _default_shedder = LoadShedder(
+            max_in_flight=config.degraded_max_in_flight,
+            max_latency=config.degraded_max_latency_seconds,
+            max_error_rate=config.degraded_max_error_rate,
+            cooldown=config.degraded_cooldown_seconds,
+            forced={"on": True, "off": False}.get(config.degraded_mode),
+        )
+    return _default_shedder
@@ -0,0 +1,435 @@
+"""
+Deadlines, hedged requests and retries for model calls.
+
+A teacher's request runs several model calls one after another (root →
+manager → leaf → manager synthesis), and one slow call stalls the whole SSE
+response. Three things bound it:
+
+- `Deadlines` gives every model call a budget derived from the request SLO
+  (a share per agent role, never past the request's own deadline), and fails
+  the call with `DeadlineExceeded` once the budget is spent.
+- `Hedger` sends a duplicate of a call that has not answered within the p95
+  latency observed for its agent; the first to answer wins and the other is
+  cancelled. Hedges are capped at a share of calls, which bounds extra cost.
+- Calls that fail with a transient error before answering are retried with
+  full-jitter exponential backoff, inside the same deadline.
+
+`HedgedGemini` applies all three to an ADK model; leaves get it through
+`CoalescingGemini`, coordinators through `hedged_model`.
+"""
+
+import asyncio
+import contextvars
+import random
+import time
+from collections import OrderedDict, deque
+from collections.abc import AsyncGenerator, AsyncIterator, Callable
+from dataclasses import dataclass, field
+from typing import Any, Generic, TypeVar
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import Gemini, LlmRequest, LlmResponse
+from google.genai import errors
+
+from app.utils.callbacks import add_callback
+from app.utils.cancellation import model_call_cancelled, model_call_finished
+from app.utils.degraded import get_load_shedder
+from app.utils.metrics import Counters, counters
+from app.utils.tokens import estimate_tokens
+
+T = TypeVar("T")
+
+_RETRYABLE_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class DeadlineExceeded(TimeoutError):
+    """A model call ran out of its deadline budget."""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Transient failures: rate limits, server errors and dropped connections."""
+    if isinstance(error, DeadlineExceeded):
+        return False
+    if isinstance(error, errors.APIError):
+        return error.code in _RETRYABLE_CODES
+    return isinstance(error, (ConnectionError, asyncio.TimeoutError))
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2^attempt)]."""
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class LatencyTracker:
+    """Latencies of recent calls, for one agent or model."""
+
+    def __init__(self, window: int = 200) -> None:
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> float | None:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@dataclass
+class _Attempt(Generic[T]):
+    started: float
+    queue: "asyncio.Queue[Any]" = field(default_factory=asyncio.Queue)
+    error: BaseException | None = None
+    task: "asyncio.Task[None] | None" = None
+
+
+_END = object()
+
+
+@dataclass
+class _Failure:
+    error: BaseException
+
+
+class _Attempts(Exception):
+    """Every execution of a round failed before answering."""
+
+    def __init__(self, count: int, error: BaseException) -> None:
+        self.count = count
+        self.error = error
+
+
+class Hedger:
+    """Hedges, retries and bounds calls that produce a stream of results."""
+
+    def __init__(
+        self,
+        name: str,
+        quantile: float = 0.95,
+        min_samples: int = 20,
+        min_delay: float = 0.05,
+        max_hedge_ratio: float = 0.1,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 8.0,
+        retryable: Callable[[BaseException], bool] = is_retryable,
+    ) -> None:
+        """
+        :param name: Name of the group, used as the metrics namespace suffix
+        :param quantile: Latency quantile after which a call is hedged
+        :param min_samples: Latencies observed for a key before it is hedged
+        :param min_delay: Shortest wait, in seconds, before hedging
+        :param max_hedge_ratio: Most hedges per call, over the life of the group
+        :param max_retries: Retries of a call that failed before answering
+        :param backoff_base: First backoff ceiling, in seconds
+        :param backoff_cap: Largest backoff ceiling, in seconds
+        :param retryable: Whether an error is worth retrying
+        """
+        self.name = name
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_hedge_ratio = max_hedge_ratio
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.retryable = retryable
+        self.counters: Counters = counters(f"hedging.{name}")
+        self._latencies: dict[str, LatencyTracker] = {}
+
+    def latency(self, key: str) -> LatencyTracker:
+        if key not in self._latencies:
+            self._latencies[key] = LatencyTracker()
+        return self._latencies[key]
+
+    def hedge_delay(self, key: str) -> float | None:
+        """Seconds to wait before hedging a call for `key`; None not to hedge."""
+        tracker = self.latency(key)
+        if len(tracker) < self.min_samples:
+            return None
+        calls = self.counters.get("calls")
+        if self.counters.get("hedges") >= self.max_hedge_ratio * calls:
+            self.counters.inc("hedges_skipped")
+            return None
+        return max(self.min_delay, tracker.quantile(self.quantile) or 0)
+
+    async def stream(
+        self,
+        key: str,
+        factory: Callable[[int], AsyncIterator[T]],
+        deadline: float | None = None,
+    ) -> AsyncGenerator[T, None]:
+        """
+        Iterate `factory(attempt)`, hedged, retried and bounded by `deadline`.
+
+        `attempt` numbers the executions (0 for the first); `deadline` is a
+        `time.monotonic()` value. Once an execution has produced a result it
+        is the only one left, and it is not retried if it fails later.
+        """
+        self.counters.inc("calls")
+        executions = 0
+        for retry in range(self.max_retries + 1):
+            try:
+                async for item in self._race(key, factory, executions, deadline):
+                    yield item
+                return
+            except _Attempts as e:
+                executions += e.count
+                error = e.error
+            if retry == self.max_retries or not self.retryable(error):
+                raise error
+            delay = backoff_delay(retry, self.backoff_base, self.backoff_cap)
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                raise error
+            self.counters.inc("retries")
+            await asyncio.sleep(delay)
+
+    async def _pump(
+        self,
+        factory: Callable[[int], AsyncIterator[T]],
+        number: int,
+        attempt: "_Attempt[T]",
+        answers: "asyncio.Queue[_Attempt[T]]",
+    ) -> None:
+        answered = False
+        try:
+            async for item in factory(number):
+                attempt.queue.put_nowait(item)
+                if not answered:
+                    answered = True
+                    answers.put_nowait(attempt)
+            attempt.queue.put_nowait(_END)
+            if not answered:
+                answers.put_nowait(attempt)
+        except Exception as e:
+            if answered:
+                attempt.queue.put_nowait(_Failure(e))
+            else:
+                attempt.error = e
+                answers.put_nowait(attempt)
+
+    async def _race(
+        self,
+        key: str,
+        factory: Callable[[int], AsyncIterator[T]],
+        first_number: int,
+        deadline: float | None,
+    ) -> AsyncGenerator[T, None]:
+        answers: asyncio.Queue[_Attempt[T]] = asyncio.Queue()
+        attempts: list[_Attempt[T]] = []
+
+        def launch() -> None:
+            attempt: _Attempt[T] = _Attempt(started=time.monotonic())
+            attempt.task = asyncio.create_task(
+                self._pump(factory, first_number + len(attempts), attempt, answers)
+            )
+            attempts.append(attempt)
+
+        def timeout(until: float | None) -> float | None:
+            return None if until is None else max(0.0, until - time.monotonic())
+
+        launch()
+        delay = self.hedge_delay(key)
+        hedge_at = None if delay is None else attempts[0].started + delay
+        winner: _Attempt[T] | None = None
+        failed: list[_Attempt[T]] = []
+        try:
+            while winner is None:
+                until = min(filter(None, (hedge_at, deadline)), default=None)
+                try:
+                    answer = await asyncio.wait_for(answers.get(), timeout(until))
+                except asyncio.TimeoutError:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        self.counters.inc("deadline_exceeded")
+                        raise DeadlineExceeded(f"{key} missed its deadline") from None
+                    self.counters.inc("hedges")
+                    launch()
+                    hedge_at = None
+                    continue
+                if answer.error is None:
+                    winner = answer
+                    continue
+                failed.append(answer)
+                if len(failed) == len(attempts):
+                    raise _Attempts(len(attempts), answer.error)
+                # Let a hedge still in flight answer instead.
+                hedge_at = None
+            self.latency(key).add(time.monotonic() - winner.started)
+            if winner is not attempts[0]:
+                self.counters.inc("hedge_wins")
+            for attempt in attempts:
+                if attempt is not winner and attempt not in failed:
+                    assert attempt.task is not None
+                    attempt.task.cancel()
+                    self.counters.inc("cancelled")
+            while True:
+                try:
+                    item = await asyncio.wait_for(winner.queue.get(), timeout(deadline))
+                except asyncio.TimeoutError:
+                    self.counters.inc("deadline_exceeded")
+                    raise DeadlineExceeded(f"{key} missed its deadline") from None
+                if item is _END:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            for attempt in attempts:
+                if attempt.task is not None and not attempt.task.done():
+                    attempt.task.cancel()
+
+
+@dataclass(frozen=True)
+class _Budget:
+    request: LlmRequest
+    agent: str
+    deadline: float
+
+
+_budget: contextvars.ContextVar[_Budget | None] = contextvars.ContextVar(
+    "model_call_budget", default=None
+)
+
+
+class Deadlines:
+    """
+    `before_model_callback` that sets the deadline of each model call.
+
+    A call gets `share` of the request SLO for its agent's role, but never
+    more than what is left of the SLO since the request started: agents with
+    sub-agents route and synthesize (short calls), leaves generate.
+    """
+
+    def __init__(
+        self,
+        slo_seconds: float,
+        coordinator_share: float = 0.15,
+        leaf_share: float = 0.5,
+        shares: dict[str, float] | None = None,
+    ) -> None:
+        """
+        :param slo_seconds: Time a teacher's request may take end to end
+        :param coordinator_share: Share of the SLO per call of an agent with
+            sub-agents (the root agent and the managers)
+        :param leaf_share: Share of the SLO per call of an agent without
+        :param shares: Shares for particular agents, by name
+        """
+        self.slo_seconds = slo_seconds
+        self.coordinator_share = coordinator_share
+        self.leaf_share = leaf_share
+        self.shares = dict(shares or {})
+        self._started: OrderedDict[str, float] = OrderedDict()
+
+    def budget(self, agent_name: str, coordinator: bool) -> float:
+        """Seconds a single model call of an agent may take."""
+        share = self.shares.get(agent_name)
+        if share is None:
+            share = self.coordinator_share if coordinator else self.leaf_share
+        return share * self.slo_seconds
+
+    def _request_start(self, invocation_id: str) -> float:
+        if invocation_id not in self._started:
+            self._started[invocation_id] = time.monotonic()
+            while len(self._started) > 1024:
+                self._started.popitem(last=False)
+        return self._started[invocation_id]
+
+    def before_model_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> None:
+        ctx = callback_context._invocation_context
+        now = time.monotonic()
+        deadline = min(
+            now + self.budget(ctx.agent.name, bool(ctx.agent.sub_agents)),
+            self._request_start(ctx.invocation_id) + self.slo_seconds,
+        )
+        _budget.set(_Budget(llm_request, ctx.agent.name, deadline))
+
+    def install(self, agent: BaseAgent) -> None:
+        """Add the callback to `agent` and all its LLM sub-agents."""
+        if isinstance(agent, LlmAgent):
+            add_callback(agent, "before_model_callback", self.before_model_callback)
+        for sub_agent in agent.sub_agents:
+            self.install(sub_agent)
+
+
+_default_hedger: Hedger | None = None
+
+
+def get_hedger() -> Hedger:
+    """Return the process-wide hedger for model calls, configured from config."""
+    global _default_hedger
+    if _default_hedger is None:
+        from app.config import config
+
+        _default_hedger = Hedger(
+            "model_calls",
+            max_hedge_ratio=config.hedge_max_ratio,
+            max_retries=config.model_max_retries,
+        )
+    return _default_hedger
+
+
+class HedgedGemini(Gemini):
+    """
+    Gemini model whose calls are hedged and retried within their deadline.
+
+    Latencies are tracked per agent when `Deadlines` is installed (which also
+    supplies the deadline), per model otherwise.
+    """
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        generate = super().generate_content_async
+        budget = _budget.get()
+        if budget is not None and budget.request is not llm_request:
+            budget = None
+
+        def call(attempt: int) -> AsyncIterator[LlmResponse]:
+            # Concurrent executions must not share a request ADK may modify.
+            request = llm_request if attempt == 0 else llm_request.model_copy(deep=True)
+            return generate(request, stream)
+
+        key = budget.agent if budget else self.model
+        produced = 0
+        try:
+            # The load shedder sees every logical call, retries and hedges
+            # included, as the teacher waits for its first chunk.
+            deadline = budget.deadline if budget else None
+            with get_load_shedder().track(deadline) as tracked:
+                async for response in get_hedger().stream(key, call, deadline):
+                    tracked.responded(time.monotonic())
+                    produced = _output_tokens(response, produced)
+                    yield response
+        except asyncio.CancelledError:
+            # The run was cancelled, usually because its client went away.
+            model_call_cancelled(key, produced)
+            raise
+        model_call_finished(key, produced)
+
+
+def _output_tokens(response: LlmResponse, produced: int) -> int:
+    """Output tokens of a call so far, counting `response`."""
+    usage = response.usage_metadata
+    if usage is not None and usage.candidates_token_count is not None:
+        return usage.candidates_token_count + (usage.thoughts_token_count or 0)
+    if response.content is None or not response.content.parts:
+        return produced
+    # Streamed chunks carry their text only; the count comes with the last one.
+    text = "".join(part.text for part in response.content.parts if part.text)
+    return produced + estimate_tokens(text) if response.partial else produced
+
+
+def hedged_model(model: str | None) -> HedgedGemini:
+    """Wrap a model name for an agent that does not coalesce its calls."""
+    if not model:
+        from app.config import config
+
+        model = config.model
+    return HedgedGemini(model=model)
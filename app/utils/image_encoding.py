@@ -0,0 +1,97 @@
+"""
+Encoding of generated images into their main, thumbnail and print variants.
+
+This is the code the image pipeline's worker processes run (see
+`app.sub_agents.visual_aid_agent.image_pipeline`). It imports nothing from
+`app` beyond this module, so starting a worker does not load the config or
+build the agent tree.
+"""
+
+import time
+from dataclasses import asdict, dataclass
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image, ImageOps, features
+
+MAIN_MAX_SIDE = 1280
+THUMBNAIL_MAX_SIDE = 256
+PRINT_MAX_SIDE = 2048
+QUALITY = {"webp": 80, "avif": 60}
+THUMBNAIL_QUALITY = 70
+
+
+@dataclass
+class ImageVariants:
+    """Files written for one generated image, and what encoding them cost."""
+
+    main: str
+    thumbnail: str
+    print: str
+    original_bytes: int
+    output_bytes: int
+    """Size of the main image, the one teachers download."""
+    encode_ms: float
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.output_bytes
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "bytes_saved": self.bytes_saved}
+
+
+def effective_format(image_format: str) -> str:
+    """The main image format actually written: AVIF needs Pillow built with it."""
+    if image_format == "avif" and not features.check("avif"):
+        return "webp"
+    return image_format
+
+
+def variant_paths(stem: Path, image_format: str) -> tuple[Path, Path, Path]:
+    """Main, thumbnail and print paths for images stored under `stem`."""
+    return (
+        stem.with_name(f"{stem.name}.{image_format}"),
+        stem.with_name(f"{stem.name}_thumb.webp"),
+        stem.with_name(f"{stem.name}_print.png"),
+    )
+
+
+def _shrunk(image: Image.Image, max_side: int) -> Image.Image:
+    image = image.copy()
+    image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    return image
+
+
+def process_image(data: bytes, stem: str, image_format: str = "webp") -> ImageVariants:
+    """
+    Write the main, thumbnail and print variants of a PNG (or any image PIL
+    reads) next to `stem`. Runs in a worker process.
+    """
+    start = time.perf_counter()
+    image_format = effective_format(image_format)
+    main_path, thumbnail_path, print_path = variant_paths(Path(stem), image_format)
+
+    image = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+    image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+    _shrunk(image, MAIN_MAX_SIDE).save(
+        main_path, image_format.upper(), quality=QUALITY[image_format], method=4
+    )
+    _shrunk(image, THUMBNAIL_MAX_SIDE).save(
+        thumbnail_path, "WEBP", quality=THUMBNAIL_QUALITY
+    )
+    # Flatten transparency onto white paper before dropping the colour.
+    paper = Image.new("RGB", image.size, "white")
+    paper.paste(image, mask=image.getchannel("A") if image.mode == "RGBA" else None)
+    grayscale = ImageOps.autocontrast(_shrunk(paper, PRINT_MAX_SIDE).convert("L"))
+    grayscale.save(print_path, "PNG", optimize=True)
+
+    return ImageVariants(
+        main=str(main_path),
+        thumbnail=str(thumbnail_path),
+        print=str(print_path),
+        original_bytes=len(data),
+        output_bytes=main_path.stat().st_size,
+        encode_ms=(time.perf_counter() - start) * 1000,
+    )
@@ -0,0 +1,241 @@
+"""
+Incremental recomputation of generator stages.
+
+A generator stage is an LLM agent that stores its output in state under an
+`output_key` and may read other stages' outputs through `{placeholders}` in
+its instruction: answerkey_creator_agent reads `{baseline_worksheet}`, which
+worksheet_creator_agent writes. `StageGraph` is the dependency graph between
+them, built from the agent tree.
+
+`IncrementalStages` fingerprints what each stage's output is made from: its
+model, its system instruction as sent (with the state it reads filled in)
+and every distinct message of the teacher's it is shown. When a stage is
+about to run with the same fingerprint as the run that made its output still
+in state, that output is reused instead of calling the model, with
+`{"reused": true, ...}` in the event's custom metadata. So a request
+repeated after a dropped connection or a failed later stage only recomputes
+the stages that did not finish, and a teacher's edit to `baseline_worksheet`
+only recomputes the answer key. A changed input (a new grade, or a follow-up
+such as "class 5" answering the stage's question) changes every fingerprint
+downstream of it, so those stages run as before.
+
+A stage whose instruction is not a plain string may read anything, so it is
+never reused. An output that did not come from the model (a degraded-mode
+fallback, or questions from the item bank) is not fingerprinted, so it is
+not replayed once the model is back. Set INCREMENTAL_STAGES=off to always
+recompute.
+
+Counters are under "incremental".
+"""
+
+import re
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from app.utils.callbacks import add_callback
+from app.utils.coalescing import fingerprint
+from app.utils.metrics import counters
+
+# Session state key holding the input fingerprint of every stage's output.
+FINGERPRINTS_KEY = "stage_inputs"
+# State placeholders as ADK resolves them: {key}, {key?}, {user:key}, ...
+_PLACEHOLDER = re.compile(r"{((?:app:|user:|temp:)?[A-Za-z_]\w*)\??}")
+# Stages started and not yet finished, remembered at most.
+_MAX_PENDING = 1024
+# Custom metadata of answers that were not generated from the stage's inputs.
+_NOT_GENERATED = ("degraded", "reused", "item_bank")
+
+_counters = counters("incremental")
+
+
+def placeholders(instruction: Any) -> tuple[str, ...]:
+    """State keys a string instruction reads, in order of first use."""
+    if not isinstance(instruction, str):
+        return ()
+    return tuple(dict.fromkeys(_PLACEHOLDER.findall(instruction)))
+
+
+@dataclass(frozen=True)
+class Stage:
+    """A generator agent, the state it reads and the key it writes."""
+
+    agent: str
+    output_key: str
+    reads: tuple[str, ...]
+
+
+class StageGraph:
+    """Dependencies between stages, through the state keys they read and write."""
+
+    def __init__(self, stages: Iterable[Stage]) -> None:
+        self.stages = {stage.agent: stage for stage in stages}
+        self.producers = {stage.output_key: stage for stage in self.stages.values()}
+
+    @classmethod
+    def from_agent(cls, agent: BaseAgent) -> "StageGraph":
+        """Every LLM agent under `agent` with an output_key and no sub-agents."""
+        stages = []
+        todo = [agent]
+        while todo:
+            current = todo.pop(0)
+            if (
+                isinstance(current, LlmAgent)
+                and current.output_key
+                and not current.sub_agents
+            ):
+                stages.append(
+                    Stage(
+                        agent=current.name,
+                        output_key=current.output_key,
+                        reads=placeholders(current.instruction),
+                    )
+                )
+            todo.extend(current.sub_agents)
+        return cls(stages)
+
+    def downstream(self, output_key: str) -> list[Stage]:
+        """Every stage made stale, directly or not, when `output_key` changes."""
+        stale: list[Stage] = []
+        keys = [output_key]
+        while keys:
+            key = keys.pop(0)
+            for stage in self.stages.values():
+                if key in stage.reads and stage not in stale:
+                    stale.append(stage)
+                    keys.append(stage.output_key)
+        return stale
+
+
+def _text(content: types.Content | None) -> str:
+    if not content or not content.parts:
+        return ""
+    return " ".join(part.text for part in content.parts if part.text)
+
+
+def _teacher_messages(llm_request: LlmRequest) -> list[str]:
+    """
+    The teacher's messages a stage is shown, each once: a request sent again
+    keeps its fingerprint, a follow-up changes it. Answers of agents (which
+    ADK passes on "For context:") are left out; the ones a stage depends on
+    reach it through state, in its instruction.
+    """
+    return list(
+        dict.fromkeys(
+            _text(content)
+            for content in llm_request.contents
+            if content.role == "user"
+            and content.parts
+            and content.parts[0].text != "For context:"
+            and _text(content)
+        )
+    )
+
+
+def _generated(callback_context: CallbackContext, agent: str) -> bool:
+    """Whether the agent's last answer in this invocation came from the model."""
+    ctx = callback_context._invocation_context
+    for event in reversed(ctx.session.events):
+        if event.invocation_id != ctx.invocation_id:
+            break
+        if event.author == agent and not event.partial and event.content:
+            metadata = event.custom_metadata or {}
+            return not any(metadata.get(key) for key in _NOT_GENERATED)
+    return True
+
+
+class IncrementalStages:
+    """Model callbacks reusing stage outputs whose inputs did not change."""
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.graph = StageGraph([])
+        self._agents: dict[str, LlmAgent] = {}
+        # (invocation, agent) -> fingerprint of the stage running there
+        self._pending: OrderedDict[tuple[str, str], str] = OrderedDict()
+
+    def fingerprint(self, agent: str, llm_request: LlmRequest) -> str | None:
+        """
+        What the stage's output is made from, as sent in `llm_request`; None
+        when that is not known.
+        """
+        llm_agent = self._agents[agent]
+        if not isinstance(llm_agent.instruction, str):
+            return None
+        config = llm_request.config
+        return fingerprint(
+            agent,
+            getattr(llm_agent.model, "model", llm_agent.model),
+            str(config.system_instruction) if config else "",
+            _teacher_messages(llm_request),
+        )
+
+    def before_model_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> LlmResponse | None:
+        agent = callback_context.agent_name
+        stage = self.graph.stages.get(agent)
+        if not self.enabled or stage is None:
+            return None
+        pending = (callback_context.invocation_id, agent)
+        if pending in self._pending:
+            # A later call of a stage that is already running (after a tool).
+            return None
+        state = callback_context.state.to_dict()
+        key = self.fingerprint(agent, llm_request)
+        if key is None:
+            _counters.inc(f"not_reusable.{agent}")
+            return None
+        output = state.get(stage.output_key)
+        if output is not None and (state.get(FINGERPRINTS_KEY) or {}).get(agent) == key:
+            _counters.inc("reused")
+            _counters.inc(f"reused.{agent}")
+            return LlmResponse(
+                content=types.Content(
+                    role="model", parts=[types.Part(text=str(output))]
+                ),
+                custom_metadata={"reused": True, "stage": stage.output_key},
+                turn_complete=True,
+            )
+        _counters.inc("recomputed")
+        _counters.inc(f"recomputed.{agent}")
+        self._pending[pending] = key
+        while len(self._pending) > _MAX_PENDING:
+            self._pending.popitem(last=False)
+        return None
+
+    def after_agent_callback(self, callback_context: CallbackContext) -> None:
+        """Remember the fingerprint of the output a stage just made."""
+        agent = callback_context.agent_name
+        key = self._pending.pop((callback_context.invocation_id, agent), None)
+        stage = self.graph.stages.get(agent)
+        if key is None or stage is None:
+            return None
+        if not _generated(callback_context, agent):
+            _counters.inc(f"not_generated.{agent}")
+            return None
+        if stage.output_key in callback_context.state:
+            fingerprints = callback_context.state.get(FINGERPRINTS_KEY) or {}
+            callback_context.state[FINGERPRINTS_KEY] = {**fingerprints, agent: key}
+        return None
+
+    def install(self, agent: BaseAgent) -> None:
+        """Build the stage graph of `agent`'s tree and add the callbacks to its stages."""
+        self.graph = StageGraph.from_agent(agent)
+        self._install(agent)
+
+    def _install(self, agent: BaseAgent) -> None:
+        if isinstance(agent, LlmAgent) and agent.name in self.graph.stages:
+            self._agents[agent.name] = agent
+            add_callback(agent, "before_model_callback", self.before_model_callback)
+            add_callback(
+                agent, "after_agent_callback", self.after_agent_callback, first=False
+            )
+        for sub_agent in agent.sub_agents:
+            self._install(sub_agent)
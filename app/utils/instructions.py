@@ -0,0 +1,53 @@
+from collections.abc import Callable, Mapping
+from datetime import datetime, timezone
+from typing import Any
+
+from google.adk.agents.readonly_context import ReadonlyContext
+
+
+def _current_date(state: Mapping[str, Any]) -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+class PrefixedInstruction:
+    """
+    Per-request instruction provider built from a static prefix and a small
+    dynamic suffix.
+
+    The static prefix is rendered once at construction time and returned
+    byte-for-byte identical on every call, so it can be served from the model's
+    prompt cache. Only the short suffix template is formatted per request, from
+    session state and the registered field resolvers.
+    """
+
+    def __init__(
+        self,
+        static_prefix: str,
+        dynamic_template: str,
+        defaults: Mapping[str, str] | None = None,
+        resolvers: Mapping[str, Callable[[Mapping[str, Any]], str]] | None = None,
+    ) -> None:
+        """
+        :param static_prefix: Instruction text that never changes between requests
+        :param dynamic_template: `str.format` template appended after the prefix
+        :param defaults: Fallback values for template fields missing from state
+        :param resolvers: Fields computed per request instead of read from state
+        """
+        self.static_prefix = static_prefix.rstrip() + "\n\n"
+        self.dynamic_template = dynamic_template.strip() + "\n"
+        self.defaults = dict(defaults or {})
+        self.resolvers = {"cur_date": _current_date, **(resolvers or {})}
+
+    def render(self, state: Mapping[str, Any]) -> str:
+        """Render the full instruction for the given session state."""
+        fields = dict(self.defaults)
+        for key in self.defaults:
+            value = state.get(key)
+            if value not in (None, ""):
+                fields[key] = str(value)
+        for key, resolver in self.resolvers.items():
+            fields[key] = resolver(state)
+        return self.static_prefix + self.dynamic_template.format(**fields)
+
+    def __call__(self, context: ReadonlyContext) -> str:
+        return self.render(context.state)
@@ -0,0 +1,659 @@
+"""
+Local item bank of generated questions, for quizzes and worksheets.
+
+The curriculum's questions recur week after week, yet quiz_generator_agent,
+fitb_generator_agent and worksheet_creator_agent wrote every one of them from
+scratch. Every question the structured generators write is now kept in an
+item bank with its answer, topic, grade, type and an estimated difficulty.
+Before a generator calls the model, `ItemBankGaps` samples the questions the
+request needs from the bank (same topic and grade, mixed or the requested
+difficulty, none the class was given before) and the model writes only the
+missing ones. A quiz the bank covers entirely is assembled without a model
+call. Questions count as given to the class once the generator has
+delivered its answer.
+
+Sampling is an index seek: every item has a random sampling key, indexed
+after topic, grade and difficulty band, and a sample reads the items that
+follow a random point in that order. It costs the same at a thousand items
+as at millions (see `app.benchmarks.item_bank`).
+
+Counters are under "item_bank".
+"""
+
+import hashlib
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from app.utils.callbacks import add_callback, callback_list
+from app.utils.degraded import parse_request
+from app.utils.material_cache import normalize_grade, normalize_topic
+from app.utils.metrics import counters
+from app.utils.speculation import is_speculating
+from app.utils.structured_output import StructuredOutput
+
+BANDS = ("easy", "medium", "hard")
+# Difficulty of each question type before its length is taken into account.
+_KIND_DIFFICULTY = {
+    "true_false": 0.2,
+    "multiple_choice": 0.35,
+    "fill_in_blank": 0.4,
+    "matching": 0.45,
+    "short_answer": 0.55,
+}
+_LABEL_DIFFICULTY = {"easy": 0.2, "medium": 0.5, "hard": 0.8}
+# Bits of the random sampling key; fits SQLite's signed 64-bit integers.
+_KEY_BITS = 62
+# Requests started and not yet answered, remembered at most.
+_MAX_PENDING = 1024
+
+# "10 hard questions", but not the 7 of "grade 7 quiz questions".
+_COUNT = re.compile(
+    r"(?<![\w.])(?<!grade )(?<!class )(?<!std )(?<!std\. )(?<!standard )"
+    r"(\d{1,2})\s+(?:[\w-]+\s+){0,4}?"
+    r"(?:questions?|items?|blanks?|sentences?|mcqs?|problems?)\b"
+    r"(?:\s+(?:on|about|of|covering)\b)?",
+    re.I,
+)
+_DIFFICULTY = {
+    "easy": re.compile(r"\b(?:easy|simple|basic)\b", re.I),
+    "medium": re.compile(r"\b(?:medium|moderate)\b", re.I),
+    "hard": re.compile(r"\b(?:hard|difficult|challenging|advanced|tough)\b", re.I),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    topic TEXT NOT NULL,
+    grade TEXT NOT NULL,
+    band INTEGER NOT NULL,
+    sample_key INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    difficulty REAL NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    fingerprint TEXT NOT NULL UNIQUE,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_sample ON items (topic, grade, band, sample_key);
+CREATE TABLE IF NOT EXISTS served (
+    class_id TEXT NOT NULL,
+    item_id INTEGER NOT NULL,
+    served_at REAL NOT NULL,
+    PRIMARY KEY (class_id, item_id)
+) WITHOUT ROWID;
+"""
+
+_counters = counters("item_bank")
+
+
+def estimate_difficulty(
+    kind: str, question: str, answer: str, label: str | None = None
+) -> float:
+    """
+    Difficulty from 0 (easiest) to 1: the generator's own label if it gave
+    one, else from the question type and how much there is to read and write.
+    """
+    if label in _LABEL_DIFFICULTY:
+        return _LABEL_DIFFICULTY[label]
+    difficulty = _KIND_DIFFICULTY.get(kind, 0.4)
+    difficulty += min(0.2, max(0, len(question.split()) - 12) * 0.01)
+    difficulty += min(0.2, max(0, len(answer.split()) - 3) * 0.02)
+    return round(min(1.0, difficulty), 3)
+
+
+def band(difficulty: float) -> int:
+    """Index into BANDS of a difficulty."""
+    return 0 if difficulty < 0.35 else 1 if difficulty < 0.6 else 2
+
+
+@dataclass
+class Item:
+    """A question with its answer, as one generator's output schema holds it."""
+
+    topic: str
+    grade: str
+    kind: str
+    question: str
+    answer: str
+    difficulty: float
+    payload: dict[str, Any] = field(default_factory=dict)
+    id: int | None = None
+
+
+def _fingerprint(topic: str, grade: str, question: str) -> str:
+    text = f"{topic}\n{grade}\n{normalize_topic(question)}"
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class ItemBank:
+    """SQLite-backed store of questions, sampled by topic, grade and difficulty."""
+
+    def __init__(self, path: str | Path, rng: random.Random | None = None) -> None:
+        """
+        :param path: Location of the SQLite database, created if missing
+        :param rng: Source of sampling keys and sampling points
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.rng = rng or random.Random()
+        self.counters = _counters
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def add(self, items: Iterable[Item]) -> int:
+        """
+        Store new items, skipping questions already banked, and set every
+        item's id to its banked one; return how many were new.
+        """
+        now = time.time()
+        added = 0
+        with self._lock:
+            for item in items:
+                topic, grade = normalize_topic(item.topic), normalize_grade(item.grade)
+                fingerprint = _fingerprint(topic, grade, item.question)
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO items (topic, grade, band, sample_key, "
+                    "kind, difficulty, question, answer, payload, fingerprint, "
+                    "created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        topic,
+                        grade,
+                        band(item.difficulty),
+                        self.rng.getrandbits(_KEY_BITS),
+                        item.kind,
+                        item.difficulty,
+                        item.question,
+                        item.answer,
+                        json.dumps(item.payload, ensure_ascii=False),
+                        fingerprint,
+                        now,
+                    ),
+                )
+                if cursor.rowcount:
+                    item.id = cursor.lastrowid
+                    added += 1
+                else:
+                    item.id = self._conn.execute(
+                        "SELECT id FROM items WHERE fingerprint = ?", (fingerprint,)
+                    ).fetchone()[0]
+            self._conn.commit()
+        self.counters.inc("stored", added)
+        return added
+
+    def _seek(
+        self,
+        topic: str,
+        grade: str,
+        band_index: int,
+        count: int,
+        kinds: tuple[str, ...] | None,
+        class_id: str | None,
+        exclude: set[int],
+    ) -> list[Item]:
+        """Up to `count` items of a band following a random point, wrapping round."""
+        where = "topic = ? AND grade = ? AND band = ?"
+        params: list[Any] = [topic, grade, band_index]
+        if kinds:
+            where += f" AND kind IN ({', '.join('?' * len(kinds))})"
+            params += kinds
+        if class_id is not None:
+            where += (
+                " AND NOT EXISTS (SELECT 1 FROM served WHERE class_id = ? "
+                "AND item_id = items.id)"
+            )
+            params.append(class_id)
+        if exclude:
+            where += f" AND id NOT IN ({', '.join('?' * len(exclude))})"
+            params += exclude
+        start = self.rng.getrandbits(_KEY_BITS)
+        rows: list[tuple] = []
+        for condition in ("sample_key >= ?", "sample_key < ?"):
+            if len(rows) >= count:
+                break
+            rows += self._conn.execute(
+                "SELECT id, kind, difficulty, question, answer, payload FROM items "
+                f"WHERE {where} AND {condition} ORDER BY sample_key LIMIT ?",
+                (*params, start, count - len(rows)),
+            ).fetchall()
+        return [
+            Item(
+                topic,
+                grade,
+                kind,
+                question,
+                answer,
+                difficulty,
+                json.loads(payload),
+                id,
+            )
+            for id, kind, difficulty, question, answer, payload in rows
+        ]
+
+    def sample(
+        self,
+        topic: str,
+        grade: str | int,
+        count: int,
+        difficulty: str | None = None,
+        kinds: Iterable[str] | None = None,
+        class_id: str | None = None,
+    ) -> list[Item]:
+        """
+        Up to `count` random items on a topic for a grade, easiest first.
+
+        :param difficulty: One of BANDS, or None for a mix of all three; a band
+            that runs short is made up from the nearest others
+        :param kinds: Question types to choose from; None for any
+        :param class_id: Leave out the items this class was given before
+        """
+        topic, grade = normalize_topic(topic), normalize_grade(grade)
+        kind_filter = tuple(kinds) if kinds is not None else None
+        if difficulty is None:
+            wanted = dict.fromkeys(range(len(BANDS)), count // 3)
+            for index in (1, 0, 2)[: count % 3]:
+                wanted[index] += 1
+        else:
+            wanted = {BANDS.index(difficulty): count}
+        chosen: list[Item] = []
+        exclude: set[int] = set()
+        with self._lock:
+            for index, n in wanted.items():
+                found = self._seek(
+                    topic, grade, index, n, kind_filter, class_id, exclude
+                )
+                chosen += found
+                exclude.update(item.id for item in found if item.id is not None)
+            target = BANDS.index(difficulty) if difficulty else 1
+            for index in sorted(range(len(BANDS)), key=lambda i: abs(i - target)):
+                if len(chosen) >= count:
+                    break
+                found = self._seek(
+                    topic,
+                    grade,
+                    index,
+                    count - len(chosen),
+                    kind_filter,
+                    class_id,
+                    exclude,
+                )
+                chosen += found
+                exclude.update(item.id for item in found if item.id is not None)
+        self.counters.inc("sampled", len(chosen))
+        return sorted(chosen, key=lambda item: item.difficulty)
+
+    def mark_served(self, class_id: str, items: Iterable[Item]) -> None:
+        """Record that a class was given these items, so it does not get them again."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO served VALUES (?, ?, ?)",
+                [(class_id, item.id, now) for item in items if item.id is not None],
+            )
+            self._conn.commit()
+
+    def count(self, topic: str | None = None, grade: str | int | None = None) -> int:
+        """Items banked, in all or on a topic and grade."""
+        with self._lock:
+            if topic is None or grade is None:
+                row = self._conn.execute("SELECT COUNT(*) FROM items").fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT COUNT(*) FROM items WHERE topic = ? AND grade = ?",
+                    (normalize_topic(topic), normalize_grade(grade)),
+                ).fetchone()
+        return int(row[0])
+
+
+@dataclass
+class ItemFormat:
+    """Where a structured generator's output keeps its questions, and their shape."""
+
+    field: str
+    """List field of the output schema holding the questions."""
+    kinds: tuple[str, ...]
+    """Question types the generator can use from the bank."""
+    kind: Callable[[dict[str, Any]], str]
+    question: Callable[[dict[str, Any]], str]
+    answer: Callable[[dict[str, Any]], str]
+    instructions: str
+    """Students' instructions for an output assembled entirely from the bank."""
+    label: Callable[[dict[str, Any]], str | None] = lambda item: None
+    """The generator's own difficulty label of a question, if it has one."""
+    word_bank: Callable[[dict[str, Any]], list[str]] | None = None
+    """Words a question adds to the output's `word_bank`, if the schema has one."""
+
+
+@dataclass
+class _Request:
+    topic: str
+    grade: str
+    count: int
+    difficulty: str | None
+    class_id: str
+
+
+def _text(content: types.Content | None) -> str:
+    if not content or not content.parts:
+        return ""
+    return " ".join(
+        part.text for part in content.parts if part.text and not part.thought
+    )
+
+
+def _as_text(item: Item) -> str:
+    options = item.payload.get("options")
+    if not options:
+        return item.question
+    return f"{item.question} ({'; '.join(options)})"
+
+
+class ItemBankGaps:
+    """
+    Model callbacks that take a generator's questions from the item bank and
+    leave only the missing ones to the model.
+
+    Structured generators (`formats`) get their banked questions merged into
+    the model's answer, which is banked in turn; generators writing free text
+    (`text_agents`) are given the banked questions to use word for word.
+    """
+
+    def __init__(
+        self,
+        formats: dict[str, ItemFormat],
+        text_agents: Iterable[str] = (),
+        default_count: int = 10,
+        enabled: bool = True,
+        bank: ItemBank | None = None,
+    ) -> None:
+        """
+        :param formats: Output format of each structured generator, by agent name
+        :param text_agents: Generators whose output is free text
+        :param default_count: Questions assumed when a request names no number
+        :param enabled: When false, every question is generated and none banked
+        :param bank: Defaults to the process-wide one (`get_item_bank`)
+        """
+        self.enabled = enabled
+        self.formats = formats
+        self.text_agents = set(text_agents)
+        self.default_count = default_count
+        self._bank = bank
+        self._structured: dict[str, StructuredOutput] = {}
+        # (invocation, agent) -> request and the banked items it was given
+        self._pending: OrderedDict[tuple[str, str], tuple[_Request, list[Item]]] = (
+            OrderedDict()
+        )
+        # (invocation, agent) -> request and sample a speculative run took
+        self._speculated: OrderedDict[tuple[str, str], tuple[_Request, list[Item]]] = (
+            OrderedDict()
+        )
+        # (invocation, agent) -> class and the items in the answer being made,
+        # marked served once the generator has delivered it
+        self._answering: OrderedDict[tuple[str, str], tuple[str, list[Item]]] = (
+            OrderedDict()
+        )
+
+    @property
+    def bank(self) -> ItemBank:
+        return self._bank or get_item_bank()
+
+    def _request(self, callback_context: CallbackContext) -> _Request | None:
+        """The topic, grade, size and difficulty asked for, if topic and grade are known."""
+        text = _text(callback_context.user_content)
+        request = parse_request(
+            callback_context.agent_name, text, callback_context.state.to_dict()
+        )
+        # "a quiz of 5 questions on plants" is a quiz on plants.
+        topic = _COUNT.sub(" ", request.topic).strip()
+        if not request.grade or not topic or request.topic == text.strip():
+            return None
+        count = _COUNT.search(text)
+        difficulty = [
+            name for name, pattern in _DIFFICULTY.items() if pattern.search(text)
+        ]
+        ctx = callback_context._invocation_context
+        grade = normalize_grade(request.grade)
+        return _Request(
+            topic=topic,
+            grade=grade,
+            count=min(50, int(count.group(1))) if count else self.default_count,
+            difficulty=difficulty[0] if len(difficulty) == 1 else None,
+            class_id=f"{ctx.user_id}/{grade}",
+        )
+
+    def before_model_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> LlmResponse | None:
+        agent = callback_context.agent_name
+        item_format = self.formats.get(agent)
+        if not self.enabled or (item_format is None and agent not in self.text_agents):
+            return None
+        key = (callback_context.invocation_id, agent)
+        speculating = is_speculating()
+        if not speculating and (key in self._pending or key in self._answering):
+            # A later call of a generator that is already running.
+            return None
+        sampled = None if speculating else self._speculated.pop(key, None)
+        if sampled is None:
+            request = self._request(callback_context)
+            if request is None:
+                return None
+            sampled = (
+                request,
+                self.bank.sample(
+                    request.topic,
+                    request.grade,
+                    request.count,
+                    difficulty=request.difficulty,
+                    kinds=item_format.kinds if item_format else None,
+                    class_id=request.class_id,
+                ),
+            )
+        request, items = sampled
+        if speculating:
+            # The real run takes the same sample, so its model request is the
+            # one the speculation made; nothing is served or banked until then.
+            self._speculated[key] = sampled
+            while len(self._speculated) > _MAX_PENDING:
+                self._speculated.popitem(last=False)
+        else:
+            _counters.inc("requested", request.count)
+            _counters.inc("from_bank", len(items))
+            _counters.inc(f"from_bank.{agent}", len(items))
+            self._answer_with(key, request.class_id, items)
+        missing = request.count - len(items)
+
+        if item_format is None:
+            if items:
+                listed = "\n".join(f"- {_as_text(item)}" for item in items)
+                llm_request.append_instructions(
+                    [
+                        f"Use these {len(items)} questions from the school's "
+                        f"question bank in the worksheet, word for word"
+                        + (
+                            f", and write only {missing} new questions:\n"
+                            if missing > 0
+                            else ", and write no new questions:\n"
+                        )
+                        + listed
+                    ]
+                )
+            return None
+
+        if missing <= 0:
+            if not speculating:
+                _counters.inc("without_model")
+            output = {
+                "topic": request.topic,
+                "grade": request.grade,
+                "instructions": item_format.instructions,
+            }
+            return self._answer(callback_context, output, items, [])
+        if items:
+            listed = "\n".join(f"- {item.question}" for item in items)
+            llm_request.append_instructions(
+                [
+                    f"The school's question bank already has {len(items)} of the "
+                    f"{request.count} questions for this request; they are added "
+                    f"to your answer automatically. Write only {missing} new "
+                    f"questions in `{item_format.field}`, different from these:\n"
+                    + listed
+                ]
+            )
+        if speculating:
+            return None
+        self._pending[key] = (request, items)
+        while len(self._pending) > _MAX_PENDING:
+            self._pending.popitem(last=False)
+        return None
+
+    def after_model_callback(
+        self, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> LlmResponse | None:
+        """Bank the new questions and merge in the banked ones."""
+        if llm_response.partial or is_speculating():
+            return None
+        agent = callback_context.agent_name
+        item_format = self.formats.get(agent)
+        pending = self._pending.pop((callback_context.invocation_id, agent), None)
+        if item_format is None or pending is None:
+            return None
+        request, items = pending
+        try:
+            output = json.loads(_text(llm_response.content))
+            generated = list(output[item_format.field])
+        except (ValueError, KeyError, TypeError):
+            return None
+        new_items = []
+        for payload in generated:
+            try:
+                kind = item_format.kind(payload)
+                question = item_format.question(payload)
+                answer = item_format.answer(payload)
+            except (KeyError, TypeError):
+                continue
+            difficulty = estimate_difficulty(
+                kind, question, answer, item_format.label(payload)
+            )
+            new_items.append(
+                Item(
+                    request.topic,
+                    request.grade,
+                    kind,
+                    question,
+                    answer,
+                    difficulty,
+                    payload,
+                )
+            )
+        self.bank.add(new_items)
+        self._answer_with(
+            (callback_context.invocation_id, agent), request.class_id, new_items
+        )
+        _counters.inc("generated", len(new_items))
+        if not items:
+            return None
+        return self._answer(callback_context, output, items, new_items, llm_response)
+
+    def _answer_with(
+        self, key: tuple[str, str], class_id: str, items: list[Item]
+    ) -> None:
+        """Note items going into the answer the generator at `key` is making."""
+        _, answered = self._answering.setdefault(key, (class_id, []))
+        answered += items
+        while len(self._answering) > _MAX_PENDING:
+            self._answering.popitem(last=False)
+
+    def after_agent_callback(self, callback_context: CallbackContext) -> None:
+        """
+        Mark the items of the generator's answer served to the class, now
+        that it was delivered; a failed or cancelled run serves nothing.
+        """
+        answering = self._answering.pop(
+            (callback_context.invocation_id, callback_context.agent_name), None
+        )
+        if answering is not None and not is_speculating():
+            self.bank.mark_served(*answering)
+        return None
+
+    def _answer(
+        self,
+        callback_context: CallbackContext,
+        output: dict[str, Any],
+        items: list[Item],
+        new_items: list[Item],
+        llm_response: LlmResponse | None = None,
+    ) -> LlmResponse:
+        """
+        The agent's reply with the banked items merged into `output`, easiest
+        question first, rendered and stored by the agent's StructuredOutput.
+        """
+        agent = callback_context.agent_name
+        item_format = self.formats[agent]
+        merged = sorted([*items, *new_items], key=lambda item: item.difficulty)
+        output[item_format.field] = [item.payload for item in merged]
+        if item_format.word_bank is not None:
+            words = set(output.get("word_bank") or [])
+            for item in items:
+                words.update(item_format.word_bank(item.payload))
+            output["word_bank"] = sorted(words, key=str.lower)
+        response = LlmResponse(
+            content=types.Content(
+                role="model", parts=[types.Part(text=json.dumps(output))]
+            ),
+            usage_metadata=llm_response.usage_metadata if llm_response else None,
+            turn_complete=True,
+        )
+        response = self._structured[agent](callback_context, response) or response
+        response.custom_metadata = {"item_bank": len(items)}
+        return response
+
+    def install(self, agent: BaseAgent) -> None:
+        """Add the callbacks, first, to the generators under `agent`."""
+        if isinstance(agent, LlmAgent) and (
+            agent.name in self.formats or agent.name in self.text_agents
+        ):
+            add_callback(agent, "before_model_callback", self.before_model_callback)
+            add_callback(
+                agent, "after_agent_callback", self.after_agent_callback, first=False
+            )
+        if isinstance(agent, LlmAgent) and agent.name in self.formats:
+            after = callback_list(agent.after_model_callback)
+            structured = [c for c in after if isinstance(c, StructuredOutput)]
+            if not structured:
+                raise ValueError(f"{agent.name} has no StructuredOutput callback")
+            # Merged answers are rendered and stored by the agent's own
+            # StructuredOutput, which then no longer runs after this callback.
+            self._structured[agent.name] = structured[0]
+            agent.after_model_callback = [self.after_model_callback, *after]
+        for sub_agent in agent.sub_agents:
+            self.install(sub_agent)
+
+
+_default_bank: ItemBank | None = None
+
+
+def get_item_bank() -> ItemBank:
+    """Return the process-wide item bank at the configured location."""
+    global _default_bank
+    if _default_bank is None:
+        from app.config import config
+
+        _default_bank = ItemBank(config.item_bank_path)
+    return _default_bank
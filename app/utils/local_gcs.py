@@ -0,0 +1,176 @@
+"""
+In-memory stand-in for the parts of `google.cloud.storage` the artifact
+services use, for tests and benchmarks without a bucket or credentials.
+
+Transfers can be given a per-request latency and a per-stream bandwidth, so
+upload-time savings (deduplication, parallel composite uploads) show up in
+wall-clock measurements the way they would against real GCS.
+
+    client = LocalGcsClient(latency=0.02, bandwidth=50e6)
+    service = DeduplicatingGcsArtifactService("bucket", client=client)
+"""
+
+import threading
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import IO, Any
+
+
+@dataclass
+class _Object:
+    data: bytes
+    content_type: str | None
+    metadata: dict[str, str] | None
+
+
+@dataclass
+class TransferStats:
+    """Requests and bytes seen by a LocalGcsClient."""
+
+    requests: int = 0
+    bytes_uploaded: int = 0
+    bytes_downloaded: int = 0
+    upload_seconds: float = 0.0
+    """Sum of simulated upload durations, across threads."""
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+class LocalGcsClient:
+    """A storage client whose buckets live in memory."""
+
+    def __init__(self, latency: float = 0.0, bandwidth: float | None = None) -> None:
+        """
+        :param latency: Seconds added to every request
+        :param bandwidth: Bytes per second of each transfer; None for unlimited
+        """
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.stats = TransferStats()
+        self._buckets: dict[str, LocalBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, name: str) -> "LocalBucket":
+        with self._lock:
+            if name not in self._buckets:
+                self._buckets[name] = LocalBucket(self, name)
+            return self._buckets[name]
+
+    def list_blobs(self, bucket: "LocalBucket", prefix: str = "") -> list["LocalBlob"]:
+        self._request()
+        with bucket._lock:
+            names = sorted(name for name in bucket._objects if name.startswith(prefix))
+        return [bucket.blob(name) for name in names]
+
+    def _request(self, upload: int = 0, download: int = 0) -> None:
+        seconds = self.latency
+        if self.bandwidth:
+            seconds += (upload + download) / self.bandwidth
+        if seconds:
+            time.sleep(seconds)
+        with self.stats._lock:
+            self.stats.requests += 1
+            self.stats.bytes_uploaded += upload
+            self.stats.bytes_downloaded += download
+            if upload:
+                self.stats.upload_seconds += seconds
+
+
+class LocalBucket:
+    def __init__(self, client: LocalGcsClient, name: str) -> None:
+        self.client = client
+        self.name = name
+        self._objects: dict[str, _Object] = {}
+        self._lock = threading.Lock()
+
+    def blob(self, name: str, chunk_size: int | None = None) -> "LocalBlob":
+        return LocalBlob(self, name, chunk_size)
+
+    def get_blob(self, name: str) -> "LocalBlob | None":
+        self.client._request()
+        blob = self.blob(name)
+        return blob if blob._load() else None
+
+    @property
+    def stored_bytes(self) -> int:
+        """Total size of all objects in the bucket."""
+        with self._lock:
+            return sum(len(obj.data) for obj in self._objects.values())
+
+    @property
+    def object_count(self) -> int:
+        with self._lock:
+            return len(self._objects)
+
+
+class LocalBlob:
+    def __init__(self, bucket: LocalBucket, name: str, chunk_size: int | None) -> None:
+        self.bucket = bucket
+        self.name = name
+        self.chunk_size = chunk_size
+        self.metadata: dict[str, str] | None = None
+        self.content_type: str | None = None
+        self.size: int | None = None
+
+    def _load(self) -> bool:
+        with self.bucket._lock:
+            obj = self.bucket._objects.get(self.name)
+        if obj is None:
+            return False
+        self.metadata = dict(obj.metadata) if obj.metadata else None
+        self.content_type = obj.content_type
+        self.size = len(obj.data)
+        return True
+
+    def _store(self, data: bytes, content_type: str | None) -> None:
+        self.bucket.client._request(upload=len(data))
+        obj = _Object(
+            data, content_type, dict(self.metadata) if self.metadata else None
+        )
+        with self.bucket._lock:
+            self.bucket._objects[self.name] = obj
+        self.content_type, self.size = content_type, len(data)
+
+    def upload_from_string(
+        self, data: bytes | str, content_type: str | None = None
+    ) -> None:
+        self._store(data.encode() if isinstance(data, str) else data, content_type)
+
+    def upload_from_file(
+        self, file: IO[bytes], size: int | None = None, content_type: str | None = None
+    ) -> None:
+        self._store(file.read() if size is None else file.read(size), content_type)
+
+    def download_as_bytes(self) -> bytes:
+        with self.bucket._lock:
+            obj = self.bucket._objects.get(self.name)
+        if obj is None:
+            raise FileNotFoundError(self.name)
+        self.bucket.client._request(download=len(obj.data))
+        self.content_type = obj.content_type
+        return obj.data
+
+    def exists(self) -> bool:
+        self.bucket.client._request()
+        return self._load()
+
+    def reload(self) -> None:
+        self.bucket.client._request()
+        if not self._load():
+            raise FileNotFoundError(self.name)
+
+    def delete(self) -> None:
+        self.bucket.client._request()
+        with self.bucket._lock:
+            self.bucket._objects.pop(self.name, None)
+
+    def compose(self, sources: Iterable["LocalBlob"], **_: Any) -> None:
+        """Concatenate `sources` into this blob, server side."""
+        self.bucket.client._request()
+        with self.bucket._lock:
+            parts = [self.bucket._objects[source.name] for source in sources]
+            self.bucket._objects[self.name] = _Object(
+                b"".join(part.data for part in parts),
+                self.content_type or parts[0].content_type,
+                dict(self.metadata) if self.metadata else None,
+            )
@@ -0,0 +1,334 @@
+"""
+Persistent cache of prepared teaching materials.
+
+Materials are keyed by (material type, topic, grade), each normalised on its
+own, so ("quiz", "Fractions", "Grade 5") and ("quizzes", "fractions", "5th")
+hit the same entry. Every lookup is logged, which lets the pre-warm report
+compare the predicted hit rate of a run with what teachers actually requested.
+
+`PreparedMaterials` answers the root agent's first model call from the cache
+when the teacher asks for one material on a topic for a grade, so a prepared
+request costs no model call at all.
+
+The cache is a local SQLite file. Every process reading it must share the
+file `make prewarm` wrote, which holds for a single server or a shared volume
+but not for Agent Engine, where each instance starts with an empty cache:
+there, pre-warming only pays off for the materials prepared by that instance.
+"""
+
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from google.adk.agents import LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from app.utils.callbacks import add_callback
+from app.utils.degraded import parse_request
+from app.utils.metrics import counters
+from app.utils.teacher_profiles import LANGUAGES
+
+MATERIAL_TYPES = ("worksheet", "quiz", "mindmap", "lesson_plan")
+
+_MATERIAL_ALIASES = {
+    "worksheet": "worksheet",
+    "worksheets": "worksheet",
+    "practice sheet": "worksheet",
+    "quiz": "quiz",
+    "quizzes": "quiz",
+    "mindmap": "mindmap",
+    "mind map": "mindmap",
+    "mindmaps": "mindmap",
+    "lesson plan": "lesson_plan",
+    "lesson_plan": "lesson_plan",
+    "lesson plans": "lesson_plan",
+    "weekly lesson plan": "lesson_plan",
+}
+
+# What a teacher asked for, by the words they used.
+_REQUESTED = [
+    ("worksheet", re.compile(r"\bworksheets?\b|\bpractice sheets?\b", re.I)),
+    ("quiz", re.compile(r"\bquiz(?:zes)?\b", re.I)),
+    ("mindmap", re.compile(r"\bmind ?maps?\b", re.I)),
+    ("lesson_plan", re.compile(r"\blesson plans?\b", re.I)),
+]
+
+# Asks beyond a topic and grade, which a prepared material (in English, at its
+# default length and level) would ignore: "10 questions", "hard", "in Hindi".
+_CONSTRAINTS = re.compile(
+    r"(?<![\w.])(?<!grade )(?<!class )(?<!std )(?<!std\. )(?<!standard )"
+    r"\d{1,3}\s+(?:[\w-]+\s+){0,4}?"
+    r"(?:questions?|items?|blanks?|sentences?|mcqs?|problems?|exercises?)\b"
+    r"|\b(?:easy|simple|basic|medium|moderate|hard|difficult|challenging"
+    r"|advanced|tough)\b"
+    r"|\b(?:" + "|".join(name for name in LANGUAGES if name != "English") + r")\b",
+    re.I,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS materials (
+    material_type TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    grade TEXT NOT NULL,
+    content TEXT NOT NULL,
+    source TEXT NOT NULL,
+    tokens INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (material_type, topic, grade)
+);
+CREATE TABLE IF NOT EXISTS lookups (
+    material_type TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    grade TEXT NOT NULL,
+    hit INTEGER NOT NULL,
+    looked_up_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lookups_time ON lookups (looked_up_at);
+CREATE TABLE IF NOT EXISTS prewarm_runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    week_start TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    planned INTEGER NOT NULL,
+    generated INTEGER NOT NULL,
+    tokens INTEGER NOT NULL,
+    predicted_hit_rate REAL NOT NULL
+);
+"""
+
+
+def normalize_material_type(material_type: str) -> str:
+    """Map a free-form material name onto one of MATERIAL_TYPES."""
+    name = " ".join(material_type.lower().replace("-", " ").split())
+    if name in _MATERIAL_ALIASES:
+        return _MATERIAL_ALIASES[name]
+    return name.replace(" ", "_")
+
+
+def normalize_topic(topic: str) -> str:
+    """Lowercase a topic and strip punctuation and repeated whitespace."""
+    return " ".join(re.sub(r"[^\w\s]", " ", topic.lower()).split())
+
+
+def normalize_grade(grade: str | int) -> str:
+    """Reduce "Grade 5", "5th" or "class 5" to "5"; other values are lowercased."""
+    match = re.search(r"\d+", str(grade))
+    return match.group() if match else " ".join(str(grade).lower().split())
+
+
+@dataclass
+class CachedMaterial:
+    material_type: str
+    topic: str
+    grade: str
+    content: str
+    source: str
+    tokens: int
+    created_at: float
+
+
+class MaterialCache:
+    """SQLite-backed store of prepared materials, shared across processes."""
+
+    def __init__(self, path: str | Path, max_age_days: float = 14) -> None:
+        """
+        :param path: Location of the SQLite database, created if missing
+        :param max_age_days: Entries older than this are treated as misses
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_age_seconds = max_age_days * 24 * 3600
+        self.counters = counters("material_cache")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def _key(material_type: str, topic: str, grade: str | int) -> tuple[str, str, str]:
+        return (
+            normalize_material_type(material_type),
+            normalize_topic(topic),
+            normalize_grade(grade),
+        )
+
+    def get(
+        self, material_type: str, topic: str, grade: str | int, record: bool = True
+    ) -> CachedMaterial | None:
+        """
+        Return the cached material, or None on a miss.
+
+        :param record: Log the lookup for hit-rate reporting; pass False for
+            internal checks such as the pre-warm job skipping existing entries
+        """
+        key = self._key(material_type, topic, grade)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, source, tokens, created_at FROM materials "
+                "WHERE material_type = ? AND topic = ? AND grade = ? "
+                "AND created_at >= ?",
+                (*key, now - self.max_age_seconds),
+            ).fetchone()
+            if record:
+                self._conn.execute(
+                    "INSERT INTO lookups VALUES (?, ?, ?, ?, ?)",
+                    (*key, int(row is not None), now),
+                )
+                self._conn.commit()
+        if record:
+            self.counters.inc("hits" if row else "misses")
+        if row is None:
+            return None
+        return CachedMaterial(*key, *row)
+
+    def put(
+        self,
+        material_type: str,
+        topic: str,
+        grade: str | int,
+        content: str,
+        source: str,
+        tokens: int = 0,
+    ) -> None:
+        """Store or replace a material."""
+        key = self._key(material_type, topic, grade)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO materials VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*key, content, source, tokens, time.time()),
+            )
+            self._conn.commit()
+        self.counters.inc("stored")
+
+    def hit_rate(self, since: float, until: float) -> tuple[int, int]:
+        """Return (hits, lookups) recorded in the time range [since, until)."""
+        with self._lock:
+            hits, total = self._conn.execute(
+                "SELECT COALESCE(SUM(hit), 0), COUNT(*) FROM lookups "
+                "WHERE looked_up_at >= ? AND looked_up_at < ?",
+                (since, until),
+            ).fetchone()
+        return hits, total
+
+    def start_run(self, week_start: str, planned: int) -> int:
+        """Record the start of a pre-warm run and return its id."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO prewarm_runs (week_start, started_at, planned, "
+                "generated, tokens, predicted_hit_rate) VALUES (?, ?, ?, 0, 0, 0)",
+                (week_start, time.time(), planned),
+            )
+            self._conn.commit()
+        return int(cursor.lastrowid or 0)
+
+    def finish_run(
+        self, run_id: int, generated: int, tokens: int, predicted_hit_rate: float
+    ) -> None:
+        """Record the outcome of a pre-warm run."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE prewarm_runs SET finished_at = ?, generated = ?, tokens = ?, "
+                "predicted_hit_rate = ? WHERE run_id = ?",
+                (time.time(), generated, tokens, predicted_hit_rate, run_id),
+            )
+            self._conn.commit()
+
+    def last_run(self, week_start: str) -> dict | None:
+        """Return the most recent finished pre-warm run for a week."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT * FROM prewarm_runs WHERE week_start = ? "
+                "AND finished_at IS NOT NULL ORDER BY run_id DESC LIMIT 1",
+                (week_start,),
+            )
+            row = cursor.fetchone()
+            columns = [column[0] for column in cursor.description]
+        return dict(zip(columns, row, strict=True)) if row else None
+
+
+def requested_material(text: str) -> str | None:
+    """The one material type a request asks for, or None for none or several."""
+    found = [name for name, pattern in _REQUESTED if pattern.search(text)]
+    return found[0] if len(found) == 1 else None
+
+
+class PreparedMaterials:
+    """
+    `before_model_callback` for the root agent, answering a request for one
+    material on a topic and grade with the prepared one, without a model call.
+
+    Only the first model call of a request is answered, and only when the
+    request names its topic and the grade is known (from the message or the
+    teacher's profile) and asks for nothing the key leaves out: a question
+    count, a difficulty or a language. Everything else goes to the model as
+    before.
+    """
+
+    def __init__(self, cache: MaterialCache | None = None) -> None:
+        """:param cache: Defaults to the process-wide one (`get_material_cache`)"""
+        self._cache = cache
+        # Requests whose first model call was seen, remembered at most 1024.
+        self._seen: OrderedDict[str, None] = OrderedDict()
+
+    @property
+    def cache(self) -> MaterialCache:
+        return self._cache or get_material_cache()
+
+    def before_model_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> LlmResponse | None:
+        invocation_id = callback_context.invocation_id
+        if invocation_id in self._seen:
+            return None
+        self._seen[invocation_id] = None
+        while len(self._seen) > 1024:
+            self._seen.popitem(last=False)
+
+        content = callback_context.user_content
+        text = (
+            " ".join(part.text for part in (content.parts or []) if part.text)
+            if content
+            else ""
+        )
+        material_type = requested_material(text)
+        if material_type is None or _CONSTRAINTS.search(text):
+            return None
+        request = parse_request(
+            callback_context.agent_name, text, callback_context.state.to_dict()
+        )
+        if not request.grade or request.topic == text.strip():
+            return None
+        material = self.cache.get(material_type, request.topic, request.grade)
+        if material is None:
+            return None
+        return LlmResponse(
+            content=types.Content(
+                role="model", parts=[types.Part(text=material.content)]
+            ),
+            custom_metadata={"prepared": material_type},
+            turn_complete=True,
+        )
+
+    def install(self, agent: LlmAgent) -> None:
+        """Add the callback, first, to `agent` (the root agent)."""
+        add_callback(agent, "before_model_callback", self.before_model_callback)
+
+
+_default_cache: MaterialCache | None = None
+
+
+def get_material_cache() -> MaterialCache:
+    """Return the process-wide cache at the configured location."""
+    global _default_cache
+    if _default_cache is None:
+        from app.config import config
+
+        _default_cache = MaterialCache(config.material_cache_path)
+    return _default_cache
@@ -0,0 +1,50 @@
+import threading
+from collections import defaultdict
+
+
+class Counters:
+    """A named group of monotonically increasing counters, safe across threads."""
+
+    def __init__(self, namespace: str) -> None:
+        self.namespace = namespace
+        self._values: dict[str, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, amount: float = 1) -> None:
+        """Increase the counter `name` by `amount`."""
+        with self._lock:
+            self._values[name] += amount
+
+    def get(self, name: str) -> float:
+        """Return the current value of the counter `name`."""
+        with self._lock:
+            return self._values.get(name, 0)
+
+    def snapshot(self) -> dict[str, float]:
+        """Return a copy of all counters in this group."""
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self) -> None:
+        """Reset all counters in this group to zero."""
+        with self._lock:
+            self._values.clear()
+
+
+_registry: dict[str, Counters] = {}
+_registry_lock = threading.Lock()
+
+
+def counters(namespace: str) -> Counters:
+    """Return the counter group for `namespace`, creating it on first use."""
+    with _registry_lock:
+        if namespace not in _registry:
+            _registry[namespace] = Counters(namespace)
+        return _registry[namespace]
+
+
+def snapshot() -> dict[str, dict[str, float]]:
+    """Return the current value of every registered counter, by namespace."""
+    with _registry_lock:
+        groups = list(_registry.values())
+    return {group.namespace: group.snapshot() for group in groups}
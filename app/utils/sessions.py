@@ -0,0 +1,481 @@
+"""
+SQLite session service for the development server.
+
+ADK's in-memory service loses sessions on every reload and deep-copies the
+whole session on each read; its database service rewrites the full session
+state on every event. Sahayak's state holds large `output_key` values
+(`baseline_worksheet`, `content_variations`, `weekly_lesson_plan`, ...), so
+both costs grow with every turn. `SqliteSessionService` instead:
+
+- writes one row per event and one row per changed state key (the event's
+  state delta), in a single WAL transaction,
+- stores large values (state values and long text parts) out of line, once
+  per content hash; a sub-agent's output is usually both the text of its
+  event and the value of its `output_key`, so it is stored once,
+- keeps the most recently used sessions in memory, so a turn on a hot session
+  reads nothing from disk.
+
+It assumes a single server process owns the database, as `make dev-backend`
+does: the in-memory copies are not invalidated by writes from elsewhere.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session, State
+from google.adk.sessions.base_session_service import (
+    GetSessionConfig,
+    ListSessionsResponse,
+)
+
+from app.utils.metrics import counters
+
+logger = logging.getLogger(__name__)
+
+# Values whose JSON is at least this long are stored out of line.
+LARGE_VALUE_BYTES = 1024
+# Marks an out-of-line value: {"$blob": "<sha256>"}.
+_REF = "$blob"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id)
+);
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY,
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_session ON events (app_name, user_id, session_id);
+-- App state has user_id = session_id = '', user state has session_id = ''.
+CREATE TABLE IF NOT EXISTS state (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, key)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_SessionKey = tuple[str, str, str]
+
+
+def _split_state(
+    state: dict[str, Any],
+) -> tuple[dict[str, Any], dict[str, Any], dict[str, Any]]:
+    """Split a state (delta) into app, user and session scoped parts."""
+    app: dict[str, Any] = {}
+    user: dict[str, Any] = {}
+    session: dict[str, Any] = {}
+    for key, value in state.items():
+        if key.startswith(State.APP_PREFIX):
+            app[key.removeprefix(State.APP_PREFIX)] = value
+        elif key.startswith(State.USER_PREFIX):
+            user[key.removeprefix(State.USER_PREFIX)] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session[key] = value
+    return app, user, session
+
+
+def _ref_hash(value: Any) -> str | None:
+    if isinstance(value, dict) and len(value) == 1 and _REF in value:
+        return value[_REF]
+    return None
+
+
+class SqliteSessionService(BaseSessionService):
+    """Sessions in a SQLite database, with a hot-session cache in front."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        cache_size: int = 64,
+        large_value_bytes: int = LARGE_VALUE_BYTES,
+    ) -> None:
+        """
+        :param path: Location of the SQLite database, created if missing
+        :param cache_size: Sessions kept in memory; 0 reads every turn from disk
+        :param large_value_bytes: JSON length from which values go out of line
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.cache_size = cache_size
+        self.large_value_bytes = large_value_bytes
+        self.counters = counters("sessions")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode this is still durable across application crashes.
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        # Session-scoped state and events of hot sessions; app and user state
+        # are small and kept for every app and user seen.
+        self._sessions: OrderedDict[_SessionKey, Session] = OrderedDict()
+        self._app_state: dict[str, dict[str, Any]] = {}
+        self._user_state: dict[tuple[str, str], dict[str, Any]] = {}
+
+    # -- Encoding ------------------------------------------------------------
+
+    def _outline(self, value: Any) -> Any:
+        """Return `value`, or a reference to it once stored out of line."""
+        text = json.dumps(value, ensure_ascii=False)
+        if len(text) < self.large_value_bytes:
+            return value
+        digest = hashlib.sha256(text.encode()).hexdigest()
+        cursor = self._conn.execute(
+            "INSERT OR IGNORE INTO blobs VALUES (?, ?)", (digest, text)
+        )
+        if cursor.rowcount:
+            self.counters.inc("blobs_stored")
+            self.counters.inc("bytes_written", len(text))
+        else:
+            self.counters.inc("blobs_deduplicated")
+        return {_REF: digest}
+
+    def _outline_event(self, event: Event) -> str:
+        data = event.model_dump(mode="json", exclude_none=True)
+        actions = data.get("actions") or {}
+        if actions.get("state_delta"):
+            actions["state_delta"] = {
+                key: self._outline(value)
+                for key, value in actions["state_delta"].items()
+            }
+        for part in (data.get("content") or {}).get("parts") or []:
+            if "text" in part:
+                part["text"] = self._outline(part["text"])
+        return json.dumps(data, ensure_ascii=False)
+
+    def _blobs(self, hashes: set[str]) -> dict[str, Any]:
+        found: dict[str, Any] = {}
+        ordered = sorted(hashes)
+        # Stay below SQLite's limit on bound parameters.
+        for start in range(0, len(ordered), 500):
+            batch = ordered[start : start + 500]
+            rows = self._conn.execute(
+                "SELECT hash, value FROM blobs WHERE hash IN "
+                f"({', '.join('?' * len(batch))})",
+                batch,
+            )
+            found.update((digest, json.loads(text)) for digest, text in rows)
+        return found
+
+    def _load_state(
+        self, app_name: str, user_id: str, session_id: str
+    ) -> dict[str, Any]:
+        rows = self._conn.execute(
+            "SELECT key, value FROM state WHERE app_name = ? AND user_id = ? "
+            "AND session_id = ?",
+            (app_name, user_id, session_id),
+        )
+        state = {key: json.loads(value) for key, value in rows}
+        refs = {h for value in state.values() if (h := _ref_hash(value))}
+        if refs:
+            blobs = self._blobs(refs)
+            state = {
+                key: blobs[h] if (h := _ref_hash(value)) else value
+                for key, value in state.items()
+            }
+        return state
+
+    def _load_events(self, key: _SessionKey) -> list[Event]:
+        rows = self._conn.execute(
+            "SELECT data FROM events WHERE app_name = ? AND user_id = ? "
+            "AND session_id = ? ORDER BY seq",
+            key,
+        )
+        events = [json.loads(data) for (data,) in rows]
+
+        def values(event: dict) -> list[tuple[dict, str]]:
+            """(container, key) of every value that may be out of line."""
+            delta = (event.get("actions") or {}).get("state_delta") or {}
+            parts = (event.get("content") or {}).get("parts") or []
+            return [(delta, key) for key in delta] + [
+                (part, "text") for part in parts if "text" in part
+            ]
+
+        refs = {
+            h
+            for event in events
+            for container, name in values(event)
+            if (h := _ref_hash(container[name]))
+        }
+        blobs = self._blobs(refs) if refs else {}
+        for event in events:
+            for container, name in values(event):
+                if h := _ref_hash(container[name]):
+                    container[name] = blobs[h]
+        return [Event.model_validate(event) for event in events]
+
+    def _write_state(
+        self, app_name: str, user_id: str, session_id: str, state: dict[str, Any]
+    ) -> None:
+        for key, value in state.items():
+            self._conn.execute(
+                "INSERT OR REPLACE INTO state VALUES (?, ?, ?, ?, ?)",
+                (
+                    app_name,
+                    user_id,
+                    session_id,
+                    key,
+                    json.dumps(self._outline(value), ensure_ascii=False),
+                ),
+            )
+        self.counters.inc("state_rows_written", len(state))
+
+    # -- Cache ---------------------------------------------------------------
+
+    def _shared_state(self, app_name: str, user_id: str) -> dict[str, Any]:
+        """App and user state, with their prefixes."""
+        if app_name not in self._app_state:
+            self._app_state[app_name] = self._load_state(app_name, "", "")
+        if (app_name, user_id) not in self._user_state:
+            self._user_state[app_name, user_id] = self._load_state(
+                app_name, user_id, ""
+            )
+        state = {
+            State.APP_PREFIX + key: value
+            for key, value in self._app_state[app_name].items()
+        }
+        state.update(
+            (State.USER_PREFIX + key, value)
+            for key, value in self._user_state[app_name, user_id].items()
+        )
+        return state
+
+    def _update_shared(
+        self,
+        app_name: str,
+        user_id: str,
+        app_state: dict[str, Any],
+        user_state: dict[str, Any],
+    ) -> None:
+        self._shared_state(app_name, user_id)
+        self._app_state[app_name].update(app_state)
+        self._user_state[app_name, user_id].update(user_state)
+
+    def _remember(self, key: _SessionKey, session: Session) -> None:
+        if self.cache_size <= 0:
+            return
+        self._sessions[key] = session
+        self._sessions.move_to_end(key)
+        while len(self._sessions) > self.cache_size:
+            self._sessions.popitem(last=False)
+            self.counters.inc("cache_evictions")
+
+    def _stored_session(self, key: _SessionKey) -> Session | None:
+        session = self._sessions.get(key)
+        if session is not None:
+            self._sessions.move_to_end(key)
+            self.counters.inc("cache_hits")
+            return session
+        self.counters.inc("cache_misses")
+        row = self._conn.execute(
+            "SELECT updated_at FROM sessions WHERE app_name = ? AND user_id = ? "
+            "AND session_id = ?",
+            key,
+        ).fetchone()
+        if row is None:
+            return None
+        app_name, user_id, session_id = key
+        session = Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=self._load_state(*key),
+            events=self._load_events(key),
+            last_update_time=row[0],
+        )
+        self._remember(key, session)
+        return session
+
+    def _copy(self, session: Session) -> Session:
+        """A copy for the caller: its own state dict and event list, which the
+        runner extends, sharing the (unmodified) events themselves."""
+        return Session(
+            app_name=session.app_name,
+            user_id=session.user_id,
+            id=session.id,
+            state={
+                **session.state,
+                **self._shared_state(session.app_name, session.user_id),
+            },
+            events=list(session.events),
+            last_update_time=session.last_update_time,
+        )
+
+    # -- BaseSessionService --------------------------------------------------
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: dict[str, Any] | None = None,
+        session_id: str | None = None,
+    ) -> Session:
+        session_id = (
+            session_id.strip()
+            if session_id and session_id.strip()
+            else str(uuid.uuid4())
+        )
+        app_state, user_state, session_state = _split_state(state or {})
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO sessions VALUES (?, ?, ?, ?, ?)",
+                (app_name, user_id, session_id, now, now),
+            )
+            self._write_state(app_name, user_id, session_id, session_state)
+            self._write_state(app_name, user_id, "", user_state)
+            self._write_state(app_name, "", "", app_state)
+            self._update_shared(app_name, user_id, app_state, user_state)
+            session = Session(
+                app_name=app_name,
+                user_id=user_id,
+                id=session_id,
+                state=session_state,
+                last_update_time=now,
+            )
+            self._remember((app_name, user_id, session_id), session)
+            return self._copy(session)
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: GetSessionConfig | None = None,
+    ) -> Session | None:
+        with self._lock:
+            stored = self._stored_session((app_name, user_id, session_id))
+            if stored is None:
+                return None
+            session = self._copy(stored)
+
+        if config:
+            if config.num_recent_events:
+                session.events = session.events[-config.num_recent_events :]
+            if config.after_timestamp:
+                session.events = [
+                    event
+                    for event in session.events
+                    if event.timestamp >= config.after_timestamp
+                ]
+        return session
+
+    async def list_sessions(
+        self, *, app_name: str, user_id: str
+    ) -> ListSessionsResponse:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id, updated_at FROM sessions "
+                "WHERE app_name = ? AND user_id = ? ORDER BY updated_at",
+                (app_name, user_id),
+            ).fetchall()
+        return ListSessionsResponse(
+            sessions=[
+                Session(
+                    app_name=app_name,
+                    user_id=user_id,
+                    id=session_id,
+                    last_update_time=updated_at,
+                )
+                for session_id, updated_at in rows
+            ]
+        )
+
+    async def delete_session(
+        self, *, app_name: str, user_id: str, session_id: str
+    ) -> None:
+        key = (app_name, user_id, session_id)
+        with self._lock, self._conn:
+            for table in ("events", "state", "sessions"):
+                self._conn.execute(
+                    f"DELETE FROM {table} WHERE app_name = ? AND user_id = ? "
+                    "AND session_id = ?",
+                    key,
+                )
+            self._sessions.pop(key, None)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        # Updates the caller's copy of the session.
+        await super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+
+        key = (session.app_name, session.user_id, session.id)
+        delta = (event.actions.state_delta if event.actions else None) or {}
+        app_state, user_state, session_state = _split_state(delta)
+        start = time.perf_counter()
+        with self._lock, self._conn:
+            updated = self._conn.execute(
+                "UPDATE sessions SET updated_at = ? WHERE app_name = ? "
+                "AND user_id = ? AND session_id = ?",
+                (event.timestamp, *key),
+            ).rowcount
+            if not updated:
+                logger.warning(
+                    "Failed to append event to session %s: not found", session.id
+                )
+                return event
+            self._conn.execute(
+                "INSERT INTO events (app_name, user_id, session_id, data) "
+                "VALUES (?, ?, ?, ?)",
+                (*key, self._outline_event(event)),
+            )
+            self._write_state(*key, session_state)
+            self._write_state(session.app_name, session.user_id, "", user_state)
+            self._write_state(session.app_name, "", "", app_state)
+            self._update_shared(
+                session.app_name, session.user_id, app_state, user_state
+            )
+            stored = self._sessions.get(key)
+            if stored is not None and stored is not session:
+                stored.events.append(event)
+                stored.state.update(session_state)
+                stored.last_update_time = event.timestamp
+        self.counters.inc("events_appended")
+        self.counters.inc("append_ms", (time.perf_counter() - start) * 1000)
+        return event
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_service: SqliteSessionService | None = None
+
+
+def get_session_service() -> SqliteSessionService:
+    """Return the process-wide session service at the configured location."""
+    global _service
+    if _service is None:
+        from app.config import config
+
+        _service = SqliteSessionService(
+            config.session_db_path, cache_size=config.session_cache_size
+        )
+    return _service
@@ -0,0 +1,311 @@
+"""
+Speculative execution of the leaf agent a request is likely to be routed to.
+
+While the root agent is still planning which sub-agent to transfer to, the
+leaf that requests of this kind historically end up in is started in the
+background on a private copy of the session. If the root agent then transfers
+towards that leaf, the speculative model responses are committed: the real
+leaf's identical model calls replay them instead of calling the model (see
+`CoalescingGemini`). Otherwise the speculation is cancelled and its tokens are
+counted as wasted.
+
+Callbacks with effects outside the session check `is_speculating()`: a
+speculative run reads teacher profiles and the item bank but changes neither.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.models import LlmRequest, LlmResponse
+
+from app.utils.cancellation import current_scope
+from app.utils.metrics import counters
+
+logger = logging.getLogger(__name__)
+
+_counters = counters("speculation")
+
+
+@dataclass
+class Route:
+    """A kind of request and where the root agent usually sends it."""
+
+    category: str
+    pattern: str
+    """Regex matched case-insensitively against the teacher's message."""
+    target: str
+    """Name of the root sub-agent the planner is expected to transfer to."""
+    leaf: BaseAgent
+    """Agent below `target` that is run speculatively."""
+    prior_confidence: float = 0.9
+    """Assumed routing accuracy before any decisions have been observed."""
+    prior_weight: int = 10
+    """How many observed decisions the prior is worth."""
+
+    def matches(self, text: str) -> bool:
+        return re.search(self.pattern, text, re.IGNORECASE) is not None
+
+
+class RoutingHistory:
+    """How often the planner agreed with each route, blended with its prior."""
+
+    def __init__(self) -> None:
+        self._agreed: dict[str, int] = {}
+        self._total: dict[str, int] = {}
+
+    def record(self, route: Route, target: str | None) -> None:
+        """Record the sub-agent the planner actually picked (None for none)."""
+        self._total[route.category] = self._total.get(route.category, 0) + 1
+        if target == route.target:
+            self._agreed[route.category] = self._agreed.get(route.category, 0) + 1
+
+    def confidence(self, route: Route) -> float:
+        agreed = self._agreed.get(route.category, 0)
+        total = self._total.get(route.category, 0)
+        prior = route.prior_confidence * route.prior_weight
+        return (agreed + prior) / (total + route.prior_weight)
+
+
+class _Result:
+    """Model responses recorded for one request key by a speculative run."""
+
+    def __init__(self) -> None:
+        self.responses: list[LlmResponse] = []
+        self.complete = False
+        self.committed = False
+        self.finished = asyncio.Event()
+        self.created = time.monotonic()
+
+    @property
+    def tokens(self) -> int:
+        usage = next(
+            (r.usage_metadata for r in reversed(self.responses) if r.usage_metadata),
+            None,
+        )
+        return (usage.total_token_count or 0) if usage else 0
+
+
+@dataclass
+class _Speculation:
+    route: Route
+    task: asyncio.Task[None] | None = None
+    results: dict[str, _Result] = field(default_factory=dict)
+
+    def discard(self) -> None:
+        if self.task:
+            self.task.cancel()
+        for key, result in self.results.items():
+            _counters.inc("wasted_tokens", result.tokens)
+            if _results.get(key) is result:
+                del _results[key]
+            result.finished.set()
+
+
+# Responses of running and committed speculations, by model request key.
+_results: dict[str, _Result] = {}
+_current: contextvars.ContextVar[_Speculation | None] = contextvars.ContextVar(
+    "speculation", default=None
+)
+
+
+def is_speculating() -> bool:
+    """Whether the caller is running inside a speculative leaf run."""
+    return _current.get() is not None
+
+
+def record(key: str) -> "_Recorder":
+    """Start recording the responses of a speculative model call."""
+    speculation = _current.get()
+    assert speculation is not None, "record() called outside a speculation"
+    result = _Result()
+    speculation.results[key] = result
+    _results[key] = result
+    return _Recorder(result)
+
+
+class _Recorder:
+    def __init__(self, result: _Result) -> None:
+        self.result = result
+
+    def add(self, response: LlmResponse) -> None:
+        self.result.responses.append(response.model_copy(deep=True))
+
+    def finish(self, complete: bool) -> None:
+        self.result.complete = complete
+        self.result.finished.set()
+
+
+async def claim(key: str) -> list[LlmResponse] | None:
+    """
+    Take the speculative responses for a real model call, if there are any.
+
+    Waits for a speculation that is still running. Returns None when there is
+    nothing to replay, in which case the caller makes the model call itself.
+    """
+    _expire()
+    result = _results.get(key)
+    if result is None:
+        return None
+    await result.finished.wait()
+    if _results.get(key) is not result or not result.complete:
+        return None
+    del _results[key]
+    _counters.inc("replayed_calls")
+    _counters.inc("tokens_saved", result.tokens)
+    return [response.model_copy(deep=True) for response in result.responses]
+
+
+def _expire(ttl_seconds: float = 300) -> None:
+    """Drop committed responses no real call claimed, e.g. after a re-route."""
+    cutoff = time.monotonic() - ttl_seconds
+    for key, result in list(_results.items()):
+        if result.committed and result.created < cutoff:
+            del _results[key]
+            _counters.inc("expired")
+            _counters.inc("wasted_tokens", result.tokens)
+
+
+def _transfer_target(response: LlmResponse) -> str | None:
+    if not response.content or not response.content.parts:
+        return None
+    for part in response.content.parts:
+        call = part.function_call
+        if call and call.name == "transfer_to_agent" and call.args:
+            return str(call.args.get("agent_name"))
+    return None
+
+
+def _has_function_calls(response: LlmResponse) -> bool:
+    return bool(
+        response.content
+        and response.content.parts
+        and any(part.function_call for part in response.content.parts)
+    )
+
+
+class SpeculativeExecutor:
+    """
+    `before_model_callback` / `after_model_callback` pair for the root agent.
+
+    A speculation starts on the root agent's first model call of a turn if
+    exactly one route matches and its confidence reaches `min_confidence`.
+    """
+
+    def __init__(self, routes: list[Route], min_confidence: float = 0.85) -> None:
+        """
+        :param routes: Request kinds worth speculating on
+        :param min_confidence: Required routing confidence; above 1 disables
+            speculation
+        """
+        self.routes = routes
+        self.min_confidence = min_confidence
+        self.history = RoutingHistory()
+        self._active: dict[str, _Speculation] = {}
+
+    def _match(self, text: str) -> Route | None:
+        matches = [route for route in self.routes if route.matches(text)]
+        return matches[0] if len(matches) == 1 else None
+
+    def before_model_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> None:
+        ctx = callback_context._invocation_context
+        if ctx.invocation_id in self._active or is_speculating():
+            return
+        user_content = callback_context.user_content
+        text = (
+            " ".join(part.text for part in (user_content.parts or []) if part.text)
+            if user_content
+            else ""
+        )
+        route = self._match(text)
+        if route is None:
+            return
+        if self.history.confidence(route) < self.min_confidence:
+            _counters.inc("skipped_low_confidence")
+            return
+
+        speculation = _Speculation(route)
+        self._active[ctx.invocation_id] = speculation
+        speculation.task = asyncio.create_task(self._run(speculation, ctx))
+        _counters.inc("started")
+        scope = current_scope()
+        if scope is not None:
+            # The speculation runs in its own task, so a cancelled run would
+            # leave it going; abandon it with the run.
+            scope.on_cancel(lambda: self._abandon(ctx.invocation_id))
+
+    def _abandon(self, invocation_id: str) -> None:
+        speculation = self._active.pop(invocation_id, None)
+        if speculation is not None:
+            _counters.inc("abandoned")
+            speculation.discard()
+
+    def after_model_callback(
+        self, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> None:
+        if llm_response.partial:
+            return
+        invocation_id = callback_context.invocation_id
+        speculation = self._active.get(invocation_id)
+        if speculation is None:
+            return
+        target = _transfer_target(llm_response)
+        if target is None and _has_function_calls(llm_response):
+            # The planner is still gathering information (e.g. a tool call).
+            return
+
+        del self._active[invocation_id]
+        route = speculation.route
+        self.history.record(route, target)
+        if target == route.target:
+            _counters.inc("committed")
+            for result in speculation.results.values():
+                result.committed = True
+        else:
+            _counters.inc("cancelled")
+            speculation.discard()
+
+    async def _run(self, speculation: _Speculation, ctx: InvocationContext) -> None:
+        _current.set(speculation)
+        # A private session copy: the speculative run must not leak state or
+        # events into the teacher's session.
+        session = ctx.session.model_copy(deep=True)
+        speculative_ctx = ctx.model_copy(update={"session": session})
+        try:
+            async with contextlib.aclosing(
+                speculation.route.leaf.run_async(speculative_ctx)
+            ) as events:
+                async for event in events:
+                    if event.partial:
+                        continue
+                    session.events.append(event)
+                    if event.actions.state_delta:
+                        session.state.update(event.actions.state_delta)
+                    # Stop before any tool or transfer runs with side effects.
+                    if event.get_function_calls():
+                        break
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning("Speculative run of %s failed", speculation.route.leaf.name)
+            _counters.inc("failed")
+        finally:
+            for result in speculation.results.values():
+                result.finished.set()
+
+
+def stats() -> dict[str, float]:
+    """Speculation counters plus the hit rate: committed per decided speculation."""
+    values = _counters.snapshot()
+    decided = values.get("committed", 0) + values.get("cancelled", 0)
+    values["hit_rate"] = values.get("committed", 0) / decided if decided else 0.0
+    return values
@@ -0,0 +1,82 @@
+import logging
+from collections.abc import Callable
+from typing import Generic, TypeVar
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmResponse
+from google.genai import types
+from pydantic import BaseModel, ValidationError
+
+SchemaT = TypeVar("SchemaT", bound=BaseModel)
+
+
+class StructuredOutput(Generic[SchemaT]):
+    """
+    `after_model_callback` for leaf agents that answer with a pydantic schema.
+
+    The validated result is stored in session state under `output_key` as a
+    compact JSON-compatible dict (None fields dropped), which managers and the
+    frontend can consume directly. Only the reply shown to the teacher is
+    rendered to markdown, locally and without another model call.
+
+    Use it instead of `LlmAgent.output_key`: ADK would otherwise try to parse
+    the rendered markdown back into the schema.
+    """
+
+    def __init__(
+        self,
+        schema: type[SchemaT],
+        output_key: str,
+        render: Callable[[SchemaT], str],
+    ) -> None:
+        """
+        :param schema: The pydantic model the agent answers with
+        :param output_key: Session state key the structured result is stored under
+        :param render: Turns a validated result into markdown for display
+        """
+        self.schema = schema
+        self.output_key = output_key
+        self.render = render
+
+    def __call__(
+        self, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> LlmResponse | None:
+        if llm_response.partial:
+            # Partial JSON is meaningless to the client; hold it back until the
+            # aggregated response arrives.
+            return LlmResponse(partial=True)
+        if not llm_response.content or not llm_response.content.parts:
+            return None
+
+        text = "".join(
+            part.text
+            for part in llm_response.content.parts
+            if part.text and not part.thought
+        )
+        if not text.strip():
+            return None
+
+        try:
+            result = self.schema.model_validate_json(text)
+        except ValidationError as e:
+            logging.warning(
+                f"{callback_context.agent_name} returned output that does not "
+                f"match {self.schema.__name__}, passing it through: {e}"
+            )
+            return None
+
+        callback_context.state[self.output_key] = result.model_dump(
+            mode="json", exclude_none=True
+        )
+        return LlmResponse(
+            content=types.Content(
+                role="model", parts=[types.Part(text=self.render(result))]
+            ),
+            usage_metadata=llm_response.usage_metadata,
+            turn_complete=llm_response.turn_complete,
+        )
+
+
+def render_list(items: list[str] | None, prefix: str = "-") -> str:
+    """Render a list of strings as markdown list items."""
+    return "\n".join(f"{prefix} {item}" for item in items or [])
@@ -0,0 +1,366 @@
+"""
+Persistent teacher profiles.
+
+A profile holds what agents otherwise ask the teacher before every task: the
+grades taught, preferred languages, subjects and the length of a class
+period. It is learned, without model calls, from what the teacher writes
+("I teach grades 4 and 5", "a 40 minute period", "we speak Kannada") and injected
+into session state before the agents run, so a known grade or language is not
+asked for again.
+
+Lookups are served from memory after the first read of a teacher; updates
+change the in-memory profile at once and are written to SQLite in the
+background (write-behind), so neither adds latency to a request.
+"""
+
+import atexit
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
+
+from app.utils.callbacks import add_callback
+from app.utils.metrics import counters
+from app.utils.speculation import is_speculating
+
+# Most recent values kept per list field.
+MAX_VALUES = 4
+
+LANGUAGES = (
+    "English",
+    "Hindi",
+    "Marathi",
+    "Kannada",
+    "Tamil",
+    "Telugu",
+    "Bengali",
+    "Gujarati",
+    "Punjabi",
+    "Malayalam",
+    "Odia",
+    "Urdu",
+    "Assamese",
+    "Konkani",
+)
+
+# Subject names as teachers write them, and the name stored in the profile.
+SUBJECTS = {
+    "maths": "Mathematics",
+    "math": "Mathematics",
+    "mathematics": "Mathematics",
+    "science": "Science",
+    "evs": "EVS",
+    "environmental studies": "EVS",
+    "social studies": "Social Studies",
+    "social science": "Social Studies",
+    "history": "History",
+    "geography": "Geography",
+    "civics": "Civics",
+    "physics": "Physics",
+    "chemistry": "Chemistry",
+    "biology": "Biology",
+    "computer science": "Computer Science",
+    **{language.lower(): language for language in LANGUAGES},
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS teacher_profiles (
+    user_id TEXT PRIMARY KEY,
+    profile TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+_GRADES = re.compile(
+    r"\b(?:grades?|class(?:es)?|std\.?|standards?)\s*"
+    r"(\d{1,2}(?:\s*(?:,|&|and|to|-)\s*\d{1,2})*)\b",
+    re.I,
+)
+_ORDINAL_GRADE = re.compile(
+    r"\b(\d{1,2})(?:st|nd|rd|th)[- ]?(?:grade|class|std)\b", re.I
+)
+_LANGUAGE = re.compile(r"\b(" + "|".join(LANGUAGES) + r")\b", re.I)
+_LANGUAGE_NAME = r"(" + "|".join(LANGUAGES) + r")\b"
+# Languages only from what the teacher says about themselves or their class:
+# "we speak Tamil", "I prefer Hindi", "my language is Odia", "Marathi medium",
+# "I teach in Kannada", "always answer in Bengali". A topic ("Tamil Nadu
+# rivers", "teach English grammar") or a one-off "translate to Hindi" is not
+# a preference.
+_SPEAKS = re.compile(
+    r"\b(?:i|we|my (?:students|class(?:es)?|pupils|children|kids))\s+"
+    r"(?:mostly\s+|only\s+)?(?:speak|prefer)\b([^.!?\n]*)",
+    re.I,
+)
+_LANGUAGE_STATEMENT = re.compile(
+    r"\bmy (?:preferred |mother |first |home |teaching )?(?:language|tongue) is\s+"
+    + _LANGUAGE_NAME
+    + r"|\b"
+    + _LANGUAGE_NAME
+    + r"[- ]medium\b",
+    re.I,
+)
+_DEFAULT = re.compile(r"\b(?:always|from now on|by default)\b([^.!?\n]*)", re.I)
+_IN_LANGUAGE = re.compile(r"\bin\s+" + _LANGUAGE_NAME, re.I)
+# "in Marathi" is the language of instruction, not a subject.
+_SUBJECT = re.compile(
+    r"(?<!\bin )\b("
+    + "|".join(sorted(map(re.escape, SUBJECTS), key=len, reverse=True))
+    + r")\b",
+    re.I,
+)
+# "I teach ...", "my subjects are ...", up to the end of the sentence.
+_TEACHES = re.compile(
+    r"\b(?:i teach|i am teaching|my subjects? (?:is|are))\b([^.!?\n]*)", re.I
+)
+_MINUTES = re.compile(
+    r"\b(\d{2,3})[\s-]*min(?:ute)?s?\b(?=\s+(?:class|period|lesson|session)s?\b)"
+    r"|\b(?:class(?:es)?|periods?|lessons?)\s+(?:are|is|of|last|lasts)\s+"
+    r"(\d{2,3})\s*min",
+    re.I,
+)
+
+
+def _recent(values: Iterable[str], existing: list[str]) -> list[str]:
+    """`values` first, then `existing`, without duplicates, at most MAX_VALUES."""
+    return list(dict.fromkeys([*values, *existing]))[:MAX_VALUES]
+
+
+def _grades(text: str) -> list[str]:
+    grades = []
+    for match in _GRADES.finditer(text):
+        numbers = [int(n) for n in re.findall(r"\d+", match.group(1))]
+        # "grades 3 to 5" and "class 6-8" are ranges.
+        if len(numbers) == 2 and re.search(r"to|-", match.group(1)):
+            numbers = list(range(numbers[0], numbers[1] + 1))
+        grades += [str(n) for n in numbers if 1 <= n <= 12]
+    grades += [
+        m.group(1) for m in _ORDINAL_GRADE.finditer(text) if 1 <= int(m.group(1)) <= 12
+    ]
+    return list(dict.fromkeys(grades))
+
+
+def _languages(text: str) -> list[str]:
+    found = [
+        m.group(1)
+        for statement in _SPEAKS.finditer(text)
+        for m in _LANGUAGE.finditer(statement[1])
+    ]
+    found += [m.group(1) or m.group(2) for m in _LANGUAGE_STATEMENT.finditer(text)]
+    # "I teach in Marathi", but not the English of "I teach English".
+    for statement in (*_TEACHES.finditer(text), *_DEFAULT.finditer(text)):
+        found += [m.group(1) for m in _IN_LANGUAGE.finditer(statement[1])]
+    return list(dict.fromkeys(language.capitalize() for language in found))
+
+
+@dataclass
+class TeacherProfile:
+    grades: list[str] = field(default_factory=list)
+    """Grades taught, most recently mentioned first."""
+    languages: list[str] = field(default_factory=list)
+    """Languages the teacher prefers, most recently stated first."""
+    subjects: list[str] = field(default_factory=list)
+    class_minutes: int | None = None
+
+    def learn(self, text: str) -> bool:
+        """Update the profile from a message of the teacher; True if it changed."""
+        before = asdict(self)
+        self.grades = _recent(_grades(text), self.grades)
+        self.languages = _recent(_languages(text), self.languages)
+        # Subjects only from statements about the teacher: a topic such as
+        # "a story in Hindi" says nothing about what they teach.
+        for statement in _TEACHES.finditer(text):
+            self.subjects = _recent(
+                (SUBJECTS[m.group(1).lower()] for m in _SUBJECT.finditer(statement[1])),
+                self.subjects,
+            )
+        minutes = _MINUTES.search(text)
+        if minutes:
+            self.class_minutes = int(minutes.group(1) or minutes.group(2))
+        return asdict(self) != before
+
+    def state(self) -> dict[str, Any]:
+        """Session state keys filled from the profile; unknown fields are left out."""
+        state: dict[str, Any] = {}
+        if self.grades:
+            state["teacher_grade"] = ", ".join(self.grades)
+        if self.languages:
+            state["teacher_locale"] = self.languages[0]
+        if self.subjects:
+            state["teacher_subjects"] = ", ".join(self.subjects)
+        if self.class_minutes:
+            state["teacher_class_minutes"] = self.class_minutes
+        known = [
+            f"grades {state['teacher_grade']}" if self.grades else "",
+            f"prefers {self.languages[0]}" if self.languages else "",
+            f"teaches {state['teacher_subjects']}" if self.subjects else "",
+            f"{self.class_minutes}-minute classes" if self.class_minutes else "",
+        ]
+        state["teacher_profile"] = "; ".join(filter(None, known)) or "nothing known yet"
+        return state
+
+
+class TeacherProfileStore:
+    """SQLite-backed teacher profiles with an in-memory cache and write-behind."""
+
+    def __init__(self, path: str | Path, flush_interval: float = 2.0) -> None:
+        """
+        :param path: Location of the SQLite database, created if missing
+        :param flush_interval: Seconds between background writes of changed
+            profiles; 0 writes every update before `update` returns
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval
+        self.counters = counters("teacher_profiles")
+        self._lock = threading.Lock()
+        self._profiles: dict[str, TeacherProfile] = {}
+        self._dirty: set[str] = set()
+        self._wake = threading.Event()
+        self._closed = False
+        self._writer: threading.Thread | None = None
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def get(self, user_id: str) -> TeacherProfile:
+        """The teacher's profile; an empty one for a teacher not seen before."""
+        with self._lock:
+            profile = self._profiles.get(user_id)
+            if profile is not None:
+                self.counters.inc("hits")
+                return profile
+            row = self._conn.execute(
+                "SELECT profile FROM teacher_profiles WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            profile = TeacherProfile(**json.loads(row[0])) if row else TeacherProfile()
+            self._profiles[user_id] = profile
+        self.counters.inc("misses" if row is None else "loads")
+        return profile
+
+    def update(self, user_id: str, text: str) -> TeacherProfile:
+        """Learn from a message of the teacher and schedule the write if it changed."""
+        profile = self.get(user_id)
+        with self._lock:
+            changed = profile.learn(text)
+            if changed:
+                self._dirty.add(user_id)
+        if changed:
+            self.counters.inc("updates")
+            if self.flush_interval <= 0:
+                self.flush()
+            else:
+                self._start_writer()
+        return profile
+
+    def flush(self) -> int:
+        """Write every changed profile now; returns how many were written."""
+        with self._lock:
+            rows = [
+                (user_id, json.dumps(asdict(self._profiles[user_id])), time.time())
+                for user_id in self._dirty
+            ]
+            self._dirty.clear()
+            if rows:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO teacher_profiles VALUES (?, ?, ?)", rows
+                )
+                self._conn.commit()
+        if rows:
+            self.counters.inc("flushes")
+            self.counters.inc("written", len(rows))
+        return len(rows)
+
+    def close(self) -> None:
+        """Stop the background writer, write pending changes and close the file."""
+        self._closed = True
+        self._wake.set()
+        if self._writer is not None:
+            self._writer.join()
+        self.flush()
+        self._conn.close()
+
+    def _start_writer(self) -> None:
+        with self._lock:
+            if self._writer is not None or self._closed:
+                return
+            self._writer = threading.Thread(
+                target=self._write_behind, name="teacher-profiles", daemon=True
+            )
+            self._writer.start()
+
+    def _write_behind(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            if not self._closed:
+                self.flush()
+
+
+def _message_text(content: types.Content | None) -> str:
+    if content is None or not content.parts:
+        return ""
+    return "\n".join(part.text for part in content.parts if part.text)
+
+
+class TeacherProfileInjector:
+    """
+    `before_agent_callback` that learns from the teacher's message and puts
+    the profile into session state (`teacher_grade`, `teacher_locale`,
+    `teacher_subjects`, `teacher_class_minutes` and a one-line
+    `teacher_profile`) for instructions to use.
+    """
+
+    def __init__(self, store: "TeacherProfileStore | None" = None) -> None:
+        self._store = store
+
+    @property
+    def store(self) -> TeacherProfileStore:
+        return self._store or get_teacher_profiles()
+
+    def before_agent_callback(self, callback_context: CallbackContext) -> None:
+        ctx = callback_context._invocation_context
+        text = _message_text(ctx.user_content)
+        # A speculative run reads the profile but must not change it.
+        profile = (
+            self.store.update(ctx.session.user_id, text)
+            if text and not is_speculating()
+            else self.store.get(ctx.session.user_id)
+        )
+        state = callback_context.state
+        for key, value in profile.state().items():
+            # Only changes are written, so most turns add no state delta.
+            if state.get(key) != value:
+                state[key] = value
+
+    def install(self, agent: BaseAgent) -> None:
+        """
+        Add the callback to `agent` and its sub-agents: a teacher's follow-up
+        goes straight to the agent that answered last, not through the root.
+        """
+        add_callback(agent, "before_agent_callback", self.before_agent_callback)
+        for sub_agent in agent.sub_agents:
+            self.install(sub_agent)
+
+
+_default_store: TeacherProfileStore | None = None
+
+
+def get_teacher_profiles() -> TeacherProfileStore:
+    """Return the process-wide store at the configured location."""
+    global _default_store
+    if _default_store is None:
+        from app.config import config
+
+        _default_store = TeacherProfileStore(
+            config.teacher_profile_path, config.teacher_profile_flush_seconds
+        )
+        atexit.register(_default_store.close)
+    return _default_store
@@ -0,0 +1,93 @@
+"""
+Persistent cache of translated teaching content.
+
+Translations are keyed by (hash of the source text, target language, grade),
+so the same canonical story or rhyme is translated into a language only once
+per grade, whichever teacher asked for it.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from app.utils.material_cache import normalize_grade
+from app.utils.metrics import counters
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    source_hash TEXT NOT NULL,
+    language TEXT NOT NULL,
+    grade TEXT NOT NULL,
+    content TEXT NOT NULL,
+    model TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (source_hash, language, grade)
+);
+"""
+
+
+def source_hash(text: str) -> str:
+    """Hash of source text, ignoring surrounding whitespace."""
+    return hashlib.sha256(text.strip().encode()).hexdigest()
+
+
+class TranslationCache:
+    """SQLite-backed store of translations, shared across processes."""
+
+    def __init__(self, path: str | Path, max_age_days: float = 90) -> None:
+        """
+        :param path: Location of the SQLite database, created if missing
+        :param max_age_days: Entries older than this are treated as misses
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_age_seconds = max_age_days * 24 * 3600
+        self.counters = counters("translation_cache")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def _key(source: str, language: str, grade: str | int) -> tuple[str, str, str]:
+        return source_hash(source), language.strip().lower(), normalize_grade(grade)
+
+    def get(self, source: str, language: str, grade: str | int) -> str | None:
+        """Return the cached translation of `source`, or None on a miss."""
+        key = self._key(source, language, grade)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content FROM translations WHERE source_hash = ? "
+                "AND language = ? AND grade = ? AND created_at >= ?",
+                (*key, time.time() - self.max_age_seconds),
+            ).fetchone()
+        self.counters.inc("hits" if row else "misses")
+        return row[0] if row else None
+
+    def put(
+        self, source: str, language: str, grade: str | int, content: str, model: str
+    ) -> None:
+        """Store or replace a translation."""
+        key = self._key(source, language, grade)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, content, model, time.time()),
+            )
+            self._conn.commit()
+        self.counters.inc("stored")
+
+
+_default_cache: TranslationCache | None = None
+
+
+def get_translation_cache() -> TranslationCache:
+    """Return the process-wide cache at the configured location."""
+    global _default_cache
+    if _default_cache is None:
+        from app.config import config
+
+        _default_cache = TranslationCache(config.translation_cache_path)
+    return _default_cache
@@ -48,11 +48,13 @@ export async function POST(request: NextRequest): Promise<Response> {
       requestData.fileName
     );
 
-    // Delegate to appropriate deployment strategy handler
+    // Delegate to appropriate deployment strategy handler. The request's
+    // signal aborts the backend call when the client disconnects, so the
+    // agent run is cancelled instead of finishing for nobody.
     if (deploymentType === "agent_engine") {
-      return await handleAgentEngineStreamRequest(requestData);
+      return await handleAgentEngineStreamRequest(requestData, request.signal);
     } else {
-      return await handleLocalBackendStreamRequest(requestData);
+      return await handleLocalBackendStreamRequest(requestData, request.signal);
     }
   } catch (error) {
     // Handle any unexpected errors at the top level
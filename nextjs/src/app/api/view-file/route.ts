@@ -64,6 +64,9 @@ export async function GET(req: NextRequest) {
       case '.webp':
         contentType = 'image/webp';
         break;
+      case '.avif':
+        contentType = 'image/avif';
+        break;
       case '.svg':
         contentType = 'image/svg+xml';
         break;
@@ -255,10 +255,12 @@ class SimpleJSONFragmentProcessor {
  * Handle Agent Engine streaming request
  *
  * @param requestData - Processed request data
+ * @param signal - Aborted when the client disconnects; closes the backend stream
  * @returns SSE streaming Response
  */
 export async function handleAgentEngineStreamRequest(
-  requestData: ProcessedStreamRequest
+  requestData: ProcessedStreamRequest,
+  signal?: AbortSignal
 ): Promise<Response> {
   console.log(
     "🚀🚀🚀 [AGENT ENGINE] SIMPLIFIED JSON FRAGMENT HANDLER STARTING 🚀🚀🚀"
@@ -289,6 +291,7 @@ export async function handleAgentEngineStreamRequest(
         ...authHeaders,
       },
       body: JSON.stringify(agentEnginePayload),
+      signal,
     });
 
     // Log the response from Agent Engine
@@ -323,9 +326,10 @@ export async function handleAgentEngineStreamRequest(
     }
 
     // Create streaming response that processes JSON fragments
+    const reader = response.body?.getReader();
+    let isStreamActive = true;
     const stream = new ReadableStream({
       async start(controller) {
-        const reader = response.body?.getReader();
         const decoder = new TextDecoder();
 
         if (!reader) {
@@ -341,7 +345,6 @@ export async function handleAgentEngineStreamRequest(
         // Set up timeout mechanism (5 minutes max)
         const timeoutMs = 5 * 60 * 1000; // 5 minutes
         const startTime = Date.now();
-        let isStreamActive = true;
 
         try {
           // Read and process JSON fragments
@@ -384,6 +387,10 @@ export async function handleAgentEngineStreamRequest(
 
           await pump();
         } catch (error) {
+          if (signal?.aborted || !isStreamActive) {
+            console.log("⏹️ [AGENT ENGINE] Client disconnected, stream aborted");
+            return;
+          }
           console.error("❌ [AGENT ENGINE] JSON fragment processing error:", error);
 
           // Attempt graceful error recovery
@@ -399,6 +406,13 @@ export async function handleAgentEngineStreamRequest(
           reader.releaseLock();
         }
       },
+      // Called when the client goes away: stop reading and close the
+      // connection to Agent Engine.
+      cancel(reason) {
+        console.log("⏹️ [AGENT ENGINE] Client disconnected, cancelling stream");
+        isStreamActive = false;
+        reader?.cancel(reason).catch(() => {});
+      },
     });
 
     // Return streaming SSE response with proper headers
@@ -407,6 +421,11 @@ export async function handleAgentEngineStreamRequest(
       headers: SSE_HEADERS,
     });
   } catch (error) {
+    if (signal?.aborted) {
+      console.log("⏹️ Client disconnected before Agent Engine answered");
+      return new Response(null, { status: 499 });
+    }
+
     console.error("❌ Agent Engine handler error:", error);
 
     if (error instanceof TypeError && error.message.includes("fetch")) {
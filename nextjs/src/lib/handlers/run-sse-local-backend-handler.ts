@@ -47,10 +47,12 @@ function validateStreamingResponse(response: Response): {
  * Handle local backend streaming request
  *
  * @param requestData - Processed request data
+ * @param signal - Aborted when the client disconnects; closes the backend stream
  * @returns SSE streaming Response
  */
 export async function handleLocalBackendStreamRequest(
-  requestData: ProcessedStreamRequest
+  requestData: ProcessedStreamRequest,
+  signal?: AbortSignal
 ): Promise<Response> {
   try {
     // Format payload for local backend
@@ -73,6 +75,7 @@ export async function handleLocalBackendStreamRequest(
         ...authHeaders,
       },
       body: JSON.stringify(localBackendPayload),
+      signal,
     });
     console.log(JSON.stringify(localBackendPayload, null, 2));
 
@@ -116,6 +119,11 @@ export async function handleLocalBackendStreamRequest(
       headers: SSE_HEADERS,
     });
   } catch (error) {
+    if (signal?.aborted) {
+      console.log("⏹️ Client disconnected before the local backend answered");
+      return new Response(null, { status: 499 });
+    }
+
     console.error("❌ Local backend handler error:", error);
 
     if (error instanceof TypeError && error.message.includes("fetch")) {
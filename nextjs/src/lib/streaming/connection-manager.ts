@@ -57,11 +57,16 @@ export class StreamingConnectionManager {
     setCurrentAgent: (agent: string) => void,
     setIsLoading: (loading: boolean) => void
   ): Promise<void> {
+    // A new question supersedes the one still streaming: abort it so the
+    // backend stops working on it.
+    this.abortController?.abort();
+    const abortController = new AbortController();
+    this.abortController = abortController;
+
     this.connectionState = "connecting";
     setIsLoading(true);
     accumulatedTextRef.current = "";
     currentAgentRef.current = "";
-    this.abortController = new AbortController();
 
     // Generate AI message ID
     const aiMessageId = uuidv4();
@@ -89,7 +94,7 @@ export class StreamingConnectionManager {
             "Content-Type": "application/json",
           },
           body: JSON.stringify(apiPayload),
-          signal: this.abortController?.signal,
+          signal: abortController.signal,
         })
       );
 
@@ -112,6 +117,10 @@ export class StreamingConnectionManager {
       this.connectionState = "idle";
       setIsLoading(false);
     } catch (error) {
+      if (this.abortController !== abortController) {
+        // Superseded by a newer request, which owns the UI state now.
+        return;
+      }
       if ((error as Error).name === "AbortError") {
         this.connectionState = "closed";
         createDebugLog("CONNECTION", "Request was cancelled by the user");
@@ -134,7 +143,9 @@ export class StreamingConnectionManager {
       callbacks.onMessageUpdate(errorMessage);
       setIsLoading(false);
     } finally {
-      this.abortController = null;
+      if (this.abortController === abortController) {
+        this.abortController = null;
+      }
     }
   }
 
@@ -0,0 +1,6 @@
+import os
+
+# Importing an agent package loads app.config, which needs a project; the
+# tests never reach Vertex AI (models are faked).
+os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "test-project")
+os.environ.setdefault("MODEL", "gemini-2.5-flash")
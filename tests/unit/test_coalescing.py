@@ -0,0 +1,111 @@
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from app.utils.coalescing import SingleFlight, _request_key
+
+
+@pytest.mark.asyncio
+async def test_followers_share_the_leaders_stream() -> None:
+    flight = SingleFlight("test_share")
+    calls = 0
+    release = asyncio.Event()
+
+    async def factory() -> AsyncIterator[int]:
+        nonlocal calls
+        calls += 1
+        for n in range(3):
+            await release.wait()
+            yield n
+
+    async def consume() -> list[int]:
+        return [item async for item in flight.stream("key", factory)]
+
+    leader = asyncio.create_task(consume())
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(consume())
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await leader == [0, 1, 2]
+    assert await follower == [0, 1, 2]
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_follower_takes_over_when_the_leader_is_cancelled() -> None:
+    flight = SingleFlight("test_takeover")
+    calls = 0
+    first_item = asyncio.Event()
+
+    async def factory() -> AsyncIterator[int]:
+        nonlocal calls
+        calls += 1
+        for n in range(3):
+            yield n
+            first_item.set()
+            await asyncio.sleep(0.01)
+
+    async def consume() -> list[int]:
+        return [item async for item in flight.stream("key", factory)]
+
+    leader = asyncio.create_task(consume())
+    await first_item.wait()
+    follower = asyncio.create_task(consume())
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    # The follower had the leader's first item, then goes on from the second.
+    assert await follower == [0, 1, 2]
+    assert calls == 2
+    assert flight.counters.snapshot()["takeovers"] == 1
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+
+@pytest.mark.asyncio
+async def test_follower_with_a_finished_item_does_not_start_over() -> None:
+    flight = SingleFlight("test_finished")
+    done = asyncio.Event()
+
+    async def factory() -> AsyncIterator[int]:
+        yield 0
+        done.set()
+        await asyncio.sleep(1)
+        yield 1
+
+    async def consume() -> list[int]:
+        stream = flight.stream("key", factory, finished=lambda item: item == 0)
+        return [item async for item in stream]
+
+    leader = asyncio.create_task(consume())
+    await done.wait()
+    follower = asyncio.create_task(consume())
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await follower == [0]
+
+
+def _request(instruction: str, *texts: str) -> LlmRequest:
+    return LlmRequest(
+        model="gemini-2.5-flash",
+        contents=[
+            types.Content(role="user", parts=[types.Part(text=text)]) for text in texts
+        ],
+        config=types.GenerateContentConfig(system_instruction=instruction),
+    )
+
+
+def test_request_key_covers_context_and_instruction() -> None:
+    request = _request("Write a quiz.", "For context: grade 5", "Fractions")
+    assert _request_key(request, False) == _request_key(request.model_copy(), False)
+    assert _request_key(request, False) != _request_key(
+        _request("Write a quiz.", "For context: grade 7", "Fractions"), False
+    )
+    assert _request_key(request, False) != _request_key(
+        _request("Write a poem.", "For context: grade 5", "Fractions"), False
+    )
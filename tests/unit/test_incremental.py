@@ -0,0 +1,143 @@
+from collections.abc import AsyncGenerator, Iterator
+from typing import Any
+
+import pytest
+from google.adk.agents import LlmAgent, SequentialAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.events import Event, EventActions
+from google.adk.models import Gemini, LlmRequest, LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from app.utils.incremental import IncrementalStages
+
+REQUEST = "Make a worksheet on fractions for class 5"
+
+
+class Pipeline:
+    """A worksheet stage and an answer key stage reading it, on a fake model."""
+
+    def __init__(self, degraded: bool = False) -> None:
+        self.calls: list[str] = []
+        self.degraded = degraded
+        self.worksheet = LlmAgent(
+            name="worksheet",
+            model="gemini-2.5-flash",
+            instruction="Write the worksheet asked for.",
+            output_key="baseline_worksheet",
+            before_model_callback=self._fallback,
+        )
+        answer_key = LlmAgent(
+            name="answer_key",
+            model="gemini-2.5-flash",
+            instruction="Answer every question of:\n{baseline_worksheet}",
+            output_key="answer_key",
+        )
+        root = SequentialAgent(name="pipeline", sub_agents=[self.worksheet, answer_key])
+        IncrementalStages().install(root)
+        self.sessions = InMemorySessionService()
+        self.runner = Runner(app_name="test", agent=root, session_service=self.sessions)
+        self.session_id = ""
+
+    def _fallback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> LlmResponse | None:
+        if not self.degraded:
+            return None
+        return LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text="Fallback")]),
+            custom_metadata={"degraded": True},
+        )
+
+    async def generate(
+        self, model: Gemini, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        labels = llm_request.config.labels if llm_request.config else None
+        agent = (labels or {}).get("adk_agent_name", "")
+        self.calls.append(agent)
+        text = f"{agent} #{len(self.calls)}"
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=text)])
+        )
+
+    async def send(self, text: str) -> dict[str, Any]:
+        """Run one teacher message; the calls made and the stages reused."""
+        if not self.session_id:
+            session = await self.sessions.create_session(
+                app_name="test", user_id="teacher"
+            )
+            self.session_id = session.id
+        before = len(self.calls)
+        reused = []
+        async for event in self.runner.run_async(
+            user_id="teacher",
+            session_id=self.session_id,
+            new_message=types.Content(role="user", parts=[types.Part(text=text)]),
+        ):
+            if event.custom_metadata and event.custom_metadata.get("reused"):
+                reused.append(event.author)
+        return {"calls": self.calls[before:], "reused": reused}
+
+
+@pytest.fixture
+def pipeline() -> Iterator[Pipeline]:
+    pipeline = Pipeline()
+
+    async def generate(
+        model: Gemini, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        async for response in pipeline.generate(model, llm_request, stream):
+            yield response
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(Gemini, "generate_content_async", generate)
+        yield pipeline
+
+
+@pytest.mark.asyncio
+async def test_request_sent_again_reuses_every_stage(pipeline: Pipeline) -> None:
+    first = await pipeline.send(REQUEST)
+    assert first == {"calls": ["worksheet", "answer_key"], "reused": []}
+
+    again = await pipeline.send(REQUEST)
+    assert again == {"calls": [], "reused": ["worksheet", "answer_key"]}
+
+
+@pytest.mark.asyncio
+async def test_follow_up_recomputes(pipeline: Pipeline) -> None:
+    await pipeline.send("Make a worksheet on decimals")
+    follow_up = await pipeline.send("class 5")
+    assert follow_up["calls"] == ["worksheet", "answer_key"]
+    assert not follow_up["reused"]
+
+
+@pytest.mark.asyncio
+async def test_edited_output_recomputes_only_downstream(pipeline: Pipeline) -> None:
+    await pipeline.send(REQUEST)
+    session = await pipeline.sessions.get_session(
+        app_name="test", user_id="teacher", session_id=pipeline.session_id
+    )
+    assert session is not None
+    await pipeline.sessions.append_event(
+        session,
+        Event(
+            author="user",
+            actions=EventActions(state_delta={"baseline_worksheet": "Q1. (edited)"}),
+        ),
+    )
+
+    again = await pipeline.send(REQUEST)
+    assert again == {"calls": ["answer_key"], "reused": ["worksheet"]}
+
+
+@pytest.mark.asyncio
+async def test_fallback_answer_is_not_replayed(pipeline: Pipeline) -> None:
+    pipeline.degraded = True
+    await pipeline.send(REQUEST)
+    assert pipeline.calls == ["answer_key"]
+
+    pipeline.degraded = False
+    recovered = await pipeline.send(REQUEST)
+    assert recovered["calls"][0] == "worksheet"
+    assert "worksheet" not in recovered["reused"]
@@ -0,0 +1,124 @@
+import random
+from collections.abc import AsyncGenerator
+from pathlib import Path
+
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.models import Gemini, LlmRequest, LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from app.utils.item_bank import _COUNT, BANDS, Item, ItemBank, ItemBankGaps, band
+
+
+def _items(topic: str, grade: str, count: int) -> list[Item]:
+    return [
+        Item(
+            topic=topic,
+            grade=grade,
+            kind="short_answer",
+            question=f"What is {n} + {n}?",
+            answer=str(2 * n),
+            difficulty=(n % 3) / 3 + 0.1,
+        )
+        for n in range(count)
+    ]
+
+
+@pytest.fixture
+def bank(tmp_path: Path) -> ItemBank:
+    return ItemBank(tmp_path / "items.sqlite3", rng=random.Random(0))
+
+
+def test_add_skips_questions_already_banked(bank: ItemBank) -> None:
+    assert bank.add(_items("Fractions", "Grade 5", 6)) == 6
+    assert bank.add(_items("fractions", "5th", 6)) == 0
+    assert bank.count("fractions", "5") == 6
+
+
+def test_sample_mixes_difficulty_easiest_first(bank: ItemBank) -> None:
+    bank.add(_items("fractions", "5", 30))
+    sample = bank.sample("fractions", "5", 9)
+    assert len(sample) == 9
+    assert [item.difficulty for item in sample] == sorted(
+        item.difficulty for item in sample
+    )
+    bands = {BANDS[band(item.difficulty)] for item in sample}
+    assert bands == set(BANDS)
+    assert not bank.sample("fractions", "6", 9)
+
+
+def test_sample_leaves_out_items_served_to_the_class(bank: ItemBank) -> None:
+    bank.add(_items("fractions", "5", 12))
+    first = bank.sample("fractions", "5", 8, class_id="teacher/5")
+    bank.mark_served("teacher/5", first)
+    second = bank.sample("fractions", "5", 8, class_id="teacher/5")
+    assert len(second) == 4
+    assert not {item.id for item in first} & {item.id for item in second}
+    assert len(bank.sample("fractions", "5", 8, class_id="other/5")) == 8
+
+
+@pytest.mark.parametrize(
+    ("text", "count"),
+    [
+        ("10 hard questions on fractions for class 5", "10"),
+        ("Make a quiz of 5 questions on plants", "5"),
+        ("Grade 7 quiz questions on motion", None),
+        ("class 6 questions on soil", None),
+    ],
+)
+def test_count_is_not_taken_from_the_grade(text: str, count: str | None) -> None:
+    match = _COUNT.search(text)
+    assert (match.group(1) if match else None) == count
+
+
+async def _run(gaps: ItemBankGaps, requests: list[LlmRequest], fail: bool) -> None:
+    agent = LlmAgent(
+        name="worksheet_creator", model="gemini-2.5-flash", instruction="Write."
+    )
+    gaps.install(agent)
+
+    async def generate(
+        self: Gemini, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        requests.append(llm_request)
+        if fail:
+            raise RuntimeError("model unavailable")
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text="Worksheet")])
+        )
+
+    sessions = InMemorySessionService()
+    runner = Runner(app_name="test", agent=agent, session_service=sessions)
+    session = await sessions.create_session(app_name="test", user_id="teacher")
+    message = types.Content(
+        role="user",
+        parts=[
+            types.Part(text="Make a worksheet of 4 questions on fractions for class 5")
+        ],
+    )
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(Gemini, "generate_content_async", generate)
+        async for _ in runner.run_async(
+            user_id="teacher", session_id=session.id, new_message=message
+        ):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_items_are_served_once_the_answer_is_delivered(bank: ItemBank) -> None:
+    bank.add(_items("fractions", "5", 4))
+    gaps = ItemBankGaps({}, text_agents=["worksheet_creator"], bank=bank)
+    requests: list[LlmRequest] = []
+
+    with pytest.raises(RuntimeError):
+        await _run(gaps, requests, fail=True)
+    config = requests[0].config
+    assert config is not None
+    assert "question bank" in str(config.system_instruction)
+    # The failed run gave the class nothing.
+    assert len(bank.sample("fractions", "5", 4, class_id="teacher/5")) == 4
+
+    await _run(gaps, requests, fail=False)
+    assert not bank.sample("fractions", "5", 4, class_id="teacher/5")
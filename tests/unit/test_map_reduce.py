@@ -0,0 +1,103 @@
+import json
+from collections.abc import AsyncGenerator, Iterator
+
+import pytest
+from google.adk.models import Gemini, LlmRequest, LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from app.sub_agents.planning.map_reduce import MapReduceLessonPlanner
+from app.sub_agents.planning.subagents.content_planner import content_planner_agent
+from app.sub_agents.planning.subagents.objective_mapper import (
+    day_objective_mapper_agent,
+)
+from app.sub_agents.planning.subagents.subtopic_decomposer import (
+    subtopic_decomposer_agent,
+)
+
+# The planners are already children of the app's lesson_planning_agent.
+UNPARENTED = {"parent_agent": None}
+TITLES = {1: "Clouds", 2: "Rain"}
+BREAKDOWN = {
+    "topic": "The water cycle",
+    "grade": "5",
+    "subtopics": [
+        {
+            "title": title,
+            "description": f"What {title.lower()} are.",
+            "key_points": [title],
+            "complexity": "low",
+            "day": day,
+        }
+        for day, title in TITLES.items()
+    ],
+}
+
+
+def _text(text: str) -> LlmResponse:
+    return LlmResponse(
+        content=types.Content(role="model", parts=[types.Part(text=text)])
+    )
+
+
+@pytest.fixture
+def planners() -> Iterator[None]:
+    async def generate(
+        model: Gemini, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        config = llm_request.config
+        agent = ((config.labels if config else None) or {}).get("adk_agent_name")
+        instruction = str(config.system_instruction if config else "")
+        title = next((t for t in TITLES.values() if f"- {t}:" in instruction), "")
+        if agent == "subtopic_decomposer_agent":
+            yield _text(json.dumps(BREAKDOWN))
+        elif agent == "day_objective_mapper_agent":
+            objectives = {
+                "subtopic": title,
+                "primary_goals": ["Critical Thinking"],
+                "outcomes": [f"Explain {title.lower()}"],
+                "assessment_criteria": ["Explains it"],
+            }
+            yield _text(json.dumps({**BREAKDOWN, "subtopics": [objectives]}))
+        else:
+            yield _text(f"Activities about {title.lower()}.")
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(Gemini, "generate_content_async", generate)
+        yield
+
+
+@pytest.mark.asyncio
+async def test_only_the_breakdown_and_the_assembled_plan_are_shown(
+    planners: None,
+) -> None:
+    agent = MapReduceLessonPlanner(
+        name="lesson_planning_agent",
+        decomposer=subtopic_decomposer_agent.model_copy(update=UNPARENTED),
+        objective_mapper=day_objective_mapper_agent.model_copy(update=UNPARENTED),
+        content_planner=content_planner_agent.model_copy(update=UNPARENTED),
+    )
+    sessions = InMemorySessionService()
+    runner = Runner(app_name="test", agent=agent, session_service=sessions)
+    session = await sessions.create_session(app_name="test", user_id="teacher")
+    message = types.Content(
+        role="user", parts=[types.Part(text="Plan two days on the water cycle")]
+    )
+    events = [
+        event
+        async for event in runner.run_async(
+            user_id="teacher", session_id=session.id, new_message=message
+        )
+    ]
+
+    assert [event.author for event in events] == [
+        "subtopic_decomposer_agent",
+        "lesson_planning_agent",
+    ]
+    plan = str(events[-1].actions.state_delta["weekly_lesson_plan"])
+    assert plan.index("## Day 1: Clouds") < plan.index("## Day 2: Rain")
+    assert "Activities about clouds." in plan
+    assert "  - Explain rain" in plan
+    content = events[-1].content
+    assert content and [part.text for part in content.parts or []] == [plan]
@@ -0,0 +1,60 @@
+from collections.abc import AsyncGenerator, Iterator
+from pathlib import Path
+
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.models import Gemini, LlmRequest, LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from app.utils.material_cache import MaterialCache, PreparedMaterials
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> Iterator[MaterialCache]:
+    async def generate(
+        model: Gemini, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text="written")])
+        )
+
+    cache = MaterialCache(tmp_path / "materials.sqlite3")
+    cache.put("quiz", "Fractions", "Grade 5", "prepared", source="prewarm")
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(Gemini, "generate_content_async", generate)
+        yield cache
+
+
+async def _answer(cache: MaterialCache, text: str) -> str:
+    agent = LlmAgent(name="root", model="gemini-2.5-flash", instruction="Help.")
+    PreparedMaterials(cache).install(agent)
+    sessions = InMemorySessionService()
+    runner = Runner(app_name="test", agent=agent, session_service=sessions)
+    session = await sessions.create_session(app_name="test", user_id="teacher")
+    message = types.Content(role="user", parts=[types.Part(text=text)])
+    events = [
+        event
+        async for event in runner.run_async(
+            user_id="teacher", session_id=session.id, new_message=message
+        )
+    ]
+    content = events[-1].content
+    return "".join(part.text or "" for part in (content.parts or [])) if content else ""
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("text", "answer"),
+    [
+        ("Make a quiz on fractions for grade 5", "prepared"),
+        ("Make a quiz on fractions for grade 5 in Hindi", "written"),
+        ("Make a quiz of 10 questions on fractions for grade 5", "written"),
+        ("Make a hard quiz on fractions for grade 5", "written"),
+    ],
+)
+async def test_prepared_material_only_answers_plain_requests(
+    cache: MaterialCache, text: str, answer: str
+) -> None:
+    assert await _answer(cache, text) == answer
@@ -0,0 +1,129 @@
+import asyncio
+from collections.abc import AsyncGenerator, Iterator
+from typing import Any
+
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.models import Gemini, LlmRequest, LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from app.sub_agents.hyper_local_content_agent import multilingual
+from app.sub_agents.hyper_local_content_agent.multilingual import (
+    MultilingualContentAgent,
+    requested_languages,
+)
+from app.utils.chunked_generation import chunk_instruction
+
+# Seconds each translation takes: the first language asked for finishes last.
+DELAYS = {"Hindi": 0.05, "Tamil": 0.01}
+
+
+class _NoCache:
+    def get(self, *args: Any) -> None:
+        return None
+
+    def put(self, *args: Any) -> None:
+        pass
+
+
+def _agent(name: str) -> LlmAgent:
+    return LlmAgent(
+        name=name,
+        model="gemini-2.5-flash",
+        instruction=chunk_instruction("Write."),
+        include_contents="none",
+    )
+
+
+@pytest.fixture
+def canonical() -> Iterator[dict[str, str]]:
+    """The canonical writer's answer; empty for a failed draft."""
+    answer = {"text": "A story about the monsoon."}
+
+    async def generate(
+        model: Gemini, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        labels = llm_request.config.labels if llm_request.config else None
+        agent = (labels or {}).get("adk_agent_name", "")
+        if agent == "canonical":
+            yield LlmResponse(
+                content=types.Content(
+                    role="model", parts=[types.Part(text=answer["text"])]
+                )
+            )
+            return
+        config = llm_request.config
+        instruction = str(config.system_instruction if config else "")
+        language = instruction.split("Target language: ")[1].split("\n")[0]
+        for n in range(3):
+            await asyncio.sleep(DELAYS[language])
+            yield LlmResponse(
+                content=types.Content(
+                    role="model", parts=[types.Part(text=f"{language} {n} ")]
+                ),
+                partial=True,
+            )
+        yield LlmResponse(
+            content=types.Content(
+                role="model", parts=[types.Part(text=f"{language} story")]
+            )
+        )
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(Gemini, "generate_content_async", generate)
+        patch.setattr(multilingual, "get_translation_cache", _NoCache)
+        yield answer
+
+
+async def _run(text: str) -> list[Any]:
+    agent = MultilingualContentAgent(
+        name="multilingual",
+        writer=_agent("writer"),
+        canonical_writer=_agent("canonical"),
+        translator=_agent("translator"),
+    )
+    sessions = InMemorySessionService()
+    runner = Runner(app_name="test", agent=agent, session_service=sessions)
+    session = await sessions.create_session(app_name="test", user_id="teacher")
+    message = types.Content(role="user", parts=[types.Part(text=text)])
+    return [
+        event
+        async for event in runner.run_async(
+            user_id="teacher", session_id=session.id, new_message=message
+        )
+    ]
+
+
+def test_requested_languages_need_target_phrasing() -> None:
+    assert requested_languages("A story in Hindi and Tamil") == ["Hindi", "Tamil"]
+    assert requested_languages("translate it to Bengali") == ["Bengali"]
+    assert not requested_languages("teach English grammar to Hindi-speaking students")
+    assert not requested_languages("Tamil Nadu rivers for class 5")
+
+
+@pytest.mark.asyncio
+async def test_translations_are_shown_whole_in_language_order(
+    canonical: dict[str, str],
+) -> None:
+    events = await _run("A story about the monsoon in Hindi and Tamil")
+    texts = [
+        part.text
+        for event in events
+        for part in (event.content.parts if event.content else None) or []
+        if part.text
+    ]
+    assert not any(event.partial for event in events)
+    assert texts == ["Hindi story", "Tamil story"]
+    assert events[-1].actions.state_delta["hyper_local_content"] == {
+        "Hindi": "Hindi story",
+        "Tamil": "Tamil story",
+    }
+
+
+@pytest.mark.asyncio
+async def test_failed_draft_is_reported(canonical: dict[str, str]) -> None:
+    canonical["text"] = ""
+    events = await _run("A story about the monsoon in Hindi and Tamil")
+    assert [event.error_code for event in events] == ["NO_CANONICAL_DRAFT"]
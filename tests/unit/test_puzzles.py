@@ -0,0 +1,62 @@
+from app.sub_agents.fun_activity.sub_agents.word_game_generator.puzzles import (
+    build_crossword,
+    build_scrambles,
+    build_word_search,
+    graphemes,
+    normalize_word,
+)
+
+
+def test_normalize_word_drops_non_letters() -> None:
+    assert normalize_word("water-cycle 2") == "WATERCYCLE"
+    assert normalize_word("123") == ""
+
+
+def test_normalize_word_keeps_other_scripts() -> None:
+    assert normalize_word("किताब") == "किताब"
+    assert normalize_word("தமிழ் நாடு") == "தமிழ்நாடு"
+
+
+def test_graphemes_keep_signs_and_conjuncts_in_one_cell() -> None:
+    assert graphemes("किताब") == ("कि", "ता", "ब")
+    assert graphemes("विद्यालय") == ("वि", "द्या", "ल", "य")
+    # A Tamil pulli ends its cell rather than forming a conjunct.
+    assert graphemes("தமிழ்நாடு") == ("த", "மி", "ழ்", "நா", "டு")
+
+
+def test_crossword_places_devanagari_words() -> None:
+    crossword = build_crossword(
+        [("नदी", "river"), ("दीपक", "lamp"), ("कमल", "lotus"), ("क", "too short")]
+    )
+    placed = {placement.word for placement in crossword.placements}
+    assert placed == {"नदी", "दीपक", "कमल"}
+    assert crossword.unplaced == ["क"]
+
+
+def test_crossword_reports_every_dropped_word() -> None:
+    crossword = build_crossword(
+        [("sun", "star"), ("photosynthesis", "too long"), ("123", "no letters")],
+        size=10,
+    )
+    assert [placement.word for placement in crossword.placements] == ["SUN"]
+    assert sorted(crossword.unplaced) == ["123", "PHOTOSYNTHESIS"]
+
+
+def test_word_search_fills_with_the_words_script() -> None:
+    words = ["किताब", "बादल", "नदी", "कलम"]
+    search = build_word_search(words, size=8)
+    letters = {letter for word in words for letter in graphemes(word)}
+    assert {placement.word for placement in search.placements} == set(words)
+    assert all(cell in letters for row in search.grid for cell in row)
+
+
+def test_word_search_reports_short_and_empty_words() -> None:
+    search = build_word_search(["rain", "a", "42"], size=8)
+    assert [placement.word for placement in search.placements] == ["RAIN"]
+    assert search.unplaced == ["42", "A"]
+
+
+def test_scrambles_skip_words_without_letters() -> None:
+    scrambles = build_scrambles([("बादल", "cloud"), ("42", "number")])
+    assert [(word, clue) for _, word, clue in scrambles] == [("बादल", "cloud")]
+    assert sorted(graphemes(scrambles[0][0])) == sorted(graphemes("बादल"))